@@ -15,7 +15,7 @@ import logging
 # Add shared directory to path (root-level for Docker)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "shared")))
 
-from shared.database.client import DatabaseClient
+from shared.database import create_database_client
 # Import only the basic models that exist
 # from models.base import Agent, Voice, User
 
@@ -82,7 +82,7 @@ app.add_middleware(
 
 # Initialize database client with error handling
 try:
-    db = DatabaseClient()
+    db = create_database_client("agents")
     logger.info("Database client initialized successfully")
 except ValueError as e:
     logger.warning(f"Database client initialization failed: {e}")
@@ -32,7 +32,7 @@ class AnalyticsService:
     
     def __init__(self, database: DatabaseClient):
         self.database = database
-        self.service_client = ServiceClient()
+        self.service_client = ServiceClient("analytics-pro")  # Shares the process-wide connection pools
         self.cache = {}
         self.requests_processed = 0
         
@@ -36,9 +36,34 @@ class Settings(BaseSettings):
     WEBHOOK_TIMEOUT: int = 15  # seconds
     HEALTH_CHECK_TIMEOUT: int = 5  # seconds
     
+    # Upstream Connection Pools (per-service overrides live under SERVICE_CONFIG[...]["pool"])
+    UPSTREAM_HTTP2: bool = False  # requires the optional `h2` package
+    UPSTREAM_MAX_CONNECTIONS: int = 100
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    UPSTREAM_KEEPALIVE_EXPIRY: float = 30.0  # seconds an idle connection is kept open
+    UPSTREAM_POOL_TIMEOUT: float = 5.0  # seconds to wait for a free connection
+    
+    # Request bodies up to this size are buffered so retries can replay them;
+    # larger or chunked uploads are streamed through without retries
+    PROXY_MAX_BUFFERED_BODY: int = 1024 * 1024  # bytes
+    
     # Health Check Settings
     HEALTH_CHECK_INTERVAL: int = 30  # seconds
     UNHEALTHY_THRESHOLD: int = 3  # failed checks before marking unhealthy
+    HEALTH_PROBE_TICK: float = 1.0  # seconds between scans for instances due a probe
+    HEALTH_PROBE_JITTER: float = 0.2  # +/- fraction of HEALTH_CHECK_INTERVAL
+    HEALTH_PROBE_MAX_CONNECTIONS: int = 20
+    
+    # Passive health (outlier detection on proxied traffic)
+    OUTLIER_WINDOW_SIZE: int = 50  # recent requests per instance
+    OUTLIER_MIN_REQUESTS: int = 10  # before error rate or latency can eject
+    OUTLIER_CONSECUTIVE_ERRORS: int = 5
+    OUTLIER_ERROR_RATE: float = 0.5
+    OUTLIER_LATENCY_FACTOR: float = 3.0  # times the median of sibling instances
+    OUTLIER_MIN_LATENCY: float = 0.1  # seconds; faster instances are never latency outliers
+    OUTLIER_BASE_EJECTION_TIME: float = 30.0  # seconds, multiplied by repeat ejections
+    OUTLIER_MAX_EJECTION_TIME: float = 300.0
+    OUTLIER_MAX_EJECTION_PERCENT: float = 50.0
     
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -47,18 +72,48 @@ class Settings(BaseSettings):
     # Monitoring
     ENABLE_METRICS: bool = True
     METRICS_PORT: int = 9090
-    
+
+    # Tracing (W3C traceparent is always propagated; these control what is kept)
+    TRACING_ENABLED: bool = True
+    TRACE_SAMPLE_RATE: float = 0.1  # Head sampling rate for traces starting at the gateway
+    TRACE_SLOW_MS: float = 1000.0  # Traces at least this slow are kept even if not sampled
+    TRACE_MAX_SPANS: int = 10000  # Finished spans buffered in memory
+    TRACE_OTLP_ENDPOINT: Optional[str] = None  # e.g. http://otel-collector:4318/v1/traces
+    TRACE_EXPORT_FILE: Optional[str] = None  # OTLP/JSON lines file when no collector is configured
+
     # Service Discovery
     SERVICE_DISCOVERY_ENABLED: bool = True
     SERVICE_REGISTRY_TTL: int = 300  # seconds
     
     # Circuit Breaker
     CIRCUIT_BREAKER_ENABLED: bool = True
-    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
-    CIRCUIT_BREAKER_TIMEOUT: int = 60  # seconds
+    CIRCUIT_BREAKER_FAILURE_RATE: float = 50.0  # percent of calls in the window that failed
+    CIRCUIT_BREAKER_SLOW_CALL_RATE: float = 80.0  # percent of calls in the window that were slow
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS: float = 10.0
+    CIRCUIT_BREAKER_WINDOW_TYPE: str = "count"  # count (last N calls) or time (last N seconds)
+    CIRCUIT_BREAKER_WINDOW_SIZE: int = 100
+    CIRCUIT_BREAKER_MIN_CALLS: int = 20  # calls in the window before the rates are trusted
+    CIRCUIT_BREAKER_HALF_OPEN_CALLS: int = 3  # trial calls let through while half-open
+    CIRCUIT_BREAKER_TIMEOUT: int = 60  # seconds open before trial calls
     
     # Load Balancing
-    LOAD_BALANCER_STRATEGY: str = "round_robin"  # round_robin, least_connections, weighted
+    LOAD_BALANCER_STRATEGY: str = "p2c"  # p2c, round_robin, least_connections, weighted
+    LOAD_BALANCER_EWMA_DECAY: float = 10.0  # seconds for instance latency EWMA to decay
+    LOAD_BALANCER_DEFAULT_RTT: float = 0.1  # seconds assumed for replicas with no measured responses
+    LOAD_BALANCER_FAILURE_PENALTY: float = 4.0  # 5xx/timeouts count as this multiple of the latency EWMA
+    
+    # Retries and Hedging
+    RETRY_BACKOFF_BASE: float = 0.05  # seconds, doubled per retry with full jitter
+    RETRY_BACKOFF_MAX: float = 1.0
+    RETRY_BUDGET_RATIO: float = 0.2  # retries (incl. hedges) allowed per original request
+    RETRY_BUDGET_MIN_PER_SECOND: float = 5.0
+    HEDGING_ENABLED: bool = True  # GET/HEAD/OPTIONS and calls with an Idempotency-Key
+    HEDGING_PERCENTILE: float = 95.0  # hedge once the first attempt is slower than this
+    HEDGING_MAX_DELAY: float = 1.0  # seconds
+    
+    # Response Cache (routes opt in with a "cache" entry in SERVICE_CONFIG)
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    COALESCE_MAX_BODY_BYTES: int = 1024 * 1024  # larger responses are not shared between coalesced requests
     
     # Webhook Settings
     WEBHOOK_RETRY_ATTEMPTS: int = 3
@@ -97,7 +152,12 @@ SERVICE_CONFIG = {
         "name": "Command Center",
         "timeout": 30,
         "retry_attempts": 2,
-        "health_check_path": "/health"
+        "health_check_path": "/health",
+        "coalesce": True,
+        "cache": {  # Dashboard tiles are polled every few seconds by every open tab
+            "paths": ["*/global-stats", "*/live-stats", "*/kpis", "*/cards", "*/analytics/summary"],
+            "ttl": 5
+        }
     },
     "agents": {
         "name": "AI Agents",
@@ -115,7 +175,12 @@ SERVICE_CONFIG = {
         "name": "Call Center",
         "timeout": 60,  # Calls may take longer
         "retry_attempts": 1,  # Don't retry calls
-        "health_check_path": "/health"
+        "health_check_path": "/health",
+        "retry_budget": {"ratio": 0.1},  # Call volume is high, keep retries from piling on
+        "pool": {
+            "max_connections": 200,  # Highest call volume behind the gateway
+            "max_keepalive_connections": 50
+        }
     },
     "phone-numbers": {
         "name": "Phone Numbers",
@@ -127,13 +192,24 @@ SERVICE_CONFIG = {
         "name": "Voice Marketplace",
         "timeout": 30,
         "retry_attempts": 2,
-        "health_check_path": "/health"
+        "health_check_path": "/health",
+        "coalesce": True,
+        "cache": {  # Catalogue data changes rarely
+            "paths": ["*/stats", "*/tiers", "*/categories", "*/featured"],
+            "ttl": 60
+        }
     },
     "voice-lab": {
         "name": "Voice Lab",
         "timeout": 120,  # Voice generation can be slow
         "retry_attempts": 1,  # Don't retry expensive operations
-        "health_check_path": "/health"
+        "health_check_path": "/health",
+        "hedging": {"enabled": False},  # A duplicate generation costs real money
+        "pool": {
+            "max_connections": 50,  # Long-running requests, keep fewer idle sockets
+            "max_keepalive_connections": 10,
+            "keepalive_expiry": 60.0
+        }
     },
     "flow-builder": {
         "name": "Flow Builder",
@@ -145,13 +221,24 @@ SERVICE_CONFIG = {
         "name": "Analytics Pro",
         "timeout": 60,  # Analytics queries may be slow
         "retry_attempts": 2,
-        "health_check_path": "/health"
+        "health_check_path": "/health",
+        "coalesce": True,
+        "hedging": {"percentile": 99.0, "max_delay": 5.0},  # Slow queries are normal, hedge only outliers
+        "cache": {
+            "paths": ["*/overview", "*/metrics/summary", "*/kpis/*", "*/chart-data/*"],
+            "ttl": 10
+        },
+        "pool": {
+            "max_connections": 100,
+            "max_keepalive_connections": 40  # Dashboards poll analytics constantly
+        }
     },
     "ai-brain": {
         "name": "AI Brain",
         "timeout": 60,  # AI processing can be slow
         "retry_attempts": 1,  # Don't retry AI operations
-        "health_check_path": "/health"
+        "health_check_path": "/health",
+        "hedging": {"enabled": False}
     },
     "integrations": {
         "name": "Integrations",
@@ -169,7 +256,8 @@ SERVICE_CONFIG = {
         "name": "Billing Pro",
         "timeout": 30,
         "retry_attempts": 3,  # Billing is critical
-        "health_check_path": "/health"
+        "health_check_path": "/health",
+        "cache": {"paths": ["*/plans", "*/plans/*"], "ttl": 300}
     },
     "team-hub": {
         "name": "Team Hub",
@@ -8,20 +8,32 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
 
-from fastapi import FastAPI, HTTPException, Depends, Request, Response, status
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from contextlib import asynccontextmanager
 import httpx
 import asyncio
 import time
 import logging
-from typing import Dict, List, Optional, Any, Union
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple, Union
 import os
 from datetime import datetime, timedelta
 from collections import defaultdict
 
+from shared.monitoring.exposition import CONTENT_TYPE as OPENMETRICS_CONTENT_TYPE, MetricsRegistry, MultiprocessAggregator
+from shared.ratelimit import TOKEN_BUCKET, LocalRateLimiter, RateLimitResult, RateLimitRule
+
+try:
+    from .utils.route_table import HeaderPlan, Route, RouteTable
+    from .utils.api_keys import close_developer_api_client
+    from .routes.internal import router as internal_router, verify_internal_secret
+except ImportError:  # Started as a script from the src directory
+    from utils.route_table import HeaderPlan, Route, RouteTable
+    from utils.api_keys import close_developer_api_client
+    from routes.internal import router as internal_router, verify_internal_secret
+
 # Configure logging first
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -54,6 +66,15 @@ SERVICE_REGISTRY = {
     "ai-brain": {"url": "http://ai-brain:8024", "timeout": 30},
 }
 
+# Connection-scoped headers that must not be forwarded between hops
+HOP_BY_HOP_HEADERS = frozenset({
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "proxy-connection", "te", "trailer", "transfer-encoding", "upgrade",
+})
+
+# Identity headers are only ever set by the gateway, never passed through from clients
+USER_CONTEXT_HEADERS = ("X-User-ID", "X-Organization-ID", "X-User-Roles")
+
 # Basic user context for fallback
 class UserContext:
     def __init__(self, user_id="guest", organization_id="default", roles=None, permissions=None, is_active=True, is_verified=True):
@@ -64,39 +85,44 @@ class UserContext:
         self.is_active = is_active
         self.is_verified = is_verified
 
-# Simple rate limiter
+# Rate limiter backed by the shared O(1) token bucket
 class RateLimiter:
     def __init__(self):
-        self.requests = defaultdict(list)
+        self.limiter = LocalRateLimiter(TOKEN_BUCKET)
         self.limits = {
-            "default": {"requests": 100, "window": 60},
-            "authenticated": {"requests": 1000, "window": 60},
+            "default": RateLimitRule(100, 60),
+            "authenticated": RateLimitRule(1000, 60),
         }
     
+    def check(self, key: str, limit_type: str = "default") -> RateLimitResult:
+        return self.limiter.check(f"{limit_type}:{key}", self.limits[limit_type])
+    
     def is_allowed(self, key: str, limit_type: str = "default") -> bool:
-        now = datetime.utcnow()
-        limit_config = self.limits[limit_type]
-        window_start = now - timedelta(seconds=limit_config["window"])
-        
-        # Clean old requests
-        self.requests[key] = [req_time for req_time in self.requests[key] if req_time > window_start]
-        
-        # Check if limit exceeded
-        if len(self.requests[key]) >= limit_config["requests"]:
-            return False
-        
-        # Add current request
-        self.requests[key].append(now)
-        return True
+        return self.check(key, limit_type).allowed
 
 rate_limiter = RateLimiter()
 
+# Seconds a client replaced by a route reload may keep serving its in-flight requests
+ROUTE_RELOAD_GRACE_PERIOD = float(os.getenv("ROUTE_RELOAD_GRACE_PERIOD", "60"))
+
 # Simple service client
 class ServiceClient:
     def __init__(self, service_name: str, base_url: str):
         self.service_name = service_name
         self.base_url = base_url.rstrip("/")
         self.session = None
+        self.in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+    
+    def _acquire(self):
+        self.in_flight += 1
+        self._idle.clear()
+    
+    def _release(self):
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self._idle.set()
     
     async def _get_session(self) -> httpx.AsyncClient:
         if self.session is None or self.session.is_closed:
@@ -107,6 +133,7 @@ class ServiceClient:
         url = f"{self.base_url}{endpoint}"
         session = await self._get_session()
         
+        self._acquire()
         try:
             response = await session.request(method, url, **kwargs)
             return response
@@ -116,6 +143,28 @@ class ServiceClient:
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail=f"Service {self.service_name} unavailable"
             )
+        finally:
+            self._release()
+    
+    async def stream(self, method: str, endpoint: str, **kwargs) -> httpx.Response:
+        """Send request and return as soon as headers arrive; the caller must close_response() it"""
+        url = f"{self.base_url}{endpoint}"
+        session = await self._get_session()
+        
+        self._acquire()
+        try:
+            upstream_request = session.build_request(method, url, **kwargs)
+            return await session.send(upstream_request, stream=True)
+        except Exception as e:
+            self._release()
+            logger.error(f"Request failed to {self.service_name}: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Service {self.service_name} unavailable"
+            )
+        except BaseException:
+            self._release()
+            raise
     
     async def get(self, endpoint: str, **kwargs) -> httpx.Response:
         return await self.request("GET", endpoint, **kwargs)
@@ -129,10 +178,35 @@ class ServiceClient:
     async def delete(self, endpoint: str, **kwargs) -> httpx.Response:
         return await self.request("DELETE", endpoint, **kwargs)
     
+    async def close_response(self, response: httpx.Response):
+        """Close a response returned by stream(), ending its request"""
+        try:
+            await response.aclose()
+        finally:
+            self._release()
+    
+    async def iter_response(self, response: httpx.Response) -> AsyncIterator[bytes]:
+        """Yield the raw body of a response returned by stream(), closing it however the stream ends"""
+        try:
+            async for chunk in response.aiter_raw():
+                yield chunk
+        finally:
+            await self.close_response(response)
+    
     async def close(self):
         if self.session and not self.session.is_closed:
             await self.session.aclose()
     
+    async def drain_and_close(self, grace_period: float):
+        """Close once in-flight requests have finished, or after `grace_period` seconds regardless"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), grace_period)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"⏳ Closing replaced {self.service_name} client with {self.in_flight} requests still in flight"
+            )
+        await self.close()
+    
     def get_health_stats(self) -> Dict[str, Any]:
         return {
             "service_name": self.service_name,
@@ -143,6 +217,7 @@ class ServiceClient:
 class ServiceClients:
     def __init__(self):
         self.clients: Dict[str, ServiceClient] = {}
+        self._retiring: Dict[ServiceClient, asyncio.Task] = {}
         self._initialized = False
     
     async def initialize(self):
@@ -156,6 +231,24 @@ class ServiceClients:
         self._initialized = True
         logger.info(f"Initialized {len(self.clients)} service clients")
     
+    def sync_registry(self) -> List[ServiceClient]:
+        """Create clients for services added or moved in SERVICE_REGISTRY; returns replaced clients"""
+        replaced = []
+        for service_name, config in SERVICE_REGISTRY.items():
+            client = self.clients.get(service_name)
+            if client is None or client.base_url != config["url"].rstrip("/"):
+                if client is not None:
+                    replaced.append(client)
+                self.clients[service_name] = ServiceClient(service_name, config["url"])
+        return replaced
+    
+    def retire(self, clients: List[ServiceClient], grace_period: float = ROUTE_RELOAD_GRACE_PERIOD):
+        """Close replaced clients in the background once their in-flight requests drain"""
+        for client in clients:
+            task = asyncio.create_task(client.drain_and_close(grace_period))
+            self._retiring[client] = task
+            task.add_done_callback(lambda _, client=client: self._retiring.pop(client, None))
+    
     def get_client(self, service_name: str) -> ServiceClient:
         if not self._initialized:
             raise Exception("Service clients not initialized")
@@ -169,32 +262,78 @@ class ServiceClients:
         return client
     
     async def close_all(self):
+        for client, task in list(self._retiring.items()):
+            task.cancel()
+            await client.close()
         for client in self.clients.values():
             await client.close()
 
 # Global service clients
 service_clients = ServiceClients()
 
+def compile_routes() -> List[Route]:
+    """Resolve each service's client, timeout and header rewrites once"""
+    header_plan = HeaderPlan.build(drop=USER_CONTEXT_HEADERS)
+    return [
+        Route(
+            service_name=service_name,
+            prefix=f"/{service_name}",
+            upstream_url=config["url"].rstrip("/"),
+            timeout=config.get("timeout", 30),
+            header_plan=header_plan,
+            client=service_clients.get_client(service_name),
+            config=config
+        )
+        for service_name, config in SERVICE_REGISTRY.items()
+    ]
+
+# Compiled at startup; POST /routes/reload recompiles after SERVICE_REGISTRY changes
+route_table = RouteTable()
+
 # Simple metrics collector
 class SimpleMetrics:
-    def __init__(self):
-        self.metrics = {}
+    """Gateway counters and timings, kept in fixed memory and scrapeable as OpenMetrics"""
+    
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
     
     def counter(self, name: str, labels: Dict[str, str] = None):
-        key = f"{name}:{labels}" if labels else name
-        self.metrics[key] = self.metrics.get(key, 0) + 1
+        self.registry.counter(name).labels(labels).inc()
     
     def timing(self, name: str, value: float, labels: Dict[str, str] = None):
-        key = f"{name}_duration:{labels}" if labels else f"{name}_duration"
-        if key not in self.metrics:
-            self.metrics[key] = []
-        self.metrics[key].append(value)
+        self.registry.summary(f"{name}_duration").labels(labels).observe(value)
     
     def get_metrics(self):
-        return self.metrics
+        """JSON summary: counters as values, timings as count/sum/percentiles"""
+        result = {}
+        for name, family in self.registry.families.items():
+            for child in family.children.values():
+                key = f"{name}{child.rendered_labels}"
+                if hasattr(child, "histogram"):
+                    total = child.histogram.total
+                    percentiles = total.quantiles((0.5, 0.95, 0.99))
+                    result[key] = {
+                        "count": total.count,
+                        "sum": total.sum,
+                        "p50": percentiles[0.5],
+                        "p95": percentiles[0.95],
+                        "p99": percentiles[0.99]
+                    }
+                else:
+                    result[key] = child.value
+        return result
+    
+    def render(self) -> bytes:
+        return self.registry.render()
 
 metrics = SimpleMetrics()
 
+# Under multiple uvicorn workers, every worker publishes snapshots here and scrapes merge them
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+metrics_aggregator = (
+    MultiprocessAggregator(METRICS_MULTIPROC_DIR, metrics.registry) if METRICS_MULTIPROC_DIR else None
+)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
@@ -202,6 +341,9 @@ async def lifespan(app: FastAPI):
     
     # Initialize service clients
     await service_clients.initialize()
+    route_table.load(compile_routes())
+    if metrics_aggregator:
+        await metrics_aggregator.start()
     
     logger.info("✅ API Gateway started successfully")
     
@@ -211,6 +353,9 @@ async def lifespan(app: FastAPI):
     
     # Close service clients
     await service_clients.close_all()
+    await close_developer_api_client()
+    if metrics_aggregator:
+        await metrics_aggregator.stop()
     
     logger.info("✅ API Gateway shutdown complete")
 
@@ -238,6 +383,9 @@ app.add_middleware(
     allowed_hosts=["*"]
 )
 
+# Service-to-service endpoints (API key cache invalidation); mounted before the catch-all proxy route
+app.include_router(internal_router)
+
 # Request/Response middleware
 @app.middleware("http")
 async def observability_middleware(request: Request, call_next):
@@ -245,8 +393,7 @@ async def observability_middleware(request: Request, call_next):
     start_time = time.time()
     
     # Extract service from path
-    path_parts = request.url.path.strip("/").split("/")
-    service_name = path_parts[0] if path_parts and path_parts[0] else "gateway"
+    service_name = request.scope["path"].lstrip("/").partition("/")[0] or "gateway"
     
     try:
         response = await call_next(request)
@@ -284,11 +431,13 @@ async def rate_limiting_middleware(request: Request, call_next):
     auth_header = request.headers.get("authorization")
     limit_type = "authenticated" if auth_header else "default"
     
-    if not rate_limiter.is_allowed(client_key, limit_type):
+    result = rate_limiter.check(client_key, limit_type)
+    if not result.allowed:
         metrics.counter("gateway_rate_limited_total")
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="Rate limit exceeded"
+            detail="Rate limit exceeded",
+            headers=result.headers()
         )
     
     return await call_next(request)
@@ -371,10 +520,31 @@ async def detailed_health():
     return health_status
 
 @app.get("/metrics")
-async def get_metrics():
-    """Get gateway metrics"""
+async def get_metrics(request: Request):
+    """Get gateway metrics (OpenMetrics text for scrapers, JSON otherwise)"""
+    accept = request.headers.get("accept", "")
+    if "application/openmetrics-text" in accept or "text/plain" in accept:
+        return Response(content=metrics.render(), media_type=OPENMETRICS_CONTENT_TYPE)
     return {"metrics": metrics.get_metrics()}
 
+@app.get("/routes")
+async def get_routes():
+    """Get the compiled route table"""
+    return route_table.get_stats()
+
+@app.post("/routes/reload")
+async def reload_routes(x_internal_secret: Optional[str] = Header(None)):
+    """Recompile the route table from SERVICE_REGISTRY"""
+    verify_internal_secret(x_internal_secret)
+    replaced = service_clients.sync_registry()
+    route_table.load(compile_routes())
+    
+    # No new request can be routed to the old clients now; close them once their
+    # in-flight requests (including responses still streaming) have finished
+    service_clients.retire(replaced)
+    
+    return {"message": "Route table reloaded", "version": route_table.version, "total_routes": len(route_table)}
+
 @app.get("/services")
 async def list_services():
     """List all available services"""
@@ -401,39 +571,33 @@ async def list_services():
 
 # Enhanced proxy functionality
 async def proxy_request(
-    service_name: str,
+    route: Route,
     path: str,
     method: str,
-    headers: Dict[str, str],
-    body: Optional[bytes] = None,
-    query_params: Optional[Dict[str, str]] = None
+    headers: List[Tuple[bytes, bytes]],
+    body: Optional[Union[bytes, AsyncIterator[bytes]]] = None,
+    query_string: bytes = b""
 ) -> httpx.Response:
-    """Proxy request with error handling"""
-    client = service_clients.get_client(service_name)
-    
-    # Prepare request
-    kwargs = {
-        "headers": headers,
-        "params": query_params
-    }
+    """Proxy request with error handling.
     
-    if body:
-        kwargs["content"] = body
-    
-    # Make request based on method
-    if method == "GET":
-        return await client.get(path, **kwargs)
-    elif method == "POST":
-        return await client.post(path, **kwargs)
-    elif method == "PUT":
-        return await client.put(path, **kwargs)
-    elif method == "DELETE":
-        return await client.delete(path, **kwargs)
-    else:
+    The body may be bytes or an async byte stream; the returned response is left
+    unread so it can be streamed back with route.client.iter_response(), which closes it.
+    """
+    if method not in ("GET", "POST", "PUT", "DELETE", "PATCH"):
         raise HTTPException(
             status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
             detail=f"Method {method} not supported"
         )
+    
+    # Forward the raw query string so repeated parameters survive
+    if query_string:
+        path = f"{path}?{query_string.decode('latin-1')}"
+    
+    kwargs = {"headers": headers, "timeout": route.timeout}
+    if body is not None:
+        kwargs["content"] = body
+    
+    return await route.client.stream(method, path, **kwargs)
 
 # Dynamic route handler
 @app.api_route("/{service_name:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
@@ -443,51 +607,50 @@ async def proxy_to_service(
     user: Optional[UserContext] = Depends(get_optional_user)
 ):
     """Dynamic proxy to microservices"""
-    # Parse service and path
-    path_parts = service_name.split("/", 1)
-    actual_service = path_parts[0]
-    remaining_path = "/" + path_parts[1] if len(path_parts) > 1 else "/"
-    
-    # Check if service exists
-    if actual_service not in SERVICE_REGISTRY:
+    # Resolve service and remaining path against the compiled route table
+    match = route_table.match(service_name)
+    if match is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Service '{actual_service}' not found"
+            detail=f"Service '{service_name.partition('/')[0]}' not found"
         )
+    route, remaining_path = match
+    actual_service = route.service_name
     
     try:
-        # Prepare headers
-        headers = dict(request.headers)
-        headers.pop("host", None)
-        
         # Add user context to headers if authenticated
+        user_headers = []
         if user:
-            headers["X-User-ID"] = user.user_id
-            headers["X-Organization-ID"] = user.organization_id
-            headers["X-User-Roles"] = ",".join([str(role) for role in user.roles])
+            user_headers = [
+                (b"x-user-id", user.user_id.encode()),
+                (b"x-organization-id", user.organization_id.encode()),
+                (b"x-user-roles", ",".join([str(role) for role in user.roles]).encode())
+            ]
+        headers = route.header_plan.apply(request.scope["headers"], user_headers)
         
-        # Get request body
-        body = await request.body() if request.method in ["POST", "PUT", "PATCH"] else None
-        
-        # Get query parameters
-        query_params = dict(request.query_params) if request.query_params else None
+        # Pipe the request body through without buffering it
+        body = request.stream() if request.method in ["POST", "PUT", "PATCH"] else None
         
         # Proxy the request
         response = await proxy_request(
-            actual_service,
+            route,
             remaining_path,
             request.method,
             headers,
             body,
-            query_params
+            request.scope.get("query_string", b"")
         )
         
-        # Return response
-        return Response(
-            content=response.content,
+        # Stream the raw (still encoded) body back, so Content-Encoding/Length stay valid
+        response_headers = {
+            name: value for name, value in response.headers.items()
+            if name not in HOP_BY_HOP_HEADERS
+        }
+        
+        return StreamingResponse(
+            route.client.iter_response(response),
             status_code=response.status_code,
-            headers=dict(response.headers),
-            media_type=response.headers.get("content-type")
+            headers=response_headers
         )
         
     except Exception as e:
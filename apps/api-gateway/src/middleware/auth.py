@@ -7,6 +7,8 @@ from datetime import datetime
 import logging
 import os
 
+from ..utils.api_keys import validate_api_key, invalidate_api_key, get_api_key_cache_stats
+
 logger = logging.getLogger(__name__)
 
 async def auth_middleware(request: Request, call_next):
@@ -19,7 +21,8 @@ async def auth_middleware(request: Request, call_next):
         "/redoc", 
         "/openapi.json",
         "/",
-        "/webhooks"  # Webhooks have their own auth
+        "/webhooks",  # Webhooks have their own auth
+        "/internal"  # Service-to-service calls authenticate with INTERNAL_SERVICE_SECRET
     ]
     
     if any(request.url.path.startswith(path) for path in skip_auth_paths):
@@ -75,38 +78,25 @@ async def auth_middleware(request: Request, call_next):
     
     return await call_next(request)
 
-async def validate_api_key(api_key: str) -> bool:
-    """Validate API key with developer-api service"""
-    try:
-        developer_api_url = os.getenv("DEVELOPER_API_SERVICE_URL", "http://localhost:8017")
-        
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.post(
-                f"{developer_api_url}/api/v1/validate-key",
-                json={"api_key": api_key}
-            )
-            return response.status_code == 200
-    except:
-        # If developer-api service is down, allow request (graceful degradation)
-        logger.warning("Could not validate API key - developer-api service unavailable")
-        return True
-
 # apps/api-gateway/src/middleware/rate_limiting.py
+import math
 import time
-import json from collections import defaultdict
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
 import redis.asyncio as redis
 import logging
 import os
 
+from shared.ratelimit import SLIDING_WINDOW, LocalRateLimiter, RateLimitRule, RedisRateLimiter
+
 logger = logging.getLogger(__name__)
 
 class RateLimiter:
     def __init__(self):
         self.redis_url = os.getenv("REDIS_URL")
         self.redis_client = None
-        self.memory_store = defaultdict(list)  # Fallback to memory if no Redis
+        self.local_limiter = LocalRateLimiter(SLIDING_WINDOW)  # Fallback to memory if no Redis
+        self.redis_limiter = None
         
     async def initialize(self):
         """Initialize Redis connection"""
@@ -114,74 +104,38 @@ class RateLimiter:
             try:
                 self.redis_client = redis.from_url(self.redis_url)
                 await self.redis_client.ping()
+                # Hash state under its own prefix: the ZSETs the previous limiter kept at
+                # rate_limit:user:* / rate_limit:ip:* would otherwise fail with WRONGTYPE
+                self.redis_limiter = RedisRateLimiter(
+                    self.redis_client, SLIDING_WINDOW, prefix="rate_limit:v2:", fallback=self.local_limiter
+                )
                 logger.info("✅ Redis connected for rate limiting")
             except Exception as e:
                 logger.warning(f"⚠️ Redis connection failed, using memory store: {e}")
                 self.redis_client = None
+                self.redis_limiter = None
     
     async def is_allowed(self, key: str, limit: int, window: int) -> tuple[bool, dict]:
         """Check if request is allowed within rate limits"""
-        current_time = time.time()
+        rule = RateLimitRule(limit, window)
         
-        if self.redis_client:
-            return await self._redis_rate_limit(key, limit, window, current_time)
+        if self.redis_limiter:
+            result = await self.redis_limiter.check(key, rule)
         else:
-            return await self._memory_rate_limit(key, limit, window, current_time)
-    
-    async def _redis_rate_limit(self, key: str, limit: int, window: int, current_time: float) -> tuple[bool, dict]:
-        """Redis-based rate limiting with sliding window"""
-        try:
-            pipe = self.redis_client.pipeline()
-            
-            # Remove old entries
-            pipe.zremrangebyscore(key, 0, current_time - window)
-            
-            # Count current requests
-            pipe.zcard(key)
-            
-            # Add current request
-            pipe.zadd(key, {str(current_time): current_time})
-            
-            # Set expiry
-            pipe.expire(key, window)
-            
-            results = await pipe.execute()
-            current_count = results[1]
-            
-            allowed = current_count < limit
-            
-            return allowed, {
-                "limit": limit,
-                "remaining": max(0, limit - current_count - 1),
-                "reset_time": int(current_time + window),
-                "retry_after": window if not allowed else None
-            }
-            
-        except Exception as e:
-            logger.error(f"Redis rate limiting error: {e}")
-            # Fallback to allowing request
-            return True, {"limit": limit, "remaining": limit - 1, "reset_time": int(current_time + window)}
-    
-    async def _memory_rate_limit(self, key: str, limit: int, window: int, current_time: float) -> tuple[bool, dict]:
-        """Memory-based rate limiting (fallback)"""
-        # Clean old entries
-        self.memory_store[key] = [
-            timestamp for timestamp in self.memory_store[key]
-            if current_time - timestamp < window
-        ]
+            result = self.local_limiter.check(key, rule)
         
-        current_count = len(self.memory_store[key])
-        allowed = current_count < limit
-        
-        if allowed:
-            self.memory_store[key].append(current_time)
-        
-        return allowed, {
-            "limit": limit,
-            "remaining": max(0, limit - current_count - (1 if allowed else 0)),
-            "reset_time": int(current_time + window),
-            "retry_after": window if not allowed else None
+        return result.allowed, {
+            "limit": result.limit,
+            "remaining": result.remaining,
+            "reset_time": int(time.time() + result.reset_after),
+            "retry_after": None if result.allowed else max(1, math.ceil(result.retry_after))
         }
+    
+    def get_stats(self) -> dict:
+        """Get rate limiter statistics"""
+        if self.redis_limiter:
+            return self.redis_limiter.get_stats()
+        return self.local_limiter.get_stats()
 
 # Global rate limiter instance
 rate_limiter = RateLimiter()
@@ -203,10 +157,10 @@ async def rate_limit_middleware(request: Request, call_next):
     user_id = getattr(request.state, "user_id", None)
     
     if user_id:
-        rate_key = f"rate_limit:user:{user_id}"
+        rate_key = f"user:{user_id}"
         limit = 5000  # Higher limit for authenticated users
     else:
-        rate_key = f"rate_limit:ip:{client_ip}"
+        rate_key = f"ip:{client_ip}"
         limit = 1000  # Lower limit for anonymous users
     
     window = 3600  # 1 hour window
@@ -340,12 +294,14 @@ This module contains all middleware for the Vocelio.ai API Gateway:
 - Error handling and metrics
 """
 
-from .auth import auth_middleware
+from .auth import auth_middleware, invalidate_api_key, get_api_key_cache_stats
 from .rate_limiting import rate_limit_middleware, rate_limiter
 from .logging import request_logging_middleware
 
 __all__ = [
     "auth_middleware",
+    "invalidate_api_key",
+    "get_api_key_cache_stats",
     "rate_limit_middleware", 
     "rate_limiter",
     "request_logging_middleware"
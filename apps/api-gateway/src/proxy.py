@@ -1,23 +1,41 @@
 # apps/api-gateway/src/routes/proxy.py
-from fastapi import APIRouter, Request, Response, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Header, Request, Response, HTTPException, BackgroundTasks
 from fastapi.responses import StreamingResponse
 import httpx
 import asyncio
 import time
 import json
+import random
+import hashlib
 import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional
 import os
 
-from ..utils.service_discovery import ServiceDiscovery
+from ..utils.service_discovery import ServiceDiscovery, parse_instance_urls
 from ..utils.load_balancer import LoadBalancer
+from ..utils.upstream_pool import UpstreamPoolManager, strip_hop_by_hop_headers
+from ..utils.route_table import HeaderPlan, Route, RouteTable
+from ..utils.hedging import HedgePolicy, RetryBudget, hedged_call
+from ..utils.response_cache import (
+    CACHEABLE_METHODS, CachedResponse, CachePolicy, ResponseCache,
+    etag_matches, normalize_query_string, parse_cache_control
+)
+from ..utils.cache import SingleFlight
 from ..config import settings, SERVICE_CONFIG
+from .internal import verify_internal_secret
+from shared.utils.circuit_breaker import CircuitOpenError
+from shared.monitoring.tracing import (
+    BatchSpanExporter, DistributedTracer, JsonFileSpanSink, OTLPHttpSpanSink,
+    format_traceparent, parse_traceparent
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Service URLs
+# Service URLs (comma-separate several URLs to balance across instances)
 SERVICES = {
     "overview": os.getenv("OVERVIEW_SERVICE_URL", "http://localhost:8001"),
     "agents": os.getenv("AGENTS_SERVICE_URL", "http://localhost:8002"),
@@ -43,6 +61,130 @@ SERVICES = {
 service_discovery = ServiceDiscovery(SERVICES)
 load_balancer = LoadBalancer(SERVICES)
 
+# Health checks and instance (de)registration feed the load balancer's instance pools
+load_balancer.attach_service_discovery(service_discovery)
+
+# One long-lived keep-alive client per upstream service
+upstream_pools = UpstreamPoolManager(SERVICES)
+
+# Gateway spans continue the caller's trace (or start one) and are handed on via traceparent
+def build_tracer() -> DistributedTracer:
+    exporter = None
+    if settings.TRACE_OTLP_ENDPOINT:
+        exporter = BatchSpanExporter(OTLPHttpSpanSink(settings.TRACE_OTLP_ENDPOINT))
+    elif settings.TRACE_EXPORT_FILE:
+        exporter = BatchSpanExporter(JsonFileSpanSink(settings.TRACE_EXPORT_FILE))
+    return DistributedTracer(
+        "api-gateway",
+        sample_rate=settings.TRACE_SAMPLE_RATE,
+        slow_trace_ms=settings.TRACE_SLOW_MS,
+        max_spans=settings.TRACE_MAX_SPANS,
+        exporter=exporter
+    )
+
+tracer = build_tracer()
+
+# Shared cache for the read endpoints routes opt into via SERVICE_CONFIG["cache"]
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES)
+
+def compile_routes() -> list:
+    """Resolve each service's pool, timeout, retry budget and header rewrites once"""
+    routes = []
+    for service_name, service_url in SERVICES.items():
+        config = SERVICE_CONFIG.get(service_name, {})
+        routes.append(Route(
+            service_name=service_name,
+            prefix=f"/{service_name}",
+            upstream_url=parse_instance_urls(service_url)[0],
+            upstream_path="/api/v1",
+            timeout=config.get("timeout", settings.SERVICE_TIMEOUT),
+            retry_attempts=config.get("retry_attempts", 2),
+            header_plan=HeaderPlan.build(add={
+                "X-Gateway-Version": settings.VERSION,
+                "X-Service-Route": service_name
+            }, drop=("traceparent",) if settings.TRACING_ENABLED else ()),  # Replaced by the gateway span's traceparent
+            client=upstream_pools.get_pool(service_name),
+            config=config,
+            cache_policy=CachePolicy.from_config(config.get("cache")),
+            coalesce=config.get("coalesce", False)
+        ))
+    return routes
+
+# Compiled once at startup; POST /proxy/routes/reload recompiles after config changes
+route_table = RouteTable(compile_routes())
+
+def get_route(service_name: str) -> Route:
+    """Look up the compiled route for a service"""
+    route = route_table.get(service_name)
+    if route is None:
+        raise HTTPException(status_code=404, detail=f"Service '{service_name}' not found")
+    return route
+
+# Per-service hedging and retry budgets, built from SERVICE_CONFIG on first use
+hedge_policies: Dict[str, HedgePolicy] = {}
+retry_budgets: Dict[str, RetryBudget] = {}
+
+def get_hedge_policy(service_name: str) -> HedgePolicy:
+    policy = hedge_policies.get(service_name)
+    if policy is None:
+        policy = hedge_policies[service_name] = HedgePolicy.from_config(
+            SERVICE_CONFIG.get(service_name, {}).get("hedging"),
+            enabled=settings.HEDGING_ENABLED,
+            percentile=settings.HEDGING_PERCENTILE,
+            max_delay=settings.HEDGING_MAX_DELAY
+        )
+    return policy
+
+# Per-service request coalescing for routes with SERVICE_CONFIG["coalesce"]
+coalescers: Dict[str, SingleFlight] = {}
+coalescing_stats = defaultdict(lambda: {"requests": 0, "unshareable": 0})
+
+def get_coalescer(service_name: str) -> SingleFlight:
+    coalescer = coalescers.get(service_name)
+    if coalescer is None:
+        coalescer = coalescers[service_name] = SingleFlight()
+    return coalescer
+
+def get_coalescing_metrics() -> Dict[str, Any]:
+    """Share of coalescable reads that rode along on another request's upstream call"""
+    metrics = {}
+    for service_name, coalescer in coalescers.items():
+        stats = coalescing_stats[service_name]
+        metrics[service_name] = {
+            **coalescer.get_stats(),
+            "requests": stats["requests"],
+            "unshareable": stats["unshareable"],
+            "coalescing_ratio": (
+                (coalescer.shared_calls - stats["unshareable"]) / stats["requests"]
+                if stats["requests"] > 0 else 0
+            )
+        }
+    return metrics
+
+def get_retry_budget(service_name: str) -> RetryBudget:
+    budget = retry_budgets.get(service_name)
+    if budget is None:
+        budget = retry_budgets[service_name] = RetryBudget.from_config(
+            SERVICE_CONFIG.get(service_name, {}).get("retry_budget"),
+            ratio=settings.RETRY_BUDGET_RATIO,
+            min_retries_per_second=settings.RETRY_BUDGET_MIN_PER_SECOND
+        )
+    return budget
+
+@router.on_event("startup")
+async def start_service_discovery():
+    """Probe idle and ejected instances in the background; live traffic covers the rest"""
+    service_discovery.start()
+    if tracer.exporter is not None:
+        tracer.exporter.start()
+
+@router.on_event("shutdown")
+async def close_upstream_pools():
+    """Close pooled upstream connections on shutdown"""
+    await upstream_pools.close()
+    await service_discovery.cleanup()
+    await tracer.shutdown()
+
 @router.get("/proxy/services")
 async def list_proxy_services():
     """List all available services for proxying"""
@@ -91,6 +233,27 @@ def get_service_description(service_name: str) -> str:
     }
     return descriptions.get(service_name, f"{service_name.replace('-', ' ').title()} service")
 
+@router.get("/proxy/routes")
+async def get_route_table():
+    """Get the compiled route table"""
+    return route_table.get_stats()
+
+@router.post("/proxy/routes/reload")
+async def reload_route_table(x_internal_secret: Optional[str] = Header(None)):
+    """Recompile the route table from the current service configuration"""
+    verify_internal_secret(x_internal_secret)
+    route_table.load(compile_routes())
+    
+    # Pick up changed hedging and retry budget settings
+    hedge_policies.clear()
+    retry_budgets.clear()
+    return {
+        "message": "Route table reloaded",
+        "version": route_table.version,
+        "total_routes": len(route_table),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
 @router.get("/proxy/load-balancer/status")
 async def get_load_balancer_status():
     """Get current load balancer status and metrics"""
@@ -134,6 +297,63 @@ async def control_circuit_breaker(service_name: str, action: str):
         logger.error(f"Error controlling circuit breaker: {e}")
         raise HTTPException(status_code=500, detail="Unable to control circuit breaker")
 
+@router.get("/proxy/instances/{service_name}")
+async def get_service_instances(service_name: str):
+    """List the instances of a service with their load and health"""
+    if service_name not in SERVICES:
+        raise HTTPException(status_code=404, detail=f"Service '{service_name}' not found")
+    
+    return {
+        "service": service_name,
+        "strategy": settings.LOAD_BALANCER_STRATEGY,
+        "instances": load_balancer.pools[service_name].get_metrics(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@router.post("/proxy/instances/{service_name}")
+async def register_service_instance(service_name: str, request: Request):
+    """Add an instance to a service without restarting the gateway"""
+    if service_name not in SERVICES:
+        raise HTTPException(status_code=404, detail=f"Service '{service_name}' not found")
+    
+    payload = await request.json()
+    url = payload.get("url")
+    if not url:
+        raise HTTPException(status_code=400, detail="Instance 'url' is required")
+    
+    # Takes traffic right away; the next health check ejects it if it is not serving
+    service_discovery.register_instance(service_name, url)
+    return await get_service_instances(service_name)
+
+@router.delete("/proxy/instances/{service_name}")
+async def deregister_service_instance(service_name: str, url: str):
+    """Remove an instance from a service; requests already sent to it complete normally"""
+    if service_name not in SERVICES:
+        raise HTTPException(status_code=404, detail=f"Service '{service_name}' not found")
+    
+    try:
+        service_discovery.deregister_instance(service_name, url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await get_service_instances(service_name)
+
+@router.post("/proxy/instances/{service_name}/{action}")
+async def control_service_instance(service_name: str, action: str, url: str, duration: Optional[float] = None):
+    """Eject an instance from rotation (for `duration` seconds, or until readmitted) or readmit it"""
+    if service_name not in SERVICES:
+        raise HTTPException(status_code=404, detail=f"Service '{service_name}' not found")
+    
+    if action == "eject":
+        found = load_balancer.eject_instance(service_name, url, duration)
+    elif action == "readmit":
+        found = load_balancer.readmit_instance(service_name, url)
+    else:
+        raise HTTPException(status_code=400, detail="Action must be 'eject' or 'readmit'")
+    
+    if not found:
+        raise HTTPException(status_code=404, detail=f"Instance '{url}' not found for {service_name}")
+    return await get_service_instances(service_name)
+
 @router.get("/proxy/metrics")
 async def get_proxy_metrics():
     """Get comprehensive proxy metrics"""
@@ -148,6 +368,12 @@ async def get_proxy_metrics():
         return {
             "service_discovery": sd_metrics,
             "load_balancer": lb_metrics,
+            "upstream_pools": upstream_pools.get_metrics(),
+            "response_cache": response_cache.get_stats(),
+            "coalescing": get_coalescing_metrics(),
+            "hedging": {name: policy.get_stats() for name, policy in hedge_policies.items()},
+            "retry_budgets": {name: budget.get_stats() for name, budget in retry_budgets.items()},
+            "tracing": tracer.get_stats(),
             "gateway_info": {
                 "version": settings.VERSION,
                 "environment": settings.ENVIRONMENT,
@@ -161,116 +387,309 @@ async def get_proxy_metrics():
         logger.error(f"Error getting proxy metrics: {e}")
         raise HTTPException(status_code=500, detail="Unable to fetch proxy metrics")
 
-async def proxy_request_with_retry(
-    service_name: str,
-    path: str,
+async def prepare_request_body(request: Request, max_retries: int):
+    """Decide how the request body is forwarded.
+    
+    Small bodies that a retry may need to replay are buffered once. Everything else
+    (large or chunked uploads, or calls that are never retried) is streamed straight
+    through to the upstream, in which case retries are disabled for the call.
+    Returns (content, max_retries).
+    """
+    content_length = request.headers.get("content-length")
+    is_chunked = "chunked" in request.headers.get("transfer-encoding", "").lower()
+    
+    if not is_chunked and content_length in (None, "0"):
+        return None, max_retries
+    
+    if max_retries > 0 and not is_chunked:
+        try:
+            if int(content_length) <= settings.PROXY_MAX_BUFFERED_BODY:
+                return await request.body(), max_retries
+        except ValueError:
+            pass
+        
+        logger.debug(f"Streaming {content_length or 'chunked'} byte upload, retries disabled")
+    
+    return request.stream(), 0
+
+def stream_upstream_response(response: httpx.Response, extra_headers: Dict[str, str],
+                             instance=None) -> StreamingResponse:
+    """Pipe the upstream response body to the client chunk by chunk"""
+    # Raw (still encoded) bytes are forwarded, so Content-Encoding/Content-Length stay valid
+    response_headers = strip_hop_by_hop_headers(dict(response.headers))
+    response_headers.update(extra_headers)
+    
+    return StreamingResponse(
+        iterate_upstream_body(response, response.aiter_raw(), instance),
+        status_code=response.status_code,
+        headers=response_headers
+    )
+
+def serve_cached_response(entry: CachedResponse, request: Request, cache_status: str,
+                          extra_headers: Optional[Dict[str, str]] = None) -> Response:
+    """Answer from the cache, with 304 when the client already has this version"""
+    age = str(int(max(0.0, response_cache.clock() - entry.stored_at)))
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, entry.etag):
+        response_cache.not_modified += 1
+        headers = {name: value for name, value in entry.headers if name.lower() in ("etag", "cache-control", "vary")}
+        headers.update(extra_headers or {})
+        headers.update({"X-Cache": cache_status, "Age": age})
+        return Response(status_code=304, headers=headers)
+    
+    headers = dict(entry.headers)
+    headers.update(extra_headers or {})
+    headers.update({"X-Cache": cache_status, "Age": age})
+    return Response(
+        content=entry.body if request.method != "HEAD" else b"",
+        status_code=entry.status_code,
+        headers=headers
+    )
+
+def cacheable_ttl(response: httpx.Response, policy: CachePolicy) -> Optional[float]:
+    """Seconds the upstream response may be cached for, or None if it must not be"""
+    ttl = policy.freshness(parse_cache_control(response.headers.get("cache-control")))
+    content_length = response.headers.get("content-length", "")
+    vary = {name.strip().lower() for name in response.headers.get("vary", "").split(",") if name.strip()}
+    
+    if (
+        response.status_code != 200
+        or ttl is None
+        or not content_length.isdigit()
+        or int(content_length) > policy.max_entry_bytes
+        or "set-cookie" in response.headers
+        or vary - {"accept-encoding"}  # Varies on something the key does not include
+    ):
+        return None
+    return ttl
+
+async def cache_upstream_response(
+    response: httpx.Response,
+    instance,
+    cache_key,
+    policy: CachePolicy,
     request: Request,
-    max_retries: int = None
+    extra_headers: Dict[str, str]
 ) -> Response:
-    """Proxy request with intelligent retry logic"""
+    """Buffer and store a cacheable upstream response, or stream it through when it is not"""
+    ttl = cacheable_ttl(response, policy)
+    if ttl is None:
+        response_cache.uncacheable += 1
+        return stream_upstream_response(response, {**extra_headers, "X-Cache": "BYPASS"}, instance)
     
-    if max_retries is None:
-        config = SERVICE_CONFIG.get(service_name, {})
-        max_retries = config.get("retry_attempts", 2)
+    try:
+        # Raw (still encoded) bytes, so the stored Content-Encoding/Content-Length stay valid
+        body = b"".join([chunk async for chunk in response.aiter_raw()])
+    finally:
+        await close_upstream_response(response, instance)
+    
+    headers = list(strip_hop_by_hop_headers(dict(response.headers)).items())
+    entry = response_cache.store(cache_key, response.status_code, headers, body, ttl)
+    return serve_cached_response(entry, request, "MISS", extra_headers)
+
+async def iterate_upstream_body(response: httpx.Response, chunks: AsyncIterator[bytes], instance=None):
+    """Yield the upstream body, closing the response however the stream ends.
+    
+    Starlette skips a response's BackgroundTask when the body iterator raises
+    (e.g. the upstream resets mid-download) or the client disconnects.
+    """
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        await close_upstream_response(response, instance)
+
+async def close_upstream_response(response: httpx.Response, instance=None):
+    """Return the connection to the pool and stop counting the request against its instance"""
+    try:
+        await response.aclose()
+    finally:
+        if instance is not None:
+            load_balancer.release_instance(instance)
+
+async def send_upstream_attempt(
+    route: Route,
+    method: str,
+    upstream_path: str,
+    query_string: bytes,
+    headers: list,
+    body,
+    attempt: int,
+    sent_to: Optional[list] = None
+):
+    """Send one attempt to an instance picked by the load balancer.
+    
+    Instances already in `sent_to` are avoided when possible, and the chosen one is
+    appended. Returns (response, instance, response_time); the instance stays counted
+    as in flight until the response is closed with close_upstream_response().
+    """
+    service_name = route.service_name
+    instance = load_balancer.acquire_instance(service_name, sent_to[-1] if sent_to else None)
+    if sent_to is not None:
+        sent_to.append(instance)
+    target_url = route.upstream_target(upstream_path, query_string, instance.url)
+    
+    start_time = time.time()
+    try:
+        # Reuse the service's pooled keep-alive connections
+        pool = route.client
+        if pool.is_closed:
+            pool = upstream_pools.get_pool(service_name)
+        upstream_request = pool.build_request(
+            method=method,
+            url=target_url,
+            headers=headers + [(b"x-attempt", str(attempt).encode())],
+            content=body,
+            timeout=route.timeout
+        )
+        response = await pool.send(upstream_request, stream=True)
+    except BaseException as e:
+        load_balancer.release_instance(instance)
+        if isinstance(e, httpx.TimeoutException):
+            load_balancer.record_request_result(service_name, time.time() - start_time, 504, False, instance)
+        elif isinstance(e, httpx.ConnectError):
+            load_balancer.record_request_result(service_name, time.time() - start_time, 503, False, instance)
+        else:
+            load_balancer.abandon_request(service_name)
+        raise
+    
+    response_time = time.time() - start_time
+    success = 200 <= response.status_code < 400
+    
+    # Record metrics
+    load_balancer.record_request_result(
+        service_name, response_time, response.status_code, success, instance
+    )
+    if success:
+        get_hedge_policy(service_name).latency.record(response_time)
+    
+    return response, instance, response_time
+
+async def send_with_retries(
+    route: Route,
+    request: Request,
+    upstream_path: str,
+    query_string: bytes,
+    headers: list,
+    body,
+    max_retries: int
+):
+    """Send a request upstream with hedging for idempotent calls and budgeted retries.
+    
+    Returns (response, instance, response_time, attempts) with the response body
+    still unread, or raises HTTPException once every attempt has failed.
+    """
+    service_name = route.service_name
+    budget = get_retry_budget(service_name)
+    budget.record_request()
+    
+    # A streamed body can only be sent once, so such calls are never hedged
+    hedge_policy = get_hedge_policy(service_name)
+    hedge = max_retries > 0 and hedge_policy.applies_to(request.method, request.headers)
+    if hedge:
+        hedge_policy.eligible_requests += 1
     
     last_exception = None
+    attempts = 0
     
-    for attempt in range(max_retries + 1):
+    for retry in range(max_retries + 1):
         try:
-            # Get optimal service URL
-            service_url = await load_balancer.get_service_url(service_name)
-            target_url = f"{service_url}/api/v1/{path}"
-            
-            # Prepare request
-            headers = dict(request.headers)
-            headers.pop("host", None)
-            headers["X-Forwarded-For"] = request.client.host
-            headers["X-Gateway-Version"] = settings.VERSION
-            headers["X-Service-Route"] = service_name
-            headers["X-Attempt"] = str(attempt + 1)
-            
-            body = await request.body()
-            
             # Log attempt
-            if attempt > 0:
-                logger.info(f"🔄 Retry attempt {attempt + 1}/{max_retries + 1} for {service_name}/{path}")
-            
-            start_time = time.time()
-            
-            # Make request with appropriate timeout
-            config = SERVICE_CONFIG.get(service_name, {})
-            timeout = config.get("timeout", settings.SERVICE_TIMEOUT)
+            if retry > 0:
+                logger.info(f"🔄 Retry attempt {retry + 1}/{max_retries + 1} for {service_name}{upstream_path}")
             
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                response = await client.request(
-                    method=request.method,
-                    url=target_url,
-                    headers=headers,
-                    content=body,
-                    params=dict(request.query_params)
-                )
-                
-                response_time = time.time() - start_time
-                success = 200 <= response.status_code < 400
-                
-                # Record metrics
-                load_balancer.record_request_result(
-                    service_name, response_time, response.status_code, success
-                )
+            attempts += 1
+            first_attempt = attempts
+            if hedge:
+                # The hedge goes to a different instance than the attempt it races
+                sent_to = []
                 
-                # Log successful request
-                logger.info(f"✅ {service_name} responded {response.status_code} in {response_time:.3f}s (attempt {attempt + 1})")
+                async def send_hedge():
+                    nonlocal attempts
+                    attempts += 1
+                    hedge_policy.hedges_sent += 1
+                    logger.info(f"🪞 Hedging {service_name}{upstream_path} after {hedge_delay:.3f}s")
+                    return await send_upstream_attempt(
+                        route, request.method, upstream_path, query_string, headers, body, attempts, sent_to
+                    )
                 
-                # Prepare response headers
-                response_headers = dict(response.headers)
-                response_headers["X-Service-Name"] = service_name
-                response_headers["X-Service-Response-Time"] = str(response_time)
-                response_headers["X-Attempt-Count"] = str(attempt + 1)
+                def can_hedge() -> bool:
+                    if budget.try_retry():
+                        return True
+                    hedge_policy.hedges_denied += 1
+                    return False
                 
-                return Response(
-                    content=response.content,
-                    status_code=response.status_code,
-                    headers=response_headers,
-                    media_type=response_headers.get("content-type", "application/json")
+                hedge_delay = hedge_policy.delay()
+                (response, instance, response_time), hedged = await hedged_call(
+                    lambda: send_upstream_attempt(
+                        route, request.method, upstream_path, query_string, headers, body, first_attempt, sent_to
+                    ),
+                    send_hedge,
+                    hedge_delay,
+                    can_hedge,
+                    lambda result: close_upstream_response(result[0], result[1])
+                )
+                if hedged:
+                    hedge_policy.hedge_wins += 1
+            else:
+                response, instance, response_time = await send_upstream_attempt(
+                    route, request.method, upstream_path, query_string, headers, body, first_attempt
                 )
+            
+            # Log successful request
+            logger.info(f"✅ {service_name} responded {response.status_code} in {response_time:.3f}s (attempt {attempts})")
+            return response, instance, response_time, attempts
                 
         except httpx.TimeoutException as e:
             last_exception = e
-            error_msg = f"Timeout calling {service_name} (attempt {attempt + 1})"
+            error_msg = f"Timeout calling {service_name} (attempt {attempts})"
             logger.warning(f"⏰ {error_msg}")
             
-            # Don't retry on final attempt
-            if attempt == max_retries:
-                break
-                
-            # Exponential backoff for retries
-            await asyncio.sleep(min(2 ** attempt, 10))
-            
         except httpx.ConnectError as e:
             last_exception = e
-            error_msg = f"Connection error to {service_name} (attempt {attempt + 1})"
+            error_msg = f"Connection error to {service_name} (attempt {attempts})"
             logger.warning(f"🔌 {error_msg}")
             
-            # Don't retry connection errors immediately
-            if attempt == max_retries:
-                break
-                
-            await asyncio.sleep(min(2 ** attempt, 10))
+        except CircuitOpenError as e:
+            last_exception = e
+            break  # Retrying would only be rejected again
             
         except Exception as e:
             last_exception = e
             logger.error(f"❌ Unexpected error proxying to {service_name}: {e}")
             break  # Don't retry unexpected errors
+        
+        # Don't retry on final attempt, or once the service's retry budget is spent
+        if retry == max_retries:
+            break
+        if not budget.try_retry():
+            logger.warning(f"💸 Retry budget exhausted for {service_name}, not retrying")
+            break
+        
+        # Short jittered backoff; the load balancer will usually pick another instance
+        await asyncio.sleep(random.uniform(0, min(settings.RETRY_BACKOFF_BASE * 2 ** retry, settings.RETRY_BACKOFF_MAX)))
     
     # All retries failed
-    if isinstance(last_exception, httpx.TimeoutException):
+    if isinstance(last_exception, CircuitOpenError):
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "Service unavailable",
+                "service": service_name,
+                "message": f"The {service_name} service is failing; requests are paused by its circuit breaker",
+                "attempts": attempts - 1
+            },
+            headers={"Retry-After": str(settings.CIRCUIT_BREAKER_TIMEOUT)}
+        )
+    elif isinstance(last_exception, httpx.TimeoutException):
         raise HTTPException(
             status_code=504,
             detail={
                 "error": "Service timeout",
                 "service": service_name,
-                "message": f"The {service_name} service took too long to respond after {max_retries + 1} attempts",
-                "attempts": max_retries + 1
+                "message": f"The {service_name} service took too long to respond after {attempts} attempts",
+                "attempts": attempts
             }
         )
     elif isinstance(last_exception, httpx.ConnectError):
@@ -279,8 +698,8 @@ async def proxy_request_with_retry(
             detail={
                 "error": "Service unavailable", 
                 "service": service_name,
-                "message": f"The {service_name} service is currently unavailable after {max_retries + 1} attempts",
-                "attempts": max_retries + 1
+                "message": f"The {service_name} service is currently unavailable after {attempts} attempts",
+                "attempts": attempts
             }
         )
     else:
@@ -290,53 +709,309 @@ async def proxy_request_with_retry(
                 "error": "Gateway error",
                 "service": service_name,
                 "message": f"Unable to connect to {service_name} service",
-                "attempts": max_retries + 1
+                "attempts": attempts
             }
         )
 
+def credential_scope(request: Request) -> Optional[bytes]:
+    """Digest of the credentials a request presents, or None when it presents none"""
+    headers = request.headers
+    credentials = (headers.get("authorization", ""), headers.get("x-api-key", ""), headers.get("cookie", ""))
+    if not any(credentials):
+        return None
+    return hashlib.blake2b("\n".join(credentials).encode(), digest_size=16).digest()
+
+def coalescing_key(route: Route, request: Request, upstream_path: str, query_string: bytes,
+                   conditional: bool) -> tuple:
+    """Requests with the same key would get the same upstream answer, so they may share one call"""
+    headers = request.headers
+    # Only callers presenting identical credentials share a response
+    key = (
+        route.service_name, request.method, upstream_path, normalize_query_string(query_string),
+        credential_scope(request) or b"", headers.get("accept-encoding", "")
+    )
+    if conditional:
+        # Conditional headers are forwarded, so they change what upstream sends back
+        key += (headers.get("if-none-match", ""), headers.get("if-modified-since", ""))
+    return key
+
+@asynccontextmanager
+async def trace_proxy_request(service_name: str, path: str, request: Request):
+    """Server span for one proxied request, continuing the caller's traceparent if valid"""
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+    
+    span = tracer.start_span(
+        f"{request.method} /{service_name}",
+        tags={"http.method": request.method, "http.target": f"/{path}", "gateway.service": service_name},
+        parent_context=parse_traceparent(request.headers.get("traceparent")),
+        kind="server"
+    )
+    try:
+        yield span
+    except HTTPException as e:
+        span.tags["http.status_code"] = e.status_code
+        tracer.finish_span(span.span_id, error=str(e.detail) if e.status_code >= 500 else None)
+        raise
+    except BaseException as e:
+        tracer.finish_span(span.span_id, error=str(e) or type(e).__name__)
+        raise
+    else:
+        status_code = span.tags.get("http.status_code", 200)
+        tracer.finish_span(span.span_id, error=f"HTTP {status_code}" if status_code >= 500 else None)
+
+def trace_headers(span) -> list:
+    """traceparent for the upstream call, naming the gateway span as the parent"""
+    if span is None:
+        return []
+    return [(b"traceparent", format_traceparent(span.trace_id, span.span_id, span.sampled).encode())]
+
+async def proxy_request_with_retry(
+    service_name: str,
+    path: str,
+    request: Request,
+    max_retries: int = None
+) -> Response:
+    """Proxy request with caching, coalescing, hedging and budgeted retries"""
+    async with trace_proxy_request(service_name, path, request) as span:
+        response = await forward_request(service_name, path, request, max_retries, span)
+        if span is not None:
+            span.tags["http.status_code"] = response.status_code
+        return response
+
+async def forward_request(
+    service_name: str,
+    path: str,
+    request: Request,
+    max_retries: Optional[int],
+    span
+) -> Response:
+    route = get_route(service_name)
+    if max_retries is None:
+        max_retries = route.retry_attempts
+    
+    # Buffer only when a retry may need to replay the body
+    body, max_retries = await prepare_request_body(request, max_retries)
+    
+    # Rewrite headers once; only X-Attempt changes between attempts
+    headers = route.header_plan.apply(
+        request.scope["headers"],
+        [(b"x-forwarded-for", request.client.host.encode()), *trace_headers(span)]
+    )
+    query_string = request.scope.get("query_string", b"")
+    upstream_path = f"/{path}"
+    
+    # Opt-in shared cache for hot read endpoints, scoped to the caller's credentials.
+    # Anonymous requests are never cached: their entry would be served to anyone.
+    cache_key = None
+    cache_policy = route.cache_policy
+    scope = credential_scope(request) if cache_policy is not None else None
+    if scope is not None and request.method in CACHEABLE_METHODS and cache_policy.matches(upstream_path):
+        request_cache_control = parse_cache_control(request.headers.get("cache-control"))
+        key = response_cache.build_key(
+            service_name, upstream_path, query_string, scope,
+            request.headers.get("accept-encoding", "")
+        )
+        
+        if "no-cache" not in request_cache_control and request_cache_control.get("max-age") != "0":
+            entry = response_cache.get(key)
+            if entry is not None:
+                return serve_cached_response(entry, request, "HIT")
+        
+        # HEAD responses have no body to store; they are only answered from cached GETs
+        if request.method == "GET" and "no-store" not in request_cache_control:
+            cache_key = key
+            # Ask upstream for the full body; the gateway answers conditional requests itself
+            headers = [(name, value) for name, value in headers if name not in (b"if-none-match", b"if-modified-since")]
+    
+    # Identical concurrent reads share one upstream call when the route opts in
+    if route.coalesce and request.method in CACHEABLE_METHODS and body is None:
+        return await proxy_coalesced_request(
+            route, request, upstream_path, query_string, headers, max_retries, cache_key
+        )
+    
+    response, instance, response_time, attempts = await send_with_retries(
+        route, request, upstream_path, query_string, headers, body, max_retries
+    )
+    extra_headers = {
+        "X-Service-Name": service_name,
+        "X-Service-Response-Time": str(response_time),
+        "X-Attempt-Count": str(attempts)
+    }
+    
+    if cache_key is not None:
+        return await cache_upstream_response(response, instance, cache_key, cache_policy, request, extra_headers)
+    
+    # A successful write makes the cached reads of this service stale
+    if cache_policy is not None and request.method not in CACHEABLE_METHODS and response.status_code < 400:
+        response_cache.invalidate_service(service_name)
+    
+    # Stream the body through instead of buffering it in the gateway
+    return stream_upstream_response(response, extra_headers, instance)
+
+async def proxy_coalesced_request(
+    route: Route,
+    request: Request,
+    upstream_path: str,
+    query_string: bytes,
+    headers: list,
+    max_retries: int,
+    cache_key
+) -> Response:
+    """Forward an idempotent read, sharing the upstream call with identical concurrent requests.
+    
+    The first caller (the leader) buffers the upstream response and every caller that
+    arrived while it was in flight gets a copy. Responses too large to buffer are
+    streamed to the leader only, and the followers then make their own calls.
+    """
+    service_name = route.service_name
+    coalescer = get_coalescer(service_name)
+    key = coalescing_key(route, request, upstream_path, query_string, conditional=cache_key is None)
+    led = {}
+    
+    async def fetch_shared():
+        led["leader"] = True
+        response, instance, response_time, attempts = await send_with_retries(
+            route, request, upstream_path, query_string, headers, None, max_retries
+        )
+        extra_headers = {
+            "X-Service-Name": service_name,
+            "X-Service-Response-Time": str(response_time),
+            "X-Attempt-Count": str(attempts)
+        }
+        
+        content_length = response.headers.get("content-length", "")
+        if not content_length.isdigit() or int(content_length) > settings.COALESCE_MAX_BODY_BYTES:
+            led["response"] = (response, instance, extra_headers)
+            return None
+        
+        try:
+            # Raw (still encoded) bytes, so Content-Encoding/Content-Length stay valid for every copy
+            content = b"".join([chunk async for chunk in response.aiter_raw()])
+        finally:
+            await close_upstream_response(response, instance)
+        
+        response_headers = strip_hop_by_hop_headers(dict(response.headers))
+        entry = None
+        if cache_key is not None:
+            ttl = cacheable_ttl(response, route.cache_policy)
+            if ttl is not None:
+                entry = response_cache.store(cache_key, response.status_code, list(response_headers.items()), content, ttl)
+            else:
+                response_cache.uncacheable += 1
+        
+        return response.status_code, response_headers, content, extra_headers, entry
+    
+    shared = await coalescer.do(key, fetch_shared)
+    coalescing_stats[service_name]["requests"] += 1
+    
+    if "response" in led:
+        response, instance, extra_headers = led["response"]
+        return stream_upstream_response(response, extra_headers, instance)
+    
+    if shared is None:
+        # The leader's response could not be shared; fetch our own copy
+        coalescing_stats[service_name]["unshareable"] += 1
+        response, instance, response_time, attempts = await send_with_retries(
+            route, request, upstream_path, query_string, headers, None, max_retries
+        )
+        return stream_upstream_response(response, {
+            "X-Service-Name": service_name,
+            "X-Service-Response-Time": str(response_time),
+            "X-Attempt-Count": str(attempts)
+        }, instance)
+    
+    status_code, response_headers, content, extra_headers, entry = shared
+    extra_headers = {**extra_headers, "X-Coalesced": "leader" if led else "follower"}
+    if entry is not None:
+        return serve_cached_response(entry, request, "MISS", extra_headers)
+    
+    return Response(
+        content=content if request.method != "HEAD" else b"",
+        status_code=status_code,
+        headers={**response_headers, **extra_headers, **({"X-Cache": "BYPASS"} if cache_key is not None else {})}
+    )
+
 async def proxy_streaming_request(
     service_name: str,
     path: str, 
     request: Request
 ) -> StreamingResponse:
     """Proxy streaming requests (for real-time features)"""
+    async with trace_proxy_request(service_name, path, request) as span:
+        response = await forward_streaming_request(service_name, path, request, span)
+        if span is not None:
+            span.tags["http.status_code"] = response.status_code
+        return response
+
+async def forward_streaming_request(service_name: str, path: str, request: Request, span) -> StreamingResponse:
+    route = get_route(service_name)
     
     try:
-        service_url = await load_balancer.get_service_url(service_name)
-        target_url = f"{service_url}/api/v1/{path}"
-        
-        headers = dict(request.headers)
-        headers.pop("host", None)
-        headers["X-Forwarded-For"] = request.client.host
-        headers["X-Gateway-Version"] = settings.VERSION
-        headers["X-Stream-Proxy"] = "true"
-        
-        config = SERVICE_CONFIG.get(service_name, {})
-        timeout = httpx.Timeout(config.get("timeout", 300))  # Longer timeout for streaming
+        instance = load_balancer.acquire_instance(service_name)
+        start_time = time.time()
+        try:
+            target_url = route.upstream_target(f"/{path}", request.scope.get("query_string", b""), instance.url)
+            
+            headers = route.header_plan.apply(request.scope["headers"], [
+                (b"x-forwarded-for", request.client.host.encode()),
+                (b"x-stream-proxy", b"true"),
+                *trace_headers(span)
+            ])
+            
+            timeout = route.config.get("timeout", 300)  # Longer timeout for streaming
+            pool = route.client
+            if pool.is_closed:
+                pool = upstream_pools.get_pool(service_name)
+            
+            # Pipe the upload through and wait for upstream headers before responding,
+            # so the request body is fully read before the response stream starts
+            upstream_request = pool.build_request(
+                method=request.method,
+                url=target_url,
+                headers=headers,
+                content=request.stream(),
+                timeout=timeout
+            )
+            response = await pool.send(upstream_request, stream=True)
+        except BaseException as e:
+            # Settle the circuit breaker permit taken with the instance, as send_upstream_attempt does
+            load_balancer.release_instance(instance)
+            if isinstance(e, httpx.TimeoutException):
+                load_balancer.record_request_result(service_name, time.time() - start_time, 504, False, instance)
+            elif isinstance(e, httpx.ConnectError):
+                load_balancer.record_request_result(service_name, time.time() - start_time, 503, False, instance)
+            else:
+                load_balancer.abandon_request(service_name)
+            raise
         
-        async def stream_response():
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                async with client.stream(
-                    method=request.method,
-                    url=target_url,
-                    headers=headers,
-                    params=dict(request.query_params),
-                    content=await request.body()
-                ) as response:
-                    
-                    # Stream the response
-                    async for chunk in response.aiter_bytes():
-                        yield chunk
+        load_balancer.record_request_result(
+            service_name, time.time() - start_time, response.status_code,
+            200 <= response.status_code < 400, instance
+        )
         
         return StreamingResponse(
-            stream_response(),
-            media_type="application/json",
+            # Returns the connection to the pool once the stream ends, however it ends
+            iterate_upstream_body(response, response.aiter_bytes(), instance),
+            status_code=response.status_code,
+            media_type=response.headers.get("content-type", "application/json"),
             headers={
                 "X-Service-Name": service_name,
                 "X-Stream-Proxy": "true"
             }
         )
         
+    except CircuitOpenError:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "Service unavailable",
+                "service": service_name,
+                "message": f"The {service_name} service is failing; requests are paused by its circuit breaker"
+            },
+            headers={"Retry-After": str(settings.CIRCUIT_BREAKER_TIMEOUT)}
+        )
     except Exception as e:
         logger.error(f"❌ Error streaming from {service_name}: {e}")
         raise HTTPException(
@@ -0,0 +1,44 @@
+# apps/api-gateway/src/routes/internal.py
+from fastapi import APIRouter, Header, HTTPException
+from pydantic import BaseModel
+from typing import Optional
+import hmac
+import os
+import logging
+
+try:
+    from ..utils.api_keys import invalidate_api_key, get_api_key_cache_stats
+except ImportError:  # Started as a script from the src directory
+    from utils.api_keys import invalidate_api_key, get_api_key_cache_stats
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/internal")
+
+class APIKeyInvalidation(BaseModel):
+    key_hash: str
+
+def verify_internal_secret(secret: Optional[str]):
+    """Service-to-service calls carry the shared INTERNAL_SERVICE_SECRET"""
+    expected = os.getenv("INTERNAL_SERVICE_SECRET")
+    if not expected:
+        # Without a configured secret there is nothing to check callers against
+        logger.error("🔒 INTERNAL_SERVICE_SECRET is not set; rejecting internal request")
+        raise HTTPException(status_code=403, detail="Internal endpoints are disabled")
+    if not hmac.compare_digest((secret or "").encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Invalid internal service secret")
+
+@router.post("/api-keys/invalidate")
+async def invalidate_api_key_cache(
+    invalidation: APIKeyInvalidation,
+    x_internal_secret: Optional[str] = Header(None)
+):
+    """Drop a revoked key from the validation cache (called by developer-api)"""
+    verify_internal_secret(x_internal_secret)
+    invalidated = invalidate_api_key(invalidation.key_hash)
+    return {"invalidated": invalidated}
+
+@router.get("/api-keys/cache")
+async def api_key_cache_stats(x_internal_secret: Optional[str] = Header(None)):
+    """API key validation cache statistics"""
+    verify_internal_secret(x_internal_secret)
+    return get_api_key_cache_stats()
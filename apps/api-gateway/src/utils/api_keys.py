@@ -0,0 +1,119 @@
+# apps/api-gateway/src/utils/api_keys.py
+import hashlib
+import logging
+import os
+from typing import Dict, Optional
+
+import httpx
+
+from .cache import TTLCache, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# API key validation cache, keyed by SHA-256 of the key so raw keys are never held in memory
+API_KEY_CACHE_TTL = float(os.getenv("API_KEY_CACHE_TTL", "300"))
+API_KEY_NEGATIVE_CACHE_TTL = float(os.getenv("API_KEY_NEGATIVE_CACHE_TTL", "30"))
+API_KEY_CACHE_MAX_ENTRIES = int(os.getenv("API_KEY_CACHE_MAX_ENTRIES", "10000"))
+
+api_key_cache = TTLCache(max_entries=API_KEY_CACHE_MAX_ENTRIES)
+api_key_lookups = SingleFlight()
+_developer_api_client: Optional[httpx.AsyncClient] = None
+
+# Invalidation generation of each key with a developer-api lookup in flight
+_lookup_generations: Dict[str, int] = {}
+
+def hash_api_key(api_key: str) -> str:
+    """Cache key for an API key; developer-api sends the same hash when a key is revoked"""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+def get_developer_api_client() -> httpx.AsyncClient:
+    """Long-lived client so validations reuse keep-alive connections to developer-api"""
+    global _developer_api_client
+    if _developer_api_client is None or _developer_api_client.is_closed:
+        _developer_api_client = httpx.AsyncClient(timeout=5.0)
+    return _developer_api_client
+
+async def close_developer_api_client():
+    if _developer_api_client is not None and not _developer_api_client.is_closed:
+        await _developer_api_client.aclose()
+
+async def validate_api_key(api_key: str) -> bool:
+    """Validate API key, consulting the validation cache before developer-api"""
+    key_hash = hash_api_key(api_key)
+
+    cached = api_key_cache.get(key_hash)
+    if cached is not None:
+        return cached
+
+    # Concurrent requests with the same key share a single developer-api lookup
+    return await api_key_lookups.do(key_hash, lambda: _lookup_api_key(api_key, key_hash))
+
+async def _lookup_api_key(api_key: str, key_hash: str) -> bool:
+    """Validate API key with developer-api service and cache the verdict"""
+    _lookup_generations[key_hash] = 0
+    try:
+        valid, ttl = await _fetch_api_key_verdict(api_key)
+        # A verdict fetched before an invalidation may already be out of date; don't cache it
+        if ttl is not None and _lookup_generations[key_hash] == 0:
+            api_key_cache.set(key_hash, valid, ttl)
+        return valid
+    finally:
+        del _lookup_generations[key_hash]
+
+async def _fetch_api_key_verdict(api_key: str):
+    """Ask developer-api about a key; returns (valid, seconds to cache the verdict or None)"""
+    try:
+        developer_api_url = os.getenv("DEVELOPER_API_SERVICE_URL", "http://localhost:8017")
+
+        response = await get_developer_api_client().post(
+            f"{developer_api_url}/api/v1/validate-key",
+            json={"api_key": api_key}
+        )
+    except Exception:
+        # If developer-api service is down, allow request (graceful degradation).
+        # Not cached, so the key is re-checked as soon as developer-api is back.
+        logger.warning("Could not validate API key - developer-api service unavailable")
+        return True, None
+
+    if response.status_code == 200:
+        ttl = API_KEY_CACHE_TTL
+        try:
+            # Never cache a key past its own expiry
+            expires_in = response.json().get("expires_in")
+            if expires_in is not None:
+                ttl = min(ttl, float(expires_in))
+        except ValueError:
+            pass
+        return True, ttl
+
+    if response.status_code in (401, 403, 404):
+        return False, API_KEY_NEGATIVE_CACHE_TTL
+    return False, None
+
+def invalidate_api_key(key_hash: str) -> bool:
+    """Drop a cached validation result, e.g. after developer-api revokes the key"""
+    if key_hash in _lookup_generations:
+        _lookup_generations[key_hash] += 1
+    invalidated = api_key_cache.invalidate(key_hash)
+    if invalidated:
+        logger.info(f"🔑 Invalidated cached API key validation {key_hash[:12]}")
+    return invalidated
+
+def get_api_key_cache_stats() -> dict:
+    """Get API key validation cache statistics"""
+    return {
+        **api_key_cache.get_stats(),
+        "positive_ttl": API_KEY_CACHE_TTL,
+        "negative_ttl": API_KEY_NEGATIVE_CACHE_TTL,
+        "lookups": api_key_lookups.get_stats()
+    }
+
+# Export for use in main application
+__all__ = [
+    "api_key_cache",
+    "close_developer_api_client",
+    "get_api_key_cache_stats",
+    "hash_api_key",
+    "invalidate_api_key",
+    "validate_api_key"
+]
@@ -0,0 +1,148 @@
+# apps/api-gateway/src/utils/cache.py
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a per-entry TTL"""
+
+    def __init__(self, max_entries: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+        # Cache metrics
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a live entry, refreshing its LRU position"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        """Store an entry for `ttl` seconds, evicting the least recently used if full"""
+        if ttl <= 0:
+            self._entries.pop(key, None)
+            return
+
+        self._entries[key] = (self.clock() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop an entry; returns whether it was cached"""
+        if self._entries.pop(key, None) is None:
+            return False
+        self.invalidations += 1
+        return True
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups > 0 else 0,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+class LeaderCancelled(Exception):
+    """The call a SingleFlight waiter was sharing was cancelled by the caller running it"""
+
+class SingleFlight:
+    """Deduplicate concurrent calls for the same key into one in-flight call"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared_calls = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn` unless a call for `key` is already running, in which case share its result"""
+        future = self._calls.get(key)
+        while future is not None:
+            try:
+                # Shield so one cancelled waiter does not cancel the call for everyone else
+                result = await asyncio.shield(future)
+            except LeaderCancelled:
+                # The caller running `fn` went away; the first waiter to wake up takes over
+                future = self._calls.get(key)
+                continue
+            self.shared_calls += 1
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.calls += 1
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieve it so a call without followers doesn't log "exception never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._calls.pop(key, None)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get deduplication statistics"""
+        total = self.calls + self.shared_calls
+        return {
+            "calls": self.calls,
+            "shared_calls": self.shared_calls,
+            "shared_rate": self.shared_calls / total if total > 0 else 0,
+            "in_flight": self.in_flight
+        }
+
+# Export for use in main application
+__all__ = [
+    "TTLCache",
+    "LeaderCancelled",
+    "SingleFlight"
+]
@@ -0,0 +1,217 @@
+# apps/api-gateway/src/utils/hedging.py
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Methods safe to send twice; other calls opt in with an Idempotency-Key header
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+class LatencyTracker:
+    """Recent upstream latencies with a cached percentile lookup"""
+
+    def __init__(self, window: int = 256, refresh_every: int = 16):
+        self.samples = deque(maxlen=window)
+        self.refresh_every = refresh_every
+        self._since_refresh = 0
+        self._sorted: list = []
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+        self._since_refresh += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        """The p-th percentile of the window, re-sorted at most every `refresh_every` samples"""
+        if not self.samples:
+            return None
+        if self._since_refresh >= self.refresh_every or not self._sorted:
+            self._sorted = sorted(self.samples)
+            self._since_refresh = 0
+        index = min(len(self._sorted) - 1, max(0, math.ceil(p / 100 * len(self._sorted)) - 1))
+        return self._sorted[index]
+
+class HedgePolicy:
+    """When to send a second copy of an idempotent request that is taking unusually long"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        percentile: float = 95.0,
+        min_delay: float = 0.01,
+        max_delay: float = 1.0,
+        min_samples: int = 20,
+        methods: Iterable[str] = IDEMPOTENT_METHODS
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.methods = frozenset(method.upper() for method in methods)
+        self.latency = LatencyTracker()
+
+        # Hedging metrics
+        self.eligible_requests = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+        self.hedges_denied = 0  # Wanted to hedge but the retry budget was empty
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], **defaults) -> "HedgePolicy":
+        """Build from a SERVICE_CONFIG "hedging" entry layered over gateway-wide defaults"""
+        return cls(**{**defaults, **(config or {})})
+
+    def applies_to(self, method: str, headers: Dict[str, str]) -> bool:
+        """Hedging is only safe for calls the upstream can receive twice"""
+        if not self.enabled:
+            return False
+        return method.upper() in self.methods or "idempotency-key" in headers
+
+    def delay(self) -> float:
+        """Seconds to wait for the first attempt before hedging: the recent p95, clamped"""
+        if len(self.latency.samples) < self.min_samples:
+            return self.max_delay  # Not enough history yet; only hedge clear outliers
+        return min(self.max_delay, max(self.min_delay, self.latency.percentile(self.percentile)))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hedging statistics"""
+        return {
+            "enabled": self.enabled,
+            "methods": sorted(self.methods),
+            "percentile": self.percentile,
+            "current_delay_ms": round(self.delay() * 1000, 2),
+            "eligible_requests": self.eligible_requests,
+            "hedges_sent": self.hedges_sent,
+            "hedge_wins": self.hedge_wins,
+            "hedges_denied": self.hedges_denied,
+            "hedge_rate": self.hedges_sent / self.eligible_requests if self.eligible_requests > 0 else 0
+        }
+
+class RetryBudget:
+    """Caps retries (and hedges) at a fraction of recent traffic so they cannot amplify an outage.
+
+    Every request deposits `ratio` tokens and every retry withdraws one. A trickle of
+    `min_retries_per_second` keeps low-traffic services able to retry at all, and the
+    balance is capped at `max_tokens` so a quiet spell cannot bank a retry storm.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        min_retries_per_second: float = 5.0,
+        max_tokens: float = 100.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.max_tokens = max_tokens
+        self.clock = clock
+        self.tokens = max_tokens
+        self._updated = clock()
+
+        # Budget metrics
+        self.requests = 0
+        self.retries_allowed = 0
+        self.retries_denied = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], **defaults) -> "RetryBudget":
+        """Build from a SERVICE_CONFIG "retry_budget" entry layered over gateway-wide defaults"""
+        return cls(**{**defaults, **(config or {})})
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self._updated) * self.min_retries_per_second)
+        self._updated = now
+
+    def record_request(self):
+        """Count an original (non-retry) request towards the budget"""
+        self._refill()
+        self.requests += 1
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_retry(self) -> bool:
+        """Withdraw one retry if the budget allows it"""
+        self._refill()
+        if self.tokens >= 1.0 - 1e-9:  # Ten deposits of 0.1 must fund a retry despite float rounding
+            self.tokens = max(0.0, self.tokens - 1.0)
+            self.retries_allowed += 1
+            return True
+        self.retries_denied += 1
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get retry budget statistics"""
+        self._refill()
+        return {
+            "ratio": self.ratio,
+            "min_retries_per_second": self.min_retries_per_second,
+            "available_retries": int(self.tokens),
+            "requests": self.requests,
+            "retries_allowed": self.retries_allowed,
+            "retries_denied": self.retries_denied,
+            "retry_ratio": self.retries_allowed / self.requests if self.requests > 0 else 0
+        }
+
+async def hedged_call(
+    primary: Callable[[], Awaitable[T]],
+    hedge: Callable[[], Awaitable[T]],
+    delay: float,
+    can_hedge: Callable[[], bool],
+    discard: Callable[[T], Awaitable[None]]
+) -> Tuple[T, bool]:
+    """Run `primary`; if it has not finished after `delay`, also run `hedge` and keep the first success.
+
+    The losing call is cancelled, or passed to `discard` if it completed anyway.
+    Returns (result, whether the hedge won). Raises the last error if both fail.
+    """
+    first = asyncio.ensure_future(primary())
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+    except asyncio.CancelledError:
+        first.cancel()
+        raise
+
+    if done or not can_hedge():
+        return await first, False
+
+    second = asyncio.ensure_future(hedge())
+    pending = {first, second}
+    winner = None
+    error: Optional[BaseException] = None
+
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    winner = task
+                    break
+                error = task.exception()
+    finally:
+        # Cancel whatever is still running; anything that completed regardless is discarded
+        losers = [task for task in (first, second) if task is not winner]
+        for task in losers:
+            task.cancel()
+        for result in await asyncio.gather(*losers, return_exceptions=True):
+            if not isinstance(result, BaseException):
+                await discard(result)
+
+    if winner is None:
+        raise error
+    return winner.result(), winner is second
+
+# Export for use in main application
+__all__ = [
+    "IDEMPOTENT_METHODS",
+    "LatencyTracker",
+    "HedgePolicy",
+    "RetryBudget",
+    "hedged_call"
+]
@@ -9,9 +9,157 @@ from collections import defaultdict, deque
 import math
 
 from ..config import settings, SERVICE_CONFIG
+from .service_discovery import build_circuit_breaker, parse_instance_urls
+from shared.utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
 
 logger = logging.getLogger(__name__)
 
+class UpstreamInstance:
+    """One replica of a service, with the load signals used to choose between replicas"""
+    
+    def __init__(self, url: str, weight: float = 1.0, decay: float = 10.0,
+                 initial_latency: Optional[float] = None, default_latency: float = 0.1,
+                 failure_penalty: float = 4.0, max_latency: float = 30.0):
+        self.url = url.rstrip("/")
+        self.weight = weight
+        self.decay = decay  # Seconds for the latency EWMA to forget old samples
+        self.default_latency = default_latency  # Seconds assumed before measuring; idle replicas decay back to it
+        self.failure_penalty = failure_penalty  # Failed responses count as this multiple of the EWMA
+        self.max_latency = max_latency  # Cap on penalized samples, so a replica is never written off
+        self.ewma = default_latency if initial_latency is None else initial_latency  # Seconds
+        self._ewma_updated = time.monotonic()
+        self.in_flight = 0
+        self.healthy = True
+        self.ejected_until: Optional[float] = None  # monotonic deadline; inf = until readmitted
+        self.total_requests = 0
+        self.errors = 0
+        self.last_request: Optional[datetime] = None
+    
+    @property
+    def is_ejected(self) -> bool:
+        if self.ejected_until is None:
+            return False
+        if time.monotonic() >= self.ejected_until:
+            self.ejected_until = None
+            logger.info(f"🟢 Re-admitted {self.url} after ejection period")
+            return False
+        return True
+    
+    @property
+    def available(self) -> bool:
+        return self.healthy and not self.is_ejected
+    
+    def cost(self) -> float:
+        """Peak-EWMA load: expected latency scaled by the queue a new request would join.
+        
+        While no responses arrive the latency decays back towards default_latency, so a
+        replica penalized for a spike or for failures is tried again once it has aged out.
+        """
+        w = math.exp(-(time.monotonic() - self._ewma_updated) / self.decay)
+        latency = self.ewma * w + self.default_latency * (1 - w)
+        return latency * (self.in_flight + 1) / self.weight
+    
+    def record(self, response_time: float, success: bool, penalize: Optional[bool] = None):
+        """Fold a response time into the EWMA; spikes are taken at once, recoveries decay in.
+        
+        Penalized responses (by default the failed ones) count as at least failure_penalty
+        times the EWMA, so a replica that fails fast does not look like a fast replica.
+        """
+        now = time.monotonic()
+        elapsed = now - self._ewma_updated
+        self._ewma_updated = now
+        
+        if penalize is None:
+            penalize = not success
+        if penalize:
+            response_time = min(max(response_time, self.ewma * self.failure_penalty), self.max_latency)
+        
+        if response_time > self.ewma:
+            self.ewma = response_time
+        else:
+            w = math.exp(-elapsed / self.decay)
+            self.ewma = self.ewma * w + response_time * (1 - w)
+        
+        self.total_requests += 1
+        self.last_request = datetime.utcnow()
+        if not success:
+            self.errors += 1
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "ejected": self.is_ejected,
+            "in_flight": self.in_flight,
+            "ewma_ms": round(self.ewma * 1000, 2),
+            "weight": self.weight,
+            "total_requests": self.total_requests,
+            "errors": self.errors,
+            "last_request": self.last_request.isoformat() if self.last_request else None
+        }
+
+class InstancePool:
+    """Replicas of one service; membership and health can change while requests are in flight"""
+    
+    def __init__(self, service_name: str, urls: List[str], decay: float = 10.0,
+                 default_latency: float = 0.1, failure_penalty: float = 4.0, max_latency: float = 30.0):
+        self.service_name = service_name
+        self.decay = decay
+        self.default_latency = default_latency
+        self.failure_penalty = failure_penalty
+        self.max_latency = max_latency
+        self.instances: Dict[str, UpstreamInstance] = {}
+        self.set_urls(urls)
+    
+    def set_urls(self, urls: List[str]):
+        """Add new replicas and drop removed ones, keeping the stats of the rest"""
+        urls = [url.rstrip("/") for url in urls]
+        
+        # New replicas start at the pool's average latency so they are not flooded before measuring
+        measured = [i.ewma for i in self.instances.values() if i.total_requests]
+        initial_latency = sum(measured) / len(measured) if measured else self.default_latency
+        
+        self.instances = {
+            url: self.instances.get(url) or UpstreamInstance(
+                url, decay=self.decay, initial_latency=initial_latency, default_latency=self.default_latency,
+                failure_penalty=self.failure_penalty, max_latency=self.max_latency
+            )
+            for url in urls
+        }
+    
+    def candidates(self) -> List[UpstreamInstance]:
+        """Replicas eligible for traffic"""
+        instances = list(self.instances.values())
+        available = [i for i in instances if i.available]
+        if available:
+            return available
+        
+        # Nothing passes: prefer replicas that are only failing health checks over ejected ones,
+        # and as a last resort keep sending rather than failing every request at the gateway
+        not_ejected = [i for i in instances if not i.is_ejected]
+        return not_ejected or instances
+    
+    def eject(self, url: str, duration: Optional[float] = None) -> bool:
+        """Take a replica out of rotation, for `duration` seconds or until readmitted"""
+        instance = self.instances.get(url.rstrip("/"))
+        if instance is None:
+            return False
+        instance.ejected_until = time.monotonic() + duration if duration else math.inf
+        logger.warning(f"⏏️ Ejected {self.service_name} instance {instance.url}" + (f" for {duration}s" if duration else ""))
+        return True
+    
+    def readmit(self, url: str) -> bool:
+        """Put an ejected replica back into rotation"""
+        instance = self.instances.get(url.rstrip("/"))
+        if instance is None:
+            return False
+        instance.ejected_until = None
+        logger.info(f"🟢 Re-admitted {self.service_name} instance {instance.url}")
+        return True
+    
+    def get_metrics(self) -> List[Dict[str, Any]]:
+        return [instance.to_dict() for instance in self.instances.values()]
+
 class LoadBalancingStrategy:
     """Base class for load balancing strategies"""
     
@@ -26,10 +174,15 @@ class LoadBalancingStrategy:
             "weight": 1.0
         })
     
-    async def select_service_url(self, service_name: str, healthy_instances: List[str]) -> Optional[str]:
-        """Select the best service URL based on strategy"""
+    def select_instance(self, service_name: str, instances: List[UpstreamInstance]) -> Optional[UpstreamInstance]:
+        """Select the replica that should take the next request"""
         raise NotImplementedError
     
+    async def select_service_url(self, service_name: str, healthy_instances: List[UpstreamInstance]) -> Optional[str]:
+        """Select the best service URL based on strategy"""
+        instance = self.select_instance(service_name, healthy_instances)
+        return instance.url if instance else None
+    
     def record_request(self, service_name: str, response_time: float, success: bool):
         """Record request metrics for load balancing decisions"""
         metrics = self.metrics[service_name]
@@ -39,9 +192,6 @@ class LoadBalancingStrategy:
         
         if not success:
             metrics["errors"] += 1
-        
-        # Update connection count (simulated)
-        metrics["connections"] = max(0, metrics["connections"] + (1 if success else -1))
     
     def get_average_response_time(self, service_name: str) -> float:
         """Get average response time for service"""
@@ -64,105 +214,94 @@ class RoundRobinStrategy(LoadBalancingStrategy):
         super().__init__(services)
         self.counters = defaultdict(int)
     
-    async def select_service_url(self, service_name: str, healthy_instances: List[str]) -> Optional[str]:
-        if not healthy_instances:
+    def select_instance(self, service_name: str, instances: List[UpstreamInstance]) -> Optional[UpstreamInstance]:
+        if not instances:
             return None
         
-        # For single service, return the URL
-        if len(healthy_instances) == 1:
-            return self.services[service_name]
-        
-        # For multiple instances (future clustering support)
         counter = self.counters[service_name]
-        selected_instance = healthy_instances[counter % len(healthy_instances)]
-        self.counters[service_name] = (counter + 1) % len(healthy_instances)
-        
-        return self.services[service_name]  # For now, return main URL
+        self.counters[service_name] = counter + 1
+        return instances[counter % len(instances)]
 
 class LeastConnectionsStrategy(LoadBalancingStrategy):
     """Least connections load balancing strategy"""
     
-    async def select_service_url(self, service_name: str, healthy_instances: List[str]) -> Optional[str]:
-        if not healthy_instances:
+    def select_instance(self, service_name: str, instances: List[UpstreamInstance]) -> Optional[UpstreamInstance]:
+        if not instances:
             return None
         
-        # For single service, return the URL
-        if len(healthy_instances) == 1:
-            return self.services[service_name]
-        
-        # Find service with least connections
-        min_connections = float('inf')
-        best_instance = None
-        
-        for instance in healthy_instances:
-            connections = self.metrics[instance]["connections"]
-            if connections < min_connections:
-                min_connections = connections
-                best_instance = instance
-        
-        return self.services[service_name]  # For now, return main URL
+        # Fewest in-flight requests; random tie-break so idle replicas share the load
+        min_in_flight = min(instance.in_flight for instance in instances)
+        return random.choice([i for i in instances if i.in_flight == min_in_flight])
 
 class WeightedResponseTimeStrategy(LoadBalancingStrategy):
     """Weighted response time load balancing strategy"""
     
-    async def select_service_url(self, service_name: str, healthy_instances: List[str]) -> Optional[str]:
-        if not healthy_instances:
+    def select_instance(self, service_name: str, instances: List[UpstreamInstance]) -> Optional[UpstreamInstance]:
+        if not instances:
             return None
         
-        # For single service, return the URL
-        if len(healthy_instances) == 1:
-            return self.services[service_name]
-        
-        # Calculate weights based on response times (inverse relationship)
+        # Lower latency and error rate = higher weight
         weights = []
-        for instance in healthy_instances:
-            avg_response_time = self.get_average_response_time(instance)
-            error_rate = self.get_error_rate(instance)
-            
-            # Lower response time and error rate = higher weight
-            if avg_response_time == 0:
+        for instance in instances:
+            error_rate = instance.errors / instance.total_requests if instance.total_requests else 0.0
+            if instance.ewma == 0:
                 weight = 1.0
             else:
-                weight = 1.0 / (avg_response_time * (1 + error_rate / 100))
-            
-            weights.append(weight)
+                weight = 1.0 / (instance.ewma * (1 + error_rate))
+            weights.append(weight * instance.weight)
         
-        # Weighted random selection
-        total_weight = sum(weights)
-        if total_weight == 0:
-            return self.services[service_name]
+        return instances[calculate_weighted_random_selection(weights)]
+
+class PowerOfTwoChoicesStrategy(LoadBalancingStrategy):
+    """Pick two replicas at random and send to the one with the lower peak-EWMA cost"""
+    
+    def select_instance(self, service_name: str, instances: List[UpstreamInstance]) -> Optional[UpstreamInstance]:
+        if not instances:
+            return None
+        if len(instances) == 1:
+            return instances[0]
         
-        # For now, just return main URL (future enhancement for multiple instances)
-        return self.services[service_name]
+        first, second = random.sample(instances, 2)
+        return first if first.cost() <= second.cost() else second
 
 class LoadBalancer:
     """Advanced load balancer with multiple strategies and health awareness"""
     
     def __init__(self, services: Dict[str, str]):
         self.services = services
-        self.service_discovery = None  # Will be set externally
+        self.service_discovery = None  # Set with attach_service_discovery()
+        
+        # Replicas per service, seeded from the (comma-separated) service URLs
+        self.pools: Dict[str, InstancePool] = {
+            service_name: InstancePool(
+                service_name,
+                parse_instance_urls(url),
+                settings.LOAD_BALANCER_EWMA_DECAY,
+                settings.LOAD_BALANCER_DEFAULT_RTT,
+                settings.LOAD_BALANCER_FAILURE_PENALTY,
+                settings.SERVICE_TIMEOUT
+            )
+            for service_name, url in services.items()
+        }
         
         # Initialize strategy based on configuration
         strategy_name = settings.LOAD_BALANCER_STRATEGY.lower()
-        if strategy_name == "round_robin":
+        if strategy_name == "p2c":
+            self.strategy = PowerOfTwoChoicesStrategy(services)
+        elif strategy_name == "round_robin":
             self.strategy = RoundRobinStrategy(services)
         elif strategy_name == "least_connections":
             self.strategy = LeastConnectionsStrategy(services)
         elif strategy_name == "weighted":
             self.strategy = WeightedResponseTimeStrategy(services)
         else:
-            logger.warning(f"Unknown load balancing strategy: {strategy_name}, using round_robin")
-            self.strategy = RoundRobinStrategy(services)
+            logger.warning(f"Unknown load balancing strategy: {strategy_name}, using p2c")
+            self.strategy = PowerOfTwoChoicesStrategy(services)
         
-        # Circuit breaker states
-        self.circuit_breakers = {}
-        for service_name in services.keys():
-            self.circuit_breakers[service_name] = {
-                "state": "closed",  # closed, open, half_open
-                "failure_count": 0,
-                "last_failure": None,
-                "success_count": 0
-            }
+        # Sliding-window circuit breaker per service, fed by every proxied attempt
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {
+            service_name: build_circuit_breaker(service_name) for service_name in services.keys()
+        }
         
         # Performance metrics
         self.global_metrics = {
@@ -174,117 +313,115 @@ class LoadBalancer:
         
         logger.info(f"🎯 Load Balancer initialized with {strategy_name} strategy")
     
-    async def get_service_url(self, service_name: str) -> str:
-        """Get optimal service URL using load balancing strategy"""
-        if service_name not in self.services:
+    def attach_service_discovery(self, service_discovery):
+        """Follow replica membership and health from service discovery"""
+        self.service_discovery = service_discovery
+        service_discovery.add_listener(self.sync_instances)
+    
+    def sync_instances(self, service_name: str, instance_states: Dict[str, bool]):
+        """Apply the replica set and health reported by service discovery"""
+        pool = self.pools.get(service_name)
+        if pool is None:
+            return
+        
+        if set(instance_states) != set(pool.instances):
+            pool.set_urls(list(instance_states))
+            logger.info(f"🎯 {service_name} now has {len(pool.instances)} instance(s)")
+        
+        for url, healthy in instance_states.items():
+            pool.instances[url].healthy = healthy
+    
+    def select_instance(self, service_name: str, exclude: Optional[UpstreamInstance] = None) -> UpstreamInstance:
+        """Pick the replica for the next request without reserving it, avoiding `exclude` if possible"""
+        pool = self.pools.get(service_name)
+        if pool is None or not pool.instances:
             raise ValueError(f"Unknown service: {service_name}")
         
-        # Check circuit breaker
+        # Fail fast while the service's circuit is open; half-open lets a few trial calls through
         if not self._is_circuit_breaker_closed(service_name):
             logger.warning(f"🔴 Circuit breaker open for {service_name}")
-            # For now, still return URL but log the issue
-            # In production, you might want to throw an exception or use fallback
-        
-        # Get healthy instances (for now, just the main service)
-        healthy_instances = [service_name]
-        
-        # If we had service discovery integration
-        if hasattr(self, 'service_discovery') and self.service_discovery:
-            is_healthy = await self.service_discovery.is_service_healthy(service_name)
-            if not is_healthy:
-                healthy_instances = []
+            raise CircuitOpenError(f"Circuit breaker open for {service_name}")
         
-        # Use strategy to select URL
-        selected_url = await self.strategy.select_service_url(service_name, healthy_instances)
-        
-        if selected_url is None:
-            logger.error(f"❌ No healthy instances available for {service_name}")
-            # Return original URL as fallback
-            selected_url = self.services[service_name]
+        candidates = pool.candidates()
+        if exclude is not None and len(candidates) > 1:
+            candidates = [candidate for candidate in candidates if candidate is not exclude]
+        instance = self.strategy.select_instance(service_name, candidates) or candidates[0]
         
         # Record request distribution
         self.global_metrics["request_distribution"][service_name] += 1
         self.global_metrics["total_requests"] += 1
         
-        return selected_url
+        return instance
+    
+    def acquire_instance(self, service_name: str, exclude: Optional[UpstreamInstance] = None) -> UpstreamInstance:
+        """Pick a replica and count the request as in flight until release_instance()"""
+        instance = self.select_instance(service_name, exclude)
+        instance.in_flight += 1
+        return instance
+    
+    def release_instance(self, instance: UpstreamInstance):
+        """The request to this replica has finished (including streaming its body)"""
+        instance.in_flight = max(0, instance.in_flight - 1)
+    
+    async def get_service_url(self, service_name: str) -> str:
+        """Get optimal service URL using load balancing strategy"""
+        return self.select_instance(service_name).url
+    
+    def eject_instance(self, service_name: str, url: str, duration: Optional[float] = None) -> bool:
+        """Take a replica out of rotation without a restart"""
+        pool = self.pools.get(service_name)
+        return pool.eject(url, duration) if pool else False
+    
+    def readmit_instance(self, service_name: str, url: str) -> bool:
+        """Return an ejected replica to rotation"""
+        pool = self.pools.get(service_name)
+        return pool.readmit(url) if pool else False
     
     def record_request_result(self, service_name: str, response_time: float, 
-                            status_code: int, success: bool):
+                            status_code: int, success: bool,
+                            instance: Optional[UpstreamInstance] = None):
         """Record request result for load balancing optimization"""
         
         # Update strategy metrics
         self.strategy.record_request(service_name, response_time, success)
+        if instance is not None:
+            # Only server-side failures are penalized; a fast 404 says nothing about the replica
+            instance.record(response_time, success, penalize=status_code >= 500)
+            # Live traffic is the primary health signal; 4xx are the client's fault, not the instance's
+            if self.service_discovery is not None:
+                self.service_discovery.record_outcome(service_name, instance.url, response_time, status_code < 500)
         
-        # Update circuit breaker
-        if success and 200 <= status_code < 400:
-            self._record_success(service_name)
-        else:
-            self._record_failure(service_name)
+        if not success:
             self.global_metrics["total_errors"] += 1
+
+        # Update circuit breaker; only 5xx, timeouts (504) and connection errors (503) say the service is failing
+        if status_code < 500:
+            self._record_success(service_name, response_time)
+        else:
+            self._record_failure(service_name, response_time)
         
         logger.debug(f"📊 Recorded {service_name}: {response_time:.3f}s, status={status_code}, success={success}")
     
     def _is_circuit_breaker_closed(self, service_name: str) -> bool:
-        """Check if circuit breaker allows requests"""
+        """Check if circuit breaker allows requests (taking a trial permit while half-open)"""
         if not settings.CIRCUIT_BREAKER_ENABLED:
             return True
-        
-        cb = self.circuit_breakers.get(service_name, {})
-        state = cb.get("state", "closed")
-        
-        if state == "closed":
-            return True
-        elif state == "open":
-            # Check if we should try half-open
-            last_failure = cb.get("last_failure")
-            if last_failure:
-                time_since_failure = (datetime.utcnow() - last_failure).total_seconds()
-                if time_since_failure >= settings.CIRCUIT_BREAKER_TIMEOUT:
-                    cb["state"] = "half_open"
-                    cb["success_count"] = 0
-                    logger.info(f"🟡 Circuit breaker half-open for {service_name}")
-                    return True
-            return False
-        elif state == "half_open":
-            return True
-        
-        return False
+        return self.circuit_breakers[service_name].allow_request()
     
-    def _record_success(self, service_name: str):
+    def _record_success(self, service_name: str, response_time: float = 0.0):
         """Record successful request for circuit breaker"""
-        if not settings.CIRCUIT_BREAKER_ENABLED:
-            return
-        
-        cb = self.circuit_breakers.get(service_name, {})
-        
-        if cb.get("state") == "half_open":
-            cb["success_count"] = cb.get("success_count", 0) + 1
-            if cb["success_count"] >= 3:  # 3 successful requests to close
-                cb["state"] = "closed"
-                cb["failure_count"] = 0
-                cb["success_count"] = 0
-                logger.info(f"🟢 Circuit breaker closed for {service_name}")
-        elif cb.get("state") == "closed":
-            cb["failure_count"] = 0  # Reset failure count on success
+        if settings.CIRCUIT_BREAKER_ENABLED:
+            self.circuit_breakers[service_name].record_success(response_time)
     
-    def _record_failure(self, service_name: str):
+    def _record_failure(self, service_name: str, response_time: float = 0.0):
         """Record failed request for circuit breaker"""
-        if not settings.CIRCUIT_BREAKER_ENABLED:
-            return
-        
-        cb = self.circuit_breakers.get(service_name, {})
-        cb["failure_count"] = cb.get("failure_count", 0) + 1
-        cb["last_failure"] = datetime.utcnow()
-        
-        current_state = cb.get("state", "closed")
-        
-        if current_state == "closed" and cb["failure_count"] >= settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD:
-            cb["state"] = "open"
-            logger.warning(f"🔴 Circuit breaker opened for {service_name} after {cb['failure_count']} failures")
-        elif current_state == "half_open":
-            cb["state"] = "open"
-            cb["success_count"] = 0
-            logger.warning(f"🔴 Circuit breaker re-opened for {service_name}")
+        if settings.CIRCUIT_BREAKER_ENABLED:
+            self.circuit_breakers[service_name].record_failure(response_time)
+    
+    def abandon_request(self, service_name: str):
+        """The request ended without an outcome (e.g. cancelled); return its circuit breaker permit"""
+        if settings.CIRCUIT_BREAKER_ENABLED:
+            self.circuit_breakers[service_name].release()
     
     async def get_load_balancing_metrics(self) -> Dict[str, Any]:
         """Get comprehensive load balancing metrics"""
@@ -299,15 +436,20 @@ class LoadBalancer:
         service_metrics = {}
         for service_name in self.services.keys():
             strategy_metrics = self.strategy.metrics[service_name]
-            circuit_breaker = self.circuit_breakers.get(service_name, {})
+            circuit_breaker = self.circuit_breakers[service_name].get_stats()
+            
+            instances = self.pools[service_name].get_metrics()
             
             service_metrics[service_name] = {
                 "requests": strategy_metrics["requests"],
                 "avg_response_time": self.strategy.get_average_response_time(service_name),
                 "error_rate": self.strategy.get_error_rate(service_name),
-                "connections": strategy_metrics["connections"],
-                "circuit_breaker_state": circuit_breaker.get("state", "closed"),
-                "failure_count": circuit_breaker.get("failure_count", 0),
+                "in_flight": sum(instance["in_flight"] for instance in instances),
+                "instances": instances,
+                "circuit_breaker_state": circuit_breaker["state"],
+                "failure_count": circuit_breaker["failure_count"],
+                "failure_rate": round(circuit_breaker["failure_rate"], 2),
+                "slow_call_rate": round(circuit_breaker["slow_call_rate"], 2),
                 "last_request": strategy_metrics["last_request"].isoformat() if strategy_metrics["last_request"] else None
             }
         
@@ -355,13 +497,6 @@ class LoadBalancer:
         for service_name, metrics in self.strategy.metrics.items():
             # Clean old response times (already limited by deque maxlen)
             pass
-        
-        # Reset circuit breaker failure counts if they're old
-        for service_name, cb in self.circuit_breakers.items():
-            last_failure = cb.get("last_failure")
-            if last_failure and (current_time - last_failure).total_seconds() > 3600:  # 1 hour
-                if cb.get("failure_count", 0) > 0:
-                    cb["failure_count"] = max(0, cb["failure_count"] - 1)
     
     def get_service_weight(self, service_name: str) -> float:
         """Get current weight for service (for weighted strategies)"""
@@ -383,16 +518,13 @@ class LoadBalancer:
     def force_circuit_breaker_open(self, service_name: str):
         """Manually open circuit breaker for service"""
         if service_name in self.circuit_breakers:
-            self.circuit_breakers[service_name]["state"] = "open"
-            self.circuit_breakers[service_name]["last_failure"] = datetime.utcnow()
+            self.circuit_breakers[service_name].force_open()
             logger.warning(f"🔴 Manually opened circuit breaker for {service_name}")
     
     def force_circuit_breaker_close(self, service_name: str):
         """Manually close circuit breaker for service"""
         if service_name in self.circuit_breakers:
-            self.circuit_breakers[service_name]["state"] = "closed"
-            self.circuit_breakers[service_name]["failure_count"] = 0
-            self.circuit_breakers[service_name]["success_count"] = 0
+            self.circuit_breakers[service_name].force_close()
             logger.info(f"🟢 Manually closed circuit breaker for {service_name}")
     
     def get_health_score(self, service_name: str) -> float:
@@ -418,10 +550,10 @@ class LoadBalancer:
         factors["error_rate"] = max(0.0, min(1.0, 1.0 - error_rate / 100.0))
         
         # Circuit breaker factor
-        cb_state = self.circuit_breakers.get(service_name, {}).get("state", "closed")
-        if cb_state == "closed":
+        cb_state = self.circuit_breakers[service_name].state
+        if cb_state is CircuitState.CLOSED:
             factors["circuit_breaker"] = 1.0
-        elif cb_state == "half_open":
+        elif cb_state is CircuitState.HALF_OPEN:
             factors["circuit_breaker"] = 0.5
         else:  # open
             factors["circuit_breaker"] = 0.0
@@ -535,10 +667,13 @@ def normalize_response_time_to_weight(response_time: float, min_time: float = 0.
 # Export for use in main application
 __all__ = [
     "LoadBalancer",
+    "UpstreamInstance",
+    "InstancePool",
     "LoadBalancingStrategy", 
     "RoundRobinStrategy",
     "LeastConnectionsStrategy", 
     "WeightedResponseTimeStrategy",
+    "PowerOfTwoChoicesStrategy",
     "calculate_weighted_random_selection",
     "normalize_response_time_to_weight"
 ]
\ No newline at end of file
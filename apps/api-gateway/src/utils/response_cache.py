@@ -0,0 +1,236 @@
+# apps/api-gateway/src/utils/response_cache.py
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from fnmatch import translate
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+CACHEABLE_METHODS = frozenset({"GET", "HEAD"})
+
+# Upstream headers that must never be replayed to another client
+UNCACHEABLE_RESPONSE_HEADERS = frozenset({"set-cookie", "www-authenticate"})
+
+# Per-entry bookkeeping (key, dict slot, timestamps) counted against the byte budget
+ENTRY_OVERHEAD_BYTES = 256
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parse a Cache-Control header into {directive: argument or None}"""
+    directives = {}
+    if not value:
+        return directives
+    for part in value.split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else None
+    return directives
+
+def normalize_query_string(query_string: bytes) -> str:
+    """Order-independent query string so ?a=1&b=2 and ?b=2&a=1 share an entry"""
+    if not query_string:
+        return ""
+    return urlencode(sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)))
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison as required for If-None-Match"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+@dataclass
+class CachedResponse:
+    """A buffered upstream response and how long it may be served without asking upstream"""
+    status_code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+    etag: str
+    stored_at: float
+    expires_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(name) + len(value) for name, value in self.headers) + ENTRY_OVERHEAD_BYTES
+
+class CachePolicy:
+    """Which paths of a route may be cached, and for how long when upstream does not say"""
+
+    def __init__(
+        self,
+        paths: Iterable[str] = ("*",),
+        ttl: float = 5.0,
+        max_entry_bytes: int = 1024 * 1024
+    ):
+        self.paths = tuple(paths)
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes
+        # Glob patterns compiled into one regex, so matching costs the same for any number of paths
+        self._pattern = re.compile("|".join(f"(?:{translate(path)})" for path in self.paths))
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional["CachePolicy"]:
+        """Build from a SERVICE_CONFIG "cache" entry; routes without one are never cached"""
+        if not config:
+            return None
+        return cls(**config)
+
+    def matches(self, path: str) -> bool:
+        return self._pattern.match(path) is not None
+
+    def freshness(self, cache_control: Dict[str, Optional[str]]) -> Optional[float]:
+        """Seconds an upstream response stays fresh in a shared cache, or None if it must not be stored"""
+        if "no-store" in cache_control or "private" in cache_control or "no-cache" in cache_control:
+            return None
+        for directive in ("s-maxage", "max-age"):
+            if cache_control.get(directive) is not None:
+                try:
+                    return max(0.0, float(cache_control[directive]))
+                except ValueError:
+                    return None
+        return self.ttl
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "paths": list(self.paths),
+            "ttl": self.ttl,
+            "max_entry_bytes": self.max_entry_bytes
+        }
+
+class ResponseCache:
+    """Shared LRU cache of upstream responses, bounded by total bytes.
+
+    Entries are only ever served while fresh; an expired entry is dropped the
+    moment it is looked up. Every entry belongs to the credentials it was
+    fetched with, so a response is only ever replayed to a caller presenting
+    the same credentials. Writes to a service bump a generation counter for
+    that service, which orphans its cached reads in O(1).
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self.total_bytes = 0
+
+        # Cache metrics
+        self.hits = 0
+        self.misses = 0
+        self.stale_rejections = 0
+        self.not_modified = 0
+        self.stores = 0
+        self.uncacheable = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def build_key(self, service_name: str, path: str, query_string: bytes,
+                  credential_scope: bytes, accept_encoding: str = "") -> Hashable:
+        """Cache key: route, path, normalized query, caller credentials and the encodings the client accepts"""
+        if not credential_scope:
+            # An anonymous entry would be replayed to every caller, so there is no shared scope
+            raise ValueError("Responses are only cached per credential scope")
+        generation = self._generations.get(service_name, 0)
+        return (service_name, path, normalize_query_string(query_string), credential_scope, accept_encoding, generation)
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        """Get a fresh entry, refreshing its LRU position"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= self.clock():
+            self._remove(key)
+            self.stale_rejections += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def store(self, key: Hashable, status_code: int, headers: List[Tuple[str, str]],
+              body: bytes, ttl: float) -> Optional[CachedResponse]:
+        """Store a response for `ttl` seconds, evicting least recently used entries to fit"""
+        headers = [(name, value) for name, value in headers if name.lower() not in UNCACHEABLE_RESPONSE_HEADERS]
+        etag = next((value for name, value in headers if name.lower() == "etag"), None)
+        if etag is None:
+            # Upstream sent no validator; derive one from the payload so clients can revalidate
+            etag = f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+            headers.append(("etag", etag))
+
+        now = self.clock()
+        entry = CachedResponse(status_code, headers, body, etag, now, now + ttl)
+        if ttl <= 0 or entry.size > self.max_bytes:
+            self.uncacheable += 1
+            return entry
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self.total_bytes += entry.size
+        self.stores += 1
+
+        while self.total_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+        return entry
+
+    def invalidate_service(self, service_name: str):
+        """Orphan every cached read for a service, e.g. after a write"""
+        # Callers of one organization hold different credentials, so a write can't be narrowed to theirs
+        self._generations[service_name] = self._generations.get(service_name, 0) + 1
+        self.invalidations += 1
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry.size
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups > 0 else 0,
+            "stale_rejections": self.stale_rejections,
+            "not_modified": self.not_modified,
+            "stores": self.stores,
+            "uncacheable": self.uncacheable,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+# Export for use in main application
+__all__ = [
+    "CACHEABLE_METHODS",
+    "CachedResponse",
+    "CachePolicy",
+    "ResponseCache",
+    "etag_matches",
+    "normalize_query_string",
+    "parse_cache_control"
+]
@@ -0,0 +1,151 @@
+# apps/api-gateway/src/utils/route_table.py
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Connection-scoped headers never forwarded upstream, plus Host which the upstream URL sets
+DEFAULT_DROP_HEADERS = frozenset({
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "proxy-connection", "te", "trailer", "transfer-encoding", "upgrade", "host",
+})
+
+@dataclass(frozen=True)
+class HeaderPlan:
+    """Precomputed header rewrite for a route: which headers to drop and which to add"""
+    drop: FrozenSet[bytes] = field(default_factory=lambda: frozenset(h.encode() for h in DEFAULT_DROP_HEADERS))
+    add: Tuple[Tuple[bytes, bytes], ...] = ()
+
+    @classmethod
+    def build(cls, add: Optional[Dict[str, str]] = None, drop: Iterable[str] = ()) -> "HeaderPlan":
+        drop_names = {name.lower() for name in DEFAULT_DROP_HEADERS}
+        drop_names.update(name.lower() for name in drop)
+        added = tuple((name.lower().encode(), str(value).encode()) for name, value in (add or {}).items())
+
+        # Static headers replace whatever the client sent under the same name
+        drop_names.update(name.decode() for name, _ in added)
+        return cls(drop=frozenset(name.encode() for name in drop_names), add=added)
+
+    def apply(self, raw_headers: Sequence[Tuple[bytes, bytes]],
+              extra: Sequence[Tuple[bytes, bytes]] = ()) -> List[Tuple[bytes, bytes]]:
+        """Rewrite raw ASGI headers in one pass; the result can be passed straight to httpx"""
+        drop = self.drop
+        headers = []
+        connection = None
+        for name, value in raw_headers:
+            if name in drop:
+                if name == b"connection":
+                    connection = value
+                continue
+            headers.append((name, value))
+
+        # Headers named in Connection are hop-by-hop too
+        if connection is not None:
+            listed = {token.strip().lower() for token in connection.split(b",")}
+            if not listed <= drop:
+                headers = [(name, value) for name, value in headers if name not in listed]
+
+        headers.extend(self.add)
+        headers.extend(extra)
+        return headers
+
+@dataclass(frozen=True)
+class Route:
+    """Everything needed to forward a request for one path prefix, resolved at compile time"""
+    service_name: str
+    prefix: str
+    upstream_url: str
+    upstream_path: str = ""  # Prepended to the remaining path, e.g. "/api/v1"
+    timeout: float = 30.0
+    retry_attempts: int = 0
+    header_plan: HeaderPlan = field(default_factory=HeaderPlan)
+    client: Any = None  # Upstream pool/client the route dispatches to
+    config: Dict[str, Any] = field(default_factory=dict)
+    cache_policy: Any = None  # Opt-in response caching for some of the route's paths
+    coalesce: bool = False  # Share one upstream call between identical concurrent reads
+
+    def upstream_target(self, path: str, query_string: bytes = b"", base_url: Optional[str] = None) -> str:
+        """Full upstream URL for the remaining path, forwarding the raw query string untouched"""
+        url = f"{base_url or self.upstream_url}{self.upstream_path}{path}"
+        if query_string:
+            url = f"{url}?{query_string.decode('latin-1')}"
+        return url
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "service": self.service_name,
+            "prefix": self.prefix,
+            "upstream": f"{self.upstream_url}{self.upstream_path}",
+            "timeout": self.timeout,
+            "retry_attempts": self.retry_attempts,
+            "added_headers": {name.decode(): value.decode() for name, value in self.header_plan.add},
+            "cache": self.cache_policy.describe() if self.cache_policy else None,
+            "coalesce": self.coalesce
+        }
+
+class RouteTable:
+    """Path-prefix routing compiled once and swapped atomically on reload.
+
+    Prefixes are single path segments ("/call-center"), so matching is one
+    str.partition and one dict lookup regardless of how many services exist.
+    """
+
+    def __init__(self, routes: Iterable[Route] = ()):
+        self._routes: Dict[str, Route] = {}
+        self.version = 0
+        self.compiled_at: Optional[datetime] = None
+        routes = list(routes)
+        if routes:
+            self.load(routes)
+
+    def load(self, routes: Iterable[Route]):
+        """Replace the whole table; requests already dispatched keep the route they matched"""
+        compiled = {}
+        for route in routes:
+            segment = route.prefix.strip("/")
+            if not segment or "/" in segment:
+                raise ValueError(f"Route prefix must be a single path segment: {route.prefix!r}")
+            compiled[segment] = route
+
+        # Single reference swap, so concurrent lookups see either the old or the new table
+        self._routes = compiled
+        self.version += 1
+        self.compiled_at = datetime.utcnow()
+        logger.info(f"🧭 Compiled route table v{self.version} with {len(compiled)} routes")
+
+    def match(self, path: str) -> Optional[Tuple[Route, str]]:
+        """Resolve a request path to (route, remaining path), or None"""
+        segment, _, rest = path.lstrip("/").partition("/")
+        route = self._routes.get(segment)
+        if route is None:
+            return None
+        return route, "/" + rest
+
+    def get(self, service_name: str) -> Optional[Route]:
+        """Look up a route by its prefix segment (the service name)"""
+        return self._routes.get(service_name)
+
+    def __contains__(self, service_name: str) -> bool:
+        return service_name in self._routes
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Describe the compiled table"""
+        return {
+            "version": self.version,
+            "compiled_at": self.compiled_at.isoformat() if self.compiled_at else None,
+            "total_routes": len(self._routes),
+            "routes": [route.describe() for route in self._routes.values()]
+        }
+
+# Export for use in main application
+__all__ = [
+    "DEFAULT_DROP_HEADERS",
+    "HeaderPlan",
+    "Route",
+    "RouteTable"
+]
@@ -1,18 +1,39 @@
 # apps/api-gateway/src/utils/service_discovery.py
 import asyncio
 import time
+import random
 import httpx
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Any
+from collections import defaultdict, deque
 import json
 import os
 
 from ..config import settings, SERVICE_CONFIG
+from shared.utils.circuit_breaker import CircuitBreaker, CircuitState
 
 logger = logging.getLogger(__name__)
 
+def parse_instance_urls(service_url: str) -> List[str]:
+    """Split a service URL setting into instance URLs ("http://cc-1:8004,http://cc-2:8004")"""
+    return [url.strip().rstrip("/") for url in service_url.split(",") if url.strip()]
+
+def build_circuit_breaker(name: str, **overrides) -> CircuitBreaker:
+    """Sliding-window circuit breaker configured from the CIRCUIT_BREAKER_* settings"""
+    options = {
+        "failure_rate_threshold": settings.CIRCUIT_BREAKER_FAILURE_RATE,
+        "slow_call_rate_threshold": settings.CIRCUIT_BREAKER_SLOW_CALL_RATE,
+        "slow_call_duration": settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+        "window_type": settings.CIRCUIT_BREAKER_WINDOW_TYPE,
+        "window_size": settings.CIRCUIT_BREAKER_WINDOW_SIZE,
+        "minimum_calls": settings.CIRCUIT_BREAKER_MIN_CALLS,
+        "wait_duration": settings.CIRCUIT_BREAKER_TIMEOUT,
+        "half_open_calls": settings.CIRCUIT_BREAKER_HALF_OPEN_CALLS,
+    }
+    options.update(overrides)
+    return CircuitBreaker(name, **options)
+
 class ServiceHealth:
     """Track health status of individual services"""
     
@@ -27,10 +48,62 @@ class ServiceHealth:
         self.total_requests = 0
         self.last_error = None
         self.uptime_start = datetime.utcnow()
+        
+        # Passive health from live proxy traffic (monotonic clock)
+        self.outcomes = deque(maxlen=settings.OUTLIER_WINDOW_SIZE)  # True for success
+        self.outcome_errors = 0  # Failures currently in the window
+        self.consecutive_errors = 0
+        self.latency_ewma: Optional[float] = None
+        self.last_traffic = 0.0
+        self.ejected_until: Optional[float] = None
+        self.ejections = 0
+        self.last_ejection = 0.0
+        self.next_probe_at = 0.0
+    
+    def record_outcome(self, response_time: float, success: bool):
+        """Record a proxied request to this instance; O(1)"""
+        self.last_traffic = time.monotonic()
+        
+        if len(self.outcomes) == self.outcomes.maxlen and not self.outcomes[0]:
+            self.outcome_errors -= 1
+        self.outcomes.append(success)
+        
+        if success:
+            self.consecutive_errors = 0
+            self.latency_ewma = response_time if self.latency_ewma is None else (
+                0.9 * self.latency_ewma + 0.1 * response_time
+            )
+        else:
+            self.outcome_errors += 1
+            self.consecutive_errors += 1
+    
+    def get_outcome_error_rate(self) -> float:
+        """Share of recent proxied requests that failed"""
+        return self.outcome_errors / len(self.outcomes) if self.outcomes else 0.0
+    
+    def eject(self, reason: str):
+        """Take the instance out of rotation; repeat offenders stay out longer"""
+        now = time.monotonic()
+        if now - self.last_ejection > settings.OUTLIER_MAX_EJECTION_TIME * 2:
+            self.ejections = 0  # Well-behaved for a while, start over at the base ejection time
+        self.ejections += 1
+        self.last_ejection = now
+        
+        duration = min(settings.OUTLIER_BASE_EJECTION_TIME * self.ejections, settings.OUTLIER_MAX_EJECTION_TIME)
+        self.ejected_until = now + duration
+        self.is_healthy = False
+        self.last_error = reason
+        
+        # Judge the instance afresh once it is readmitted
+        self.outcomes.clear()
+        self.outcome_errors = 0
+        self.consecutive_errors = 0
+        return duration
     
     def record_success(self, response_time: float):
         """Record successful health check"""
         self.is_healthy = True
+        self.ejected_until = None
         self.consecutive_failures = 0
         self.last_check = datetime.utcnow()
         self.total_requests += 1
@@ -86,7 +159,12 @@ class ServiceHealth:
             "total_requests": self.total_requests,
             "error_count": self.error_count,
             "uptime_seconds": round(self.get_uptime_seconds(), 1),
-            "last_error": self.last_error
+            "last_error": self.last_error,
+            "ejected_for": round(max(0.0, self.ejected_until - time.monotonic()), 1) if self.ejected_until else 0,
+            "ejections": self.ejections,
+            "recent_error_rate": round(self.get_outcome_error_rate() * 100, 2),
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "idle_seconds": round(time.monotonic() - self.last_traffic, 1) if self.last_traffic else None
         }
 
 class ServiceDiscovery:
@@ -95,19 +173,29 @@ class ServiceDiscovery:
     def __init__(self, services: Dict[str, str]):
         self.services = services
         self.service_health: Dict[str, ServiceHealth] = {}
-        self.circuit_breakers: Dict[str, Dict] = {}
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {}
         self.health_check_task: Optional[asyncio.Task] = None
         self.start_time = datetime.utcnow()
         
+        # Per-instance health for services running several replicas: service -> url -> health
+        self.instances: Dict[str, Dict[str, ServiceHealth]] = {}
+        self._listeners: List[Callable[[str, Dict[str, bool]], None]] = []
+        
+        # One pooled client for all active probes
+        self._probe_client: Optional[httpx.AsyncClient] = None
+        self.probes_sent = 0
+        self.passive_ejections = 0
+        
         # Initialize service health tracking
         for service_name, service_url in services.items():
             self.service_health[service_name] = ServiceHealth(service_name, service_url)
-            self.circuit_breakers[service_name] = {
-                "state": "closed",  # closed, open, half_open
-                "failure_count": 0,
-                "last_failure": None,
-                "next_attempt": None
+            self.instances[service_name] = {
+                url: ServiceHealth(service_name, url) for url in parse_instance_urls(service_url)
             }
+            # Fed by health checks, which are far sparser than requests, so the window is short
+            self.circuit_breakers[service_name] = build_circuit_breaker(
+                f"{service_name}_health", window_size=10, minimum_calls=5, half_open_calls=1
+            )
     
     async def initialize(self):
         """Initialize service discovery"""
@@ -151,95 +239,197 @@ class ServiceDiscovery:
             logger.error(f"❌ Unknown service: {service_name}")
             return False
         
-        service_url = self.services[service_name]
         service_health = self.service_health[service_name]
         config = SERVICE_CONFIG.get(service_name, {})
         
-        # Check circuit breaker
-        if not self._is_circuit_breaker_closed(service_name):
+        # Check circuit breaker; while half-open this check is the trial call
+        if settings.CIRCUIT_BREAKER_ENABLED and not self.circuit_breakers[service_name].allow_request():
             logger.debug(f"🔌 Circuit breaker open for {service_name}")
             return False
         
+        health_path = config.get("health_check_path", "/health")
+        timeout = config.get("timeout", settings.HEALTH_CHECK_TIMEOUT)
+        instances = self.instances[service_name]
+        
+        # Probe every replica; the service is up while at least one of them is
+        results = await asyncio.gather(*[
+            self._check_instance(health, f"{url}{health_path}", timeout)
+            for url, health in instances.items()
+        ])
+        self._notify(service_name)
+        
+        response_times = [response_time for response_time in results if response_time is not None]
+        if response_times:
+            service_health.record_success(min(response_times))
+            self._record_circuit_breaker_success(service_name, min(response_times))
+            return True
+        
+        errors = {health.last_error for health in instances.values()}
+        service_health.record_failure(", ".join(sorted(str(error) for error in errors)) or "no instances")
+        self._record_circuit_breaker_failure(service_name)
+        return False
+    
+    def _get_probe_client(self) -> httpx.AsyncClient:
+        if self._probe_client is None or self._probe_client.is_closed:
+            self._probe_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.HEALTH_PROBE_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HEALTH_PROBE_MAX_CONNECTIONS
+                ),
+                timeout=settings.HEALTH_CHECK_TIMEOUT
+            )
+        return self._probe_client
+    
+    async def _check_instance(self, health: ServiceHealth, health_url: str, timeout: float) -> Optional[float]:
+        """Check one replica, returning its response time or None if it failed"""
+        self.probes_sent += 1
+        ejected = health.ejected_until is not None
         try:
             start_time = time.time()
-            health_path = config.get("health_check_path", "/health")
-            timeout = config.get("timeout", settings.HEALTH_CHECK_TIMEOUT)
             
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                response = await client.get(f"{service_url}{health_path}")
-                response_time = time.time() - start_time
-                
-                if response.status_code == 200:
-                    service_health.record_success(response_time)
-                    self._reset_circuit_breaker(service_name)
-                    return True
-                else:
-                    error_msg = f"HTTP {response.status_code}"
-                    service_health.record_failure(error_msg)
-                    self._record_circuit_breaker_failure(service_name)
-                    return False
+            response = await self._get_probe_client().get(health_url, timeout=timeout)
+            response_time = time.time() - start_time
+            
+            if response.status_code == 200:
+                health.record_success(response_time)
+                if ejected:
+                    logger.info(f"🟢 Re-admitted {health.service_name} instance {health.service_url} after probe")
+                return response_time
+            
+            error = f"HTTP {response.status_code}"
         
         except httpx.TimeoutException:
-            service_health.record_failure("timeout")
-            self._record_circuit_breaker_failure(service_name)
-            return False
+            error = "timeout"
         except httpx.ConnectError:
-            service_health.record_failure("connection_error")
-            self._record_circuit_breaker_failure(service_name)
-            return False
+            error = "connection_error"
         except Exception as e:
-            service_health.record_failure(str(e))
-            self._record_circuit_breaker_failure(service_name)
-            return False
+            error = str(e)
+        
+        health.record_failure(error)
+        if ejected:
+            duration = health.eject(f"probe failed: {error}")
+            logger.warning(f"⏏️ {health.service_name} instance {health.service_url} still failing, ejected for {duration:.0f}s")
+        return None
     
-    def _is_circuit_breaker_closed(self, service_name: str) -> bool:
-        """Check if circuit breaker allows requests"""
-        if not settings.CIRCUIT_BREAKER_ENABLED:
-            return True
+    def record_outcome(self, service_name: str, url: str, response_time: float, success: bool):
+        """Passive health: feed a proxied request's outcome and eject the instance if it is an outlier"""
+        instances = self.instances.get(service_name)
+        health = instances.get(url) if instances else None
+        if health is None or health.ejected_until is not None:
+            return  # Requests that raced an ejection say nothing new
+        
+        health.record_outcome(response_time, success)
+        reason = self._outlier_reason(instances, health)
+        if reason is None:
+            return
         
-        cb = self.circuit_breakers[service_name]
-        current_time = datetime.utcnow()
+        # Never eject so many instances that the rest are overwhelmed
+        ejected = sum(1 for instance in instances.values() if instance.ejected_until is not None)
+        if ejected >= max(1, int(len(instances) * settings.OUTLIER_MAX_EJECTION_PERCENT / 100)):
+            logger.debug(f"{service_name} instance {url} is an outlier ({reason}) but the ejection limit is reached")
+            return
         
-        if cb["state"] == "closed":
-            return True
-        elif cb["state"] == "open":
-            # Check if it's time to try again (half-open)
-            if cb["next_attempt"] and current_time >= cb["next_attempt"]:
-                cb["state"] = "half_open"
-                logger.info(f"🔄 Circuit breaker half-open for {service_name}")
-                return True
+        duration = health.eject(reason)
+        self.passive_ejections += 1
+        logger.warning(f"⏏️ Ejected {service_name} instance {url} for {duration:.0f}s: {reason}")
+        self._refresh_service_health(service_name)
+        self._notify(service_name)
+    
+    def _outlier_reason(self, instances: Dict[str, ServiceHealth], health: ServiceHealth) -> Optional[str]:
+        """Why live traffic says this instance is misbehaving, or None"""
+        if health.consecutive_errors >= settings.OUTLIER_CONSECUTIVE_ERRORS:
+            return f"{health.consecutive_errors} consecutive errors"
+        
+        if len(health.outcomes) < settings.OUTLIER_MIN_REQUESTS:
+            return None
+        
+        error_rate = health.get_outcome_error_rate()
+        if error_rate >= settings.OUTLIER_ERROR_RATE:
+            return f"error rate {error_rate:.0%}"
+        
+        # Latency outlier: far slower than the typical sibling serving the same traffic
+        if health.latency_ewma is None or health.latency_ewma < settings.OUTLIER_MIN_LATENCY:
+            return None
+        siblings = sorted(
+            instance.latency_ewma for instance in instances.values()
+            if instance is not health and instance.is_healthy and instance.latency_ewma is not None
+            and len(instance.outcomes) >= settings.OUTLIER_MIN_REQUESTS
+        )
+        if siblings:
+            median = siblings[len(siblings) // 2]
+            if health.latency_ewma > median * settings.OUTLIER_LATENCY_FACTOR:
+                return f"latency {health.latency_ewma * 1000:.0f}ms vs {median * 1000:.0f}ms median"
+        return None
+    
+    def _refresh_service_health(self, service_name: str):
+        """A service is up while any of its instances is"""
+        self.service_health[service_name].is_healthy = any(
+            health.is_healthy for health in self.instances[service_name].values()
+        )
+    
+    def add_listener(self, listener: Callable[[str, Dict[str, bool]], None]):
+        """Subscribe to instance changes; called with (service_name, {url: is_healthy})"""
+        self._listeners.append(listener)
+        for service_name in self.services:
+            listener(service_name, self.get_instance_states(service_name))
+    
+    def _notify(self, service_name: str):
+        states = self.get_instance_states(service_name)
+        for listener in self._listeners:
+            try:
+                listener(service_name, states)
+            except Exception as e:
+                logger.error(f"❌ Service discovery listener failed for {service_name}: {e}")
+    
+    def get_instance_states(self, service_name: str) -> Dict[str, bool]:
+        """Current replicas of a service and whether each passed its last health check"""
+        return {url: health.is_healthy for url, health in self.instances.get(service_name, {}).items()}
+    
+    def register_instance(self, service_name: str, url: str) -> bool:
+        """Add a replica at runtime (e.g. when call-center scales out)"""
+        if service_name not in self.services:
+            raise ValueError(f"Unknown service: {service_name}")
+        
+        url = url.rstrip("/")
+        instances = self.instances[service_name]
+        if url in instances:
             return False
-        elif cb["state"] == "half_open":
-            return True
         
-        return False
+        instances[url] = ServiceHealth(service_name, url)
+        logger.info(f"➕ Registered {service_name} instance {url} ({len(instances)} total)")
+        self._notify(service_name)
+        return True
     
-    def _record_circuit_breaker_failure(self, service_name: str):
-        """Record failure for circuit breaker"""
-        if not settings.CIRCUIT_BREAKER_ENABLED:
-            return
+    def deregister_instance(self, service_name: str, url: str) -> bool:
+        """Remove a replica at runtime; requests already sent to it are unaffected"""
+        url = url.rstrip("/")
+        instances = self.instances.get(service_name, {})
+        if url not in instances:
+            return False
+        if len(instances) == 1:
+            raise ValueError(f"Cannot remove the last instance of {service_name}")
         
-        cb = self.circuit_breakers[service_name]
-        cb["failure_count"] += 1
-        cb["last_failure"] = datetime.utcnow()
+        del instances[url]
         
-        if cb["failure_count"] >= settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD:
-            if cb["state"] != "open":
-                cb["state"] = "open"
-                cb["next_attempt"] = datetime.utcnow() + timedelta(seconds=settings.CIRCUIT_BREAKER_TIMEOUT)
-                logger.warning(f"🔴 Circuit breaker opened for {service_name}")
+        logger.info(f"➖ Deregistered {service_name} instance {url} ({len(instances)} left)")
+        self._notify(service_name)
+        return True
     
-    def _reset_circuit_breaker(self, service_name: str):
-        """Reset circuit breaker on successful request"""
+    def _is_circuit_breaker_closed(self, service_name: str) -> bool:
+        """Check if circuit breaker allows requests"""
         if not settings.CIRCUIT_BREAKER_ENABLED:
-            return
-        
-        cb = self.circuit_breakers[service_name]
-        if cb["state"] != "closed":
-            cb["state"] = "closed"
-            cb["failure_count"] = 0
-            cb["next_attempt"] = None
-            logger.info(f"🟢 Circuit breaker closed for {service_name}")
+            return True
+        return self.circuit_breakers[service_name].state is not CircuitState.OPEN
+    
+    def _record_circuit_breaker_failure(self, service_name: str, response_time: float = 0.0):
+        """Record failure for circuit breaker"""
+        if settings.CIRCUIT_BREAKER_ENABLED:
+            self.circuit_breakers[service_name].record_failure(response_time)
+    
+    def _record_circuit_breaker_success(self, service_name: str, response_time: float = 0.0):
+        """Record success for circuit breaker"""
+        if settings.CIRCUIT_BREAKER_ENABLED:
+            self.circuit_breakers[service_name].record_success(response_time)
     
     async def get_healthy_services(self) -> List[str]:
         """Get list of currently healthy services"""
@@ -271,10 +461,10 @@ class ServiceDiscovery:
         
         if 200 <= status_code < 400:
             service_health.record_success(response_time)
-            self._reset_circuit_breaker(service_name)
+            self._record_circuit_breaker_success(service_name, response_time)
         else:
             service_health.record_failure(f"HTTP {status_code}")
-            self._record_circuit_breaker_failure(service_name)
+            self._record_circuit_breaker_failure(service_name, response_time)
     
     async def mark_service_unhealthy(self, service_name: str, reason: str):
         """Manually mark service as unhealthy"""
@@ -305,7 +495,10 @@ class ServiceDiscovery:
         service_metrics = {}
         for service_name, health in self.service_health.items():
             service_metrics[service_name] = health.to_dict()
-            service_metrics[service_name]["circuit_breaker"] = self.circuit_breakers[service_name].copy()
+            service_metrics[service_name]["circuit_breaker"] = self.circuit_breakers[service_name].get_stats()
+            service_metrics[service_name]["instances"] = [
+                instance.to_dict() for instance in self.instances[service_name].values()
+            ]
         
         return {
             "uptime": (datetime.utcnow() - self.start_time).total_seconds(),
@@ -315,43 +508,65 @@ class ServiceDiscovery:
             "healthy_services_count": len(healthy_services),
             "total_services_count": total_services,
             "health_ratio": round(len(healthy_services) / max(total_services, 1), 2),
+            "probes_sent": self.probes_sent,
+            "passive_ejections": self.passive_ejections,
             "services": service_metrics
         }
     
+    def start(self):
+        """Start background probing of idle and ejected instances"""
+        if self.health_check_task is None or self.health_check_task.done():
+            self.health_check_task = asyncio.create_task(self.periodic_health_check(), name="service_discovery_probes")
+    
+    def _probe_due(self, health: ServiceHealth, now: float) -> bool:
+        if now < health.next_probe_at:
+            return False
+        if health.ejected_until is not None:
+            return now >= health.ejected_until
+        # Recent proxied traffic already says how the instance is doing
+        return now - health.last_traffic >= settings.HEALTH_CHECK_INTERVAL
+    
     async def periodic_health_check(self):
-        """Background task for periodic health checks"""
-        logger.info(f"🔄 Starting periodic health checks (interval: {settings.HEALTH_CHECK_INTERVAL}s)")
+        """Background task probing only instances live traffic says nothing about: idle and ejected ones"""
+        logger.info(f"🔄 Starting health probes for idle/ejected instances (interval: {settings.HEALTH_CHECK_INTERVAL}s)")
         
         while True:
             try:
-                await asyncio.sleep(settings.HEALTH_CHECK_INTERVAL)
+                await asyncio.sleep(settings.HEALTH_PROBE_TICK)
                 
-                logger.debug("🔍 Performing periodic health check...")
-                healthy_count = await self.health_check_all_services()
+                now = time.monotonic()
+                due = [
+                    (service_name, url, health)
+                    for service_name, instances in self.instances.items()
+                    for url, health in instances.items()
+                    if self._probe_due(health, now)
+                ]
+                if not due:
+                    continue
                 
-                # Log summary
-                total_services = len(self.services)
-                health_ratio = healthy_count / total_services
+                before = {service_name: self.get_instance_states(service_name) for service_name, _, _ in due}
+                await asyncio.gather(*[self._probe(service_name, url, health, now) for service_name, url, health in due])
                 
-                if health_ratio >= 0.8:
-                    log_level = logging.INFO
-                    status_emoji = "✅"
-                elif health_ratio >= 0.5:
-                    log_level = logging.WARNING
-                    status_emoji = "⚠️"
-                else:
-                    log_level = logging.ERROR
-                    status_emoji = "❌"
-                
-                logger.log(
-                    log_level,
-                    f"{status_emoji} Health Check: {healthy_count}/{total_services} services healthy ({health_ratio:.1%})"
-                )
+                for service_name, states in before.items():
+                    self._refresh_service_health(service_name)
+                    if self.get_instance_states(service_name) != states:
+                        self._notify(service_name)
                 
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"❌ Error in periodic health check: {e}")
                 await asyncio.sleep(5)  # Short delay before retrying
     
+    async def _probe(self, service_name: str, url: str, health: ServiceHealth, now: float):
+        # Jitter so instances that went idle together are not probed in lockstep
+        jitter = settings.HEALTH_PROBE_JITTER
+        health.next_probe_at = now + settings.HEALTH_CHECK_INTERVAL * random.uniform(1 - jitter, 1 + jitter)
+        
+        config = SERVICE_CONFIG.get(service_name, {})
+        health_path = config.get("health_check_path", "/health")
+        await self._check_instance(health, f"{url}{health_path}", settings.HEALTH_CHECK_TIMEOUT)
+    
     async def cleanup(self):
         """Cleanup resources"""
         if self.health_check_task and not self.health_check_task.done():
@@ -361,6 +576,9 @@ class ServiceDiscovery:
             except asyncio.CancelledError:
                 pass
         
+        if self._probe_client is not None:
+            await self._probe_client.aclose()
+        
         logger.info("🧹 Service Discovery cleaned up")
     
     def get_service_info(self, service_name: str) -> Optional[Dict[str, Any]]:
@@ -377,7 +595,8 @@ class ServiceDiscovery:
             "display_name": config.get("name", service_name.replace("-", " ").title()),
             "url": self.services[service_name],
             "health": health.to_dict(),
-            "circuit_breaker": circuit_breaker.copy(),
+            "instances": [instance.to_dict() for instance in self.instances[service_name].values()],
+            "circuit_breaker": circuit_breaker.get_stats(),
             "config": config
         }
     
@@ -390,4 +609,4 @@ class ServiceDiscovery:
         return services_info
 
 # Export for use in main application
-__all__ = ["ServiceDiscovery", "ServiceHealth"]
\ No newline at end of file
+__all__ = ["ServiceDiscovery", "ServiceHealth", "parse_instance_urls"]
\ No newline at end of file
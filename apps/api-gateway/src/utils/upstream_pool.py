@@ -0,0 +1,247 @@
+# apps/api-gateway/src/utils/upstream_pool.py
+import importlib.util
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+import httpx
+
+from ..config import settings, SERVICE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Connection-scoped headers that must not be forwarded between hops (RFC 7230 §6.1).
+# Forwarding e.g. a client's "Connection: close" would tear down our pooled upstream connection.
+HOP_BY_HOP_HEADERS = frozenset({
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "proxy-connection",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+})
+
+class UpstreamPool:
+    """Long-lived keep-alive client for a single upstream service"""
+
+    def __init__(
+        self,
+        service_name: str,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        pool_timeout: float = 5.0,
+        http2: bool = False
+    ):
+        self.service_name = service_name
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.pool_timeout = pool_timeout
+
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning(f"⚠️ HTTP/2 requested for {service_name} but 'h2' is not installed, using HTTP/1.1 keep-alive")
+            http2 = False
+        self.http2 = http2
+
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+
+        # Keep a handle on the transport so we can introspect the connection pool
+        self._transport = httpx.AsyncHTTPTransport(http2=http2, limits=limits, retries=0)
+        self.client = httpx.AsyncClient(
+            transport=self._transport,
+            timeout=httpx.Timeout(settings.SERVICE_TIMEOUT, pool=pool_timeout)
+        )
+
+        # Pool metrics
+        self.total_requests = 0
+        self.pending_requests = 0
+        self.peak_pending_requests = 0
+        self.connections_opened = 0
+        self.pool_timeouts = 0
+        self.wait_times = deque(maxlen=500)  # Seconds spent waiting for a connection
+        self.created_at = datetime.utcnow()
+
+    @property
+    def is_closed(self) -> bool:
+        return self.client.is_closed
+
+    def build_request(self, method: str, url: str, timeout: Optional[float] = None, **kwargs) -> httpx.Request:
+        """Build an upstream request bound to this pool"""
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, pool=self.pool_timeout)
+        return self.client.build_request(method, url, **kwargs)
+
+    async def send(self, request: httpx.Request, stream: bool = False) -> httpx.Response:
+        """Send request over a pooled connection, recording how long it waited for one"""
+        started = time.perf_counter()
+        acquired = False
+
+        async def trace(event_name: str, info: Dict[str, Any]):
+            # The first connection-level event fires once the pool has handed us a connection
+            nonlocal acquired
+            if acquired or not event_name.endswith(".started"):
+                return
+            acquired = True
+            self.wait_times.append(time.perf_counter() - started)
+            if event_name == "connection.connect_tcp.started":
+                self.connections_opened += 1
+
+        request.extensions["trace"] = trace
+
+        self.total_requests += 1
+        self.pending_requests += 1
+        self.peak_pending_requests = max(self.peak_pending_requests, self.pending_requests)
+
+        try:
+            return await self.client.send(request, stream=stream)
+        except httpx.PoolTimeout:
+            self.pool_timeouts += 1
+            logger.warning(f"⏳ No free upstream connection for {self.service_name} within {self.pool_timeout}s")
+            raise
+        finally:
+            self.pending_requests -= 1
+
+    def _connection_counts(self) -> Dict[str, int]:
+        """Count active and idle connections held by the underlying pool"""
+        pool = getattr(self._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+
+        idle = 0
+        active = 0
+        for connection in connections:
+            if connection.is_closed():
+                continue
+            if connection.is_idle():
+                idle += 1
+            else:
+                active += 1
+
+        return {"active": active, "idle": idle, "total": active + idle}
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get pool metrics"""
+        waits = sorted(self.wait_times)
+        count = len(waits)
+
+        if count:
+            wait_time_ms = {
+                "avg": round(sum(waits) / count * 1000, 3),
+                "p95": round(waits[min(count - 1, int(count * 0.95))] * 1000, 3),
+                "max": round(waits[-1] * 1000, 3),
+                "samples": count
+            }
+        else:
+            wait_time_ms = {"avg": 0.0, "p95": 0.0, "max": 0.0, "samples": 0}
+
+        return {
+            "http2": self.http2,
+            "limits": {
+                "max_connections": self.max_connections,
+                "max_keepalive_connections": self.max_keepalive_connections,
+                "keepalive_expiry": self.keepalive_expiry,
+                "pool_timeout": self.pool_timeout
+            },
+            "connections": self._connection_counts(),
+            "connections_opened": self.connections_opened,
+            "total_requests": self.total_requests,
+            "pending_requests": self.pending_requests,
+            "peak_pending_requests": self.peak_pending_requests,
+            "pool_timeouts": self.pool_timeouts,
+            "wait_time_ms": wait_time_ms,
+            "created_at": self.created_at.isoformat()
+        }
+
+    async def close(self):
+        """Close the client and all pooled connections"""
+        if not self.client.is_closed:
+            await self.client.aclose()
+
+class UpstreamPoolManager:
+    """One long-lived connection pool per upstream service"""
+
+    def __init__(self, services: Dict[str, str]):
+        self.services = services
+        self.pools: Dict[str, UpstreamPool] = {}
+
+    def get_pool(self, service_name: str) -> UpstreamPool:
+        """Get the pool for a service, creating it on first use"""
+        pool = self.pools.get(service_name)
+        if pool is None or pool.is_closed:
+            pool = self._create_pool(service_name)
+            self.pools[service_name] = pool
+        return pool
+
+    def _create_pool(self, service_name: str) -> UpstreamPool:
+        """Create a pool using the service's `pool` overrides from SERVICE_CONFIG"""
+        pool_config = SERVICE_CONFIG.get(service_name, {}).get("pool", {})
+
+        pool = UpstreamPool(
+            service_name,
+            max_connections=pool_config.get("max_connections", settings.UPSTREAM_MAX_CONNECTIONS),
+            max_keepalive_connections=pool_config.get(
+                "max_keepalive_connections", settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            keepalive_expiry=pool_config.get("keepalive_expiry", settings.UPSTREAM_KEEPALIVE_EXPIRY),
+            pool_timeout=pool_config.get("pool_timeout", settings.UPSTREAM_POOL_TIMEOUT),
+            http2=pool_config.get("http2", settings.UPSTREAM_HTTP2)
+        )
+
+        logger.info(
+            f"🔗 Created upstream pool for {service_name} "
+            f"(max={pool.max_connections}, keepalive={pool.max_keepalive_connections}, http2={pool.http2})"
+        )
+        return pool
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get metrics for all pools"""
+        pools = {name: pool.get_metrics() for name, pool in self.pools.items()}
+
+        return {
+            "pools": pools,
+            "total_pools": len(pools),
+            "active_connections": sum(p["connections"]["active"] for p in pools.values()),
+            "idle_connections": sum(p["connections"]["idle"] for p in pools.values()),
+            "pending_requests": sum(p["pending_requests"] for p in pools.values()),
+            "pool_timeouts": sum(p["pool_timeouts"] for p in pools.values())
+        }
+
+    async def close(self):
+        """Close every pool"""
+        for pool in self.pools.values():
+            await pool.close()
+        self.pools.clear()
+        logger.info("🧹 Upstream pools closed")
+
+def strip_hop_by_hop_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    """Drop connection-scoped headers (and any listed in Connection) before forwarding"""
+    connection_tokens = {
+        token.strip().lower()
+        for token in headers.get("connection", "").split(",")
+        if token.strip()
+    }
+    return {
+        name: value for name, value in headers.items()
+        if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() not in connection_tokens
+    }
+
+# Export for use in main application
+__all__ = [
+    "UpstreamPool",
+    "UpstreamPoolManager",
+    "HOP_BY_HOP_HEADERS",
+    "HTTP2_AVAILABLE",
+    "strip_hop_by_hop_headers"
+]
@@ -18,9 +18,13 @@ import logging
 import hashlib
 import secrets
 import time
+import os
+import httpx
 from collections import defaultdict
 import re
 
+from shared.ratelimit import SLIDING_WINDOW, LocalRateLimiter, RateLimitRule
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -117,14 +121,6 @@ class APIUsage(BaseModel):
     error_message: Optional[str] = None
     metadata: Dict[str, Any] = {}
 
-class RateLimit(BaseModel):
-    api_key_id: str
-    period: RateLimitPeriod
-    requests_made: int = 0
-    requests_limit: int
-    window_start: datetime = Field(default_factory=datetime.now)
-    blocked: bool = False
-
 class WebhookEvent(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4))
     api_key_id: str
@@ -220,7 +216,7 @@ SAMPLE_ENDPOINTS = [
 # Global storage
 api_keys: List[APIKey] = []
 api_usage: List[APIUsage] = []
-rate_limits: Dict[str, RateLimit] = {}
+rate_limiter = LocalRateLimiter(SLIDING_WINDOW)
 webhook_events: List[WebhookEvent] = []
 endpoints: List[APIEndpoint] = []
 
@@ -259,48 +255,26 @@ app.add_middleware(
 )
 
 # Rate limiting helper
+RATE_LIMIT_WINDOWS = {
+    RateLimitPeriod.MINUTE: 60,
+    RateLimitPeriod.HOUR: 3600,
+    RateLimitPeriod.DAY: 86400,
+    RateLimitPeriod.MONTH: 30 * 86400,
+}
+
+def get_rate_limit_rule(api_key: APIKey) -> RateLimitRule:
+    """Rate limit rule for an API key's plan"""
+    return RateLimitRule(api_key.rate_limit_requests, RATE_LIMIT_WINDOWS[api_key.rate_limit_period])
+
 async def check_rate_limit(api_key: APIKey, endpoint: str) -> bool:
     """Check if request is within rate limits"""
-    now = datetime.now()
     key = f"{api_key.id}_{api_key.rate_limit_period.value}"
-    
-    if key not in rate_limits:
-        rate_limits[key] = RateLimit(
-            api_key_id=api_key.id,
-            period=api_key.rate_limit_period,
-            requests_limit=api_key.rate_limit_requests,
-            window_start=now
-        )
-    
-    rate_limit = rate_limits[key]
-    
-    # Check if we need to reset the window
-    if api_key.rate_limit_period == RateLimitPeriod.MINUTE:
-        window_duration = timedelta(minutes=1)
-    elif api_key.rate_limit_period == RateLimitPeriod.HOUR:
-        window_duration = timedelta(hours=1)
-    elif api_key.rate_limit_period == RateLimitPeriod.DAY:
-        window_duration = timedelta(days=1)
-    else:  # MONTH
-        window_duration = timedelta(days=30)
-    
-    if now - rate_limit.window_start >= window_duration:
-        rate_limit.requests_made = 0
-        rate_limit.window_start = now
-        rate_limit.blocked = False
-    
-    # Check limit
-    if rate_limit.requests_made >= rate_limit.requests_limit:
-        rate_limit.blocked = True
-        return False
-    
-    rate_limit.requests_made += 1
-    return True
+    return rate_limiter.check(key, get_rate_limit_rule(api_key)).allowed
 
 # Authentication helper
-async def verify_api_key(credentials: HTTPAuthorizationCredentials = Security(security)) -> APIKey:
-    """Verify API key from Authorization header"""
-    api_key = next((k for k in api_keys if k.key == credentials.credentials), None)
+def get_active_api_key(key: str) -> APIKey:
+    """Look up an API key and check it is usable"""
+    api_key = next((k for k in api_keys if k.key == key), None)
     
     if not api_key:
         raise HTTPException(status_code=401, detail="Invalid API key")
@@ -313,6 +287,27 @@ async def verify_api_key(credentials: HTTPAuthorizationCredentials = Security(se
     
     return api_key
 
+async def verify_api_key(credentials: HTTPAuthorizationCredentials = Security(security)) -> APIKey:
+    """Verify API key from Authorization header"""
+    return get_active_api_key(credentials.credentials)
+
+# Gateway cache invalidation
+async def notify_api_key_changed(api_key: APIKey):
+    """Tell the gateway to drop its cached validation of this key"""
+    gateway_url = os.getenv("API_GATEWAY_URL", "http://api-gateway:8000")
+    key_hash = hashlib.sha256(api_key.key.encode()).hexdigest()
+    
+    try:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            await client.post(
+                f"{gateway_url}/internal/api-keys/invalidate",
+                json={"key_hash": key_hash},
+                headers={"X-Internal-Secret": os.getenv("INTERNAL_SERVICE_SECRET", "")}
+            )
+    except Exception as e:
+        # The gateway cache TTL still bounds how long the key stays usable
+        logger.warning(f"Could not invalidate gateway cache for API key {api_key.id}: {e}")
+
 # Health endpoint
 @app.get("/health")
 async def health_check():
@@ -360,7 +355,7 @@ async def create_api_key(api_key_data: APIKey):
     return api_key_data
 
 @app.put("/api-keys/{api_key_id}", response_model=APIKey)
-async def update_api_key(api_key_id: str, updates: Dict[str, Any]):
+async def update_api_key(api_key_id: str, updates: Dict[str, Any], background_tasks: BackgroundTasks):
     """Update an existing API key"""
     api_key = next((k for k in api_keys if k.id == api_key_id), None)
     if not api_key:
@@ -370,20 +365,44 @@ async def update_api_key(api_key_id: str, updates: Dict[str, Any]):
         if hasattr(api_key, field):
             setattr(api_key, field, value)
     
+    # Status, expiry or scope changes must not wait for the gateway cache to expire
+    background_tasks.add_task(notify_api_key_changed, api_key)
+    
     logger.info(f"Updated API key: {api_key.name}")
     return api_key
 
 @app.delete("/api-keys/{api_key_id}")
-async def revoke_api_key(api_key_id: str):
+async def revoke_api_key(api_key_id: str, background_tasks: BackgroundTasks):
     """Revoke an API key"""
     api_key = next((k for k in api_keys if k.id == api_key_id), None)
     if not api_key:
         raise HTTPException(status_code=404, detail="API key not found")
     
     api_key.status = APIKeyStatus.REVOKED
+    background_tasks.add_task(notify_api_key_changed, api_key)
     logger.info(f"Revoked API key: {api_key.name}")
     return {"message": "API key revoked successfully"}
 
+class APIKeyValidationRequest(BaseModel):
+    api_key: str
+
+@app.post("/api/v1/validate-key")
+async def validate_api_key(request: APIKeyValidationRequest):
+    """Validate an API key for the gateway"""
+    api_key = get_active_api_key(request.api_key)
+    
+    expires_in = None
+    if api_key.expires_at:
+        expires_in = (api_key.expires_at - datetime.now()).total_seconds()
+    
+    return {
+        "valid": True,
+        "api_key_id": api_key.id,
+        "scopes": api_key.scopes,
+        "tier": api_key.tier,
+        "expires_in": expires_in
+    }
+
 # API Usage and Analytics
 @app.get("/usage/stats")
 async def get_usage_stats(
@@ -479,25 +498,16 @@ async def get_api_documentation():
 async def get_rate_limit_status(api_key: APIKey = Depends(verify_api_key)):
     """Get current rate limit status for the authenticated API key"""
     key = f"{api_key.id}_{api_key.rate_limit_period.value}"
-    rate_limit = rate_limits.get(key)
-    
-    if not rate_limit:
-        return {
-            "requests_made": 0,
-            "requests_limit": api_key.rate_limit_requests,
-            "requests_remaining": api_key.rate_limit_requests,
-            "period": api_key.rate_limit_period.value,
-            "window_start": datetime.now().isoformat(),
-            "blocked": False
-        }
+    rule = get_rate_limit_rule(api_key)
+    result = rate_limiter.peek(key, rule)
     
     return {
-        "requests_made": rate_limit.requests_made,
-        "requests_limit": rate_limit.requests_limit,
-        "requests_remaining": max(0, rate_limit.requests_limit - rate_limit.requests_made),
-        "period": rate_limit.period.value,
-        "window_start": rate_limit.window_start.isoformat(),
-        "blocked": rate_limit.blocked
+        "requests_made": rule.limit - result.remaining,
+        "requests_limit": rule.limit,
+        "requests_remaining": result.remaining,
+        "period": api_key.rate_limit_period.value,
+        "window_start": (datetime.now() - timedelta(seconds=rule.window - result.reset_after)).isoformat(),
+        "blocked": result.remaining <= 0
     }
 
 # Developer Dashboard
@@ -19,12 +19,12 @@ import random
 
 # Enhanced import handling with fallback
 try:
-    from shared.database.client import DatabaseClient
+    from shared.database import create_database_client
     from shared.models.base import User
 except ImportError as e:
     logger = logging.getLogger(__name__)
     logger.warning(f"Database import failed: {e}. Running in demo mode.")
-    DatabaseClient = None
+    create_database_client = None
     User = None
 
 # Configure logging
@@ -51,7 +51,7 @@ app.add_middleware(
 
 # Initialize database client with fallback
 try:
-    db = DatabaseClient() if DatabaseClient else None
+    db = create_database_client("overview") if create_database_client else None
 except Exception as e:
     logger.warning(f"Database connection failed: {e}. Running in demo mode.")
     db = None
@@ -27,7 +27,7 @@ class DashboardService:
     """Dashboard service for managing dashboard data and insights"""
     
     def __init__(self):
-        self.service_client = ServiceClient()
+        self.service_client = ServiceClient("overview")  # Shares the process-wide connection pools
         self._cache = {}
         self._cache_ttl = 30  # 30 seconds cache
     
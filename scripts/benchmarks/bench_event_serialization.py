@@ -0,0 +1,87 @@
+"""
+Event Serialization Benchmark
+Events/sec to serialize and deserialize events with the legacy path
+(Event.to_dict + json and json + Event.from_dict) against EventSerializer in
+each available format. Events carry a realistic nested data payload.
+
+Usage: python scripts/benchmarks/bench_event_serialization.py [--events 50000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from shared.events.event_system import CallStartedEvent, Event
+from shared.events.serialization import JSON, MSGPACK, ORJSON, EventSerializer, msgpack, orjson
+
+def make_events(count: int):
+    return [
+        CallStartedEvent(
+            aggregate_id=f"call-{i % 5000}",
+            aggregate_type="Call",
+            event_version=i % 40 + 1,
+            data={
+                "call_id": f"call-{i % 5000}",
+                "agent_id": f"agent-{i % 200}",
+                "from_number": "+15551234567",
+                "to_number": "+15557654321",
+                "direction": "outbound",
+                "campaign": {"id": f"campaign-{i % 50}", "name": "Spring renewals", "tags": ["renewal", "priority"]},
+                "latency_ms": [120, 95, 101, 88],
+            },
+            metadata={"organization_id": f"org-{i % 20}", "correlation_id": f"req-{i}", "publisher": "event_bus"},
+        )
+        for i in range(count)
+    ]
+
+def legacy_dumps(event: Event) -> bytes:
+    return json.dumps(event.to_dict(), default=str).encode()
+
+def legacy_loads(payload: bytes) -> Event:
+    return Event.from_dict(json.loads(payload))
+
+def bench(name: str, dumps, loads, events, baseline=None):
+    started = time.perf_counter()
+    payloads = [dumps(event) for event in events]
+    encode = len(events) / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for payload in payloads:
+        loads(payload)
+    decode = len(events) / (time.perf_counter() - started)
+
+    size = sum(len(payload) for payload in payloads) / len(payloads)
+    speedup = f"  ({encode / baseline[0]:.1f}x / {decode / baseline[1]:.1f}x)" if baseline else ""
+    print(f"{name:<10} {encode:>12,.0f} {decode:>12,.0f} {size:>9.0f} B{speedup}")
+    return encode, decode
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=50_000)
+    args = parser.parse_args()
+
+    events = make_events(args.events)
+
+    # Every format must round-trip the event exactly
+    for fmt in (MSGPACK, ORJSON, JSON):
+        if (fmt == MSGPACK and msgpack is None) or (fmt == ORJSON and orjson is None):
+            continue
+        serializer = EventSerializer(format=fmt)
+        assert serializer.loads(serializer.dumps(events[0])) == events[0], fmt
+
+    print(f"{args.events:,} events\n")
+    print(f"{'format':<10} {'encode/s':>12} {'decode/s':>12} {'avg size':>11}")
+    baseline = bench("legacy", legacy_dumps, legacy_loads, events)
+    for fmt, available in ((MSGPACK, msgpack), (ORJSON, orjson), (JSON, True)):
+        if not available:
+            print(f"{fmt:<10} (not installed)")
+            continue
+        serializer = EventSerializer(format=fmt)
+        bench(fmt, serializer.dumps, serializer.loads, events, baseline)
+
+if __name__ == "__main__":
+    main()
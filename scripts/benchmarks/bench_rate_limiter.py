@@ -0,0 +1,103 @@
+"""
+Rate Limiter Benchmark
+Per-check cost of the shared limiters against the legacy per-client deque limiter,
+with traffic spread over a large number of distinct keys.
+
+Usage: python scripts/benchmarks/bench_rate_limiter.py [--keys 100000] [--checks 500000]
+
+Use a small --keys value (e.g. 100) to see the legacy limiters degrade on hot keys,
+where their per-client history grows to the full limit.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from shared.ratelimit import GCRA, SLIDING_WINDOW, TOKEN_BUCKET, LocalRateLimiter, RateLimitRule
+
+class LegacyDequeLimiter:
+    """The previous shared/middleware limiter: one timestamp deque per client, never evicted"""
+
+    def __init__(self):
+        self.requests = defaultdict(deque)
+
+    def is_allowed(self, client_id: str, max_requests: int, window_seconds: int) -> bool:
+        now = time.time()
+        client_requests = self.requests[client_id]
+        while client_requests and client_requests[0] <= now - window_seconds:
+            client_requests.popleft()
+        if len(client_requests) >= max_requests:
+            return False
+        client_requests.append(now)
+        return True
+
+class LegacyListLimiter:
+    """The previous api-gateway limiter: rebuilds a per-client list of datetimes on every check"""
+
+    def __init__(self):
+        self.requests = defaultdict(list)
+
+    def is_allowed(self, key: str, max_requests: int, window_seconds: int) -> bool:
+        now = datetime.utcnow()
+        window_start = now - timedelta(seconds=window_seconds)
+        self.requests[key] = [req_time for req_time in self.requests[key] if req_time > window_start]
+        if len(self.requests[key]) >= max_requests:
+            return False
+        self.requests[key].append(now)
+        return True
+
+def run(name, make_check, keys, checks):
+    """Time `checks` calls spread over `keys`, then measure retained memory on a fresh limiter"""
+    sequence = [random.choice(keys) for _ in range(checks)]
+
+    check = make_check()
+    started = time.perf_counter()
+    for key in sequence:
+        check(key)
+    elapsed = time.perf_counter() - started
+
+    # Measured separately: tracing every allocation would distort the timings
+    tracemalloc.start()
+    check = make_check()
+    for key in sequence:
+        check(key)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<16} {elapsed / checks * 1e9:>8.0f} ns/check {checks / elapsed:>12,.0f} checks/s {retained / 1e6:>8.1f} MB retained")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--checks", type=int, default=500_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--window", type=int, default=60)
+    args = parser.parse_args()
+
+    random.seed(42)
+    keys = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}:/api/v1/calls" for i in range(args.keys)]
+    rule = RateLimitRule(args.limit, args.window)
+
+    print(f"{args.checks:,} checks over {args.keys:,} distinct keys (limit {args.limit}/{args.window}s)\n")
+
+    for name, legacy_class in (("legacy deque", LegacyDequeLimiter), ("legacy list", LegacyListLimiter)):
+        def legacy(legacy_class=legacy_class):
+            limiter = legacy_class()
+            return lambda key: limiter.is_allowed(key, args.limit, args.window)
+        run(name, legacy, keys, args.checks)
+
+    for algorithm in (TOKEN_BUCKET, GCRA, SLIDING_WINDOW):
+        def shared(algorithm=algorithm):
+            limiter = LocalRateLimiter(algorithm, max_keys=args.keys)
+            return lambda key: limiter.check(key, rule)
+        run(algorithm, shared, keys, args.checks)
+
+if __name__ == "__main__":
+    main()
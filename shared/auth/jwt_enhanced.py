@@ -4,14 +4,17 @@ Comprehensive token validation, refresh, and security features
 """
 
 import jwt
+import asyncio
 import hashlib
+import json
 import secrets
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from fastapi import HTTPException, status, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-import redis
+import redis.asyncio as redis
 import logging
 from .rbac import UserContext, Role, rbac_manager
 
@@ -36,8 +39,112 @@ class TokenPair(BaseModel):
     token_type: str = "bearer"
     expires_in: int
 
+def _now() -> float:
+    # Tokens are stamped with datetime.utcnow().timestamp(); compare on the same clock
+    return datetime.utcnow().timestamp()
+
+def hash_token(token: str) -> str:
+    """Key for a token in the claims cache and the blacklist"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+class VerifiedTokenCache:
+    """LRU of verified token claims keyed by token hash; an entry lapses at its token's exp"""
+    
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, float, TokenData]]" = OrderedDict()  # hash -> (exp, iat, data)
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, token_hash: str, now: float) -> Optional[Tuple[float, TokenData]]:
+        """(iat, claims) of a verified, unexpired token"""
+        entry = self._entries.get(token_hash)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= now:
+            del self._entries[token_hash]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token_hash)
+        self.hits += 1
+        return entry[1], entry[2]
+    
+    def set(self, token_hash: str, exp: float, iat: float, token_data: TokenData):
+        self._entries[token_hash] = (exp, iat, token_data)
+        self._entries.move_to_end(token_hash)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def discard(self, token_hash: str):
+        self._entries.pop(token_hash, None)
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups > 0 else 0
+        }
+
+class RevocationList:
+    """Local replica of the blacklisted tokens and per-user revocation cut-offs.
+    
+    Entries carry their own expiry (the token's exp, or the longest token
+    lifetime for a user cut-off) and are pruned as they lapse, so the replica
+    stays as small as the set of revocations that still matter.
+    """
+    
+    def __init__(self):
+        self.tokens: Dict[str, float] = {}  # token hash -> token exp
+        self.users: Dict[str, Tuple[float, float]] = {}  # user_id -> (cut-off, expiry)
+        self._next_prune = 0.0
+    
+    def revoke_token(self, token_hash: str, exp: float):
+        self.tokens[token_hash] = max(exp, self.tokens.get(token_hash, 0.0))
+    
+    def revoke_user(self, user_id: str, cutoff: float, expires_at: float):
+        current = self.users.get(user_id)
+        if current is None or cutoff > current[0]:
+            self.users[user_id] = (cutoff, expires_at)
+    
+    def is_revoked(self, token_hash: str, user_id: str, issued_at: float) -> bool:
+        """Whether a token is blacklisted or was issued before its user's cut-off"""
+        if token_hash in self.tokens:
+            return True
+        revocation = self.users.get(user_id)
+        return revocation is not None and issued_at <= revocation[0]
+    
+    def prune(self, now: float, interval: float = 60.0):
+        """Drop lapsed entries, at most once per `interval` seconds"""
+        if now < self._next_prune:
+            return
+        self._next_prune = now + interval
+        self.tokens = {token_hash: exp for token_hash, exp in self.tokens.items() if exp > now}
+        self.users = {user_id: entry for user_id, entry in self.users.items() if entry[1] > now}
+    
+    def clear(self):
+        self.tokens.clear()
+        self.users.clear()
+
 class JWTManager:
-    """Enhanced JWT token management with security features"""
+    """Enhanced JWT token management with security features.
+    
+    Verified claims are cached per token until the token expires, and
+    revocations are checked against a local replica, so verifying a token
+    already seen costs a hash and a few dict lookups instead of a signature
+    check and a Redis round trip. With Redis, start() loads the blacklist and
+    user cut-offs and follows the revocations channel, so tokens revoked by
+    any instance are rejected everywhere within the pub/sub delay.
+    """
     
     def __init__(
         self,
@@ -45,7 +152,8 @@ class JWTManager:
         algorithm: str = "HS256",
         access_token_expire_minutes: int = 30,
         refresh_token_expire_days: int = 7,
-        redis_client: Optional[redis.Redis] = None
+        redis_client: Optional[redis.Redis] = None,
+        max_cached_tokens: int = 10000
     ):
         self.secret_key = secret_key
         self.algorithm = algorithm
@@ -57,8 +165,14 @@ class JWTManager:
         self.max_failed_attempts = 5
         self.lockout_duration = timedelta(minutes=15)
         self.token_blacklist_prefix = "blacklist:"
+        self.revoked_user_prefix = "revoked_user:"
         self.failed_attempts_prefix = "failed:"
         self.refresh_token_prefix = "refresh:"
+        self.revocation_channel = "auth:revocations"
+        
+        self.verified_tokens = VerifiedTokenCache(max_cached_tokens)
+        self.revocations = RevocationList()
+        self._sync_task: Optional[asyncio.Task] = None
     
     def create_access_token(
         self,
@@ -93,7 +207,7 @@ class JWTManager:
         
         return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
     
-    def create_refresh_token(self, user_id: str) -> str:
+    async def create_refresh_token(self, user_id: str) -> str:
         """Create refresh token"""
         expire = datetime.utcnow() + timedelta(days=self.refresh_token_expire_days)
         issued_at = datetime.utcnow()
@@ -110,7 +224,7 @@ class JWTManager:
         
         # Store refresh token in Redis if available
         if self.redis_client:
-            self.redis_client.setex(
+            await self.redis_client.setex(
                 f"{self.refresh_token_prefix}{user_id}",
                 timedelta(days=self.refresh_token_expire_days),
                 token
@@ -118,7 +232,7 @@ class JWTManager:
         
         return token
     
-    def create_token_pair(
+    async def create_token_pair(
         self,
         user_id: str,
         organization_id: str,
@@ -131,7 +245,7 @@ class JWTManager:
         access_token = self.create_access_token(
             user_id, organization_id, roles, email, is_verified, is_active
         )
-        refresh_token = self.create_refresh_token(user_id)
+        refresh_token = await self.create_refresh_token(user_id)
         
         return TokenPair(
             access_token=access_token,
@@ -139,33 +253,45 @@ class JWTManager:
             expires_in=self.access_token_expire_minutes * 60
         )
     
-    def verify_token(self, token: str, token_type: str = "access") -> TokenData:
+    async def verify_token(self, token: str, token_type: str = "access") -> TokenData:
         """Verify and decode JWT token"""
+        token_hash = hash_token(token)
+        now = _now()
+        self.revocations.prune(now)
+        
+        cached = self.verified_tokens.get(token_hash, now)
+        if cached is None:
+            expires_at, issued_at, token_data = self._decode(token)
+            self.verified_tokens.set(token_hash, expires_at, issued_at, token_data)
+        else:
+            issued_at, token_data = cached
+        
+        if self.revocations.is_revoked(token_hash, token_data.user_id, issued_at):
+            self.verified_tokens.discard(token_hash)
+            raise _unauthorized("Token has been revoked")
+        
+        # Validate token type
+        if token_data.token_type != token_type:
+            raise _unauthorized(f"Invalid token type. Expected: {token_type}")
+        
+        return token_data
+    
+    def _decode(self, token: str) -> Tuple[float, float, TokenData]:
+        """Check the signature and expiry; returns (exp, iat, claims)"""
         try:
-            # Check if token is blacklisted
-            if self.is_token_blacklisted(token):
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Token has been revoked"
-                )
-            
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            
-            # Validate token type
-            if payload.get("token_type") != token_type:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail=f"Invalid token type. Expected: {token_type}"
-                )
-            
-            # Check expiration
-            if datetime.utcnow().timestamp() > payload.get("exp", 0):
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Token has expired"
-                )
-            
-            return TokenData(
+        except jwt.ExpiredSignatureError:
+            raise _unauthorized("Token has expired")
+        except jwt.PyJWTError as e:
+            logger.warning(f"JWT validation error: {str(e)}")
+            raise _unauthorized("Could not validate credentials")
+        
+        # Check expiration
+        if _now() > payload.get("exp", 0):
+            raise _unauthorized("Token has expired")
+        
+        try:
+            token_data = TokenData(
                 user_id=payload["user_id"],
                 organization_id=payload.get("organization_id", ""),
                 roles=payload.get("roles", []),
@@ -176,28 +302,22 @@ class JWTManager:
                 issued_at=datetime.fromtimestamp(payload["iat"]),
                 expires_at=datetime.fromtimestamp(payload["exp"])
             )
-            
-        except jwt.ExpiredSignatureError:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token has expired"
-            )
-        except jwt.JWTError as e:
+        except (KeyError, ValueError, TypeError) as e:
             logger.warning(f"JWT validation error: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials"
-            )
+            raise _unauthorized("Could not validate credentials")
+        return payload["exp"], payload["iat"], token_data
     
-    def refresh_access_token(self, refresh_token: str) -> TokenPair:
+    async def refresh_access_token(self, refresh_token: str) -> TokenPair:
         """Refresh access token using refresh token"""
         # Verify refresh token
-        token_data = self.verify_token(refresh_token, "refresh")
+        token_data = await self.verify_token(refresh_token, "refresh")
         
         # Check if refresh token is still valid in Redis
         if self.redis_client:
-            stored_token = self.redis_client.get(f"{self.refresh_token_prefix}{token_data.user_id}")
-            if not stored_token or stored_token.decode() != refresh_token:
+            stored_token = await self.redis_client.get(f"{self.refresh_token_prefix}{token_data.user_id}")
+            if isinstance(stored_token, bytes):
+                stored_token = stored_token.decode()
+            if stored_token != refresh_token:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Invalid refresh token"
@@ -205,7 +325,7 @@ class JWTManager:
         
         # Here you would typically fetch user data from database
         # For now, we'll use the token data
-        return self.create_token_pair(
+        return await self.create_token_pair(
             user_id=token_data.user_id,
             organization_id=token_data.organization_id,
             roles=token_data.roles,
@@ -214,81 +334,174 @@ class JWTManager:
             is_active=token_data.is_active
         )
     
-    def blacklist_token(self, token: str) -> None:
+    async def blacklist_token(self, token: str) -> None:
         """Add token to blacklist"""
-        if not self.redis_client:
-            logger.warning("Redis not available for token blacklisting")
-            return
-        
         try:
             # Decode token to get expiration
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            exp = payload.get("exp", 0)
-            
-            # Calculate TTL (time until token expires)
-            ttl = max(0, int(exp - datetime.utcnow().timestamp()))
-            
-            # Add to blacklist with TTL
-            token_hash = hashlib.sha256(token.encode()).hexdigest()
-            self.redis_client.setex(f"{self.blacklist_prefix}{token_hash}", ttl, "1")
-            
-        except jwt.JWTError:
+        except jwt.PyJWTError:
             # If token is invalid, no need to blacklist
-            pass
-    
-    def is_token_blacklisted(self, token: str) -> bool:
-        """Check if token is blacklisted"""
+            return
+        
+        exp = payload.get("exp", 0)
+        token_hash = hash_token(token)
+        self.revocations.revoke_token(token_hash, exp)
+        self.verified_tokens.discard(token_hash)
+        
         if not self.redis_client:
-            return False
+            logger.warning("Redis not available; token blacklisted on this instance only")
+            return
+        
+        # Calculate TTL (time until token expires)
+        ttl = max(1, int(exp - _now()))
         
-        token_hash = hashlib.sha256(token.encode()).hexdigest()
-        return bool(self.redis_client.get(f"{self.blacklist_prefix}{token_hash}"))
+        # Stored for instances that start later, published for those running now
+        await self.redis_client.setex(f"{self.token_blacklist_prefix}{token_hash}", ttl, str(exp))
+        await self.redis_client.publish(
+            self.revocation_channel, json.dumps({"token": token_hash, "exp": exp})
+        )
+    
+    def is_token_blacklisted(self, token: str) -> bool:
+        """Check if token is blacklisted (in the local replica)"""
+        return hash_token(token) in self.revocations.tokens
     
-    def revoke_all_user_tokens(self, user_id: str) -> None:
+    async def revoke_all_user_tokens(self, user_id: str) -> None:
         """Revoke all tokens for a user"""
+        # All tokens issued up to now are invalid; later ones (a new login) are not
+        cutoff = _now()
+        ttl = timedelta(days=self.refresh_token_expire_days)
+        self.revocations.revoke_user(user_id, cutoff, cutoff + ttl.total_seconds())
+        
         if not self.redis_client:
-            logger.warning("Redis not available for token revocation")
+            logger.warning("Redis not available; tokens revoked on this instance only")
             return
         
         # Remove refresh token
-        self.redis_client.delete(f"{self.refresh_token_prefix}{user_id}")
+        await self.redis_client.delete(f"{self.refresh_token_prefix}{user_id}")
         
         # Add user to global revocation list (all tokens issued before this time are invalid)
-        self.redis_client.setex(
-            f"revoked_user:{user_id}",
-            timedelta(days=self.refresh_token_expire_days),
-            datetime.utcnow().timestamp()
+        await self.redis_client.setex(f"{self.revoked_user_prefix}{user_id}", ttl, cutoff)
+        await self.redis_client.publish(
+            self.revocation_channel, json.dumps({"user_id": user_id, "cutoff": cutoff})
         )
     
-    def track_failed_login(self, identifier: str) -> None:
+    # Revocation replication
+    async def start(self):
+        """Load the revocation state from Redis and follow its updates"""
+        if self.redis_client is None or (self._sync_task and not self._sync_task.done()):
+            return
+        pubsub = self.redis_client.pubsub()
+        await pubsub.subscribe(self.revocation_channel)
+        await self.load_revocations()
+        self._sync_task = asyncio.create_task(self._follow_revocations(pubsub), name="jwt_revocation_sync")
+    
+    async def stop(self):
+        if self._sync_task and not self._sync_task.done():
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+    
+    async def load_revocations(self):
+        """Replace the local replica with the blacklist and cut-offs stored in Redis"""
+        revocations = RevocationList()
+        now = _now()
+        user_ttl = timedelta(days=self.refresh_token_expire_days).total_seconds()
+        
+        for prefix in (self.token_blacklist_prefix, self.revoked_user_prefix):
+            keys = [key async for key in self.redis_client.scan_iter(match=f"{prefix}*", count=1000)]
+            for start in range(0, len(keys), 1000):
+                batch = keys[start:start + 1000]
+                for key, value in zip(batch, await self.redis_client.mget(batch)):
+                    if value is None:
+                        continue
+                    key = key.decode() if isinstance(key, bytes) else key
+                    value = float(value)
+                    if prefix == self.token_blacklist_prefix:
+                        # Entries written before expiries were stored hold "1"
+                        exp = value if value > 1 else now + user_ttl
+                        revocations.revoke_token(key[len(prefix):], exp)
+                    else:
+                        revocations.revoke_user(key[len(prefix):], value, value + user_ttl)
+        
+        self.revocations = revocations
+        self.verified_tokens.clear()
+        logger.info(
+            f"Loaded {len(revocations.tokens)} blacklisted tokens and {len(revocations.users)} revoked users"
+        )
+    
+    def _apply_revocation(self, message: Dict[str, Any]):
+        if "token" in message:
+            self.revocations.revoke_token(message["token"], float(message["exp"]))
+            self.verified_tokens.discard(message["token"])
+        elif "user_id" in message:
+            cutoff = float(message["cutoff"])
+            ttl = timedelta(days=self.refresh_token_expire_days).total_seconds()
+            self.revocations.revoke_user(message["user_id"], cutoff, cutoff + ttl)
+    
+    async def _follow_revocations(self, pubsub):
+        while True:
+            try:
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        try:
+                            self._apply_revocation(json.loads(message["data"]))
+                        except (ValueError, KeyError, TypeError) as e:
+                            logger.warning(f"Ignoring malformed revocation message: {e}")
+                raise ConnectionError("Revocation subscription ended")
+            except asyncio.CancelledError:
+                await pubsub.aclose()
+                raise
+            except Exception as e:
+                # Messages may have been missed while disconnected; resubscribe, then reload
+                logger.error(f"Revocation sync interrupted: {e}")
+                await asyncio.sleep(5)
+                try:
+                    await pubsub.aclose()
+                    pubsub = self.redis_client.pubsub()
+                    await pubsub.subscribe(self.revocation_channel)
+                    await self.load_revocations()
+                except Exception as e:
+                    logger.error(f"Revocation sync reconnect failed: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "verified_tokens": self.verified_tokens.get_stats(),
+            "blacklisted_tokens": len(self.revocations.tokens),
+            "revoked_users": len(self.revocations.users),
+            "revocation_sync": self._sync_task is not None and not self._sync_task.done()
+        }
+    
+    async def track_failed_login(self, identifier: str) -> None:
         """Track failed login attempt"""
         if not self.redis_client:
             return
         
         key = f"{self.failed_attempts_prefix}{identifier}"
-        current_attempts = self.redis_client.get(key)
+        current_attempts = await self.redis_client.get(key)
         
         if current_attempts:
             attempts = int(current_attempts) + 1
         else:
             attempts = 1
         
-        self.redis_client.setex(key, self.lockout_duration, attempts)
+        await self.redis_client.setex(key, self.lockout_duration, attempts)
     
-    def is_account_locked(self, identifier: str) -> bool:
+    async def is_account_locked(self, identifier: str) -> bool:
         """Check if account is locked due to failed attempts"""
         if not self.redis_client:
             return False
         
         key = f"{self.failed_attempts_prefix}{identifier}"
-        attempts = self.redis_client.get(key)
+        attempts = await self.redis_client.get(key)
         
-        return attempts and int(attempts) >= self.max_failed_attempts
+        return bool(attempts) and int(attempts) >= self.max_failed_attempts
     
-    def clear_failed_attempts(self, identifier: str) -> None:
+    async def clear_failed_attempts(self, identifier: str) -> None:
         """Clear failed login attempts"""
         if self.redis_client:
-            self.redis_client.delete(f"{self.failed_attempts_prefix}{identifier}")
+            await self.redis_client.delete(f"{self.failed_attempts_prefix}{identifier}")
 
 # Security bearer for FastAPI
 security = HTTPBearer()
@@ -305,7 +518,7 @@ async def get_current_user(
 ) -> UserContext:
     """Dependency to get current authenticated user"""
     try:
-        token_data = jwt_manager.verify_token(credentials.credentials)
+        token_data = await jwt_manager.verify_token(credentials.credentials)
         
         # Convert to UserContext
         roles = [Role(role) for role in token_data.roles if role in Role.__members__.values()]
@@ -3,10 +3,10 @@ Role-Based Access Control (RBAC) Manager
 Comprehensive permission and role management system
 """
 
-from typing import Dict, List, Set, Optional, Any
+from typing import Dict, FrozenSet, Iterable, List, Set, Optional, Any, Tuple
 from enum import Enum
 from dataclasses import dataclass
-from functools import wraps
+from functools import lru_cache, wraps
 from fastapi import HTTPException, status, Depends
 import logging
 
@@ -89,6 +89,31 @@ class Permission(str, Enum):
     INTEGRATION_UPDATE = "integration:update"
     INTEGRATION_DELETE = "integration:delete"
 
+# Each permission is one bit; a set of permissions is the OR of its bits
+PERMISSION_BITS: Dict[Permission, int] = {permission: 1 << index for index, permission in enumerate(Permission)}
+ALL_PERMISSIONS_MASK = (1 << len(PERMISSION_BITS)) - 1
+
+# Operations granted by READ_ALL and WRITE_ALL
+WRITE_OPERATIONS = ("create", "update", "delete", "start", "stop", "train", "assign")
+READ_MASK = sum(bit for permission, bit in PERMISSION_BITS.items() if permission.value.endswith(":read"))
+WRITE_MASK = sum(
+    bit for permission, bit in PERMISSION_BITS.items()
+    if permission.value.partition(":")[2] in WRITE_OPERATIONS
+)
+
+def permissions_mask(permissions: Iterable[Permission]) -> int:
+    """Bitmask of a set of permissions, with ALL, READ_ALL and WRITE_ALL expanded"""
+    mask = 0
+    for permission in permissions:
+        mask |= PERMISSION_BITS[permission]
+    if mask & PERMISSION_BITS[Permission.ALL]:
+        return ALL_PERMISSIONS_MASK
+    if mask & PERMISSION_BITS[Permission.READ_ALL]:
+        mask |= READ_MASK
+    if mask & PERMISSION_BITS[Permission.WRITE_ALL]:
+        mask |= WRITE_MASK
+    return mask
+
 @dataclass
 class UserContext:
     """User context with roles and permissions"""
@@ -100,11 +125,20 @@ class UserContext:
     is_verified: bool = True
 
 class RBACManager:
-    """Role-Based Access Control Manager"""
+    """Role-Based Access Control Manager.
+    
+    Role permissions are compiled to integer bitmasks (see PERMISSION_BITS),
+    so a check is one AND against the mask of the user's roles. Masks of role
+    combinations are cached in a small LRU; there are only as many entries as
+    distinct combinations in use, however many users share them.
+    """
     
-    def __init__(self):
+    def __init__(self, combination_cache_size: int = 256):
         self._role_permissions = self._initialize_role_permissions()
-        self._cached_permissions: Dict[str, Set[Permission]] = {}
+        self._role_masks: Dict[Role, int] = {}
+        self._compile()
+        self._combination_mask = lru_cache(maxsize=combination_cache_size)(self._compile_combination)
+        self._combination_permissions = lru_cache(maxsize=combination_cache_size)(self._decode_combination)
     
     def _initialize_role_permissions(self) -> Dict[Role, Set[Permission]]:
         """Initialize role-permission mappings"""
@@ -161,59 +195,51 @@ class RBACManager:
             Role.GUEST: set()
         }
     
+    def _compile(self):
+        """Compile every role's permissions into its bitmask"""
+        self._role_masks = {role: permissions_mask(perms) for role, perms in self._role_permissions.items()}
+    
+    def _compile_combination(self, roles: Tuple[Role, ...]) -> int:
+        mask = 0
+        for role in roles:
+            mask |= self._role_masks.get(role, 0)
+        return mask
+    
+    def _decode_combination(self, roles: Tuple[Role, ...]) -> FrozenSet[Permission]:
+        mask = self._combination_mask(roles)
+        return frozenset(permission for permission, bit in PERMISSION_BITS.items() if mask & bit)
+    
+    def get_permission_mask(self, user_context: UserContext) -> int:
+        """Bitmask of everything the user's roles grant"""
+        return self._combination_mask(tuple(user_context.roles))
+    
     def get_user_permissions(self, user_context: UserContext) -> Set[Permission]:
         """Get all permissions for a user based on their roles"""
-        cache_key = f"{user_context.user_id}:{','.join(user_context.roles)}"
-        
-        if cache_key in self._cached_permissions:
-            return self._cached_permissions[cache_key]
-        
-        permissions = set()
-        for role in user_context.roles:
-            role_perms = self._role_permissions.get(role, set())
-            permissions.update(role_perms)
-        
-        # Handle wildcard permissions
-        if Permission.ALL in permissions:
-            permissions = set(Permission)
-        
-        self._cached_permissions[cache_key] = permissions
-        return permissions
+        return set(self._combination_permissions(tuple(user_context.roles)))
     
     def has_permission(self, user_context: UserContext, required_permission: Permission) -> bool:
         """Check if user has specific permission"""
         if not user_context.is_active or not user_context.is_verified:
             return False
-        
-        user_permissions = self.get_user_permissions(user_context)
-        
-        # Check for exact permission
-        if required_permission in user_permissions:
-            return True
-        
-        # Check for wildcard permissions
-        if Permission.ALL in user_permissions:
-            return True
-        
-        # Check for read-all permission on read operations
-        if required_permission.value.endswith(":read") and Permission.READ_ALL in user_permissions:
-            return True
-        
-        # Check for write-all permission on write operations
-        write_ops = [":create", ":update", ":delete", ":start", ":stop", ":train", ":assign"]
-        if any(required_permission.value.endswith(op) for op in write_ops):
-            if Permission.WRITE_ALL in user_permissions:
-                return True
-        
-        return False
+        return self._combination_mask(tuple(user_context.roles)) & PERMISSION_BITS[required_permission] != 0
     
     def has_any_permission(self, user_context: UserContext, permissions: List[Permission]) -> bool:
         """Check if user has any of the specified permissions"""
-        return any(self.has_permission(user_context, perm) for perm in permissions)
+        if not user_context.is_active or not user_context.is_verified:
+            return False
+        required = 0
+        for permission in permissions:
+            required |= PERMISSION_BITS[permission]
+        return self._combination_mask(tuple(user_context.roles)) & required != 0
     
     def has_all_permissions(self, user_context: UserContext, permissions: List[Permission]) -> bool:
         """Check if user has all specified permissions"""
-        return all(self.has_permission(user_context, perm) for perm in permissions)
+        if not user_context.is_active or not user_context.is_verified:
+            return False
+        required = 0
+        for permission in permissions:
+            required |= PERMISSION_BITS[permission]
+        return self._combination_mask(tuple(user_context.roles)) & required == required
     
     def add_role_permission(self, role: Role, permission: Permission):
         """Add permission to role"""
@@ -229,8 +255,16 @@ class RBACManager:
         self._clear_cache()
     
     def _clear_cache(self):
-        """Clear permission cache"""
-        self._cached_permissions.clear()
+        """Recompile role masks and clear the combination caches"""
+        self._compile()
+        self._combination_mask.cache_clear()
+        self._combination_permissions.cache_clear()
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        return {
+            "masks": self._combination_mask.cache_info()._asdict(),
+            "permission_sets": self._combination_permissions.cache_info()._asdict()
+        }
 
 # Global RBAC manager instance
 rbac_manager = RBACManager()
@@ -1,4 +1,5 @@
 # Database module for Vocelio AI Call Center
 from .client import DatabaseClient
+from .async_client import AsyncDatabaseClient, create_database_client
 
-__all__ = ["DatabaseClient"]
+__all__ = ["AsyncDatabaseClient", "DatabaseClient", "create_database_client"]
@@ -0,0 +1,319 @@
+"""
+Async Database Client
+Pooled, non-blocking replacement for the supabase-backed DatabaseClient with
+the same method surface, running on any DatabaseBackend (asyncpg in
+production, the SQLite stand-in in tests).
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from .pool import AsyncpgBackend, DatabaseBackend, asyncpg, pool_config_for
+
+logger = logging.getLogger(__name__)
+
+# Columns whose ISO-8601 string values (as the supabase client accepted) are sent as datetimes
+TIMESTAMP_COLUMNS = frozenset({"timestamp", "last_login", "start_time", "end_time"})
+
+def _coerce(column: str, value: Any) -> Any:
+    if isinstance(value, str) and (column in TIMESTAMP_COLUMNS or column.endswith("_at")):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    return value
+
+Condition = Tuple[str, str, Any]  # (column, operator, value)
+
+class AsyncDatabaseClient:
+    """Database client for Vocelio microservices backed by an async connection pool"""
+
+    def __init__(self, backend: DatabaseBackend, service_name: str = "unknown_service"):
+        self.backend = backend
+        self.service_name = service_name
+
+    async def connect(self):
+        await self.backend.connect()
+
+    async def disconnect(self):
+        await self.backend.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"service_name": self.service_name, **self.backend.get_stats()}
+
+    # Query helpers
+    async def _select(
+        self,
+        table: str,
+        conditions: List[Condition] = (),
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        sql = self.backend.queries.select(
+            table, tuple((column, op) for column, op, _ in conditions), order_by, descending, limit is not None
+        )
+        args = [_coerce(column, value) for column, _, value in conditions]
+        if limit is not None:
+            args.append(limit)
+        return await self.backend.fetch(sql, *args)
+
+    async def _insert(self, table: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        columns = tuple(data)
+        sql = self.backend.queries.insert(table, columns)
+        return await self.backend.fetchrow(sql, *(_coerce(column, data[column]) for column in columns))
+
+    async def _update(self, table: str, record_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        columns = tuple(updates)
+        sql = self.backend.queries.update(table, columns, (("id", "eq"),))
+        args = [_coerce(column, updates[column]) for column in columns]
+        return await self.backend.fetchrow(sql, *args, record_id)
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc)
+
+    async def health_check(self) -> bool:
+        """Check database connectivity"""
+        try:
+            await self._select("users", limit=1)
+            return True
+        except Exception as e:
+            logger.error(f"Database health check failed: {e}")
+            return False
+
+    # User Management
+    async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get user by ID"""
+        try:
+            rows = await self._select("users", [("id", "eq", user_id)], limit=2)
+            return rows[0] if len(rows) == 1 else None
+        except Exception as e:
+            logger.error(f"Error getting user {user_id}: {e}")
+            return None
+
+    async def create_user(self, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Create new user"""
+        try:
+            now = self._now()
+            return await self._insert("users", {**user_data, "created_at": now, "updated_at": now})
+        except Exception as e:
+            logger.error(f"Error creating user: {e}")
+            return None
+
+    async def update_user(self, user_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update user"""
+        try:
+            return await self._update("users", user_id, {**updates, "updated_at": self._now()})
+        except Exception as e:
+            logger.error(f"Error updating user {user_id}: {e}")
+            return None
+
+    # Organization Management
+    async def get_organization(self, org_id: str) -> Optional[Dict[str, Any]]:
+        """Get organization by ID"""
+        try:
+            rows = await self._select("organizations", [("id", "eq", org_id)], limit=2)
+            return rows[0] if len(rows) == 1 else None
+        except Exception as e:
+            logger.error(f"Error getting organization {org_id}: {e}")
+            return None
+
+    async def create_organization(self, org_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Create new organization"""
+        try:
+            now = self._now()
+            return await self._insert("organizations", {**org_data, "created_at": now, "updated_at": now})
+        except Exception as e:
+            logger.error(f"Error creating organization: {e}")
+            return None
+
+    # Agent Management
+    async def get_agents(self, user_id: str, org_id: str) -> List[Dict[str, Any]]:
+        """Get all agents for a user/organization"""
+        try:
+            return await self._select("agents", [("user_id", "eq", user_id), ("organization_id", "eq", org_id)])
+        except Exception as e:
+            logger.error(f"Error getting agents: {e}")
+            return []
+
+    async def create_agent(self, agent_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Create new AI agent"""
+        try:
+            now = self._now()
+            return await self._insert("agents", {**agent_data, "created_at": now, "updated_at": now})
+        except Exception as e:
+            logger.error(f"Error creating agent: {e}")
+            return None
+
+    async def update_agent(self, agent_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update agent"""
+        try:
+            return await self._update("agents", agent_id, {**updates, "updated_at": self._now()})
+        except Exception as e:
+            logger.error(f"Error updating agent {agent_id}: {e}")
+            return None
+
+    # Campaign Management
+    async def get_campaigns(self, user_id: str, org_id: str) -> List[Dict[str, Any]]:
+        """Get all campaigns for a user/organization"""
+        try:
+            return await self._select("campaigns", [("user_id", "eq", user_id), ("organization_id", "eq", org_id)])
+        except Exception as e:
+            logger.error(f"Error getting campaigns: {e}")
+            return []
+
+    async def create_campaign(self, campaign_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Create new campaign"""
+        try:
+            now = self._now()
+            return await self._insert("campaigns", {**campaign_data, "created_at": now, "updated_at": now})
+        except Exception as e:
+            logger.error(f"Error creating campaign: {e}")
+            return None
+
+    # Call Management
+    async def create_call_record(self, call_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Create call record"""
+        try:
+            return await self._insert("calls", {**call_data, "created_at": self._now()})
+        except Exception as e:
+            logger.error(f"Error creating call record: {e}")
+            return None
+
+    async def update_call_record(self, call_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update call record"""
+        try:
+            return await self._update("calls", call_id, {**updates, "updated_at": self._now()})
+        except Exception as e:
+            logger.error(f"Error updating call {call_id}: {e}")
+            return None
+
+    # Voice Management
+    async def get_voices(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Get available voices with optional filters"""
+        try:
+            conditions = [
+                (key, "eq", value) for key, value in (filters or {}).items()
+                if value and value != "all"
+            ]
+            return await self._select("voices", conditions)
+        except Exception as e:
+            logger.error(f"Error getting voices: {e}")
+            return []
+
+    # Analytics and Metrics
+    async def log_metric(self, metric_data: Dict[str, Any]) -> bool:
+        """Log analytics metric"""
+        try:
+            await self._insert("analytics_metrics", {**metric_data, "timestamp": self._now()})
+            return True
+        except Exception as e:
+            logger.error(f"Error logging metric: {e}")
+            return False
+
+    async def get_metrics(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Get analytics metrics with filters"""
+        try:
+            conditions = []
+            if filters.get("user_id"):
+                conditions.append(("user_id", "eq", filters["user_id"]))
+            if filters.get("metric_type"):
+                conditions.append(("metric_type", "eq", filters["metric_type"]))
+            if filters.get("start_date"):
+                conditions.append(("timestamp", "gte", filters["start_date"]))
+            if filters.get("end_date"):
+                conditions.append(("timestamp", "lte", filters["end_date"]))
+
+            return await self._select("analytics_metrics", conditions, order_by="timestamp", descending=True, limit=1000)
+        except Exception as e:
+            logger.error(f"Error getting metrics: {e}")
+            return []
+
+    # Billing and Usage
+    async def log_usage(self, usage_data: Dict[str, Any]) -> bool:
+        """Log usage for billing"""
+        try:
+            await self._insert("usage_logs", {**usage_data, "timestamp": self._now()})
+            return True
+        except Exception as e:
+            logger.error(f"Error logging usage: {e}")
+            return False
+
+    async def get_usage_summary(self, user_id: str, start_date: str, end_date: str) -> Dict[str, Any]:
+        """Get usage summary for billing"""
+        try:
+            usage_data = await self._select("usage_logs", [
+                ("user_id", "eq", user_id),
+                ("timestamp", "gte", start_date),
+                ("timestamp", "lte", end_date)
+            ])
+
+            # Calculate totals
+            calls = [u for u in usage_data if u.get("usage_type") == "call"]
+            return {
+                "total_calls": len(calls),
+                "total_minutes": sum(u.get("duration") or 0 for u in calls),
+                "total_cost": sum(u.get("cost") or 0 for u in usage_data),
+                "usage_details": usage_data
+            }
+        except Exception as e:
+            logger.error(f"Error getting usage summary: {e}")
+            return {}
+
+    # Generic table operations
+    async def get_records(self, table: str, filters: Optional[Dict[str, Any]] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Generic method to get records from any table"""
+        try:
+            conditions = [(key, "eq", value) for key, value in (filters or {}).items()]
+            return await self._select(table, conditions, limit=limit)
+        except Exception as e:
+            logger.error(f"Error getting records from {table}: {e}")
+            return []
+
+    async def create_record(self, table: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Generic method to create record in any table"""
+        try:
+            now = self._now()
+            return await self._insert(table, {"created_at": now, "updated_at": now, **data})
+        except Exception as e:
+            logger.error(f"Error creating record in {table}: {e}")
+            return None
+
+    async def update_record(self, table: str, record_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Generic method to update record in any table"""
+        try:
+            return await self._update(table, record_id, {**updates, "updated_at": self._now()})
+        except Exception as e:
+            logger.error(f"Error updating record in {table}: {e}")
+            return None
+
+# One pooled client per service per process
+_clients: Dict[str, AsyncDatabaseClient] = {}
+
+def create_database_client(service_name: str, dsn: Optional[str] = None):
+    """Database client for a service.
+
+    With DATABASE_URL (a direct Postgres DSN) set and asyncpg installed, this is
+    the service's shared AsyncDatabaseClient; otherwise the legacy supabase
+    DatabaseClient, whose calls run in a thread pool. Raises ValueError when
+    neither is configured, like DatabaseClient().
+    """
+    dsn = dsn or os.getenv("DATABASE_URL")
+    if dsn and asyncpg is not None:
+        client = _clients.get(service_name)
+        if client is None:
+            backend = AsyncpgBackend(dsn, pool_config_for(service_name))
+            client = _clients[service_name] = AsyncDatabaseClient(backend, service_name)
+        return client
+
+    from .client import DatabaseClient
+    return DatabaseClient()
+
+__all__ = [
+    "AsyncDatabaseClient",
+    "create_database_client",
+]
@@ -4,8 +4,12 @@ Centralized database connection and utilities for all microservices
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any, List
-from supabase import create_client, Client
+try:
+    from supabase import create_client, Client
+except ImportError:
+    create_client = Client = None
 import asyncio
 import logging
 from datetime import datetime, timezone
@@ -14,7 +18,12 @@ import json
 logger = logging.getLogger(__name__)
 
 class DatabaseClient:
-    """Centralized database client for all Vocelio microservices"""
+    """Centralized database client for all Vocelio microservices.
+    
+    supabase-py is synchronous, so every `.execute()` runs on a bounded thread
+    pool instead of blocking the event loop. Services with a direct Postgres
+    DSN should use AsyncDatabaseClient (see create_database_client) instead.
+    """
     
     def __init__(self):
         self.supabase_url = os.getenv("SUPABASE_URL")
@@ -23,6 +32,8 @@ class DatabaseClient:
         
         if not all([self.supabase_url, self.supabase_key]):
             raise ValueError("Missing required Supabase environment variables")
+        if create_client is None:
+            raise ValueError("supabase is not installed")
             
         # Client for regular operations
         self.client: Client = create_client(self.supabase_url, self.supabase_key)
@@ -32,11 +43,28 @@ class DatabaseClient:
             self.admin_client: Client = create_client(self.supabase_url, self.service_role_key)
         else:
             self.admin_client = self.client
+        
+        # Offload executor for the blocking supabase calls
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("SUPABASE_OFFLOAD_THREADS", "8")),
+            thread_name_prefix="supabase"
+        )
+    
+    async def _execute(self, query):
+        """Run a supabase query builder's blocking execute() off the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, query.execute)
+    
+    async def connect(self):
+        """No-op; the supabase client connects per request"""
+    
+    async def disconnect(self):
+        """Release the offload threads once in-flight queries finish"""
+        self._executor.shutdown(wait=False)
             
     async def health_check(self) -> bool:
         """Check database connectivity"""
         try:
-            result = self.client.table("users").select("id").limit(1).execute()
+            result = await self._execute(self.client.table("users").select("id").limit(1))
             return True
         except Exception as e:
             logger.error(f"Database health check failed: {e}")
@@ -46,7 +74,7 @@ class DatabaseClient:
     async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user by ID"""
         try:
-            result = self.client.table("users").select("*").eq("id", user_id).single().execute()
+            result = await self._execute(self.client.table("users").select("*").eq("id", user_id).single())
             return result.data
         except Exception as e:
             logger.error(f"Error getting user {user_id}: {e}")
@@ -58,7 +86,7 @@ class DatabaseClient:
             user_data["created_at"] = datetime.now(timezone.utc).isoformat()
             user_data["updated_at"] = datetime.now(timezone.utc).isoformat()
             
-            result = self.client.table("users").insert(user_data).execute()
+            result = await self._execute(self.client.table("users").insert(user_data))
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error creating user: {e}")
@@ -69,7 +97,7 @@ class DatabaseClient:
         try:
             updates["updated_at"] = datetime.now(timezone.utc).isoformat()
             
-            result = self.client.table("users").update(updates).eq("id", user_id).execute()
+            result = await self._execute(self.client.table("users").update(updates).eq("id", user_id))
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error updating user {user_id}: {e}")
@@ -79,7 +107,7 @@ class DatabaseClient:
     async def get_organization(self, org_id: str) -> Optional[Dict[str, Any]]:
         """Get organization by ID"""
         try:
-            result = self.client.table("organizations").select("*").eq("id", org_id).single().execute()
+            result = await self._execute(self.client.table("organizations").select("*").eq("id", org_id).single())
             return result.data
         except Exception as e:
             logger.error(f"Error getting organization {org_id}: {e}")
@@ -91,7 +119,7 @@ class DatabaseClient:
             org_data["created_at"] = datetime.now(timezone.utc).isoformat()
             org_data["updated_at"] = datetime.now(timezone.utc).isoformat()
             
-            result = self.client.table("organizations").insert(org_data).execute()
+            result = await self._execute(self.client.table("organizations").insert(org_data))
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error creating organization: {e}")
@@ -101,7 +129,7 @@ class DatabaseClient:
     async def get_agents(self, user_id: str, org_id: str) -> List[Dict[str, Any]]:
         """Get all agents for a user/organization"""
         try:
-            result = self.client.table("agents").select("*").eq("user_id", user_id).eq("organization_id", org_id).execute()
+            result = await self._execute(self.client.table("agents").select("*").eq("user_id", user_id).eq("organization_id", org_id))
             return result.data or []
         except Exception as e:
             logger.error(f"Error getting agents: {e}")
@@ -113,7 +141,7 @@ class DatabaseClient:
             agent_data["created_at"] = datetime.now(timezone.utc).isoformat()
             agent_data["updated_at"] = datetime.now(timezone.utc).isoformat()
             
-            result = self.client.table("agents").insert(agent_data).execute()
+            result = await self._execute(self.client.table("agents").insert(agent_data))
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error creating agent: {e}")
@@ -124,7 +152,7 @@ class DatabaseClient:
         try:
             updates["updated_at"] = datetime.now(timezone.utc).isoformat()
             
-            result = self.client.table("agents").update(updates).eq("id", agent_id).execute()
+            result = await self._execute(self.client.table("agents").update(updates).eq("id", agent_id))
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error updating agent {agent_id}: {e}")
@@ -134,7 +162,7 @@ class DatabaseClient:
     async def get_campaigns(self, user_id: str, org_id: str) -> List[Dict[str, Any]]:
         """Get all campaigns for a user/organization"""
         try:
-            result = self.client.table("campaigns").select("*").eq("user_id", user_id).eq("organization_id", org_id).execute()
+            result = await self._execute(self.client.table("campaigns").select("*").eq("user_id", user_id).eq("organization_id", org_id))
             return result.data or []
         except Exception as e:
             logger.error(f"Error getting campaigns: {e}")
@@ -146,7 +174,7 @@ class DatabaseClient:
             campaign_data["created_at"] = datetime.now(timezone.utc).isoformat()
             campaign_data["updated_at"] = datetime.now(timezone.utc).isoformat()
             
-            result = self.client.table("campaigns").insert(campaign_data).execute()
+            result = await self._execute(self.client.table("campaigns").insert(campaign_data))
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error creating campaign: {e}")
@@ -158,7 +186,7 @@ class DatabaseClient:
         try:
             call_data["created_at"] = datetime.now(timezone.utc).isoformat()
             
-            result = self.client.table("calls").insert(call_data).execute()
+            result = await self._execute(self.client.table("calls").insert(call_data))
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error creating call record: {e}")
@@ -169,7 +197,7 @@ class DatabaseClient:
         try:
             updates["updated_at"] = datetime.now(timezone.utc).isoformat()
             
-            result = self.client.table("calls").update(updates).eq("id", call_id).execute()
+            result = await self._execute(self.client.table("calls").update(updates).eq("id", call_id))
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error updating call {call_id}: {e}")
@@ -186,7 +214,7 @@ class DatabaseClient:
                     if value and value != "all":
                         query = query.eq(key, value)
             
-            result = query.execute()
+            result = await self._execute(query)
             return result.data or []
         except Exception as e:
             logger.error(f"Error getting voices: {e}")
@@ -198,7 +226,7 @@ class DatabaseClient:
         try:
             metric_data["timestamp"] = datetime.now(timezone.utc).isoformat()
             
-            self.client.table("analytics_metrics").insert(metric_data).execute()
+            await self._execute(self.client.table("analytics_metrics").insert(metric_data))
             return True
         except Exception as e:
             logger.error(f"Error logging metric: {e}")
@@ -218,7 +246,7 @@ class DatabaseClient:
             if filters.get("end_date"):
                 query = query.lte("timestamp", filters["end_date"])
             
-            result = query.order("timestamp", desc=True).limit(1000).execute()
+            result = await self._execute(query.order("timestamp", desc=True).limit(1000))
             return result.data or []
         except Exception as e:
             logger.error(f"Error getting metrics: {e}")
@@ -230,7 +258,7 @@ class DatabaseClient:
         try:
             usage_data["timestamp"] = datetime.now(timezone.utc).isoformat()
             
-            self.client.table("usage_logs").insert(usage_data).execute()
+            await self._execute(self.client.table("usage_logs").insert(usage_data))
             return True
         except Exception as e:
             logger.error(f"Error logging usage: {e}")
@@ -239,7 +267,7 @@ class DatabaseClient:
     async def get_usage_summary(self, user_id: str, start_date: str, end_date: str) -> Dict[str, Any]:
         """Get usage summary for billing"""
         try:
-            result = self.client.table("usage_logs").select("*").eq("user_id", user_id).gte("timestamp", start_date).lte("timestamp", end_date).execute()
+            result = await self._execute(self.client.table("usage_logs").select("*").eq("user_id", user_id).gte("timestamp", start_date).lte("timestamp", end_date))
             
             usage_data = result.data or []
             
@@ -268,7 +296,7 @@ class DatabaseClient:
                 for key, value in filters.items():
                     query = query.eq(key, value)
             
-            result = query.limit(limit).execute()
+            result = await self._execute(query.limit(limit))
             return result.data or []
         except Exception as e:
             logger.error(f"Error getting records from {table}: {e}")
@@ -282,7 +310,7 @@ class DatabaseClient:
             if "updated_at" not in data:
                 data["updated_at"] = datetime.now(timezone.utc).isoformat()
             
-            result = self.client.table(table).insert(data).execute()
+            result = await self._execute(self.client.table(table).insert(data))
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error creating record in {table}: {e}")
@@ -293,7 +321,7 @@ class DatabaseClient:
         try:
             updates["updated_at"] = datetime.now(timezone.utc).isoformat()
             
-            result = self.client.table(table).update(updates).eq("id", record_id).execute()
+            result = await self._execute(self.client.table(table).update(updates).eq("id", record_id))
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error updating record in {table}: {e}")
@@ -0,0 +1,242 @@
+"""
+Async Database Pool
+asyncpg connection pools sized per service, with SQL built once per query
+shape so every call reuses the connection's cached prepared statement.
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """Connection pool settings for one service"""
+    min_size: int = 1
+    max_size: int = 10
+    statement_cache_size: int = 256  # Prepared statements kept per connection; 0 behind pgbouncer (transaction mode)
+    max_queries: int = 50000  # Recycle a connection after this many queries
+    max_inactive_connection_lifetime: float = 300.0
+    command_timeout: float = 30.0
+
+# Sized for each service's typical concurrency; override with <SERVICE>_DB_POOL_MIN_SIZE / _MAX_SIZE
+SERVICE_POOL_SIZES: Dict[str, Tuple[int, int]] = {
+    "call-center": (5, 30),
+    "analytics-pro": (5, 30),
+    "overview": (2, 20),
+    "smart-campaigns": (2, 20),
+    "billing-pro": (2, 10),
+    "agents": (2, 10),
+}
+
+def pool_config_for(service_name: str) -> PoolConfig:
+    """Pool settings for a service from SERVICE_POOL_SIZES and the environment"""
+    prefix = re.sub(r"[^A-Z0-9]", "_", service_name.upper())
+    default_min, default_max = SERVICE_POOL_SIZES.get(service_name, (1, 10))
+
+    def setting(name: str, default, cast=int):
+        value = os.getenv(f"{prefix}_DB_{name}", os.getenv(f"DB_{name}"))
+        return cast(value) if value is not None else default
+
+    return PoolConfig(
+        min_size=setting("POOL_MIN_SIZE", default_min),
+        max_size=setting("POOL_MAX_SIZE", default_max),
+        statement_cache_size=setting("STATEMENT_CACHE_SIZE", 256),
+        command_timeout=setting("COMMAND_TIMEOUT", 30.0, float)
+    )
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+def quote_identifier(name: str) -> str:
+    """Quote a table or column name; names are interpolated into SQL, so only plain identifiers are allowed"""
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid SQL identifier: {name!r}")
+    return f'"{name}"'
+
+# Comparison operators accepted in filters given as (column, op) keys
+OPERATORS = {"eq": "=", "gte": ">=", "lte": "<=", "gt": ">", "lt": "<", "neq": "<>"}
+
+class QueryBuilder:
+    """Builds parameterized SQL, cached per query shape.
+
+    Identical shapes (table, columns, filters, ordering) always produce the
+    same SQL text, which is what the per-connection prepared statement caches
+    are keyed by, so repeated calls skip parsing and planning.
+    """
+
+    def __init__(self, placeholder: Callable[[int], str]):
+        self.placeholder = placeholder
+        self.select = lru_cache(maxsize=1024)(self._select)
+        self.insert = lru_cache(maxsize=1024)(self._insert)
+        self.update = lru_cache(maxsize=1024)(self._update)
+
+    def _where(self, filters: Sequence[Tuple[str, str]], start: int = 1) -> str:
+        if not filters:
+            return ""
+        clauses = [
+            f"{quote_identifier(column)} {OPERATORS[op]} {self.placeholder(start + i)}"
+            for i, (column, op) in enumerate(filters)
+        ]
+        return " WHERE " + " AND ".join(clauses)
+
+    def _select(self, table: str, filters: Tuple[Tuple[str, str], ...] = (),
+                order_by: Optional[str] = None, descending: bool = False, limit: bool = False) -> str:
+        sql = f"SELECT * FROM {quote_identifier(table)}{self._where(filters)}"
+        if order_by:
+            sql += f" ORDER BY {quote_identifier(order_by)}{' DESC' if descending else ''}"
+        if limit:
+            sql += f" LIMIT {self.placeholder(len(filters) + 1)}"
+        return sql
+
+    def _insert(self, table: str, columns: Tuple[str, ...]) -> str:
+        names = ", ".join(quote_identifier(column) for column in columns)
+        values = ", ".join(self.placeholder(i + 1) for i in range(len(columns)))
+        return f"INSERT INTO {quote_identifier(table)} ({names}) VALUES ({values}) RETURNING *"
+
+    def _update(self, table: str, columns: Tuple[str, ...], filters: Tuple[Tuple[str, str], ...]) -> str:
+        assignments = ", ".join(
+            f"{quote_identifier(column)} = {self.placeholder(i + 1)}" for i, column in enumerate(columns)
+        )
+        return f"UPDATE {quote_identifier(table)} SET {assignments}{self._where(filters, len(columns) + 1)} RETURNING *"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            name: getattr(self, name).cache_info()._asdict()
+            for name in ("select", "insert", "update")
+        }
+
+class DatabaseBackend(ABC):
+    """Async connection source used by AsyncDatabaseClient"""
+
+    def __init__(self, placeholder: Callable[[int], str]):
+        self.queries = QueryBuilder(placeholder)
+        self.total_queries = 0
+        self.failed_queries = 0
+        self.total_query_time = 0.0
+
+    @abstractmethod
+    async def connect(self) -> None:
+        ...
+
+    @abstractmethod
+    async def close(self) -> None:
+        ...
+
+    @abstractmethod
+    async def _fetch(self, sql: str, args: Sequence[Any]) -> List[Dict[str, Any]]:
+        ...
+
+    async def fetch(self, sql: str, *args) -> List[Dict[str, Any]]:
+        """Run a query and return its rows as dicts"""
+        started = time.perf_counter()
+        self.total_queries += 1
+        try:
+            return await self._fetch(sql, args)
+        except Exception:
+            self.failed_queries += 1
+            raise
+        finally:
+            self.total_query_time += time.perf_counter() - started
+
+    async def fetchrow(self, sql: str, *args) -> Optional[Dict[str, Any]]:
+        rows = await self.fetch(sql, *args)
+        return rows[0] if rows else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "total_queries": self.total_queries,
+            "failed_queries": self.failed_queries,
+            "avg_query_ms": (
+                self.total_query_time / self.total_queries * 1000
+                if self.total_queries > 0 else 0
+            ),
+            "query_shapes": self.queries.get_stats()
+        }
+
+class AsyncpgBackend(DatabaseBackend):
+    """asyncpg pool against Postgres (Supabase's database directly, not its REST API)"""
+
+    def __init__(self, dsn: str, config: Optional[PoolConfig] = None):
+        if asyncpg is None:
+            raise ImportError("asyncpg is required for AsyncpgBackend")
+        super().__init__(lambda index: f"${index}")
+        self.dsn = dsn
+        self.config = config or PoolConfig()
+        self.pool = None
+        self._connect_lock = asyncio.Lock()
+
+    @staticmethod
+    async def _init_connection(connection):
+        # Return the same JSON-friendly types the supabase REST client did
+        for type_name in ("json", "jsonb"):
+            await connection.set_type_codec(
+                type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+            )
+        await connection.set_type_codec("uuid", encoder=str, decoder=str, schema="pg_catalog", format="text")
+        await connection.set_type_codec("numeric", encoder=str, decoder=float, schema="pg_catalog", format="text")
+
+    async def connect(self) -> None:
+        async with self._connect_lock:
+            if self.pool is None:
+                self.pool = await self._create_pool()
+
+    async def _create_pool(self):
+        config = self.config
+        pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=config.min_size,
+            max_size=config.max_size,
+            max_queries=config.max_queries,
+            max_inactive_connection_lifetime=config.max_inactive_connection_lifetime,
+            command_timeout=config.command_timeout,
+            statement_cache_size=config.statement_cache_size,
+            init=self._init_connection
+        )
+        logger.info(f"Database pool ready ({config.min_size}-{config.max_size} connections)")
+        return pool
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def _fetch(self, sql: str, args: Sequence[Any]) -> List[Dict[str, Any]]:
+        if self.pool is None:
+            await self.connect()
+        rows = await self.pool.fetch(sql, *args)
+        return [dict(row) for row in rows]
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        if self.pool is not None:
+            stats.update({
+                "pool_size": self.pool.get_size(),
+                "pool_idle": self.pool.get_idle_size(),
+                "pool_min_size": self.pool.get_min_size(),
+                "pool_max_size": self.pool.get_max_size()
+            })
+        return stats
+
+__all__ = [
+    "OPERATORS",
+    "SERVICE_POOL_SIZES",
+    "AsyncpgBackend",
+    "DatabaseBackend",
+    "PoolConfig",
+    "QueryBuilder",
+    "pool_config_for",
+    "quote_identifier",
+]
@@ -0,0 +1,102 @@
+"""
+SQLite Database Stand-in
+DatabaseBackend over an in-process SQLite database, so AsyncDatabaseClient can
+be exercised in tests and local development without a Postgres server
+"""
+
+import asyncio
+import json
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+from .pool import DatabaseBackend
+
+_TABLE_IN_SQL = re.compile(r'(?:FROM|INTO|UPDATE) "(\w+)"')
+_MISSING_TABLE = re.compile(r"no such table: (\w+)")
+_MISSING_COLUMN = re.compile(r"(?:table \w+ has no column named|no such column:) (\w+)")
+
+class SQLiteStandIn(DatabaseBackend):
+    """In-process replacement for the Postgres pool.
+
+    Tables (with a random hex `id` primary key) and columns are created the
+    first time a query needs them, so no migrations are required; column types
+    are not enforced. Datetimes are stored as ISO-8601 strings and dicts/lists
+    as JSON, which is decoded again on read. All queries run on one thread,
+    off the event loop, like a pool of one connection.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        super().__init__(lambda index: f"?{index}")
+        self.path = path
+        self.available = True
+        self._connection: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-stand-in")
+
+    async def connect(self) -> None:
+        if self._connection is None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._open)
+
+    def _open(self):
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._connection.close)
+            self._connection = None
+
+    async def _fetch(self, sql: str, args: Sequence[Any]) -> List[Dict[str, Any]]:
+        if not self.available:
+            raise ConnectionError("Database stand-in is unavailable")
+        await self.connect()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._run, sql, args)
+
+    def _run(self, sql: str, args: Sequence[Any]) -> List[Dict[str, Any]]:
+        params = [self._adapt(arg) for arg in args]
+        while True:
+            try:
+                rows = self._connection.execute(sql, params).fetchall()
+                self._connection.commit()
+                return [{key: self._convert(row[key]) for key in row.keys()} for row in rows]
+            except sqlite3.OperationalError as e:
+                if not self._create_missing(sql, str(e)):
+                    raise
+
+    def _create_missing(self, sql: str, error: str) -> bool:
+        """Create the table or column an error complains about; False if it is another error"""
+        match = _MISSING_TABLE.search(error)
+        if match:
+            self._connection.execute(
+                f'CREATE TABLE "{match.group(1)}" ("id" TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))))'
+            )
+            return True
+
+        match = _MISSING_COLUMN.search(error)
+        table = _TABLE_IN_SQL.search(sql)
+        if match and table:
+            self._connection.execute(f'ALTER TABLE "{table.group(1)}" ADD COLUMN "{match.group(1)}"')
+            return True
+        return False
+
+    @staticmethod
+    def _adapt(value: Any) -> Any:
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        if isinstance(value, Decimal):
+            return float(value)
+        return value
+
+    @staticmethod
+    def _convert(value: Any) -> Any:
+        if isinstance(value, str) and value[:1] in ("{", "["):
+            try:
+                return json.loads(value)
+            except ValueError:
+                return value
+        return value
@@ -5,8 +5,11 @@ Message bus, event sourcing, and CQRS patterns for microservices
 
 import asyncio
 import json
+import time
 import uuid
+import zlib
 from typing import Dict, List, Any, Optional, Callable, Type, Union
+from collections import deque
 from datetime import datetime
 from dataclasses import dataclass, field, asdict
 from enum import Enum
@@ -15,6 +18,13 @@ import logging
 from contextlib import asynccontextmanager
 import weakref
 
+from .storage import (
+    EventStoreBackend,
+    InMemoryEventStoreBackend,
+    RecordedEvent,
+    SegmentedLogEventStoreBackend
+)
+
 logger = logging.getLogger(__name__)
 
 class EventPriority(str, Enum):
@@ -99,6 +109,11 @@ class CampaignStoppedEvent(CampaignEvent):
 class EventHandler(ABC):
     """Abstract event handler"""
     
+    # Delivery settings, overridable per handler class
+    max_concurrency: int = 1  # Concurrent calls when the bus runs handlers concurrently
+    max_retries: int = 0  # Retries of this handler alone before the event is dead-lettered
+    retry_backoff: float = 0.1  # Seconds before the first retry, doubled on each further one
+    
     @abstractmethod
     async def handle(self, event: Event) -> None:
         """Handle an event"""
@@ -109,124 +124,322 @@ class EventHandler(ABC):
         """Check if handler can handle event type"""
         pass
 
+class BatchEventHandler(EventHandler):
+    """Event handler that consumes events in batches, e.g. to write them in one round trip.
+    
+    The bus buffers events for the handler and calls handle_batch() once
+    `batch_max_size` events are waiting or the oldest has waited `batch_max_linger`
+    seconds, whichever comes first. Events keep their publish order within and
+    across batches.
+    """
+    
+    batch_max_size: int = 100
+    batch_max_linger: float = 0.05
+    
+    @abstractmethod
+    async def handle_batch(self, events: List[Event]) -> None:
+        """Handle a batch of events"""
+        pass
+    
+    async def handle(self, event: Event) -> None:
+        await self.handle_batch([event])
+
 class EventStore:
-    """Event store for event sourcing"""
+    """Event store for event sourcing.
     
-    def __init__(self):
-        self._events: Dict[str, List[Event]] = {}
-        self._snapshots: Dict[str, Dict[str, Any]] = {}
-        self._lock = asyncio.Lock()
+    Storage is delegated to a pluggable EventStoreBackend: in memory by default,
+    or durable via EventStore.open_log() (segmented log files plus an SQLite index).
+    """
     
-    async def append_events(self, aggregate_id: str, events: List[Event], expected_version: int = -1) -> None:
-        """Append events to aggregate stream"""
-        async with self._lock:
-            if aggregate_id not in self._events:
-                self._events[aggregate_id] = []
-            
-            current_version = len(self._events[aggregate_id])
-            
-            # Check optimistic concurrency
-            if expected_version != -1 and current_version != expected_version:
-                raise Exception(f"Concurrency conflict. Expected version {expected_version}, got {current_version}")
-            
-            # Append events
-            for i, event in enumerate(events):
-                event.event_version = current_version + i + 1
-                self._events[aggregate_id].append(event)
-            
-            logger.info(f"Appended {len(events)} events to aggregate {aggregate_id}")
+    def __init__(self, backend: Optional[EventStoreBackend] = None):
+        self.backend = backend or InMemoryEventStoreBackend()
+        self._append_listeners: List[Callable[[int], None]] = []
+    
+    @classmethod
+    def open_log(cls, directory: str, serializer=None, **options) -> 'EventStore':
+        """Durable store in `directory`, encoding events with an EventSerializer"""
+        from .serialization import EventSerializer
+        
+        serializer = serializer or EventSerializer()
+        return cls(SegmentedLogEventStoreBackend(
+            directory,
+            serialize=serializer.dumps,
+            deserialize=serializer.loads,
+            **options
+        ))
+    
+    async def append_events(self, aggregate_id: str, events: List[Event], expected_version: int = -1) -> int:
+        """Append events to aggregate stream, returning the global position of the last one"""
+        position = await self.backend.append(aggregate_id, events, expected_version)
+        logger.info(f"Appended {len(events)} events to aggregate {aggregate_id}")
+        
+        for listener in self._append_listeners:
+            try:
+                listener(position)
+            except Exception as e:
+                logger.error(f"Append listener error: {str(e)}")
+        return position
+    
+    def add_append_listener(self, listener: Callable[[int], None]) -> None:
+        """Call `listener(head_position)` after every append, e.g. to wake catch-up readers"""
+        self._append_listeners.append(listener)
+    
+    def remove_append_listener(self, listener: Callable[[int], None]) -> None:
+        if listener in self._append_listeners:
+            self._append_listeners.remove(listener)
     
     async def get_events(self, aggregate_id: str, from_version: int = 0) -> List[Event]:
         """Get events for aggregate from specific version"""
-        async with self._lock:
-            if aggregate_id not in self._events:
-                return []
-            
-            events = self._events[aggregate_id]
-            return [e for e in events if e.event_version > from_version]
-    
-    async def get_all_events(self, event_types: Optional[List[str]] = None) -> List[Event]:
-        """Get all events, optionally filtered by type"""
-        async with self._lock:
-            all_events = []
-            for events in self._events.values():
-                all_events.extend(events)
-            
-            if event_types:
-                all_events = [e for e in all_events if e.event_type in event_types]
-            
-            return sorted(all_events, key=lambda x: x.timestamp)
+        return await self.backend.read_stream(aggregate_id, from_version)
+    
+    async def get_all_events(
+        self,
+        event_types: Optional[List[str]] = None,
+        from_position: int = 0,
+        limit: Optional[int] = None
+    ) -> List[Event]:
+        """Get all events in append order, optionally filtered by type"""
+        return [recorded.event for recorded in await self.read_all(from_position, limit, event_types)]
+    
+    async def read_all(
+        self,
+        from_position: int = 0,
+        limit: Optional[int] = None,
+        event_types: Optional[List[str]] = None
+    ) -> List[RecordedEvent]:
+        """Events after a global position with their positions, for catch-up subscriptions"""
+        return await self.backend.read_all(from_position, limit, event_types)
+    
+    async def get_head_position(self) -> int:
+        """Global position of the latest event"""
+        return await self.backend.head_position()
     
     async def save_snapshot(self, aggregate_id: str, version: int, snapshot: Dict[str, Any]) -> None:
         """Save aggregate snapshot"""
-        async with self._lock:
-            self._snapshots[aggregate_id] = {
-                'version': version,
-                'data': snapshot,
-                'timestamp': datetime.utcnow().isoformat()
-            }
+        await self.backend.save_snapshot(aggregate_id, version, snapshot)
     
     async def get_snapshot(self, aggregate_id: str) -> Optional[Dict[str, Any]]:
         """Get latest snapshot for aggregate"""
-        async with self._lock:
-            return self._snapshots.get(aggregate_id)
+        return await self.backend.get_snapshot(aggregate_id)
+    
+    async def close(self) -> None:
+        await self.backend.close()
 
-class EventBus:
-    """In-memory event bus with pub/sub pattern"""
+class BackpressureMode(str, Enum):
+    """What publish() does when an event's partition queue is full"""
+    BLOCK = "block"  # Wait for room
+    DROP_OLDEST = "drop_oldest"  # Discard the oldest queued event of that partition
+    REJECT = "reject"  # Raise EventBusFullError
+
+class EventBusFullError(Exception):
+    """Raised by publish() in REJECT mode when the event's partition is full"""
+
+class EventPartition:
+    """One bounded queue with a single consumer, so its events are handled in publish order"""
     
-    def __init__(self):
+    LATENCY_SAMPLES = 1024
+    
+    def __init__(self, index: int, max_queue_size: int):
+        self.index = index
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.consumer: Optional[asyncio.Task] = None
+        
+        # Partition metrics
+        self.published = 0
+        self.processed = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.queue_latencies = deque(maxlen=self.LATENCY_SAMPLES)  # Publish to start of handling
+        self.handle_latencies = deque(maxlen=self.LATENCY_SAMPLES)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get partition statistics"""
+        return {
+            'partition': self.index,
+            'depth': self.queue.qsize(),
+            'max_depth': self.max_depth,
+            'capacity': self.queue.maxsize,
+            'published': self.published,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'rejected': self.rejected,
+            'queue_latency_ms': _latency_summary(self.queue_latencies),
+            'handle_latency_ms': _latency_summary(self.handle_latencies)
+        }
+
+def _latency_summary(samples) -> Dict[str, float]:
+    """p50/p95/max in milliseconds of recent latency samples (seconds)"""
+    if not samples:
+        return {'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    ordered = sorted(samples)
+    return {
+        'p50': round(ordered[len(ordered) // 2] * 1000, 3),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        'max': round(ordered[-1] * 1000, 3)
+    }
+
+class HandlerBatcher:
+    """Buffers events for one BatchEventHandler and flushes them on size or linger"""
+    
+    def __init__(self, bus: "EventBus", handler: BatchEventHandler):
+        self.bus = bus
+        self.handler = handler
+        # Bounded so a slow sink pushes back on the partitions feeding it
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=handler.batch_max_size * 4)
+        self.task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.batched_events = 0
+    
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._flush_loop())
+    
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        queue = self.queue
+        max_size = self.handler.batch_max_size
+        
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.handler.batch_max_linger
+            
+            while len(batch) < max_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                await self.bus._run_handler(self.handler, batch)
+            finally:
+                self.batches += 1
+                self.batched_events += len(batch)
+                for _ in batch:
+                    queue.task_done()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics"""
+        return {
+            'buffered': self.queue.qsize(),
+            'batches': self.batches,
+            'avg_batch_size': self.batched_events / self.batches if self.batches > 0 else 0
+        }
+
+class EventBus:
+    """In-memory event bus with pub/sub pattern.
+    
+    Events are hashed by aggregate_id onto bounded partitions, each drained by one
+    consumer, so events for the same aggregate are handled in the order published
+    while different aggregates are handled concurrently. Memory is bounded by
+    num_partitions * max_queue_size; when a partition is full, publish() blocks,
+    drops that partition's oldest event, or raises, depending on `backpressure`.
+    
+    With `concurrent_handlers`, the handlers subscribed to an event run concurrently
+    (each limited to its `max_concurrency` calls across partitions) instead of one
+    after another. A failing handler is retried on its own, and BatchEventHandlers
+    receive events through a HandlerBatcher in either mode.
+    """
+    
+    def __init__(
+        self,
+        num_partitions: int = 8,
+        max_queue_size: int = 10_000,
+        backpressure: BackpressureMode = BackpressureMode.BLOCK,
+        concurrent_handlers: bool = False
+    ):
         self._handlers: Dict[str, List[EventHandler]] = {}
         self._dead_letter_queue: List[Event] = []
-        self._processing_queue = asyncio.Queue()
-        self._workers: List[asyncio.Task] = []
+        self._partitions: List[EventPartition] = []
         self._is_running = False
         self._lock = asyncio.Lock()
-    
-    async def start(self, num_workers: int = 5):
-        """Start event bus with worker tasks"""
+        self.num_partitions = num_partitions
+        self.max_queue_size = max_queue_size
+        self.backpressure = BackpressureMode(backpressure)
+        self.concurrent_handlers = concurrent_handlers
+        self._handler_limits: Dict[EventHandler, asyncio.Semaphore] = {}
+        self._batchers: Dict[EventHandler, HandlerBatcher] = {}
+        self._handler_stats: Dict[EventHandler, Dict[str, int]] = {}
+    
+    async def start(self, num_workers: Optional[int] = None):
+        """Start event bus with one consumer per partition (`num_workers` overrides the partition count)"""
+        if num_workers is not None:
+            self.num_partitions = num_workers
         self._is_running = True
         
-        # Start worker tasks
-        for i in range(num_workers):
-            worker = asyncio.create_task(self._worker(f"worker-{i}"))
-            self._workers.append(worker)
+        self._partitions = [EventPartition(i, self.max_queue_size) for i in range(self.num_partitions)]
+        for partition in self._partitions:
+            partition.consumer = asyncio.create_task(self._consume(partition))
+        for batcher in self._batchers.values():
+            batcher.start()
         
-        logger.info(f"Event bus started with {num_workers} workers")
+        logger.info(
+            f"Event bus started with {self.num_partitions} partitions "
+            f"(queue size {self.max_queue_size}, backpressure {self.backpressure.value})"
+        )
     
-    async def stop(self):
-        """Stop event bus"""
+    async def stop(self, drain_timeout: float = 0.0):
+        """Stop event bus, optionally giving queued events `drain_timeout` seconds to be handled"""
         self._is_running = False
         
-        # Cancel all workers
-        for worker in self._workers:
-            worker.cancel()
+        if drain_timeout > 0:
+            try:
+                await asyncio.wait_for(
+                    self._drain(),
+                    timeout=drain_timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning("Event bus stopped before all queued events were handled")
+        
+        # Cancel all consumers and batch flushers
+        consumers = [partition.consumer for partition in self._partitions if partition.consumer]
+        consumers += [batcher.task for batcher in self._batchers.values() if batcher.task]
+        for batcher in self._batchers.values():
+            batcher.task = None
+        for consumer in consumers:
+            consumer.cancel()
         
-        # Wait for workers to finish
-        await asyncio.gather(*self._workers, return_exceptions=True)
+        # Wait for consumers to finish
+        await asyncio.gather(*consumers, return_exceptions=True)
         
-        self._workers.clear()
         logger.info("Event bus stopped")
     
-    async def _worker(self, worker_id: str):
-        """Event processing worker"""
-        logger.info(f"Event worker {worker_id} started")
+    async def _drain(self):
+        """Wait until every queued event, including buffered batches, has been handled"""
+        await asyncio.gather(*(partition.queue.join() for partition in self._partitions))
+        await asyncio.gather(*(batcher.queue.join() for batcher in self._batchers.values()))
+    
+    def _partition_for(self, event: Event) -> EventPartition:
+        """Stable partition for the event's aggregate (events without one are spread by event_id)"""
+        key = event.aggregate_id or event.event_id
+        return self._partitions[zlib.crc32(key.encode()) % len(self._partitions)]
+    
+    async def _consume(self, partition: EventPartition):
+        """Handle one partition's events strictly in order"""
+        logger.debug(f"Event partition {partition.index} consumer started")
+        queue = partition.queue
         
-        while self._is_running:
+        while True:
+            enqueued_at, event = await queue.get()
+            started_at = time.perf_counter()
+            partition.queue_latencies.append(started_at - enqueued_at)
+            
             try:
-                # Get event from queue (with timeout to allow graceful shutdown)
-                event = await asyncio.wait_for(self._processing_queue.get(), timeout=1.0)
-                
                 await self._process_event(event)
-                self._processing_queue.task_done()
-                
-            except asyncio.TimeoutError:
-                continue
             except asyncio.CancelledError:
-                break
+                raise
             except Exception as e:
-                logger.error(f"Error in worker {worker_id}: {str(e)}")
-        
-        logger.info(f"Event worker {worker_id} stopped")
+                logger.error(f"Error in partition {partition.index}: {str(e)}")
+            finally:
+                partition.handle_latencies.append(time.perf_counter() - started_at)
+                partition.processed += 1
+                queue.task_done()
     
     async def _process_event(self, event: Event):
         """Process single event"""
@@ -236,15 +449,61 @@ class EventBus:
             logger.warning(f"No handlers for event type: {event.event_type}")
             return
         
-        # Process with all handlers
+        handlers = [handler for handler in handlers if handler.can_handle(event.event_type)]
+        
+        # Batch handlers only get the event buffered; their flusher delivers it
+        direct = []
         for handler in handlers:
+            batcher = self._batchers.get(handler)
+            if batcher is not None:
+                await batcher.queue.put(event)
+            else:
+                direct.append(handler)
+        
+        if self.concurrent_handlers and len(direct) > 1:
+            await asyncio.gather(*(self._run_handler(handler, [event]) for handler in direct))
+        else:
+            for handler in direct:
+                await self._run_handler(handler, [event])
+    
+    async def _run_handler(self, handler: EventHandler, events: List[Event]):
+        """Deliver events to one handler, retrying only that handler, then dead-letter on failure"""
+        stats = self._handler_stats.setdefault(handler, {'calls': 0, 'retries': 0, 'failures': 0})
+        limit = self._handler_limits.get(handler)
+        if limit is None:
+            limit = self._handler_limits[handler] = asyncio.Semaphore(max(1, handler.max_concurrency))
+        
+        attempt = 0
+        while True:
             try:
-                if handler.can_handle(event.event_type):
-                    await handler.handle(event)
+                stats['calls'] += 1
+                if self.concurrent_handlers:
+                    async with limit:
+                        await self._invoke(handler, events)
+                else:
+                    await self._invoke(handler, events)
+                return
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Handler error for event {event.event_id}: {str(e)}")
+                if attempt < handler.max_retries:
+                    await asyncio.sleep(handler.retry_backoff * (2 ** attempt))
+                    attempt += 1
+                    stats['retries'] += 1
+                    continue
+                
+                stats['failures'] += 1
+                logger.error(f"Handler {type(handler).__name__} failed for event {events[0].event_id}: {str(e)}")
                 # Add to dead letter queue
-                self._dead_letter_queue.append(event)
+                self._dead_letter_queue.extend(events)
+                return
+    
+    @staticmethod
+    async def _invoke(handler: EventHandler, events: List[Event]):
+        if isinstance(handler, BatchEventHandler):
+            await handler.handle_batch(events)
+        else:
+            await handler.handle(events[0])
     
     async def publish(self, event: Event) -> None:
         """Publish event to bus"""
@@ -257,10 +516,28 @@ class EventBus:
             'publisher': 'event_bus'
         })
         
-        # Queue for processing
-        await self._processing_queue.put(event)
+        # Queue on the aggregate's partition, applying backpressure when it is full
+        partition = self._partition_for(event)
+        queue = partition.queue
+        item = (time.perf_counter(), event)
+        
+        if not queue.full():
+            queue.put_nowait(item)
+        elif self.backpressure == BackpressureMode.REJECT:
+            partition.rejected += 1
+            raise EventBusFullError(f"Event partition {partition.index} is full ({queue.maxsize} events)")
+        elif self.backpressure == BackpressureMode.DROP_OLDEST:
+            queue.get_nowait()
+            queue.task_done()
+            partition.dropped += 1
+            queue.put_nowait(item)
+        else:
+            await queue.put(item)
+        
+        partition.published += 1
+        partition.max_depth = max(partition.max_depth, queue.qsize())
         
-        logger.debug(f"Published event: {event.event_type} ({event.event_id})")
+        logger.debug(f"Published event: {event.event_type} ({event.event_id}) to partition {partition.index}")
     
     async def subscribe(self, event_type: str, handler: EventHandler) -> None:
         """Subscribe handler to event type"""
@@ -269,11 +546,17 @@ class EventBus:
                 self._handlers[event_type] = []
             
             self._handlers[event_type].append(handler)
+            
+            if isinstance(handler, BatchEventHandler) and handler not in self._batchers:
+                batcher = self._batchers[handler] = HandlerBatcher(self, handler)
+                if self._is_running:
+                    batcher.start()
         
         logger.info(f"Subscribed handler to event type: {event_type}")
     
     async def unsubscribe(self, event_type: str, handler: EventHandler) -> None:
         """Unsubscribe handler from event type"""
+        batcher = None
         async with self._lock:
             if event_type in self._handlers:
                 try:
@@ -282,6 +565,15 @@ class EventBus:
                         del self._handlers[event_type]
                 except ValueError:
                     pass
+            
+            # Stop batching for a handler once it has no subscriptions left
+            if not any(handler in handlers for handlers in self._handlers.values()):
+                batcher = self._batchers.pop(handler, None)
+        
+        if batcher is not None and batcher.task is not None:
+            # Let the handler see what was already buffered for it
+            await batcher.queue.join()
+            batcher.task.cancel()
         
         logger.info(f"Unsubscribed handler from event type: {event_type}")
     
@@ -289,11 +581,24 @@ class EventBus:
         """Get event bus statistics"""
         return {
             'is_running': self._is_running,
-            'num_workers': len(self._workers),
-            'queue_size': self._processing_queue.qsize(),
+            'num_workers': len(self._partitions),
+            'queue_size': sum(partition.queue.qsize() for partition in self._partitions),
+            'backpressure': self.backpressure.value,
+            'dropped_events': sum(partition.dropped for partition in self._partitions),
+            'rejected_events': sum(partition.rejected for partition in self._partitions),
             'dead_letter_count': len(self._dead_letter_queue),
             'handler_types': list(self._handlers.keys()),
-            'total_handlers': sum(len(handlers) for handlers in self._handlers.values())
+            'total_handlers': sum(len(handlers) for handlers in self._handlers.values()),
+            'concurrent_handlers': self.concurrent_handlers,
+            'handlers': [
+                {
+                    'handler': type(handler).__name__,
+                    **stats,
+                    **(self._batchers[handler].get_stats() if handler in self._batchers else {})
+                }
+                for handler, stats in self._handler_stats.items()
+            ],
+            'partitions': [partition.get_stats() for partition in self._partitions]
         }
 
 class Aggregate(ABC):
@@ -328,13 +633,26 @@ class Aggregate(ABC):
         for event in events:
             self.apply_event(event)
             self.version = event.event_version
+    
+    def get_snapshot_state(self) -> Dict[str, Any]:
+        """State to snapshot; by default every public attribute except the id and version"""
+        return {
+            key: value for key, value in vars(self).items()
+            if not key.startswith('_') and key not in ('aggregate_id', 'version')
+        }
+    
+    def restore_snapshot(self, state: Dict[str, Any]) -> None:
+        """Restore state captured by get_snapshot_state"""
+        for key, value in state.items():
+            setattr(self, key, value)
 
 class Repository(ABC):
     """Base repository for aggregates"""
     
-    def __init__(self, event_store: EventStore, event_bus: EventBus):
+    def __init__(self, event_store: EventStore, event_bus: EventBus, snapshot_every: int = 0):
         self.event_store = event_store
         self.event_bus = event_bus
+        self.snapshot_every = snapshot_every  # Snapshot after every N events; 0 disables
     
     @abstractmethod
     def create_aggregate(self, aggregate_id: str) -> Aggregate:
@@ -349,8 +667,8 @@ class Repository(ABC):
         if snapshot:
             # Load from snapshot
             aggregate = self.create_aggregate(aggregate_id)
+            aggregate.restore_snapshot(snapshot['data'])
             aggregate.version = snapshot['version']
-            # Apply snapshot data to aggregate (implementation specific)
             
             # Get events after snapshot
             events = await self.event_store.get_events(aggregate_id, snapshot['version'])
@@ -387,7 +705,19 @@ class Repository(ABC):
         
         # Mark as committed
         aggregate.mark_events_as_committed()
+        previous_version = aggregate.version
         aggregate.version += len(uncommitted_events)
+        
+        if self.snapshot_every and aggregate.version // self.snapshot_every > previous_version // self.snapshot_every:
+            await self.save_snapshot(aggregate)
+    
+    async def save_snapshot(self, aggregate: Aggregate) -> None:
+        """Snapshot the aggregate so get() only replays events after this version"""
+        await self.event_store.save_snapshot(
+            aggregate.aggregate_id,
+            aggregate.version,
+            aggregate.get_snapshot_state()
+        )
 
 # CQRS Implementation
 class Query(ABC):
@@ -0,0 +1,356 @@
+"""
+Read-Model Projections
+Tails the event store from checkpointed positions, applies events to registered
+projections in batches, and rebuilds projections in the background with a
+replay partitioned by aggregate.
+"""
+
+import asyncio
+import json
+import os
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+import logging
+
+from .event_system import Event, EventStore
+
+logger = logging.getLogger(__name__)
+
+class Projection(ABC):
+    """A read model built from the event stream"""
+
+    name: str = ""
+    event_types: Optional[List[str]] = None  # None receives every event
+    # Events of different aggregates may be applied concurrently during a rebuild
+    supports_parallel_replay: bool = False
+
+    @abstractmethod
+    async def apply_batch(self, events: List[Event]) -> None:
+        """Apply events in position order; must be idempotent for at-least-once delivery"""
+
+    async def reset(self) -> None:
+        """Clear the read model before a rebuild"""
+
+class CheckpointStore(ABC):
+    """Where each projection's last applied global position is kept"""
+
+    @abstractmethod
+    async def load(self, name: str) -> int:
+        """Last saved position, 0 if none"""
+
+    @abstractmethod
+    async def save(self, name: str, position: int) -> None:
+        """Persist a position"""
+
+class InMemoryCheckpointStore(CheckpointStore):
+    """Checkpoints that last as long as the process"""
+
+    def __init__(self):
+        self._positions: Dict[str, int] = {}
+
+    async def load(self, name: str) -> int:
+        return self._positions.get(name, 0)
+
+    async def save(self, name: str, position: int) -> None:
+        self._positions[name] = position
+
+class FileCheckpointStore(CheckpointStore):
+    """Checkpoints in one JSON file, replaced atomically on every save"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._positions: Optional[Dict[str, int]] = None
+        self._lock = asyncio.Lock()
+
+    def _read(self) -> Dict[str, int]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write(self, positions: Dict[str, int]):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(positions, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    async def load(self, name: str) -> int:
+        async with self._lock:
+            if self._positions is None:
+                self._positions = await asyncio.get_running_loop().run_in_executor(None, self._read)
+            return self._positions.get(name, 0)
+
+    async def save(self, name: str, position: int) -> None:
+        async with self._lock:
+            if self._positions is None:
+                self._positions = await asyncio.get_running_loop().run_in_executor(None, self._read)
+            self._positions[name] = position
+            await asyncio.get_running_loop().run_in_executor(None, self._write, dict(self._positions))
+
+class ProjectionState:
+    """Runtime state of one registered projection"""
+
+    def __init__(self, projection: Projection):
+        self.projection = projection
+        self.position = 0
+        self.status = "stopped"  # stopped, running, rebuilding, failed
+        self.task: Optional[asyncio.Task] = None
+        self.events_applied = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.last_checkpoint_at = 0.0
+        self.unsaved = False
+        self.appended = asyncio.Event()
+
+class ProjectionRunner:
+    """Keeps projections up to date with the event store.
+
+    Each projection has its own tailing task that reads up to `batch_size` events
+    after its checkpoint, applies them as one batch, and persists the checkpoint
+    at most every `checkpoint_interval` seconds (delivery is at-least-once). Idle
+    tails sleep until the store reports an append or `poll_interval` elapses.
+    """
+
+    def __init__(
+        self,
+        event_store: EventStore,
+        checkpoints: Optional[CheckpointStore] = None,
+        batch_size: int = 500,
+        poll_interval: float = 1.0,
+        checkpoint_interval: float = 1.0,
+        retry_delay: float = 1.0
+    ):
+        self.event_store = event_store
+        self.checkpoints = checkpoints or InMemoryCheckpointStore()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.retry_delay = retry_delay
+        self._projections: Dict[str, ProjectionState] = {}
+        self._is_running = False
+
+    def register(self, projection: Projection) -> None:
+        """Register a projection; it starts tailing with the runner"""
+        name = projection.name or type(projection).__name__
+        if name in self._projections:
+            raise ValueError(f"Projection already registered: {name}")
+        projection.name = name
+        state = self._projections[name] = ProjectionState(projection)
+        if self._is_running:
+            state.task = asyncio.create_task(self._tail(state))
+
+    def _on_append(self, position: int):
+        for state in self._projections.values():
+            state.appended.set()
+
+    async def start(self) -> None:
+        """Start tailing every registered projection from its checkpoint"""
+        self._is_running = True
+        self.event_store.add_append_listener(self._on_append)
+        for state in self._projections.values():
+            if state.task is None:
+                state.task = asyncio.create_task(self._tail(state))
+        logger.info(f"Projection runner started with {len(self._projections)} projections")
+
+    async def stop(self) -> None:
+        """Stop all tails and rebuilds, saving their checkpoints"""
+        self._is_running = False
+        self.event_store.remove_append_listener(self._on_append)
+
+        tasks = [state.task for state in self._projections.values() if state.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for state in self._projections.values():
+            state.task = None
+            state.status = "stopped"
+            await self._save_checkpoint(state, force=True)
+        logger.info("Projection runner stopped")
+
+    async def _save_checkpoint(self, state: ProjectionState, force: bool = False):
+        if not state.unsaved:
+            return
+        now = time.monotonic()
+        if force or now - state.last_checkpoint_at >= self.checkpoint_interval:
+            await self.checkpoints.save(state.projection.name, state.position)
+            state.last_checkpoint_at = now
+            state.unsaved = False
+
+    async def _tail(self, state: ProjectionState):
+        """Follow the store from the projection's checkpoint"""
+        projection = state.projection
+        state.position = await self.checkpoints.load(projection.name)
+        state.status = "running"
+
+        while True:
+            # Clear before reading so an append during the read is not missed
+            state.appended.clear()
+            head = await self.event_store.get_head_position()
+            recorded = await self.event_store.read_all(state.position, self.batch_size, projection.event_types)
+
+            if not recorded:
+                # Nothing of interest up to head, so a filtered projection is caught up to it
+                if head > state.position:
+                    state.position = head
+                    state.unsaved = True
+                await self._save_checkpoint(state, force=True)
+                try:
+                    await asyncio.wait_for(state.appended.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await projection.apply_batch([entry.event for entry in recorded])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Leave the checkpoint where it is and retry the same batch
+                state.errors += 1
+                state.last_error = str(e)
+                logger.error(f"Projection {projection.name} failed at position {recorded[0].position}: {str(e)}")
+                await asyncio.sleep(self.retry_delay)
+                continue
+
+            state.position = recorded[-1].position
+            state.events_applied += len(recorded)
+            state.batches += 1
+            state.unsaved = True
+            await self._save_checkpoint(state)
+
+    def rebuild(self, name: str, workers: int = 4) -> asyncio.Task:
+        """Reset a projection and replay the whole store into it in the background.
+
+        Its live tail is paused meanwhile and resumes from the end of the replay;
+        the returned task completes when the replay does. The checkpoint is
+        reset to 0 before the read model is, so if the replay fails (or the
+        process dies during it) the tail replays the store from the start.
+        Projections that support parallel replay get events split across
+        `workers` by aggregate, so each aggregate's events stay in order.
+        """
+        state = self._projections[name]
+        if state.status == "rebuilding":
+            raise ValueError(f"Projection {name} is already rebuilding")
+        tail = state.task
+        if tail is not None:
+            tail.cancel()
+        state.status = "rebuilding"
+        state.task = asyncio.create_task(self._rebuild(state, workers, tail))
+        return state.task
+
+    async def _rebuild(self, state: ProjectionState, workers: int, tail: Optional[asyncio.Task] = None):
+        projection = state.projection
+        if not projection.supports_parallel_replay:
+            workers = 1
+
+        # The old tail must not save its position over the reset checkpoint
+        if tail is not None:
+            await asyncio.gather(tail, return_exceptions=True)
+
+        started = time.perf_counter()
+        state.position = 0
+        state.unsaved = False
+        await self.checkpoints.save(projection.name, 0)
+        await projection.reset()
+
+        head = await self.event_store.get_head_position()
+        queues = [asyncio.Queue(maxsize=4) for _ in range(workers)]
+        consumers = [asyncio.create_task(self._replay_worker(projection, queue)) for queue in queues]
+
+        try:
+            position = 0
+            replayed = 0
+            while position < head:
+                recorded = await self.event_store.read_all(
+                    position, min(self.batch_size, head - position), projection.event_types
+                )
+                recorded = [entry for entry in recorded if entry.position <= head]
+                if not recorded:
+                    break
+
+                parts: List[List[Event]] = [[] for _ in range(workers)]
+                for entry in recorded:
+                    key = entry.event.aggregate_id or entry.event.event_id
+                    parts[zlib.crc32(key.encode()) % workers].append(entry.event)
+                for queue, part in zip(queues, parts):
+                    if part:
+                        await queue.put(part)
+
+                position = recorded[-1].position
+                replayed += len(recorded)
+                # A worker that failed stops consuming; surface its error instead of blocking
+                for consumer in consumers:
+                    if consumer.done():
+                        consumer.result()
+
+            for queue in queues:
+                await queue.put(None)
+            await asyncio.gather(*consumers)
+        except BaseException as e:
+            for consumer in consumers:
+                consumer.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            state.status = "failed"
+            state.errors += 1
+            state.last_error = str(e)
+            logger.error(f"Rebuild of projection {projection.name} failed: {str(e)}")
+        else:
+            await self.checkpoints.save(projection.name, head)
+            state.position = head
+            state.events_applied += replayed
+            logger.info(
+                f"Rebuilt projection {projection.name} from {replayed} events "
+                f"with {workers} workers in {time.perf_counter() - started:.2f}s"
+            )
+
+        # Continue live from the checkpoint: the end of the replay, or 0 if it failed
+        if self._is_running:
+            state.task = asyncio.create_task(self._tail(state))
+        else:
+            state.task = None
+            if state.status == "rebuilding":
+                state.status = "stopped"
+
+    @staticmethod
+    async def _replay_worker(projection: Projection, queue: asyncio.Queue):
+        while True:
+            events = await queue.get()
+            if events is None:
+                return
+            await projection.apply_batch(events)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get per-projection position, lag and throughput"""
+        head = await self.event_store.get_head_position()
+        return {
+            'is_running': self._is_running,
+            'head_position': head,
+            'projections': {
+                name: {
+                    'status': state.status,
+                    'position': state.position,
+                    'lag': max(0, head - state.position),
+                    'events_applied': state.events_applied,
+                    'batches': state.batches,
+                    'errors': state.errors,
+                    'last_error': state.last_error
+                }
+                for name, state in self._projections.items()
+            }
+        }
+
+__all__ = [
+    "CheckpointStore",
+    "FileCheckpointStore",
+    "InMemoryCheckpointStore",
+    "Projection",
+    "ProjectionRunner",
+]
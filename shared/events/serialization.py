@@ -0,0 +1,213 @@
+"""
+Event Serialization
+Compact binary encoding of events (msgpack, or orjson when msgpack is not
+installed), with a registry mapping event types to classes and versioned
+upcasters for payloads written by older code.
+"""
+
+import dataclasses
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+import logging
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .event_system import (
+    AgentCreatedEvent,
+    AgentUpdatedEvent,
+    CallEndedEvent,
+    CallStartedEvent,
+    CampaignStartedEvent,
+    CampaignStoppedEvent,
+    Event,
+    EventPriority
+)
+
+logger = logging.getLogger(__name__)
+
+MSGPACK = "msgpack"
+ORJSON = "orjson"
+JSON = "json"
+
+_EPOCH = datetime(1970, 1, 1)
+_BASE_FIELDS = tuple(f.name for f in dataclasses.fields(Event))
+_PRIORITIES = {priority.value: priority for priority in EventPriority}
+
+Upcaster = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+class EventRegistry:
+    """Maps event_type to its class and current schema version.
+
+    Payloads record the schema version they were written with; on read, the
+    upcasters registered for each older version are applied in turn to bring
+    `data` up to the current shape before the event is built.
+    """
+
+    def __init__(self):
+        self._classes: Dict[str, Type[Event]] = {}
+        self._versions: Dict[str, int] = {}
+        self._extra_fields: Dict[Type[Event], Tuple[str, ...]] = {}
+        self._upcasters: Dict[Tuple[str, int], Upcaster] = {}
+
+    def register(self, event_class: Type[Event], event_type: Optional[str] = None, version: int = 1) -> Type[Event]:
+        """Register a class under its default event_type (or an explicit one)"""
+        event_type = event_type or event_class.__dataclass_fields__['event_type'].default
+        self._classes[event_type] = event_class
+        self._versions[event_type] = version
+        self.extra_fields(event_class)
+        return event_class
+
+    def event(self, event_type: Optional[str] = None, version: int = 1):
+        """Class decorator form of register()"""
+        def decorator(event_class: Type[Event]) -> Type[Event]:
+            return self.register(event_class, event_type, version)
+        return decorator
+
+    def upcaster(self, event_type: str, from_version: int):
+        """Register fn(data) -> data converting `event_type` payloads from `from_version` to the next"""
+        def decorator(fn: Upcaster) -> Upcaster:
+            self._upcasters[(event_type, from_version)] = fn
+            return fn
+        return decorator
+
+    def class_for(self, event_type: str) -> Type[Event]:
+        return self._classes.get(event_type, Event)
+
+    def version_for(self, event_type: str) -> int:
+        return self._versions.get(event_type, 1)
+
+    def extra_fields(self, event_class: Type[Event]) -> Tuple[str, ...]:
+        fields = self._extra_fields.get(event_class)
+        if fields is None:
+            fields = self._extra_fields[event_class] = tuple(
+                f.name for f in dataclasses.fields(event_class) if f.name not in _BASE_FIELDS
+            )
+        return fields
+
+    def upcast(self, event_type: str, version: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Bring a payload written at `version` up to the current schema version"""
+        current = self.version_for(event_type)
+        while version < current:
+            upcaster = self._upcasters.get((event_type, version))
+            if upcaster is None:
+                raise ValueError(f"No upcaster for {event_type} from version {version}")
+            data = upcaster(data)
+            version += 1
+        return data
+
+def _default(value: Any) -> Any:
+    """Fallback for values in data/metadata the encoders do not know"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+class EventSerializer:
+    """Encodes events as one flat array instead of a nested dict.
+
+    Layout: [event_type, schema_version, event_id, aggregate_id, aggregate_type,
+    event_version, timestamp (µs since epoch), data, metadata, priority, extra],
+    where `extra` holds any fields a subclass adds. `data` and `metadata` are
+    handed to the encoder as-is, with no intermediate copy.
+    """
+
+    def __init__(self, registry: Optional["EventRegistry"] = None, format: Optional[str] = None):
+        self.registry = registry or event_registry
+        self.format = format or (MSGPACK if msgpack is not None else ORJSON if orjson is not None else JSON)
+
+        if self.format == MSGPACK:
+            if msgpack is None:
+                raise ImportError("msgpack is required for the msgpack event format")
+            self._encode = lambda value: msgpack.packb(value, default=_default, use_bin_type=True)
+            self._decode = lambda payload: msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        elif self.format == ORJSON:
+            if orjson is None:
+                raise ImportError("orjson is required for the orjson event format")
+            self._encode = lambda value: orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+            self._decode = orjson.loads
+        elif self.format == JSON:
+            self._encode = lambda value: json.dumps(value, default=_default, separators=(",", ":")).encode()
+            self._decode = json.loads
+        else:
+            raise ValueError(f"Unknown event format: {self.format}")
+
+    def dumps(self, event: Event) -> bytes:
+        """Serialize one event"""
+        event_class = type(event)
+        extra = self.registry.extra_fields(event_class) if event_class is not Event else ()
+        timestamp = event.timestamp
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        timestamp -= _EPOCH
+        return self._encode([
+            event.event_type,
+            self.registry.version_for(event.event_type),
+            event.event_id,
+            event.aggregate_id,
+            event.aggregate_type,
+            event.event_version,
+            (timestamp.days * 86400 + timestamp.seconds) * 1_000_000 + timestamp.microseconds,
+            event.data,
+            event.metadata,
+            event.priority.value if isinstance(event.priority, EventPriority) else event.priority,
+            {name: getattr(event, name) for name in extra} if extra else None
+        ])
+
+    def loads(self, payload: bytes) -> Event:
+        """Deserialize one event into its registered class"""
+        (event_type, schema_version, event_id, aggregate_id, aggregate_type,
+         event_version, timestamp, data, metadata, priority, extra) = self._decode(payload)
+
+        registry = self.registry
+        if schema_version < registry.version_for(event_type):
+            data = registry.upcast(event_type, schema_version, data)
+
+        # Fields are already validated; skip the dataclass __init__ and its default factories
+        event = object.__new__(registry.class_for(event_type))
+        fields = event.__dict__
+        fields['event_id'] = event_id
+        fields['event_type'] = event_type
+        fields['aggregate_id'] = aggregate_id
+        fields['aggregate_type'] = aggregate_type
+        fields['event_version'] = event_version
+        fields['timestamp'] = _EPOCH + timedelta(microseconds=timestamp)
+        fields['data'] = data
+        fields['metadata'] = metadata
+        fields['priority'] = _PRIORITIES.get(priority, priority)
+        if extra:
+            fields.update(extra)
+        return event
+
+    def dumps_many(self, events: List[Event]) -> List[bytes]:
+        return [self.dumps(event) for event in events]
+
+    def loads_many(self, payloads: List[bytes]) -> List[Event]:
+        return [self.loads(payload) for payload in payloads]
+
+# Default registry with the shared domain events
+event_registry = EventRegistry()
+for _event_class in (
+    CallStartedEvent, CallEndedEvent,
+    AgentCreatedEvent, AgentUpdatedEvent,
+    CampaignStartedEvent, CampaignStoppedEvent
+):
+    event_registry.register(_event_class)
+
+__all__ = [
+    "JSON",
+    "MSGPACK",
+    "ORJSON",
+    "EventRegistry",
+    "EventSerializer",
+    "event_registry",
+]
@@ -0,0 +1,405 @@
+"""
+Event Storage Backends
+Pluggable persistence for EventStore: an in-memory backend and a durable
+segmented append-only log with an SQLite index. Every read is served from an
+index, so it costs O(events returned) regardless of the size of the history.
+"""
+
+import asyncio
+import heapq
+import json
+import os
+import sqlite3
+import struct
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ConcurrencyError(Exception):
+    """An append expected a different aggregate version than the stored one"""
+
+class RecordedEvent(NamedTuple):
+    """An event with its position in the global, append-ordered stream (1-based)"""
+    position: int
+    event: Any
+
+class EventStoreBackend(ABC):
+    """Storage used by EventStore.
+
+    Events are anything with `aggregate_id`, `event_type` and `event_version`
+    attributes. Appends for one aggregate are atomic and version-checked;
+    positions are assigned in append order and never reused.
+    """
+
+    @abstractmethod
+    async def append(self, aggregate_id: str, events: Sequence[Any], expected_version: int = -1) -> int:
+        """Append events, setting their event_version; returns the position of the last one"""
+
+    @abstractmethod
+    async def read_stream(self, aggregate_id: str, from_version: int = 0) -> List[Any]:
+        """Events of one aggregate with event_version > from_version, in version order"""
+
+    @abstractmethod
+    async def read_all(
+        self,
+        from_position: int = 0,
+        limit: Optional[int] = None,
+        event_types: Optional[Iterable[str]] = None
+    ) -> List[RecordedEvent]:
+        """Events with position > from_position in position order, optionally only some types"""
+
+    @abstractmethod
+    async def head_position(self) -> int:
+        """Position of the last appended event, 0 when empty"""
+
+    @abstractmethod
+    async def save_snapshot(self, aggregate_id: str, version: int, snapshot: Dict[str, Any]) -> None:
+        """Replace the aggregate's snapshot"""
+
+    @abstractmethod
+    async def get_snapshot(self, aggregate_id: str) -> Optional[Dict[str, Any]]:
+        """{'version', 'data', 'timestamp'} of the latest snapshot, or None"""
+
+    async def close(self) -> None:
+        """Release files and connections"""
+
+def _check_version(aggregate_id: str, current_version: int, expected_version: int):
+    if expected_version != -1 and current_version != expected_version:
+        raise ConcurrencyError(
+            f"Concurrency conflict on {aggregate_id}. Expected version {expected_version}, got {current_version}"
+        )
+
+class InMemoryEventStoreBackend(EventStoreBackend):
+    """Process-local backend: per-aggregate lists plus global and per-type position indexes.
+
+    Each operation runs without awaiting, so it is atomic on the event loop and
+    needs no lock.
+    """
+
+    def __init__(self):
+        self._log: List[Any] = []  # position - 1 -> event
+        self._streams: Dict[str, List[Any]] = {}  # version - 1 -> event
+        self._types: Dict[str, List[int]] = {}  # event_type -> ascending positions
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+
+    async def append(self, aggregate_id: str, events: Sequence[Any], expected_version: int = -1) -> int:
+        stream = self._streams.setdefault(aggregate_id, [])
+        _check_version(aggregate_id, len(stream), expected_version)
+
+        for event in events:
+            event.event_version = len(stream) + 1
+            stream.append(event)
+            self._log.append(event)
+            self._types.setdefault(event.event_type, []).append(len(self._log))
+        return len(self._log)
+
+    async def read_stream(self, aggregate_id: str, from_version: int = 0) -> List[Any]:
+        return self._streams.get(aggregate_id, [])[max(0, from_version):]
+
+    async def read_all(
+        self,
+        from_position: int = 0,
+        limit: Optional[int] = None,
+        event_types: Optional[Iterable[str]] = None
+    ) -> List[RecordedEvent]:
+        from_position = max(0, from_position)
+        end = len(self._log) if limit is None else min(len(self._log), from_position + limit)
+
+        if event_types is None:
+            return [RecordedEvent(position, self._log[position - 1]) for position in range(from_position + 1, end + 1)]
+
+        # Merge the per-type position lists from the first position past from_position
+        runs = []
+        for event_type in set(event_types):
+            positions = self._types.get(event_type, [])
+            runs.append(positions[bisect_right(positions, from_position):])
+
+        recorded = []
+        for position in heapq.merge(*runs):
+            if limit is not None and len(recorded) >= limit:
+                break
+            recorded.append(RecordedEvent(position, self._log[position - 1]))
+        return recorded
+
+    async def head_position(self) -> int:
+        return len(self._log)
+
+    async def save_snapshot(self, aggregate_id: str, version: int, snapshot: Dict[str, Any]) -> None:
+        # Stored encoded, as the log backend does, so the snapshot shares no objects with the aggregate
+        self._snapshots[aggregate_id] = {
+            'version': version,
+            'data': json.dumps(snapshot, default=str),
+            'timestamp': datetime.utcnow().isoformat()
+        }
+
+    async def get_snapshot(self, aggregate_id: str) -> Optional[Dict[str, Any]]:
+        snapshot = self._snapshots.get(aggregate_id)
+        if snapshot is None:
+            return None
+        return {**snapshot, 'data': json.loads(snapshot['data'])}
+
+_RECORD_HEADER = struct.Struct(">I")  # Payload length
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    position INTEGER PRIMARY KEY,
+    aggregate_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    event_type TEXT NOT NULL,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS events_by_aggregate ON events (aggregate_id, version);
+CREATE INDEX IF NOT EXISTS events_by_type ON events (event_type, position);
+CREATE TABLE IF NOT EXISTS snapshots (
+    aggregate_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+"""
+
+class SegmentedLogEventStoreBackend(EventStoreBackend):
+    """Durable backend: event payloads in append-only segment files, indexed in SQLite.
+
+    Payloads are length-prefixed records in `segment-NNNNNN.log` files that roll
+    over at `segment_max_bytes`. The SQLite index maps each global position to its
+    aggregate version, event type and (segment, offset, length), so reads are index
+    range scans followed by positioned reads of just the requested records.
+
+    The index commit is the commit point: on open, log bytes past the last indexed
+    record (from a crash between the two writes) are truncated. All file and
+    SQLite work runs on one dedicated thread, which also serializes appends.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        serialize: Callable[[Any], bytes],
+        deserialize: Callable[[bytes], Any],
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        fsync: bool = False
+    ):
+        self.directory = directory
+        self.serialize = serialize
+        self.deserialize = deserialize
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync = fsync
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="event-store")
+        self._db: Optional[sqlite3.Connection] = None
+        self._readers: Dict[int, int] = {}  # segment -> read-only fd
+        self._writer = None
+        self._segment = 1
+        self._segment_size = 0
+        self._head = 0
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:06d}.log")
+
+    def _ensure_open(self):
+        """Open (and recover) on first use, on the store thread"""
+        if self._db is not None:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(f"PRAGMA synchronous={'FULL' if self.fsync else 'NORMAL'}")
+        self._db.executescript(_SCHEMA)
+
+        row = self._db.execute(
+            "SELECT position, segment, offset + length FROM events ORDER BY position DESC LIMIT 1"
+        ).fetchone()
+        self._head, self._segment, self._segment_size = row if row else (0, 1, 0)
+
+        # Drop anything written to the log but never indexed
+        for name in os.listdir(self.directory):
+            if name.startswith("segment-") and name.endswith(".log") and int(name[8:14]) > self._segment:
+                os.remove(os.path.join(self.directory, name))
+        path = self._segment_path(self._segment)
+        if os.path.exists(path) and os.path.getsize(path) > self._segment_size:
+            logger.warning(f"Truncating {os.path.getsize(path) - self._segment_size} unindexed bytes from {path}")
+            os.truncate(path, self._segment_size)
+
+        self._writer = open(path, "ab")
+        logger.info(f"Opened event store at {self.directory} (head position {self._head})")
+
+    def _append_sync(self, aggregate_id: str, events: Sequence[Any], expected_version: int) -> int:
+        self._ensure_open()
+        row = self._db.execute("SELECT MAX(version) FROM events WHERE aggregate_id = ?", (aggregate_id,)).fetchone()
+        current_version = row[0] or 0
+        _check_version(aggregate_id, current_version, expected_version)
+
+        # Serialize the whole batch before touching the log, restoring the events' versions if it fails
+        previous_versions = [event.event_version for event in events]
+        try:
+            payloads = []
+            for i, event in enumerate(events):
+                event.event_version = current_version + i + 1
+                payloads.append(self.serialize(event))
+        except BaseException:
+            for event, version in zip(events, previous_versions):
+                event.event_version = version
+            raise
+
+        start_segment, start_size = self._segment, self._segment_size
+        try:
+            rows = []
+            chunks = []
+            for i, (event, payload) in enumerate(zip(events, payloads)):
+                if self._segment_size > 0 and self._segment_size + _RECORD_HEADER.size + len(payload) > self.segment_max_bytes:
+                    self._flush(chunks)
+                    chunks = []
+                    self._writer.close()
+                    self._segment += 1
+                    self._segment_size = 0
+                    self._writer = open(self._segment_path(self._segment), "ab")
+
+                chunks.append(_RECORD_HEADER.pack(len(payload)))
+                chunks.append(payload)
+                rows.append((
+                    self._head + i + 1, aggregate_id, event.event_version, event.event_type,
+                    self._segment, self._segment_size + _RECORD_HEADER.size, len(payload)
+                ))
+                self._segment_size += _RECORD_HEADER.size + len(payload)
+
+            self._flush(chunks)
+            with self._db:
+                self._db.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        except BaseException:
+            for event, version in zip(events, previous_versions):
+                event.event_version = version
+            self._discard_unindexed(start_segment, start_size)
+            raise
+
+        self._head += len(rows)
+        return self._head
+
+    def _discard_unindexed(self, segment: int, size: int):
+        """Roll the log back to the end of the last indexed record after a failed append"""
+        self._writer.close()
+        while self._segment > segment:
+            path = self._segment_path(self._segment)
+            if os.path.exists(path):
+                os.remove(path)
+            self._segment -= 1
+        os.truncate(self._segment_path(segment), size)
+        self._segment_size = size
+        self._writer = open(self._segment_path(segment), "ab")
+
+    def _flush(self, chunks: List[bytes]):
+        if not chunks:
+            return
+        self._writer.write(b"".join(chunks))
+        self._writer.flush()
+        if self.fsync:
+            os.fsync(self._writer.fileno())
+
+    def _load(self, rows: Iterable[Sequence[int]]) -> List[Any]:
+        """Deserialize the records at (segment, offset, length)"""
+        events = []
+        for segment, offset, length in rows:
+            fd = self._readers.get(segment)
+            if fd is None:
+                fd = self._readers[segment] = os.open(self._segment_path(segment), os.O_RDONLY)
+            events.append(self.deserialize(os.pread(fd, length, offset)))
+        return events
+
+    def _read_stream_sync(self, aggregate_id: str, from_version: int) -> List[Any]:
+        self._ensure_open()
+        rows = self._db.execute(
+            "SELECT segment, offset, length FROM events WHERE aggregate_id = ? AND version > ? ORDER BY version",
+            (aggregate_id, from_version)
+        ).fetchall()
+        return self._load(rows)
+
+    def _read_all_sync(self, from_position: int, limit: Optional[int], event_types: Optional[List[str]]) -> List[RecordedEvent]:
+        self._ensure_open()
+        query = "SELECT position, segment, offset, length FROM events WHERE position > ?"
+        params: List[Any] = [from_position]
+        if event_types is not None:
+            query += f" AND event_type IN ({', '.join('?' * len(event_types))})"
+            params.extend(event_types)
+        query += " ORDER BY position LIMIT ?"
+        params.append(-1 if limit is None else limit)
+
+        rows = self._db.execute(query, params).fetchall()
+        events = self._load(row[1:] for row in rows)
+        return [RecordedEvent(row[0], event) for row, event in zip(rows, events)]
+
+    def _head_sync(self) -> int:
+        self._ensure_open()
+        return self._head
+
+    def _save_snapshot_sync(self, aggregate_id: str, version: int, snapshot: Dict[str, Any]):
+        self._ensure_open()
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)",
+                (aggregate_id, version, json.dumps(snapshot, default=str), datetime.utcnow().isoformat())
+            )
+
+    def _get_snapshot_sync(self, aggregate_id: str) -> Optional[Dict[str, Any]]:
+        self._ensure_open()
+        row = self._db.execute(
+            "SELECT version, data, timestamp FROM snapshots WHERE aggregate_id = ?", (aggregate_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'version': row[0], 'data': json.loads(row[1]), 'timestamp': row[2]}
+
+    def _close_sync(self):
+        for fd in self._readers.values():
+            os.close(fd)
+        self._readers.clear()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    async def append(self, aggregate_id: str, events: Sequence[Any], expected_version: int = -1) -> int:
+        return await self._run(self._append_sync, aggregate_id, events, expected_version)
+
+    async def read_stream(self, aggregate_id: str, from_version: int = 0) -> List[Any]:
+        return await self._run(self._read_stream_sync, aggregate_id, from_version)
+
+    async def read_all(
+        self,
+        from_position: int = 0,
+        limit: Optional[int] = None,
+        event_types: Optional[Iterable[str]] = None
+    ) -> List[RecordedEvent]:
+        types = sorted(set(event_types)) if event_types is not None else None
+        return await self._run(self._read_all_sync, from_position, limit, types)
+
+    async def head_position(self) -> int:
+        return await self._run(self._head_sync)
+
+    async def save_snapshot(self, aggregate_id: str, version: int, snapshot: Dict[str, Any]) -> None:
+        await self._run(self._save_snapshot_sync, aggregate_id, version, snapshot)
+
+    async def get_snapshot(self, aggregate_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self._get_snapshot_sync, aggregate_id)
+
+    async def close(self) -> None:
+        await self._run(self._close_sync)
+        self._executor.shutdown(wait=False)
+
+__all__ = [
+    "ConcurrencyError",
+    "EventStoreBackend",
+    "InMemoryEventStoreBackend",
+    "RecordedEvent",
+    "SegmentedLogEventStoreBackend",
+]
@@ -162,38 +162,13 @@ async def logging_middleware(request: Request, call_next):
 
 # shared/middleware/rate_limiting.py
 from fastapi import Request, HTTPException, status
-from typing import Dict
-import time
-from collections import defaultdict, deque
 
 from core.config import settings
+from shared.ratelimit import SLIDING_WINDOW, LocalRateLimiter, RateLimitRule
 
 
-class RateLimiter:
-    """Simple in-memory rate limiter"""
-    
-    def __init__(self):
-        self.requests = defaultdict(deque)
-    
-    def is_allowed(self, client_id: str, max_requests: int, window_seconds: int) -> bool:
-        """Check if client is within rate limits"""
-        now = time.time()
-        client_requests = self.requests[client_id]
-        
-        # Remove old requests outside the window
-        while client_requests and client_requests[0] <= now - window_seconds:
-            client_requests.popleft()
-        
-        # Check if under limit
-        if len(client_requests) >= max_requests:
-            return False
-        
-        # Add current request
-        client_requests.append(now)
-        return True
-
-
-rate_limiter = RateLimiter()
+# O(1) per check with idle-key eviction, instead of a timestamp deque per client
+rate_limiter = LocalRateLimiter(SLIDING_WINDOW)
 
 
 async def rate_limit_middleware(request: Request, call_next):
@@ -208,15 +183,15 @@ async def rate_limit_middleware(request: Request, call_next):
     client_id = f"{client_ip}:{request.url.path}"
     
     # Check rate limit
-    if not rate_limiter.is_allowed(
+    result = rate_limiter.check(
         client_id,
-        settings.RATE_LIMIT_REQUESTS,
-        settings.RATE_LIMIT_WINDOW
-    ):
+        RateLimitRule(settings.RATE_LIMIT_REQUESTS, settings.RATE_LIMIT_WINDOW)
+    )
+    if not result.allowed:
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Rate limit exceeded. Please try again later.",
-            headers={"Retry-After": str(settings.RATE_LIMIT_WINDOW)}
+            headers=result.headers()
         )
     
     return await call_next(request)
@@ -0,0 +1,379 @@
+"""
+OpenMetrics Exposition
+Counters, gauges and histogram-sketch summaries with label sets rendered once
+at creation, scrape output cached between scrapes, and aggregation of
+snapshots written by every worker process of a multi-worker server.
+"""
+
+import asyncio
+import json
+import math
+import os
+import re
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from .histogram import WindowedHistogram
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+COUNTER = "counter"
+GAUGE = "gauge"
+SUMMARY = "summary"
+
+SUMMARY_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_:]")
+
+def sanitize_name(name: str) -> str:
+    """Metric or label name restricted to the OpenMetrics character set"""
+    name = _INVALID_NAME_CHARS.sub("_", name)
+    return f"_{name}" if name[:1].isdigit() else name
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def render_labels(labels: Iterable[Tuple[str, Any]]) -> str:
+    """`{a="1",b="2"}`, or "" for no labels"""
+    rendered = ",".join(f'{sanitize_name(name)}="{_escape(value)}"' for name, value in labels)
+    return f"{{{rendered}}}" if rendered else ""
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+class MetricChild:
+    """One labelled series of a family; its label string is rendered once"""
+
+    __slots__ = ("labels", "rendered_labels", "value")
+
+    def __init__(self, labels: Tuple[Tuple[str, str], ...]):
+        self.labels = labels
+        self.rendered_labels = render_labels(labels)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+class SummaryChild:
+    """Histogram-sketch series exposed as an OpenMetrics summary"""
+
+    __slots__ = ("labels", "rendered_labels", "histogram")
+
+    def __init__(self, labels: Tuple[Tuple[str, str], ...]):
+        self.labels = labels
+        self.rendered_labels = render_labels(labels)
+        self.histogram = WindowedHistogram()
+
+    def observe(self, value: float):
+        self.histogram.record(value)
+
+class MetricFamily:
+    """All series of one metric name.
+
+    `labels()` returns the child for a label set, creating it on first use;
+    callers on hot paths keep the child and call it directly. Children are
+    also cached by the label items as given, so repeated calls with the same
+    dict shape skip sorting and rendering.
+    """
+
+    def __init__(self, name: str, metric_type: str, help_text: str = "",
+                 multiprocess_mode: str = "sum", window: str = "1m"):
+        if metric_type == COUNTER and name.endswith("_total"):
+            name = name[:-len("_total")]
+        self.name = sanitize_name(name)
+        self.metric_type = metric_type
+        self.help_text = help_text
+        self.multiprocess_mode = multiprocess_mode  # Gauges: sum, max, min or all (per-pid series)
+        self.window = window  # Summaries: window the quantiles cover
+        self.children: Dict[Tuple[Tuple[str, str], ...], Any] = {}
+        self._by_items: Dict[Tuple[Tuple[str, Any], ...], Any] = {}
+
+    def labels(self, labels: Optional[Dict[str, Any]] = None, **kwargs):
+        """Child series for a label set"""
+        if kwargs:
+            labels = {**(labels or {}), **kwargs}
+        items = tuple(labels.items()) if labels else ()
+        child = self._by_items.get(items)
+        if child is None:
+            key = tuple(sorted((name, str(value)) for name, value in items))
+            child = self.children.get(key)
+            if child is None:
+                child = self.children[key] = (SummaryChild if self.metric_type == SUMMARY else MetricChild)(key)
+            self._by_items[items] = child
+        return child
+
+    def render(self, out: List[str]):
+        out.append(f"# TYPE {self.name} {self.metric_type}\n")
+        if self.help_text:
+            out.append(f"# HELP {self.name} {_escape(self.help_text)}\n")
+
+        if self.metric_type == COUNTER:
+            for child in self.children.values():
+                out.append(f"{self.name}_total{child.rendered_labels} {_format_value(child.value)}\n")
+        elif self.metric_type == GAUGE:
+            for child in self.children.values():
+                out.append(f"{self.name}{child.rendered_labels} {_format_value(child.value)}\n")
+        else:
+            for child in self.children.values():
+                _render_summary(out, self.name, child.labels, child.histogram, self.window)
+
+def _render_summary(out: List[str], name: str, labels: Tuple[Tuple[str, str], ...],
+                    histogram: WindowedHistogram, window: str):
+    total = histogram.total
+    sketch = histogram.window(window) if window in histogram.windows else total
+    for q, value in sketch.quantiles(SUMMARY_QUANTILES).items():
+        rendered = render_labels(labels + (("quantile", q),))
+        out.append(f"{name}{rendered} {_format_value(value if value is not None else math.nan)}\n")
+    rendered = render_labels(labels)
+    out.append(f"{name}_count{rendered} {total.count}\n")
+    out.append(f"{name}_sum{rendered} {_format_value(total.sum)}\n")
+
+class MetricsRegistry:
+    """Metric families plus any MetricsCollectors to expose, rendered as OpenMetrics text.
+
+    Rendering walks pre-rendered label strings, and the encoded output is
+    reused for `cache_ttl` seconds so concurrent or frequent scrapes cost one
+    render.
+    """
+
+    def __init__(self, cache_ttl: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.families: Dict[str, MetricFamily] = {}
+        self.collectors: List[Any] = []
+        self._mirrored: Dict[str, MetricFamily] = {}  # Families mirroring the collectors, kept across scrapes
+        self.cache_ttl = cache_ttl
+        self.clock = clock
+        self._cached: Optional[bytes] = None
+        self._cached_at = -math.inf
+        self.multiprocess: Optional["MultiprocessAggregator"] = None
+
+    def _family(self, name: str, metric_type: str, help_text: str, **options) -> MetricFamily:
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = MetricFamily(name, metric_type, help_text, **options)
+        elif family.metric_type != metric_type:
+            raise ValueError(f"Metric {name} is already registered as a {family.metric_type}")
+        return family
+
+    def counter(self, name: str, help_text: str = "") -> MetricFamily:
+        return self._family(name, COUNTER, help_text)
+
+    def gauge(self, name: str, help_text: str = "", multiprocess_mode: str = "sum") -> MetricFamily:
+        return self._family(name, GAUGE, help_text, multiprocess_mode=multiprocess_mode)
+
+    def summary(self, name: str, help_text: str = "", window: str = "1m") -> MetricFamily:
+        """Histogram-sketch family, exposed with quantiles over `window`"""
+        return self._family(name, SUMMARY, help_text, window=window)
+
+    def add_collector(self, collector) -> None:
+        """Also expose a shared.monitoring MetricsCollector's counters, gauges and histograms"""
+        self.collectors.append(collector)
+
+    def _collector_families(self) -> Dict[str, MetricFamily]:
+        """Families mirroring the registered MetricsCollectors"""
+        families = self._mirrored
+        for collector in self.collectors:
+            for metric_type, values in ((COUNTER, collector._counters), (GAUGE, collector._gauges)):
+                for key, value in values.items():
+                    metric = collector.metrics[key]
+                    family = families.get(metric.name)
+                    if family is None:
+                        family = families[metric.name] = MetricFamily(metric.name, metric_type, metric.help_text)
+                    family.labels(metric.labels).value = value
+            for key, histogram in collector._histograms.items():
+                name, labels = collector._histogram_series[key]
+                family = families.get(name)
+                if family is None:
+                    family = families[name] = MetricFamily(name, SUMMARY)
+                family.labels(labels).histogram = histogram
+        return families
+
+    def snapshot(self) -> Dict[str, Any]:
+        """This process's state in a JSON-serializable, mergeable form"""
+        families = {**self._collector_families(), **self.families}
+        snapshot = {}
+        for family in families.values():
+            samples = []
+            for child in family.children.values():
+                value = child.histogram.to_dict() if family.metric_type == SUMMARY else child.value
+                samples.append([list(map(list, child.labels)), value])
+            snapshot[family.name] = {
+                "type": family.metric_type,
+                "help": family.help_text,
+                "mode": family.multiprocess_mode,
+                "window": family.window,
+                "samples": samples
+            }
+        return snapshot
+
+    def render(self) -> bytes:
+        """OpenMetrics text for a scrape, served from cache while fresh"""
+        now = self.clock()
+        if self._cached is not None and now - self._cached_at < self.cache_ttl:
+            return self._cached
+
+        if self.multiprocess is not None:
+            families = self.multiprocess.collect()
+        else:
+            families = {**self._collector_families(), **self.families}
+
+        out: List[str] = []
+        for family in families.values():
+            if family.children:
+                family.render(out)
+        out.append("# EOF\n")
+
+        self._cached = "".join(out).encode()
+        self._cached_at = now
+        return self._cached
+
+class MultiprocessAggregator:
+    """Aggregates metrics across the worker processes of one server.
+
+    Every worker periodically writes its registry snapshot to
+    `<directory>/metrics-<pid>-<id>.json` (atomically replaced, and unique per
+    process start so a reused pid never overwrites an exited worker's file);
+    whichever worker serves a scrape merges all files. Counters and summary
+    totals are summed across workers, including workers that have exited, so
+    totals never go backwards; summary windows only take each snapshot's
+    observations that still fall inside them. Gauges follow their family's
+    multiprocess_mode and ignore snapshots older than `stale_after` seconds.
+    Empty the directory when the server is redeployed.
+    """
+
+    def __init__(self, directory: str, registry: MetricsRegistry, flush_interval: float = 5.0,
+                 stale_after: Optional[float] = None):
+        self.directory = directory
+        self.registry = registry
+        self.flush_interval = flush_interval
+        self.stale_after = stale_after if stale_after is not None else flush_interval * 3
+        self.pid = None
+        self.instance = None
+        self._task: Optional[asyncio.Task] = None
+        os.makedirs(directory, exist_ok=True)
+        registry.multiprocess = self
+
+    def _identify(self):
+        # Checked on every use: a worker forked after construction needs its own file
+        pid = os.getpid()
+        if pid != self.pid:
+            self.pid = pid
+            self.instance = f"{pid}-{uuid.uuid4().hex[:12]}"
+
+    @property
+    def path(self) -> str:
+        self._identify()
+        return os.path.join(self.directory, f"metrics-{self.instance}.json")
+
+    def write_snapshot(self):
+        """Publish this worker's current state"""
+        path = self.path
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "pid": self.pid,
+                "instance": self.instance,
+                "written_at": time.time(),
+                "families": self.registry.snapshot()
+            }, f)
+        os.replace(tmp_path, path)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.write_snapshot()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                logger.error(f"Error writing metrics snapshot: {str(e)}")
+
+    def _read_snapshots(self) -> List[Dict[str, Any]]:
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not (name.startswith("metrics-") and name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable metrics snapshot {name}: {str(e)}")
+        return snapshots
+
+    def collect(self) -> Dict[str, MetricFamily]:
+        """Merged families of every worker, this one's taken live"""
+        self.write_snapshot()
+        now = time.time()
+        merged: Dict[str, MetricFamily] = {}
+        gauge_values: Dict[Tuple[str, tuple], List[Tuple[int, float]]] = {}
+
+        for snapshot in self._read_snapshots():
+            pid = snapshot["pid"]
+            own = snapshot.get("instance") == self.instance
+            age = 0.0 if own else max(0.0, now - snapshot["written_at"])
+            fresh = own or age <= self.stale_after
+            for name, data in snapshot["families"].items():
+                family = merged.get(name)
+                if family is None:
+                    family = merged[name] = MetricFamily(
+                        name, data["type"], data["help"], multiprocess_mode=data["mode"], window=data["window"]
+                    )
+                for labels, value in data["samples"]:
+                    labels = tuple(tuple(item) for item in labels)
+                    if data["type"] == COUNTER:
+                        family.labels(dict(labels)).inc(value)
+                    elif data["type"] == SUMMARY:
+                        # Slots move back by the snapshot's age, so an exited worker ages out of the windows
+                        family.labels(dict(labels)).histogram.merge(WindowedHistogram.from_dict(value, age=age))
+                    elif fresh:
+                        gauge_values.setdefault((name, labels), []).append((pid, value))
+
+        for (name, labels), values in gauge_values.items():
+            family = merged[name]
+            mode = family.multiprocess_mode
+            if mode == "all":
+                for pid, value in values:
+                    family.labels({**dict(labels), "pid": pid}).set(value)
+            elif mode == "max":
+                family.labels(dict(labels)).set(max(value for _, value in values))
+            elif mode == "min":
+                family.labels(dict(labels)).set(min(value for _, value in values))
+            else:
+                family.labels(dict(labels)).set(sum(value for _, value in values))
+        return merged
+
+__all__ = [
+    "CONTENT_TYPE",
+    "MetricFamily",
+    "MetricsRegistry",
+    "MultiprocessAggregator",
+    "render_labels",
+    "sanitize_name",
+]
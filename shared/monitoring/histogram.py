@@ -0,0 +1,218 @@
+"""
+Fixed-Memory Histograms
+Log-bucketed (HDR-style) histogram sketches with bounded relative error,
+O(1) recording, time-windowed rotation and lossless merging across workers.
+"""
+
+import math
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+class HistogramSketch:
+    """Histogram whose quantiles are within `relative_accuracy` of the true value.
+
+    A value v > 0 lands in bucket ceil(log(v) / log(gamma)) with
+    gamma = (1 + a) / (1 - a), so every bucket spans a constant ratio and any
+    value in it is within a (1% by default) of the bucket's representative
+    value. Values are clamped to [min_value, max_value], which bounds the
+    number of buckets (about 1,200 at 1% between 1e-3 and 1e7) regardless of
+    how many samples are recorded. Buckets are stored sparsely, so typical
+    latency distributions only use a few dozen of them.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-3, max_value: float = 1e7):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0  # Values at or below min_value
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def record(self, value: float, count: int = 1):
+        """Add `count` observations of `value`"""
+        self.count += count
+        self.sum += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+        if value <= self.min_value:
+            self.zero_count += count
+            return
+        index = math.ceil(math.log(min(value, self.max_value)) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def _value_at(self, index: int) -> float:
+        """Representative value of a bucket, equidistant in relative terms from both edges"""
+        return 2 * self._gamma ** index / (1 + self._gamma)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile (0 <= q <= 1), or None when empty"""
+        return self.quantiles([q])[q]
+
+    def quantiles(self, qs: Iterable[float]) -> Dict[float, Optional[float]]:
+        """Several quantiles in one pass over the buckets"""
+        qs = sorted(qs)
+        if self.count == 0:
+            return {q: None for q in qs}
+
+        results: Dict[float, Optional[float]] = {}
+        pending = [(q, q * (self.count - 1)) for q in qs]
+        while pending and pending[0][1] < self.zero_count:
+            results[pending.pop(0)[0]] = max(self.min, 0.0)
+
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            while pending and seen > pending[0][1]:
+                results[pending.pop(0)[0]] = min(max(self._value_at(index), self.min), self.max)
+            if not pending:
+                break
+        for q, _ in pending:
+            results[q] = self.max
+        return results
+
+    def merge(self, other: "HistogramSketch"):
+        """Add another sketch's observations (both must use the same accuracy)"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge histograms with different relative accuracy")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def clear(self):
+        self.buckets.clear()
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def copy(self) -> "HistogramSketch":
+        sketch = HistogramSketch(self.relative_accuracy, self.min_value, self.max_value)
+        sketch.merge(self)
+        return sketch
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact form for shipping to another worker"""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            "buckets": {str(index): count for index, count in self.buckets.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HistogramSketch":
+        sketch = cls(data["relative_accuracy"], data["min_value"], data["max_value"])
+        sketch.buckets = {int(index): count for index, count in data["buckets"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if sketch.count:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
+
+class WindowedHistogram:
+    """A cumulative sketch plus a ring of per-slot sketches for recent windows.
+
+    Observations go to the cumulative sketch and to the current slot
+    (`slot_seconds` wide). A window such as the last minute is the merge of the
+    slots it covers; slots older than the longest window are cleared and reused
+    as time advances, so memory stays fixed.
+    """
+
+    def __init__(
+        self,
+        windows: Dict[str, float] = None,
+        slot_seconds: float = 10.0,
+        relative_accuracy: float = 0.01,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.windows = windows or {"1m": 60.0, "5m": 300.0}
+        self.slot_seconds = slot_seconds
+        self.clock = clock
+        self.total = HistogramSketch(relative_accuracy)
+        num_slots = max(1, math.ceil(max(self.windows.values()) / slot_seconds))
+        self._slots: List[HistogramSketch] = [HistogramSketch(relative_accuracy) for _ in range(num_slots)]
+        self._slot = int(clock() // slot_seconds)
+
+    def _rotate(self) -> HistogramSketch:
+        """Advance to the current slot, clearing any slots skipped while idle"""
+        slot = int(self.clock() // self.slot_seconds)
+        if slot != self._slot:
+            for skipped in range(self._slot + 1, min(slot, self._slot + len(self._slots)) + 1):
+                self._slots[skipped % len(self._slots)].clear()
+            self._slot = slot
+        return self._slots[slot % len(self._slots)]
+
+    def record(self, value: float):
+        self.total.record(value)
+        self._rotate().record(value)
+
+    def window(self, name: str) -> HistogramSketch:
+        """Merged sketch of the named window (the current, partial slot included)"""
+        self._rotate()
+        slots = min(len(self._slots), max(1, math.ceil(self.windows[name] / self.slot_seconds)))
+        merged = HistogramSketch(self.total.relative_accuracy)
+        for offset in range(slots):
+            merged.merge(self._slots[(self._slot - offset) % len(self._slots)])
+        return merged
+
+    def merge(self, other: "WindowedHistogram"):
+        """Merge another worker's histogram, aligning slots by age"""
+        self._rotate()
+        other._rotate()
+        self.total.merge(other.total)
+        for offset in range(min(len(self._slots), len(other._slots))):
+            self._slots[(self._slot - offset) % len(self._slots)].merge(
+                other._slots[(other._slot - offset) % len(other._slots)]
+            )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Export for another worker: the cumulative sketch and the slots, newest first"""
+        self._rotate()
+        return {
+            "windows": self.windows,
+            "slot_seconds": self.slot_seconds,
+            "total": self.total.to_dict(),
+            "slots": [
+                self._slots[(self._slot - offset) % len(self._slots)].to_dict()
+                for offset in range(len(self._slots))
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], clock: Callable[[], float] = time.monotonic,
+                  age: float = 0.0) -> "WindowedHistogram":
+        """Rebuild a histogram exported `age` seconds ago; its newest slot lands that far
+        behind the current one, and slots pushed past the longest window are dropped"""
+        total = HistogramSketch.from_dict(data["total"])
+        histogram = cls(data["windows"], data["slot_seconds"], total.relative_accuracy, clock)
+        histogram.total = total
+        shift = int(age // histogram.slot_seconds)
+        for offset, slot in enumerate(data["slots"][:max(0, len(histogram._slots) - shift)]):
+            index = (histogram._slot - offset - shift) % len(histogram._slots)
+            histogram._slots[index] = HistogramSketch.from_dict(slot)
+        return histogram
+
+__all__ = [
+    "HistogramSketch",
+    "WindowedHistogram",
+]
@@ -15,9 +15,14 @@ from enum import Enum
 import uuid
 import structlog
 from functools import wraps
+from random import random
 import psutil
 import aiohttp
 
+from .histogram import WindowedHistogram
+from .tracing import DistributedTracer, TraceSpan, exporter_from_env
+from .profiler import AsyncStackProfiler
+
 class LogLevel(str, Enum):
     DEBUG = "debug"
     INFO = "info"
@@ -31,22 +36,6 @@ class MetricType(str, Enum):
     HISTOGRAM = "histogram"
     SUMMARY = "summary"
 
-@dataclass
-class TraceSpan:
-    """Distributed tracing span"""
-    trace_id: str
-    span_id: str
-    parent_span_id: Optional[str]
-    operation_name: str
-    service_name: str
-    start_time: datetime
-    end_time: Optional[datetime] = None
-    duration_ms: Optional[float] = None
-    tags: Dict[str, Any] = field(default_factory=dict)
-    logs: List[Dict[str, Any]] = field(default_factory=list)
-    status: str = "ok"
-    error: Optional[str] = None
-
 @dataclass
 class Metric:
     """System metric"""
@@ -143,7 +132,8 @@ class MetricsCollector:
         self.metrics: Dict[str, Metric] = {}
         self._counters: Dict[str, float] = {}
         self._gauges: Dict[str, float] = {}
-        self._histograms: Dict[str, List[float]] = {}
+        self._histograms: Dict[str, WindowedHistogram] = {}
+        self._histogram_series: Dict[str, tuple] = {}  # key -> (name, labels)
         
     def counter(self, name: str, value: float = 1.0, labels: Dict[str, str] = None):
         """Increment counter metric"""
@@ -174,45 +164,64 @@ class MetricsCollector:
         )
     
     def histogram(self, name: str, value: float, labels: Dict[str, str] = None):
-        """Add value to histogram"""
+        """Add value to histogram (O(1); percentiles are computed when metrics are read)"""
         labels = labels or {}
         key = f"{name}:{self._labels_to_string(labels)}"
         
-        if key not in self._histograms:
-            self._histograms[key] = []
-        
-        self._histograms[key].append(value)
-        
-        # Calculate percentiles
-        values = sorted(self._histograms[key])
-        count = len(values)
-        
-        self.metrics[f"{key}_count"] = Metric(
-            name=f"{name}_count",
-            value=count,
-            metric_type=MetricType.COUNTER,
-            labels=labels
-        )
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = WindowedHistogram()
+            self._histogram_series[key] = (name, labels)
         
-        if count > 0:
-            self.metrics[f"{key}_sum"] = Metric(
-                name=f"{name}_sum",
-                value=sum(values),
-                metric_type=MetricType.COUNTER,
-                labels=labels
-            )
+        histogram.record(value)
+    
+    def get_histogram(self, name: str, labels: Dict[str, str] = None) -> Optional[WindowedHistogram]:
+        """Get the sketch behind a histogram series"""
+        return self._histograms.get(f"{name}:{self._labels_to_string(labels or {})}")
+    
+    def export_histograms(self) -> Dict[str, Dict[str, Any]]:
+        """Histogram sketches in a form another worker can merge"""
+        return {
+            key: {'name': name, 'labels': labels, 'histogram': self._histograms[key].to_dict()}
+            for key, (name, labels) in self._histogram_series.items()
+        }
+    
+    def merge_histograms(self, exported: Dict[str, Dict[str, Any]]):
+        """Merge histograms exported by another worker into this collector"""
+        for key, series in exported.items():
+            other = WindowedHistogram.from_dict(series['histogram'])
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                self._histograms[key] = other
+                self._histogram_series[key] = (series['name'], series['labels'])
+            else:
+                histogram.merge(other)
+    
+    def _histogram_metrics(self) -> List[Metric]:
+        """Count, sum and percentiles per histogram: cumulative, and per recent window"""
+        metrics = []
+        quantiles = (0.5, 0.9, 0.95, 0.99)
+        for key, histogram in self._histograms.items():
+            name, labels = self._histogram_series[key]
+            total = histogram.total
+            if total.count == 0:
+                continue
             
-            # Percentiles
-            for p in [50, 90, 95, 99]:
-                idx = int((p / 100) * count) - 1
-                idx = max(0, min(idx, count - 1))
-                
-                self.metrics[f"{key}_p{p}"] = Metric(
-                    name=f"{name}_p{p}",
-                    value=values[idx],
-                    metric_type=MetricType.GAUGE,
-                    labels=labels
-                )
+            metrics.append(Metric(name=f"{name}_count", value=total.count, metric_type=MetricType.COUNTER, labels=labels))
+            metrics.append(Metric(name=f"{name}_sum", value=total.sum, metric_type=MetricType.COUNTER, labels=labels))
+            for q, value in total.quantiles(quantiles).items():
+                metrics.append(Metric(name=f"{name}_p{int(q * 100)}", value=value, metric_type=MetricType.GAUGE, labels=labels))
+            
+            for window in histogram.windows:
+                sketch = histogram.window(window)
+                if sketch.count == 0:
+                    continue
+                window_labels = {**labels, 'window': window}
+                for q, value in sketch.quantiles(quantiles).items():
+                    metrics.append(Metric(
+                        name=f"{name}_p{int(q * 100)}", value=value, metric_type=MetricType.GAUGE, labels=window_labels
+                    ))
+        return metrics
     
     def timing(self, name: str, duration_ms: float, labels: Dict[str, str] = None):
         """Record timing metric"""
@@ -224,7 +233,7 @@ class MetricsCollector:
     
     def get_metrics(self) -> List[Metric]:
         """Get all current metrics"""
-        return list(self.metrics.values())
+        return list(self.metrics.values()) + self._histogram_metrics()
     
     def reset_metrics(self):
         """Reset all metrics"""
@@ -232,96 +241,7 @@ class MetricsCollector:
         self._counters.clear()
         self._gauges.clear()
         self._histograms.clear()
-
-class DistributedTracer:
-    """Distributed tracing implementation"""
-    
-    def __init__(self, service_name: str):
-        self.service_name = service_name
-        self.spans: Dict[str, TraceSpan] = {}
-        self.active_spans: List[str] = []
-    
-    def start_span(
-        self,
-        operation_name: str,
-        parent_span_id: Optional[str] = None,
-        tags: Dict[str, Any] = None
-    ) -> TraceSpan:
-        """Start a new trace span"""
-        # Generate IDs
-        if not parent_span_id and not self.active_spans:
-            trace_id = str(uuid.uuid4())
-        else:
-            # Use trace ID from parent or current active span
-            parent_id = parent_span_id or (self.active_spans[-1] if self.active_spans else None)
-            if parent_id and parent_id in self.spans:
-                trace_id = self.spans[parent_id].trace_id
-            else:
-                trace_id = str(uuid.uuid4())
-        
-        span_id = str(uuid.uuid4())
-        
-        span = TraceSpan(
-            trace_id=trace_id,
-            span_id=span_id,
-            parent_span_id=parent_span_id,
-            operation_name=operation_name,
-            service_name=self.service_name,
-            start_time=datetime.utcnow(),
-            tags=tags or {}
-        )
-        
-        self.spans[span_id] = span
-        self.active_spans.append(span_id)
-        
-        return span
-    
-    def finish_span(self, span_id: str, error: Optional[str] = None):
-        """Finish a trace span"""
-        if span_id not in self.spans:
-            return
-        
-        span = self.spans[span_id]
-        span.end_time = datetime.utcnow()
-        span.duration_ms = (span.end_time - span.start_time).total_seconds() * 1000
-        
-        if error:
-            span.status = "error"
-            span.error = error
-        
-        # Remove from active spans
-        if span_id in self.active_spans:
-            self.active_spans.remove(span_id)
-    
-    def add_span_log(self, span_id: str, message: str, **kwargs):
-        """Add log to span"""
-        if span_id in self.spans:
-            self.spans[span_id].logs.append({
-                "timestamp": datetime.utcnow().isoformat(),
-                "message": message,
-                **kwargs
-            })
-    
-    def add_span_tag(self, span_id: str, key: str, value: Any):
-        """Add tag to span"""
-        if span_id in self.spans:
-            self.spans[span_id].tags[key] = value
-    
-    @asynccontextmanager
-    async def trace(self, operation_name: str, **tags):
-        """Context manager for tracing"""
-        span = self.start_span(operation_name, tags=tags)
-        try:
-            yield span
-        except Exception as e:
-            self.finish_span(span.span_id, error=str(e))
-            raise
-        else:
-            self.finish_span(span.span_id)
-    
-    def get_trace(self, trace_id: str) -> List[TraceSpan]:
-        """Get all spans for a trace"""
-        return [span for span in self.spans.values() if span.trace_id == trace_id]
+        self._histogram_series.clear()
 
 class SystemMonitor:
     """System resource monitoring"""
@@ -366,13 +286,28 @@ class ObservabilityManager:
         self.service_name = service_name
         self.logger = StructuredLogger(service_name)
         self.metrics = MetricsCollector(service_name)
-        self.tracer = DistributedTracer(service_name)
+        self.tracer = DistributedTracer(service_name, exporter=exporter_from_env())
         self.monitor = SystemMonitor(service_name)
+        self.profiler: Optional[AsyncStackProfiler] = None
         
         # Background tasks
         self._monitoring_task = None
         self._is_monitoring = False
     
+    def start_profiling(self, interval: float = 0.01, task_every: int = 10) -> AsyncStackProfiler:
+        """Start sampling the running event loop's stacks (see AsyncStackProfiler)"""
+        if self.profiler is None or not self.profiler.running:
+            self.profiler = AsyncStackProfiler(interval=interval, task_every=task_every)
+            self.profiler.start()
+        return self.profiler
+    
+    def stop_profiling(self) -> str:
+        """Stop the profiler and return its stacks in collapsed (flame graph) format"""
+        if self.profiler is None:
+            return ""
+        self.profiler.stop()
+        return self.profiler.collapsed()
+    
     async def start_monitoring(self, interval: int = 60):
         """Start background monitoring"""
         self._is_monitoring = True
@@ -387,6 +322,7 @@ class ObservabilityManager:
                 await self._monitoring_task
             except asyncio.CancelledError:
                 pass
+        await self.tracer.shutdown()
     
     async def _monitoring_loop(self, interval: int):
         """Background monitoring loop"""
@@ -435,54 +371,135 @@ class ObservabilityManager:
             "active_spans": len(self.tracer.active_spans)
         }
 
+# Per-operation sampling for observe_function
+_default_sample_rate = 1.0
+_configured_sample_rates: Dict[str, float] = {}
+_samplers: Dict[str, "OperationSampler"] = {}
+
+class OperationSampler:
+    """Sampling decision state shared by every function instrumented as one operation"""
+    
+    __slots__ = ("operation", "decorator_rate", "rate", "weight")
+    
+    def __init__(self, operation: str, decorator_rate: Optional[float] = None):
+        self.operation = operation
+        self.decorator_rate = decorator_rate
+        self.refresh()
+    
+    def refresh(self):
+        """Resolve the rate: configure_sampling() override, then the decorator's, then the default"""
+        rate = _configured_sample_rates.get(self.operation, self.decorator_rate)
+        self.rate = min(max(_default_sample_rate if rate is None else rate, 0.0), 1.0)
+        # Each sampled success stands in for 1/rate calls, so counters stay unbiased
+        self.weight = 1.0 / self.rate if self.rate > 0 else 0.0
+
+def configure_sampling(default_rate: Optional[float] = None, rates: Optional[Dict[str, float]] = None):
+    """Set the default sampling rate and/or per-operation rates for observe_function"""
+    global _default_sample_rate
+    if default_rate is not None:
+        _default_sample_rate = default_rate
+    if rates:
+        _configured_sample_rates.update(rates)
+    for sampler in _samplers.values():
+        sampler.refresh()
+
+def get_sampler(operation_name: str, sample_rate: Optional[float] = None) -> OperationSampler:
+    sampler = _samplers.get(operation_name)
+    if sampler is None:
+        sampler = _samplers[operation_name] = OperationSampler(operation_name, sample_rate)
+    elif sample_rate is not None:
+        sampler.decorator_rate = sample_rate
+        sampler.refresh()
+    return sampler
+
 # Decorators for observability
-def observe_function(operation_name: str = None):
-    """Decorator to add observability to functions"""
+def observe_function(
+    operation_name: str = None,
+    sample_rate: Optional[float] = None,
+    labels: Any = None,
+    service_name: str = "unknown_service"
+):
+    """Decorator to add observability to functions.
+    
+    Only a sampled fraction of calls (`sample_rate`, default 1.0) opens a span
+    and records timing; the rest go straight to the function after a single
+    random draw, allocating nothing. Success counts are scaled by 1/rate.
+    Errors are counted and logged on every call. `labels` may be a dict or a
+    callable (args, kwargs) -> dict that only runs for calls that record.
+    """
     def decorator(func):
         op_name = operation_name or f"{func.__module__}.{func.__name__}"
+        sampler = get_sampler(op_name, sample_rate)
+        success_metric = f"{op_name}_success"
+        error_metric = f"{op_name}_error"
+        
+        def resolve(wrapper) -> ObservabilityManager:
+            # Get observability manager from the wrapper, else the service's shared one
+            obs = getattr(wrapper, '_observability', None)
+            if not obs:
+                obs = wrapper._observability = get_observability(service_name)
+            return obs
+        
+        def build_labels(args, kwargs) -> Optional[Dict[str, str]]:
+            return labels(args, kwargs) if callable(labels) else labels
+        
+        def record_error(wrapper, e: Exception, args, kwargs, call_labels=None):
+            obs = resolve(wrapper)
+            if call_labels is None:
+                call_labels = build_labels(args, kwargs)
+            obs.metrics.counter(error_metric, labels=call_labels)
+            obs.logger.error(f"Error in {op_name}", error=str(e))
         
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
-            # Get observability manager from context or create new one
-            obs = getattr(async_wrapper, '_observability', None)
-            if not obs:
-                obs = ObservabilityManager("unknown_service")
+            # Fast path: unsampled calls only pay for the draw
+            if random() >= sampler.rate:
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    record_error(async_wrapper, e, args, kwargs)
+                    raise
             
-            async with obs.tracer.trace(op_name) as span:
-                start_time = time.time()
+            obs = resolve(async_wrapper)
+            call_labels = build_labels(args, kwargs)
+            async with obs.tracer.trace(op_name, **(call_labels or {})):
+                start_time = time.perf_counter()
                 
                 try:
                     result = await func(*args, **kwargs)
-                    obs.metrics.counter(f"{op_name}_success")
+                    obs.metrics.counter(success_metric, sampler.weight, call_labels)
                     return result
                 except Exception as e:
-                    obs.metrics.counter(f"{op_name}_error")
-                    obs.logger.error(f"Error in {op_name}", error=str(e))
+                    record_error(async_wrapper, e, args, kwargs, call_labels)
                     raise
                 finally:
-                    duration_ms = (time.time() - start_time) * 1000
-                    obs.metrics.timing(op_name, duration_ms)
+                    duration_ms = (time.perf_counter() - start_time) * 1000
+                    obs.metrics.timing(op_name, duration_ms, call_labels)
         
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
             # For sync functions, just add metrics
-            obs = getattr(sync_wrapper, '_observability', None)
-            if not obs:
-                obs = ObservabilityManager("unknown_service")
+            if random() >= sampler.rate:
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    record_error(sync_wrapper, e, args, kwargs)
+                    raise
             
-            start_time = time.time()
+            obs = resolve(sync_wrapper)
+            call_labels = build_labels(args, kwargs)
+            start_time = time.perf_counter()
             
             try:
                 result = func(*args, **kwargs)
-                obs.metrics.counter(f"{op_name}_success")
+                obs.metrics.counter(success_metric, sampler.weight, call_labels)
                 return result
             except Exception as e:
-                obs.metrics.counter(f"{op_name}_error")
-                obs.logger.error(f"Error in {op_name}", error=str(e))
+                record_error(sync_wrapper, e, args, kwargs, call_labels)
                 raise
             finally:
-                duration_ms = (time.time() - start_time) * 1000
-                obs.metrics.timing(op_name, duration_ms)
+                duration_ms = (time.perf_counter() - start_time) * 1000
+                obs.metrics.timing(op_name, duration_ms, call_labels)
         
         if asyncio.iscoroutinefunction(func):
             return async_wrapper
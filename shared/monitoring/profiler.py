@@ -0,0 +1,155 @@
+"""
+Async Stack Profiler
+Statistical profiler for an asyncio event loop: periodically samples what the
+loop thread is executing and where every pending task is suspended, and
+aggregates the stacks in collapsed form for flame graphs.
+"""
+
+import asyncio
+import sys
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{frame.f_lineno})"
+
+def _thread_stack(frame, max_depth: int) -> List[str]:
+    """Frames from the outermost caller to `frame`"""
+    stack = []
+    while frame is not None and len(stack) < max_depth:
+        stack.append(_frame_name(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+def _task_stack(task: asyncio.Task, max_depth: int) -> List[str]:
+    """Frames of a suspended task, following its chain of awaited coroutines"""
+    stack = []
+    awaitable = task.get_coro()
+    while awaitable is not None and len(stack) < max_depth:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            break
+        stack.append(_frame_name(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return stack
+
+class AsyncStackProfiler:
+    """Samples an event loop every `interval` seconds from a background thread.
+
+    Two kinds of stacks are counted, each prefixed with a root frame so they
+    can share one flame graph:
+
+    - "loop": the loop thread's current Python stack (on-CPU time, including
+      callbacks and synchronous code that blocks the loop)
+    - "tasks": each pending task's await chain (where coroutines spend their
+      time waiting); these are taken on the loop thread between callbacks, at
+      every `task_every`-th sample, since task state is not thread-safe
+
+    Sampling is statistical: overhead is bounded by the interval, not by how
+    much code runs.
+    """
+
+    def __init__(self, interval: float = 0.01, task_every: int = 10, max_depth: int = 64):
+        self.interval = interval
+        self.task_every = task_every
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.task_samples = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Start sampling the given loop (by default the running one, from its thread)"""
+        if self._thread is not None:
+            return
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="async-stack-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling; collected stacks are kept"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        tick = 0
+        while not self._stopping.wait(self.interval):
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                stack = ["loop"] + _thread_stack(frame, self.max_depth)
+                with self._lock:
+                    self.stacks[";".join(stack)] += 1
+                    self.samples += 1
+
+            tick += 1
+            if self.task_every and tick % self.task_every == 0:
+                try:
+                    self._loop.call_soon_threadsafe(self._sample_tasks)
+                except RuntimeError:
+                    break  # Loop closed
+
+    def _sample_tasks(self):
+        current = asyncio.current_task()
+        stacks = [
+            ";".join(["tasks"] + _task_stack(task, self.max_depth))
+            for task in asyncio.all_tasks(self._loop)
+            if task is not current and not task.done()
+        ]
+        with self._lock:
+            self.stacks.update(stacks)
+            self.task_samples += 1
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+            self.task_samples = 0
+
+    def collapsed(self) -> str:
+        """Stacks in collapsed format ("frame;frame;frame count" per line), for flamegraph.pl or speedscope"""
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def write_collapsed(self, path: str):
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Leaf frames with the most samples"""
+        leaves: Counter = Counter()
+        with self._lock:
+            for stack, count in self.stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+        return [{"frame": frame, "samples": count} for frame, count in leaves.most_common(limit)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "loop_samples": self.samples,
+            "task_samples": self.task_samples,
+            "unique_stacks": len(self.stacks)
+        }
+
+__all__ = [
+    "AsyncStackProfiler",
+]
@@ -0,0 +1,47 @@
+"""
+Local Collector Stand-in
+Span sink that keeps exported batches in memory in the OTLP/JSON form a
+collector would receive, so tracing can be exercised in tests and local
+development without an OpenTelemetry collector
+"""
+
+from typing import Any, Dict, List
+
+from .tracing import SpanSink, TraceSpan, spans_to_otlp
+
+class LocalCollectorStandIn(SpanSink):
+    """In-process replacement for an OTLP trace collector"""
+
+    def __init__(self):
+        self.available = True
+        self.requests: List[Dict[str, Any]] = []  # One OTLP/JSON export request per batch
+        self.closed = False
+
+    async def export(self, spans: List[TraceSpan]) -> None:
+        if not self.available:
+            raise ConnectionError("Collector stand-in is unavailable")
+        self.requests.append(spans_to_otlp(spans))
+
+    async def close(self) -> None:
+        self.closed = True
+
+    @property
+    def spans(self) -> List[Dict[str, Any]]:
+        """Every received span, in OTLP/JSON form"""
+        return [
+            span
+            for request in self.requests
+            for resource_spans in request["resourceSpans"]
+            for scope_spans in resource_spans["scopeSpans"]
+            for span in scope_spans["spans"]
+        ]
+
+    def traces(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Received spans grouped by trace id"""
+        traces: Dict[str, List[Dict[str, Any]]] = {}
+        for span in self.spans:
+            traces.setdefault(span["traceId"], []).append(span)
+        return traces
+
+    def find(self, trace_id: str) -> List[Dict[str, Any]]:
+        return self.traces().get(trace_id, [])
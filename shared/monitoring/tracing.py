@@ -0,0 +1,482 @@
+"""
+Distributed Tracing
+Spans with W3C traceparent propagation, head and tail sampling over a bounded
+span buffer, and a batched background exporter to pluggable sinks (OTLP/JSON
+over HTTP or to a file).
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class TraceSpan:
+    """Distributed tracing span"""
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    operation_name: str
+    service_name: str
+    start_time: datetime
+    end_time: Optional[datetime] = None
+    duration_ms: Optional[float] = None
+    tags: Dict[str, Any] = field(default_factory=dict)
+    logs: List[Dict[str, Any]] = field(default_factory=list)
+    status: str = "ok"
+    error: Optional[str] = None
+    sampled: bool = False  # Head sampling decision, propagated to downstream services
+    local_root: bool = False  # First span of the trace in this process; its end decides tail sampling
+    kind: str = "internal"  # internal, server or client
+
+@dataclass(frozen=True)
+class SpanContext:
+    """The part of a span that crosses process boundaries"""
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """Parse a W3C traceparent header; None if absent or invalid"""
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None:
+        return None
+    version, trace_id, span_id, flags = match.groups()
+    if version == "ff" or trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 0x01))
+
+def format_traceparent(trace_id: str, span_id: str, sampled: bool) -> str:
+    return f"00-{trace_id}-{span_id}-{'01' if sampled else '00'}"
+
+def new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+def new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+_current_span: ContextVar[Optional[TraceSpan]] = ContextVar("current_span", default=None)
+
+def current_span() -> Optional[TraceSpan]:
+    """Innermost span open in the current task"""
+    return _current_span.get()
+
+def inject_trace_context(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Add a traceparent header for the current span, if any, to outgoing request headers"""
+    headers = dict(headers or {})
+    span = _current_span.get()
+    if span is not None:
+        headers["traceparent"] = format_traceparent(span.trace_id, span.span_id, span.sampled)
+    return headers
+
+def _unix_nanos(value: datetime) -> str:
+    return str(int((value - datetime(1970, 1, 1)).total_seconds() * 1_000_000) * 1000)
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+_OTLP_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+def spans_to_otlp(spans: List[TraceSpan]) -> Dict[str, Any]:
+    """OTLP/JSON ExportTraceServiceRequest for a batch of finished spans"""
+    by_service: Dict[str, List[TraceSpan]] = {}
+    for span in spans:
+        by_service.setdefault(span.service_name, []).append(span)
+
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "vocelio.shared.monitoring"},
+                    "spans": [
+                        {
+                            "traceId": span.trace_id,
+                            "spanId": span.span_id,
+                            **({"parentSpanId": span.parent_span_id} if span.parent_span_id else {}),
+                            "name": span.operation_name,
+                            "kind": _OTLP_KINDS.get(span.kind, 1),
+                            "startTimeUnixNano": _unix_nanos(span.start_time),
+                            "endTimeUnixNano": _unix_nanos(span.end_time or span.start_time),
+                            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.tags.items()],
+                            "events": [
+                                {
+                                    "name": entry.get("message", ""),
+                                    "attributes": [
+                                        {"key": key, "value": _otlp_value(value)}
+                                        for key, value in entry.items() if key not in ("message", "timestamp")
+                                    ]
+                                }
+                                for entry in span.logs
+                            ],
+                            "status": {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1}
+                        }
+                        for span in service_spans
+                    ]
+                }]
+            }
+            for service, service_spans in by_service.items()
+        ]
+    }
+
+class SpanSink(ABC):
+    """Destination for exported spans"""
+
+    @abstractmethod
+    async def export(self, spans: List[TraceSpan]) -> None:
+        """Deliver one batch; raising makes the exporter count the batch as failed"""
+
+    async def close(self) -> None:
+        pass
+
+class OTLPHttpSpanSink(SpanSink):
+    """POSTs OTLP/JSON to a collector, e.g. http://otel-collector:4318/v1/traces"""
+
+    def __init__(self, endpoint: str, headers: Optional[Dict[str, str]] = None, timeout: float = 10.0):
+        self.endpoint = endpoint
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.timeout = timeout
+        self._session = None
+
+    async def export(self, spans: List[TraceSpan]) -> None:
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        async with self._session.post(self.endpoint, data=json.dumps(spans_to_otlp(spans)), headers=self.headers) as response:
+            response.raise_for_status()
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+class JsonFileSpanSink(SpanSink):
+    """Appends one OTLP/JSON document per batch, one per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _write(self, line: str):
+        with open(self.path, "a") as f:
+            f.write(line)
+
+    async def export(self, spans: List[TraceSpan]) -> None:
+        line = json.dumps(spans_to_otlp(spans)) + "\n"
+        await asyncio.get_running_loop().run_in_executor(None, self._write, line)
+
+class BatchSpanExporter:
+    """Queues finished spans and ships them to a sink in batches from a background task.
+
+    The queue is bounded; when the sink cannot keep up, the oldest queued spans
+    are dropped (and counted) rather than growing memory or slowing callers.
+    """
+
+    def __init__(
+        self,
+        sink: SpanSink,
+        max_queue_size: int = 4096,
+        max_batch_size: int = 512,
+        flush_interval: float = 2.0
+    ):
+        self.sink = sink
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self._queue: deque = deque(maxlen=max_queue_size)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Exporter metrics
+        self.exported_spans = 0
+        self.dropped_spans = 0
+        self.failed_batches = 0
+
+    def enqueue(self, spans: List[TraceSpan]):
+        """Queue spans for export; never blocks"""
+        overflow = len(self._queue) + len(spans) - self._queue.maxlen
+        if overflow > 0:
+            self.dropped_spans += overflow
+        self._queue.extend(spans)
+
+        if self._task is None:
+            self.start()
+        if self._wakeup is not None and len(self._queue) >= self.max_batch_size:
+            self._wakeup.set()
+
+    def start(self):
+        """Start the background flush task (needs a running event loop)"""
+        if self._task is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Started on the first enqueue from async code
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Export everything queued so far"""
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(self.max_batch_size, len(self._queue)))]
+            try:
+                await self.sink.export(batch)
+                self.exported_spans += len(batch)
+            except Exception as e:
+                self.failed_batches += 1
+                self.dropped_spans += len(batch)
+                logger.warning(f"Failed to export {len(batch)} spans: {str(e)}")
+
+    async def shutdown(self):
+        """Stop the background task, export what is queued and close the sink"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        await self.sink.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "queued_spans": len(self._queue),
+            "exported_spans": self.exported_spans,
+            "dropped_spans": self.dropped_spans,
+            "failed_batches": self.failed_batches
+        }
+
+def exporter_from_env() -> Optional[BatchSpanExporter]:
+    """Exporter configured by OTEL_EXPORTER_OTLP_TRACES_ENDPOINT or TRACE_EXPORT_FILE, if set"""
+    endpoint = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT")
+    if endpoint:
+        return BatchSpanExporter(OTLPHttpSpanSink(endpoint))
+    path = os.getenv("TRACE_EXPORT_FILE")
+    if path:
+        return BatchSpanExporter(JsonFileSpanSink(path))
+    return None
+
+class DistributedTracer:
+    """Distributed tracing implementation.
+
+    Root traces are head-sampled at `sample_rate`, and callers' decisions are
+    inherited through traceparent. Unsampled traces are still recorded until
+    their local root span ends; they are then kept anyway if any span failed
+    or the root took at least `slow_trace_ms` (tail sampling). Kept traces go
+    to the exporter. Finished spans live in a ring buffer of `max_spans`, and
+    traces awaiting their decision in one of `max_pending_spans`, so memory is
+    bounded whatever the traffic.
+    """
+
+    def __init__(
+        self,
+        service_name: str,
+        sample_rate: float = 0.1,
+        slow_trace_ms: float = 1000.0,
+        max_spans: int = 10000,
+        max_pending_spans: int = 10000,
+        exporter: Optional[BatchSpanExporter] = None
+    ):
+        self.service_name = service_name
+        self.sample_rate = sample_rate
+        self.slow_trace_ms = slow_trace_ms
+        self.max_spans = max_spans
+        self.max_pending_spans = max_pending_spans
+        self.exporter = exporter
+        self.spans: "OrderedDict[str, TraceSpan]" = OrderedDict()  # Ring buffer of recent spans
+        self.active_spans: Dict[str, TraceSpan] = {}
+        self._pending: "OrderedDict[str, List[TraceSpan]]" = OrderedDict()
+        self._pending_count = 0
+
+        # Sampling metrics
+        self.traces_head_sampled = 0
+        self.traces_tail_sampled = 0
+        self.traces_dropped = 0
+        self.evicted_spans = 0
+
+    def start_span(
+        self,
+        operation_name: str,
+        parent_span_id: Optional[str] = None,
+        tags: Dict[str, Any] = None,
+        parent_context: Optional[SpanContext] = None,
+        kind: str = "internal"
+    ) -> TraceSpan:
+        """Start a new trace span, by default as a child of the current span"""
+        parent = self.active_spans.get(parent_span_id) if parent_span_id else None
+        if parent is None and parent_context is None:
+            parent = _current_span.get()
+
+        if parent is not None:
+            trace_id, parent_id, sampled, local_root = parent.trace_id, parent.span_id, parent.sampled, False
+        elif parent_context is not None:
+            trace_id, parent_id, sampled, local_root = parent_context.trace_id, parent_context.span_id, parent_context.sampled, True
+        else:
+            trace_id, parent_id, local_root = new_trace_id(), None, True
+            sampled = random.random() < self.sample_rate
+
+        span = TraceSpan(
+            trace_id=trace_id,
+            span_id=new_span_id(),
+            parent_span_id=parent_id,
+            operation_name=operation_name,
+            service_name=self.service_name,
+            start_time=datetime.utcnow(),
+            tags=tags or {},
+            sampled=sampled,
+            local_root=local_root,
+            kind=kind
+        )
+
+        self.active_spans[span.span_id] = span
+        self._remember(span)
+        _current_span.set(span)
+        return span
+
+    def _remember(self, span: TraceSpan):
+        self.spans[span.span_id] = span
+        while len(self.spans) > self.max_spans:
+            self.spans.popitem(last=False)
+
+    def finish_span(self, span_id: str, error: Optional[str] = None):
+        """Finish a trace span"""
+        span = self.active_spans.pop(span_id, None)
+        if span is None:
+            return
+
+        span.end_time = datetime.utcnow()
+        span.duration_ms = (span.end_time - span.start_time).total_seconds() * 1000
+
+        if error:
+            span.status = "error"
+            span.error = error
+
+        # Restore the parent as the current span
+        if _current_span.get() is span:
+            _current_span.set(self.active_spans.get(span.parent_span_id))
+
+        trace = self._pending.get(span.trace_id)
+        if trace is None:
+            trace = self._pending[span.trace_id] = []
+        trace.append(span)
+        self._pending_count += 1
+        while self._pending_count > self.max_pending_spans:
+            _, evicted = self._pending.popitem(last=False)
+            self._pending_count -= len(evicted)
+            self.evicted_spans += len(evicted)
+
+        if span.local_root:
+            self._complete_trace(span)
+
+    def _complete_trace(self, root: TraceSpan):
+        """Keep or drop the trace once its local root has finished"""
+        spans = self._pending.pop(root.trace_id, [])
+        self._pending_count -= len(spans)
+
+        if root.sampled:
+            self.traces_head_sampled += 1
+        elif root.duration_ms >= self.slow_trace_ms or any(span.status == "error" for span in spans):
+            self.traces_tail_sampled += 1
+        else:
+            self.traces_dropped += 1
+            return
+
+        if self.exporter is not None and spans:
+            self.exporter.enqueue(spans)
+
+    def add_span_log(self, span_id: str, message: str, **kwargs):
+        """Add log to span"""
+        if span_id in self.spans:
+            self.spans[span_id].logs.append({
+                "timestamp": datetime.utcnow().isoformat(),
+                "message": message,
+                **kwargs
+            })
+
+    def add_span_tag(self, span_id: str, key: str, value: Any):
+        """Add tag to span"""
+        if span_id in self.spans:
+            self.spans[span_id].tags[key] = value
+
+    @asynccontextmanager
+    async def trace(self, operation_name: str, parent_context: Optional[SpanContext] = None, **tags):
+        """Context manager for tracing"""
+        span = self.start_span(operation_name, tags=tags, parent_context=parent_context)
+        try:
+            yield span
+        except Exception as e:
+            self.finish_span(span.span_id, error=str(e))
+            raise
+        except BaseException:
+            self.finish_span(span.span_id, error="cancelled")
+            raise
+        else:
+            self.finish_span(span.span_id)
+
+    def get_trace(self, trace_id: str) -> List[TraceSpan]:
+        """Get all recent spans for a trace"""
+        return [span for span in self.spans.values() if span.trace_id == trace_id]
+
+    async def shutdown(self):
+        """Export kept traces that are still queued"""
+        if self.exporter is not None:
+            await self.exporter.shutdown()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tracing statistics"""
+        return {
+            "sample_rate": self.sample_rate,
+            "buffered_spans": len(self.spans),
+            "active_spans": len(self.active_spans),
+            "pending_spans": self._pending_count,
+            "traces_head_sampled": self.traces_head_sampled,
+            "traces_tail_sampled": self.traces_tail_sampled,
+            "traces_dropped": self.traces_dropped,
+            "evicted_spans": self.evicted_spans,
+            "exporter": self.exporter.get_stats() if self.exporter else None
+        }
+
+__all__ = [
+    "BatchSpanExporter",
+    "DistributedTracer",
+    "JsonFileSpanSink",
+    "OTLPHttpSpanSink",
+    "SpanContext",
+    "SpanSink",
+    "TraceSpan",
+    "current_span",
+    "exporter_from_env",
+    "format_traceparent",
+    "inject_trace_context",
+    "parse_traceparent",
+    "spans_to_otlp",
+]
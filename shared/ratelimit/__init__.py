@@ -0,0 +1,20 @@
+# Shared rate limiting package
+from .limiter import (
+    GCRA,
+    SLIDING_WINDOW,
+    TOKEN_BUCKET,
+    LocalRateLimiter,
+    RateLimitResult,
+    RateLimitRule,
+)
+from .redis_backend import RedisRateLimiter
+
+__all__ = [
+    "GCRA",
+    "SLIDING_WINDOW",
+    "TOKEN_BUCKET",
+    "LocalRateLimiter",
+    "RateLimitResult",
+    "RateLimitRule",
+    "RedisRateLimiter",
+]
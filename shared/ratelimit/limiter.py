@@ -0,0 +1,261 @@
+"""
+Local Rate Limiting Algorithms
+O(1) token-bucket, GCRA and sliding-window limiters with idle-key eviction
+"""
+
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+TOKEN_BUCKET = "token_bucket"
+GCRA = "gcra"
+SLIDING_WINDOW = "sliding_window"
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """Allow `limit` requests per `window` seconds, with an optional larger burst"""
+    limit: int
+    window: float
+    burst: Optional[int] = None
+
+    @property
+    def capacity(self) -> int:
+        """Maximum requests allowed back to back"""
+        return self.burst if self.burst is not None else self.limit
+
+    @property
+    def rate(self) -> float:
+        """Tokens replenished per second"""
+        return self.limit / self.window
+
+    @property
+    def emission_interval(self) -> float:
+        """Seconds between requests at the sustained rate"""
+        return self.window / self.limit
+
+@dataclass
+class RateLimitResult:
+    """Outcome of a rate limit check"""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float  # Seconds until the key is back to full capacity
+    retry_after: float = 0.0  # Seconds until the request would be allowed (0 when allowed)
+
+    def headers(self) -> Dict[str, str]:
+        """Standard X-RateLimit-* response headers"""
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(int(time.time() + self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+def sliding_window_retry_after(rule: RateLimitRule, elapsed: float, current: float,
+                               previous: float, cost: int) -> float:
+    """Seconds until the weighted two-window count leaves room for `cost` more requests"""
+    reset_after = (1.0 - elapsed) * rule.window
+
+    if cost > rule.limit:
+        return reset_after + rule.window
+
+    if current + cost > rule.limit:
+        # Wait for the next window, where the current count becomes the weighted previous one
+        if current <= 0:
+            return reset_after
+        fraction = max(0.0, 1.0 - (rule.limit - cost) / current)
+        return reset_after + fraction * rule.window
+
+    if previous <= 0:
+        return 0.0
+
+    fraction = 1.0 - (rule.limit - current - cost) / previous
+    return max(0.0, (fraction - elapsed) * rule.window)
+
+class LocalRateLimiter:
+    """In-process rate limiter with O(1) checks and bounded memory.
+
+    State per key is a small list whose first slot is the time the key decays back
+    to an unused state ("fresh"). Keys are kept in an OrderedDict in recency order so
+    decayed keys can be evicted from the front in O(1) without a periodic sweep.
+    Evicting a fresh key is lossless: it behaves exactly like a key never seen.
+    check() never awaits, so it is atomic within an event loop and needs no lock.
+    """
+
+    def __init__(
+        self,
+        algorithm: str = TOKEN_BUCKET,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        checks = {
+            TOKEN_BUCKET: self._check_token_bucket,
+            GCRA: self._check_gcra,
+            SLIDING_WINDOW: self._check_sliding_window,
+        }
+        if algorithm not in checks:
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+
+        self.algorithm = algorithm
+        self.max_keys = max_keys
+        self.clock = clock
+        self._check = checks[algorithm]
+
+        # key -> [fresh_at, ...algorithm slots]
+        self._state: "OrderedDict[str, List[float]]" = OrderedDict()
+
+        self.total_checks = 0
+        self.rejected_checks = 0
+        self.evicted_keys = 0
+        self.forced_evictions = 0
+
+    def check(self, key: str, rule: RateLimitRule, cost: int = 1) -> RateLimitResult:
+        """Consume `cost` from the key's allowance if available"""
+        now = self.clock()
+        states = self._state
+        self._evict_idle(now)
+
+        state = states.get(key)
+        if state is not None:
+            states.move_to_end(key)
+            result, _ = self._check(state, now, rule, cost, True)
+        else:
+            result, states[key] = self._check(None, now, rule, cost, True)
+            if len(states) > self.max_keys:
+                # Over the hard cap: drop the least recently used key even though it is not idle
+                states.popitem(last=False)
+                self.forced_evictions += 1
+
+        self.total_checks += 1
+        if not result.allowed:
+            self.rejected_checks += 1
+        return result
+
+    def peek(self, key: str, rule: RateLimitRule) -> RateLimitResult:
+        """Report the key's allowance without consuming it"""
+        state = self._state.get(key)
+        result, _ = self._check(list(state) if state else None, self.clock(), rule, 0, False)
+        return result
+
+    def is_allowed(self, key: str, limit: int, window: float) -> bool:
+        """Convenience wrapper for callers that only need a yes/no answer"""
+        return self.check(key, RateLimitRule(limit, window)).allowed
+
+    def reset(self, key: Optional[str] = None):
+        """Forget one key, or every key"""
+        if key is None:
+            self._state.clear()
+        else:
+            self._state.pop(key, None)
+
+    def _evict_idle(self, now: float, max_evictions: int = 2):
+        """Drop a couple of decayed keys from the front; amortised O(1) per check"""
+        state = self._state
+        for _ in range(max_evictions):
+            key = next(iter(state), None)
+            if key is None or state[key][0] > now:
+                return
+            del state[key]
+            self.evicted_keys += 1
+
+    # Algorithms: each returns (result, new_state) and mutates state in place when it exists
+
+    def _check_token_bucket(self, state, now, rule, cost, consume):
+        rate = rule.limit / rule.window
+        capacity = rule.limit if rule.burst is None else rule.burst
+
+        if state is None:
+            tokens = float(capacity)
+            state = [now, tokens, now]
+        else:
+            tokens = min(capacity, state[1] + max(0.0, now - state[2]) * rate)
+
+        allowed = tokens >= cost
+        retry_after = 0.0
+        if allowed:
+            tokens -= cost
+        else:
+            retry_after = (cost - tokens) / rate
+
+        reset_after = (capacity - tokens) / rate
+        if consume:
+            state[0] = now + reset_after
+            state[1] = tokens
+            state[2] = now
+
+        return RateLimitResult(allowed, rule.limit, int(tokens), reset_after, retry_after), state
+
+    def _check_gcra(self, state, now, rule, cost, consume):
+        interval = rule.emission_interval
+        tolerance = interval * rule.capacity
+
+        if state is None:
+            state = [now, now]
+
+        tat = max(state[1], now)
+        new_tat = tat + interval * cost
+        allow_at = new_tat - tolerance
+
+        if now < allow_at:
+            remaining = max(0, int((now + tolerance - tat) / interval + 1e-9))
+            return RateLimitResult(False, rule.limit, remaining, tat - now, allow_at - now), state
+
+        if consume:
+            state[0] = new_tat
+            state[1] = new_tat
+
+        remaining = max(0, int((now + tolerance - new_tat) / interval + 1e-9))
+        return RateLimitResult(True, rule.limit, remaining, new_tat - now), state
+
+    def _check_sliding_window(self, state, now, rule, cost, consume):
+        window = rule.window
+        index = math.floor(now / window)
+
+        if state is None:
+            state = [now, index, 0.0, 0.0]
+            current = 0.0
+            previous = 0.0
+        elif state[1] != index:
+            # Roll forward: the old current window becomes the previous one if adjacent
+            previous = state[2] if index - state[1] == 1 else 0.0
+            current = 0.0
+        else:
+            current = state[2]
+            previous = state[3]
+
+        elapsed = (now - index * window) / window
+        estimated = previous * (1.0 - elapsed) + current
+        reset_after = (index + 1) * window - now
+
+        if estimated + cost > rule.limit:
+            retry_after = sliding_window_retry_after(rule, elapsed, current, previous, cost)
+            return RateLimitResult(False, rule.limit, max(0, int(rule.limit - estimated)), reset_after, retry_after), state
+
+        if consume:
+            state[0] = (index + 2) * window  # Both windows empty again
+            state[1] = index
+            state[2] = current + cost
+            state[3] = previous
+
+        remaining = max(0, int(rule.limit - estimated - cost))
+        return RateLimitResult(True, rule.limit, remaining, reset_after), state
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get limiter statistics"""
+        return {
+            "algorithm": self.algorithm,
+            "tracked_keys": len(self._state),
+            "max_keys": self.max_keys,
+            "total_checks": self.total_checks,
+            "rejected_checks": self.rejected_checks,
+            "rejection_rate": (
+                self.rejected_checks / self.total_checks
+                if self.total_checks > 0 else 0
+            ),
+            "evicted_keys": self.evicted_keys,
+            "forced_evictions": self.forced_evictions
+        }
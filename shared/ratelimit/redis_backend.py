@@ -0,0 +1,193 @@
+"""
+Cluster-wide Rate Limiting
+Redis Lua implementations of the local algorithms, checked in batched pipelines
+"""
+
+import logging
+from typing import Any, List, Optional, Sequence, Tuple
+
+from .limiter import (
+    GCRA, SLIDING_WINDOW, TOKEN_BUCKET,
+    LocalRateLimiter, RateLimitResult, RateLimitRule
+)
+
+logger = logging.getLogger(__name__)
+
+# All scripts take KEYS[1] = state key and ARGV = limit, window, burst, cost, and return
+# {allowed, remaining, reset_after, retry_after}. Floats are returned as strings because
+# Redis truncates Lua numbers to integers. Server time keeps every gateway on one clock.
+_SCRIPT_PRELUDE = """
+if redis.replicate_commands then redis.replicate_commands() end
+local key = KEYS[1]
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+if burst <= 0 then burst = limit end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+"""
+
+TOKEN_BUCKET_SCRIPT = _SCRIPT_PRELUDE + """
+local rate = limit / window
+local state = redis.call('HMGET', key, 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+  tokens = burst
+  ts = now
+end
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry_after = (cost - tokens) / rate
+end
+local reset_after = (burst - tokens) / rate
+redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', key, math.ceil(reset_after * 1000) + 1000)
+return {allowed, math.floor(tokens), tostring(reset_after), tostring(retry_after)}
+"""
+
+GCRA_SCRIPT = _SCRIPT_PRELUDE + """
+local interval = window / limit
+local tolerance = interval * burst
+local tat = tonumber(redis.call('GET', key))
+if tat == nil or tat < now then
+  tat = now
+end
+local new_tat = tat + interval * cost
+local allow_at = new_tat - tolerance
+if now < allow_at then
+  local remaining = math.max(0, math.floor((now + tolerance - tat) / interval + 1e-9))
+  return {0, remaining, tostring(tat - now), tostring(allow_at - now)}
+end
+redis.call('SET', key, tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000) + 1)
+local remaining = math.max(0, math.floor((now + tolerance - new_tat) / interval + 1e-9))
+return {1, remaining, tostring(new_tat - now), '0'}
+"""
+
+SLIDING_WINDOW_SCRIPT = _SCRIPT_PRELUDE + """
+local index = math.floor(now / window)
+local state = redis.call('HMGET', key, 'idx', 'cur', 'prev')
+local stored_index = tonumber(state[1])
+local current = tonumber(state[2]) or 0
+local previous = tonumber(state[3]) or 0
+if stored_index ~= index then
+  if stored_index ~= nil and index - stored_index == 1 then previous = current else previous = 0 end
+  current = 0
+end
+local elapsed = (now - index * window) / window
+local estimated = previous * (1 - elapsed) + current
+local reset_after = (index + 1) * window - now
+if estimated + cost > limit then
+  local retry_after
+  if cost > limit then
+    retry_after = reset_after + window
+  elseif current + cost > limit then
+    if current <= 0 then
+      retry_after = reset_after
+    else
+      retry_after = reset_after + math.max(0, 1 - (limit - cost) / current) * window
+    end
+  elseif previous <= 0 then
+    retry_after = 0
+  else
+    retry_after = math.max(0, (1 - (limit - current - cost) / previous - elapsed) * window)
+  end
+  return {0, math.max(0, math.floor(limit - estimated)), tostring(reset_after), tostring(retry_after)}
+end
+current = current + cost
+redis.call('HSET', key, 'idx', index, 'cur', current, 'prev', previous)
+redis.call('PEXPIRE', key, math.ceil((reset_after + window) * 1000))
+return {1, math.max(0, math.floor(limit - estimated - cost)), tostring(reset_after), '0'}
+"""
+
+SCRIPTS = {
+    TOKEN_BUCKET: TOKEN_BUCKET_SCRIPT,
+    GCRA: GCRA_SCRIPT,
+    SLIDING_WINDOW: SLIDING_WINDOW_SCRIPT,
+}
+
+class RedisRateLimiter:
+    """Cluster-wide rate limiter backed by Redis Lua scripts.
+
+    Several checks (e.g. per-IP and per-user) go out in one pipeline round trip.
+    If Redis is unreachable the limiter degrades to a per-process LocalRateLimiter
+    with the same algorithm rather than failing open.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any,
+        algorithm: str = TOKEN_BUCKET,
+        prefix: str = "rate_limit:",
+        fallback: Optional[LocalRateLimiter] = None
+    ):
+        if algorithm not in SCRIPTS:
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+
+        self.redis_client = redis_client
+        self.algorithm = algorithm
+        self.prefix = prefix
+        self.fallback = fallback or LocalRateLimiter(algorithm)
+        self._script = redis_client.register_script(SCRIPTS[algorithm])
+
+        self.total_checks = 0
+        self.rejected_checks = 0
+        self.fallback_checks = 0
+
+    async def check(self, key: str, rule: RateLimitRule, cost: int = 1) -> RateLimitResult:
+        """Check a single key"""
+        results = await self.check_many([(key, rule, cost)])
+        return results[0]
+
+    async def check_many(self, checks: Sequence[Tuple[str, RateLimitRule, int]]) -> List[RateLimitResult]:
+        """Check several keys in a single pipelined round trip"""
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, rule, cost in checks:
+                await self._script(
+                    keys=[f"{self.prefix}{key}"],
+                    args=[rule.limit, rule.window, rule.burst or 0, cost],
+                    client=pipe
+                )
+            replies = await pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis rate limiting error, using local limiter: {e}")
+            self.fallback_checks += len(checks)
+            return [self.fallback.check(key, rule, cost) for key, rule, cost in checks]
+
+        results = []
+        for (key, rule, cost), reply in zip(checks, replies):
+            result = self._parse_reply(rule, reply)
+            self.total_checks += 1
+            if not result.allowed:
+                self.rejected_checks += 1
+            results.append(result)
+        return results
+
+    @staticmethod
+    def _parse_reply(rule: RateLimitRule, reply: Sequence[Any]) -> RateLimitResult:
+        allowed, remaining, reset_after, retry_after = reply
+        return RateLimitResult(
+            allowed=bool(int(allowed)),
+            limit=rule.limit,
+            remaining=int(remaining),
+            reset_after=float(reset_after),
+            retry_after=float(retry_after)
+        )
+
+    def get_stats(self) -> dict:
+        """Get limiter statistics"""
+        return {
+            "algorithm": self.algorithm,
+            "backend": "redis",
+            "total_checks": self.total_checks,
+            "rejected_checks": self.rejected_checks,
+            "fallback_checks": self.fallback_checks,
+            "fallback": self.fallback.get_stats()
+        }
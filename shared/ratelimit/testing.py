@@ -0,0 +1,78 @@
+"""
+Local Redis Stand-in
+Implements the subset of redis.asyncio used by RedisRateLimiter, so cluster-wide
+limits can be exercised in tests and local development without a Redis server
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .limiter import LocalRateLimiter, RateLimitRule
+from .redis_backend import SCRIPTS
+
+_ALGORITHM_BY_SCRIPT = {script: algorithm for algorithm, script in SCRIPTS.items()}
+
+class _StandInScript:
+    """Mimics redis.asyncio AsyncScript by running the local twin of a Lua script"""
+
+    def __init__(self, server: "LocalRedisStandIn", script: str):
+        if script not in _ALGORITHM_BY_SCRIPT:
+            raise ValueError("Only the rate limiting scripts are supported by the stand-in")
+        self.server = server
+        self.algorithm = _ALGORITHM_BY_SCRIPT[script]
+
+    async def __call__(self, keys: Sequence[str] = (), args: Sequence[Any] = (), client: Any = None):
+        call = (self.algorithm, keys[0], args)
+        if isinstance(client, _StandInPipeline):
+            client.calls.append(call)
+            return client
+        return self.server.run(*call)
+
+class _StandInPipeline:
+    """Queues script calls until execute(), like a non-transactional pipeline"""
+
+    def __init__(self, server: "LocalRedisStandIn"):
+        self.server = server
+        self.calls: List[tuple] = []
+
+    async def execute(self) -> List[list]:
+        self.server.round_trips += 1
+        calls, self.calls = self.calls, []
+        return [self.server.run(*call) for call in calls]
+
+class LocalRedisStandIn:
+    """In-process replacement for a Redis server running the rate limiting scripts"""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.available = True
+        self.round_trips = 0
+        self._limiters: Dict[str, LocalRateLimiter] = {}
+
+    def register_script(self, script: str) -> _StandInScript:
+        return _StandInScript(self, script)
+
+    def pipeline(self, transaction: bool = True) -> _StandInPipeline:
+        return _StandInPipeline(self)
+
+    async def ping(self) -> bool:
+        self._ensure_available()
+        return True
+
+    def run(self, algorithm: str, key: str, args: Sequence[Any]) -> list:
+        """Execute one script call and format the reply like Redis would"""
+        self._ensure_available()
+
+        limiter = self._limiters.get(algorithm)
+        if limiter is None:
+            limiter = self._limiters[algorithm] = LocalRateLimiter(algorithm, clock=self.clock)
+
+        limit, window, burst, cost = args
+        rule = RateLimitRule(int(limit), float(window), int(burst) or None)
+        result = limiter.check(key, rule, int(cost))
+
+        return [int(result.allowed), result.remaining, repr(result.reset_after), repr(result.retry_after)]
+
+    def _ensure_available(self):
+        if not self.available:
+            raise ConnectionError("Redis stand-in is unavailable")
@@ -0,0 +1,203 @@
+# shared/tests/test_circuit_breaker.py
+import asyncio
+
+import pytest
+
+from shared.utils import circuit_breaker as circuit_breaker_module
+from shared.utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+
+class FakeTime:
+    """Stands in for the time module inside circuit_breaker"""
+
+    def __init__(self, now=1_000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(circuit_breaker_module, "time", fake)
+    return fake
+
+
+def make_breaker(**kwargs):
+    options = dict(window_size=10, minimum_calls=5, wait_duration=30.0, half_open_calls=2)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+
+def test_stays_closed_below_minimum_calls(clock):
+    breaker = make_breaker()
+
+    for _ in range(4):
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_opens_at_failure_rate_threshold(clock):
+    breaker = make_breaker(failure_rate_threshold=50.0)
+
+    for _ in range(5):
+        breaker.record_success()
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.state is CircuitState.CLOSED  # 4/9 failed
+
+    breaker.record_failure()  # 5/10 failed
+
+    assert breaker.state is CircuitState.OPEN
+    assert not breaker.allow_request()
+    assert breaker.rejected_requests == 1
+
+
+def test_opens_at_slow_call_rate_threshold(clock):
+    breaker = make_breaker(slow_call_rate_threshold=60.0, slow_call_duration=1.0)
+
+    for _ in range(2):
+        breaker.record_success(0.1)
+    for _ in range(3):
+        breaker.record_success(2.0)
+
+    assert breaker.state is CircuitState.OPEN
+    assert breaker.get_stats()["slow_requests"] == 3
+
+
+def test_count_window_forgets_old_calls(clock):
+    breaker = make_breaker(window_size=10, minimum_calls=10)
+
+    for _ in range(4):
+        breaker.record_failure()
+    for _ in range(10):
+        breaker.record_success()
+
+    stats = breaker.get_stats()
+    assert stats["window_calls"] == 10
+    assert stats["failure_count"] == 0
+
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.state is CircuitState.CLOSED  # 4/10 failed
+
+
+def test_time_window_forgets_old_seconds(clock):
+    breaker = make_breaker(window_type="time", window_size=10, minimum_calls=5)
+
+    for _ in range(4):
+        breaker.record_failure()
+    clock.advance(11)
+    breaker.record_failure()
+
+    assert breaker.state is CircuitState.CLOSED
+    assert breaker.get_stats()["window_calls"] == 1
+
+
+def test_unknown_window_type_is_rejected():
+    with pytest.raises(ValueError):
+        make_breaker(window_type="sessions")
+
+
+def trip(breaker):
+    for _ in range(breaker.minimum_calls):
+        breaker.record_failure()
+    assert breaker.state is CircuitState.OPEN
+
+
+def test_half_open_limits_trial_calls_and_closes_on_success(clock):
+    breaker = make_breaker()
+    trip(breaker)
+
+    clock.advance(29)
+    assert not breaker.allow_request()
+
+    clock.advance(1)
+    assert breaker.state is CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    breaker.record_success()
+
+    assert breaker.state is CircuitState.CLOSED
+    assert breaker.get_stats()["window_calls"] == 0
+
+
+def test_half_open_reopens_when_trials_fail(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.advance(30)
+
+    assert breaker.allow_request() and breaker.allow_request()
+    breaker.record_success()
+    breaker.record_failure()  # 1/2 failed, at the 50% threshold
+
+    assert breaker.state is CircuitState.OPEN
+
+
+def test_released_and_lost_trial_permits_are_reissued(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.advance(30)
+
+    assert breaker.allow_request() and breaker.allow_request()
+    breaker.release()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    # Neither trial reports back; a new round starts after another wait
+    clock.advance(30)
+    assert breaker.allow_request()
+
+
+def test_force_open_and_close(clock):
+    breaker = make_breaker()
+
+    breaker.force_open()
+    assert not breaker.allow_request()
+
+    breaker.force_close()
+    assert breaker.allow_request()
+    assert breaker.state is CircuitState.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_call_records_outcomes_and_rejects_when_open():
+    breaker = make_breaker(minimum_calls=3, expected_exception=ConnectionError, timeout=0.01)
+
+    async def ok():
+        return "ok"
+
+    async def refused():
+        raise ConnectionError()
+
+    async def hangs():
+        await asyncio.sleep(1)
+
+    async def bad_input():
+        raise ValueError()
+
+    assert await breaker.call(ok) == "ok"
+    with pytest.raises(ValueError):
+        await breaker.call(bad_input)  # Not an expected exception; says nothing about the dependency
+    assert breaker.failed_requests == 0
+
+    with pytest.raises(ConnectionError):
+        await breaker.call(refused)
+    with pytest.raises(asyncio.TimeoutError):
+        await breaker.call(hangs)
+
+    assert breaker.state is CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
@@ -0,0 +1,229 @@
+# shared/tests/test_concurrency_limiter.py
+import asyncio
+
+import pytest
+
+from shared.utils.concurrency_limiter import (
+    AIMDLimit, AdaptiveConcurrencyLimiter, FixedLimit, GradientLimit,
+    LimitExceededError, VegasLimit
+)
+
+
+def make_limiter(limit=1, **kwargs):
+    return AdaptiveConcurrencyLimiter("test", FixedLimit(limit), **kwargs)
+
+
+async def queued(limiter):
+    """Start an acquire() and let it reach the queue"""
+    task = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    return task
+
+
+@pytest.mark.asyncio
+async def test_admits_up_to_the_limit_without_queueing():
+    limiter = make_limiter(2)
+
+    assert await limiter.acquire() == 1
+    assert await limiter.acquire() == 2
+
+    stats = limiter.get_stats()
+    assert stats["active_requests"] == 2
+    assert stats["queued_requests"] == 0
+
+
+@pytest.mark.asyncio
+async def test_queued_call_expires_and_is_rejected():
+    limiter = make_limiter(max_queue_wait=0.01)
+    await limiter.acquire()
+
+    with pytest.raises(LimitExceededError):
+        await limiter.acquire()
+
+    stats = limiter.get_stats()
+    assert stats["rejected_requests"] == 1
+    assert stats["queued_requests"] == 0
+    assert stats["active_requests"] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_immediately():
+    limiter = make_limiter(max_queue=1, max_queue_wait=1.0)
+    await limiter.acquire()
+    waiting = await queued(limiter)
+
+    with pytest.raises(LimitExceededError):
+        await limiter.acquire()
+    assert limiter.rejected_requests == 1
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+
+@pytest.mark.asyncio
+async def test_zero_queue_wait_sheds_at_once():
+    limiter = make_limiter(max_queue_wait=0)
+    await limiter.acquire()
+
+    with pytest.raises(LimitExceededError):
+        await limiter.acquire()
+
+
+@pytest.mark.asyncio
+async def test_freed_slots_go_to_waiters_oldest_first():
+    limiter = make_limiter(max_queue_wait=1.0)
+    first_inflight = await limiter.acquire()
+    first = await queued(limiter)
+    second = await queued(limiter)
+
+    limiter.release(0.01, first_inflight)
+    assert await first == 1
+    assert not second.done()
+
+    limiter.release(0.01, 1)
+    assert await second == 1
+    assert limiter.inflight == 1
+    assert limiter.queue_wait.window("1m").count == 2
+
+
+@pytest.mark.asyncio
+async def test_waiter_cancelled_as_slot_is_granted_passes_it_on():
+    limiter = make_limiter(max_queue_wait=1.0)
+    inflight = await limiter.acquire()
+    cancelled = await queued(limiter)
+    next_in_line = await queued(limiter)
+
+    # The slot is granted, but the caller is cancelled before it resumes
+    limiter.release(0.01, inflight)
+    cancelled.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    assert await next_in_line == 1
+    assert limiter.inflight == 1
+
+    limiter.release(0.01, 1)
+    assert limiter.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_take_a_slot():
+    limiter = make_limiter(max_queue_wait=1.0)
+    inflight = await limiter.acquire()
+    waiting = await queued(limiter)
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    limiter.release(0.01, inflight)
+
+    assert limiter.inflight == 0
+    assert limiter.get_stats()["queued_requests"] == 0
+
+
+@pytest.mark.asyncio
+async def test_execute_feeds_drops_but_ignores_other_errors():
+    limiter = AdaptiveConcurrencyLimiter("test", AIMDLimit(initial_limit=10, backoff_ratio=0.5))
+
+    async def times_out():
+        raise asyncio.TimeoutError()
+
+    async def bad_input():
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        await limiter.execute(bad_input)
+    assert limiter.limit == 10
+
+    with pytest.raises(asyncio.TimeoutError):
+        await limiter.execute(times_out)
+    assert limiter.limit == 5
+    assert limiter.dropped_requests == 1
+    assert limiter.inflight == 0
+
+
+def test_aimd_grows_while_used_and_backs_off_on_drops():
+    algorithm = AIMDLimit(initial_limit=20, backoff_ratio=0.9, timeout=1.0)
+
+    algorithm.update(0.1, inflight=2, dropped=False)
+    assert algorithm.limit == 20  # Limit not in use
+
+    algorithm.update(0.1, inflight=15, dropped=False)
+    assert algorithm.limit == 21
+
+    algorithm.update(0.1, inflight=15, dropped=True)
+    assert algorithm.limit == 18
+
+    algorithm.update(2.0, inflight=15, dropped=False)  # Slower than the timeout
+    assert algorithm.limit == 17
+
+
+def test_aimd_respects_bounds():
+    algorithm = AIMDLimit(initial_limit=3, min_limit=2, max_limit=4, backoff_ratio=0.1)
+
+    for _ in range(5):
+        algorithm.update(0.1, inflight=4, dropped=False)
+    assert algorithm.limit == 4
+
+    algorithm.update(0.1, inflight=4, dropped=True)
+    assert algorithm.limit == 2
+
+
+def test_vegas_grows_with_a_short_queue_and_shrinks_with_a_long_one():
+    algorithm = VegasLimit(initial_limit=20)
+    algorithm.update(0.1, inflight=15, dropped=False)  # Learns the no-load latency
+    assert algorithm.rtt_noload == 0.1
+
+    for _ in range(5):
+        algorithm.update(0.1, inflight=algorithm.limit, dropped=False)
+    grown = algorithm.limit
+    assert grown > 20
+
+    for _ in range(5):
+        algorithm.update(0.3, inflight=algorithm.limit, dropped=False)
+    assert algorithm.limit < grown
+
+    shrunk = algorithm.limit
+    algorithm.update(0.1, inflight=1, dropped=True)
+    assert algorithm.limit < shrunk
+
+
+def test_vegas_relearns_no_load_latency():
+    algorithm = VegasLimit(initial_limit=20, probe_interval=10)
+    algorithm.update(0.1, inflight=15, dropped=False)
+
+    for _ in range(9):
+        algorithm.update(0.5, inflight=15, dropped=False)
+
+    assert algorithm.rtt_noload == 0.5
+
+
+def test_gradient_probes_upwards_while_latency_is_flat():
+    algorithm = GradientLimit(initial_limit=20)
+
+    for _ in range(20):
+        algorithm.update(0.1, inflight=algorithm.limit, dropped=False)
+
+    assert algorithm.limit > 20
+
+
+def test_gradient_shrinks_when_latency_rises():
+    algorithm = GradientLimit(initial_limit=50)
+    for _ in range(5):
+        algorithm.update(0.1, inflight=50, dropped=False)
+    before = algorithm.limit
+
+    for _ in range(30):
+        algorithm.update(1.0, inflight=algorithm.limit, dropped=False)
+
+    assert algorithm.limit < before
+
+
+def test_gradient_ignores_latency_when_limit_is_unused():
+    algorithm = GradientLimit(initial_limit=20)
+
+    for _ in range(20):
+        algorithm.update(1.0, inflight=1, dropped=False)
+
+    assert algorithm.limit == 20
@@ -0,0 +1,128 @@
+# shared/tests/test_database_client.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from shared.database.async_client import AsyncDatabaseClient
+from shared.database.pool import QueryBuilder, pool_config_for
+from shared.database.testing import SQLiteStandIn
+
+
+@pytest.fixture
+def db():
+    return AsyncDatabaseClient(SQLiteStandIn(), "test-service")
+
+
+@pytest.mark.asyncio
+async def test_create_and_get_records(db):
+    created = await db.create_record("notes", {"owner": "u1", "body": "hello", "tags": ["a", "b"]})
+    await db.create_record("notes", {"owner": "u2", "body": "other"})
+
+    records = await db.get_records("notes", {"owner": "u1"})
+
+    assert created["id"]
+    assert created["created_at"]
+    assert records == [created]
+    assert records[0]["tags"] == ["a", "b"]
+    assert len(await db.get_records("notes", limit=1)) == 1
+
+
+@pytest.mark.asyncio
+async def test_agent_lifecycle(db):
+    agent = await db.create_agent({"name": "Ava", "user_id": "u1", "organization_id": "o1"})
+    await db.create_agent({"name": "Ben", "user_id": "u1", "organization_id": "o2"})
+
+    updated = await db.update_agent(agent["id"], {"name": "Ava 2"})
+    agents = await db.get_agents("u1", "o1")
+
+    assert updated["name"] == "Ava 2"
+    assert updated["updated_at"] >= agent["updated_at"]
+    assert [a["name"] for a in agents] == ["Ava 2"]
+
+
+@pytest.mark.asyncio
+async def test_get_metrics_filters_by_date_and_orders_newest_first(db):
+    now = datetime.now(timezone.utc)
+    for days_ago in (10, 3, 1):
+        await db.create_record("analytics_metrics", {
+            "user_id": "u1", "metric_type": "calls", "metric_value": days_ago,
+            "timestamp": (now - timedelta(days=days_ago)).isoformat()
+        })
+    await db.log_metric({"user_id": "u1", "metric_type": "minutes", "metric_value": 5})
+
+    metrics = await db.get_metrics({
+        "user_id": "u1",
+        "metric_type": "calls",
+        "start_date": (now - timedelta(days=5)).isoformat()
+    })
+
+    assert [m["metric_value"] for m in metrics] == [1, 3]
+
+
+@pytest.mark.asyncio
+async def test_usage_summary(db):
+    await db.log_usage({"user_id": "u1", "usage_type": "call", "duration": 3, "cost": 0.5})
+    await db.log_usage({"user_id": "u1", "usage_type": "call", "duration": 2, "cost": 0.25})
+    await db.log_usage({"user_id": "u1", "usage_type": "sms", "cost": 0.1})
+    now = datetime.now(timezone.utc)
+
+    summary = await db.get_usage_summary(
+        "u1", (now - timedelta(hours=1)).isoformat(), (now + timedelta(hours=1)).isoformat()
+    )
+
+    assert summary["total_calls"] == 2
+    assert summary["total_minutes"] == 5
+    assert summary["total_cost"] == pytest.approx(0.85)
+
+
+@pytest.mark.asyncio
+async def test_single_row_lookups(db):
+    user = await db.create_user({"email": "a@example.com"})
+
+    assert (await db.get_user(user["id"]))["email"] == "a@example.com"
+    assert await db.get_user("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_same_query_shape_reuses_sql(db):
+    for owner in ("u1", "u2", "u3"):
+        await db.get_records("notes", {"owner": owner})
+
+    stats = db.get_stats()["query_shapes"]["select"]
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_return_legacy_defaults(db):
+    db.backend.available = False
+
+    assert await db.get_records("notes") == []
+    assert await db.create_record("notes", {"body": "x"}) is None
+    assert await db.log_usage({"user_id": "u1"}) is False
+    assert await db.health_check() is False
+    assert db.get_stats()["failed_queries"] == 4
+
+
+@pytest.mark.asyncio
+async def test_identifiers_are_validated(db):
+    assert await db.get_records('notes"; DROP TABLE notes; --') == []
+
+
+def test_postgres_placeholders():
+    queries = QueryBuilder(lambda index: f"${index}")
+
+    assert queries.select("calls", (("user_id", "eq"), ("timestamp", "gte")), "timestamp", True, True) == (
+        'SELECT * FROM "calls" WHERE "user_id" = $1 AND "timestamp" >= $2 ORDER BY "timestamp" DESC LIMIT $3'
+    )
+    assert queries.update("calls", ("status",), (("id", "eq"),)) == (
+        'UPDATE "calls" SET "status" = $1 WHERE "id" = $2 RETURNING *'
+    )
+
+
+def test_pool_config_per_service(monkeypatch):
+    monkeypatch.setenv("CALL_CENTER_DB_POOL_MAX_SIZE", "50")
+
+    assert pool_config_for("call-center").max_size == 50
+    assert pool_config_for("call-center").min_size == 5
+    assert pool_config_for("voice-lab").max_size == 10
@@ -0,0 +1,177 @@
+# shared/tests/test_event_store.py
+import os
+
+import pytest
+
+from shared.events.event_system import Aggregate, CallStartedEvent, Event, EventBus, EventStore, Repository
+from shared.events.serialization import EventSerializer
+from shared.events.storage import SegmentedLogEventStoreBackend
+
+
+class Tally(Aggregate):
+    def __init__(self, aggregate_id):
+        super().__init__(aggregate_id)
+        self.items = []
+
+    def add(self, item):
+        event = Event(event_type="item_added", data={"item": item})
+        self.apply_event(event)
+        self.raise_event(event)
+
+    def apply_event(self, event):
+        self.items.append(event.data["item"])
+
+
+class TallyRepository(Repository):
+    def create_aggregate(self, aggregate_id):
+        return Tally(aggregate_id)
+
+
+def open_log(directory, serializer=None, **options):
+    serializer = serializer or EventSerializer()
+    return SegmentedLogEventStoreBackend(
+        str(directory), serialize=serializer.dumps, deserialize=serializer.loads, **options
+    )
+
+
+def started(aggregate_id, call_id):
+    return CallStartedEvent(aggregate_id=aggregate_id, data={"call_id": call_id})
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "log"])
+async def test_repository_snapshot_is_not_shared_with_the_aggregate(backend, tmp_path):
+    event_store = EventStore() if backend == "memory" else EventStore(open_log(tmp_path))
+    event_bus = EventBus(num_partitions=1)
+    await event_bus.start()
+    repository = TallyRepository(event_store, event_bus, snapshot_every=2)
+    tally = Tally("tally-1")
+
+    for item in (1, 2, 3):
+        tally.add(item)
+        await repository.save(tally)
+
+    snapshot = await event_store.get_snapshot("tally-1")
+    assert snapshot["version"] == 2
+    assert snapshot["data"] == {"items": [1, 2]}
+
+    loaded = await repository.get("tally-1")
+    assert loaded.items == [1, 2, 3]
+    assert loaded.version == 3
+
+    loaded.items.append(4)
+    assert tally.items == [1, 2, 3]
+    assert (await repository.get("tally-1")).items == [1, 2, 3]
+
+    await event_bus.stop()
+    await event_store.close()
+
+
+@pytest.mark.asyncio
+async def test_log_reads_streams_and_positions(tmp_path):
+    backend = open_log(tmp_path)
+
+    await backend.append("call-1", [started("call-1", "a"), started("call-1", "b")])
+    assert await backend.append("call-2", [started("call-2", "c")]) == 3
+
+    stream = await backend.read_stream("call-1", from_version=1)
+    assert [event.data["call_id"] for event in stream] == ["b"]
+    assert [event.event_version for event in stream] == [2]
+
+    recorded = await backend.read_all(from_position=1, limit=1)
+    assert [(r.position, r.event.data["call_id"]) for r in recorded] == [(2, "b")]
+    await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_log_rolls_segments_and_reads_across_them(tmp_path):
+    backend = open_log(tmp_path, segment_max_bytes=256)
+
+    for i in range(20):
+        await backend.append("call-1", [started("call-1", str(i))])
+    await backend.close()
+
+    segments = sorted(name for name in os.listdir(tmp_path) if name.startswith("segment-"))
+    assert len(segments) > 1
+    assert all(os.path.getsize(tmp_path / name) <= 256 for name in segments)
+
+    reopened = open_log(tmp_path, segment_max_bytes=256)
+    events = await reopened.read_stream("call-1")
+    assert [event.data["call_id"] for event in events] == [str(i) for i in range(20)]
+    assert await reopened.head_position() == 20
+    await reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_log_truncates_unindexed_bytes_on_open(tmp_path):
+    backend = open_log(tmp_path)
+    await backend.append("call-1", [started("call-1", "a")])
+    await backend.close()
+
+    # A crash between the log write and the index commit leaves a record nobody indexed
+    segment = tmp_path / "segment-000001.log"
+    indexed_size = os.path.getsize(segment)
+    with open(segment, "ab") as log:
+        log.write(b"\x00\x00\x00\x10partial")
+
+    reopened = open_log(tmp_path)
+    await reopened.append("call-1", [started("call-1", "b")])
+    events = await reopened.read_stream("call-1")
+
+    assert [event.data["call_id"] for event in events] == ["a", "b"]
+    assert os.path.getsize(segment) > indexed_size
+    await reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_append_leaves_the_log_consistent(tmp_path):
+    serializer = EventSerializer()
+
+    def serialize(event):
+        if event.data["call_id"] == "bad":
+            raise TypeError("not serializable")
+        return serializer.dumps(event)
+
+    backend = SegmentedLogEventStoreBackend(str(tmp_path), serialize=serialize, deserialize=serializer.loads)
+    await backend.append("call-1", [started("call-1", "a")])
+
+    batch = [started("call-1", "b"), started("call-1", "bad")]
+    with pytest.raises(TypeError):
+        await backend.append("call-1", batch)
+    assert [event.event_version for event in batch] == [1, 1]
+
+    await backend.append("call-1", [started("call-1", "c")])
+
+    events = await backend.read_stream("call-1")
+    assert [event.data["call_id"] for event in events] == ["a", "c"]
+    assert [event.event_version for event in events] == [1, 2]
+    assert await backend.head_position() == 2
+    await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_write_after_a_segment_roll_is_rolled_back(tmp_path):
+    backend = open_log(tmp_path, segment_max_bytes=256)
+    await backend.append("call-1", [started("call-1", "a")])
+    flush = backend._flush
+    flushes = []
+
+    def failing_flush(chunks):
+        flushes.append(chunks)
+        flush(chunks)
+        if len(flushes) == 2:
+            raise OSError("disk full")
+
+    # The batch fills the first segment and fails while writing to the next one
+    backend._flush = failing_flush
+    with pytest.raises(OSError):
+        await backend.append("call-1", [started("call-1", str(i)) for i in range(10)])
+    backend._flush = flush
+
+    assert not os.path.exists(tmp_path / "segment-000002.log")
+
+    await backend.append("call-1", [started("call-1", "b")])
+    events = await backend.read_stream("call-1")
+    assert [event.data["call_id"] for event in events] == ["a", "b"]
+    assert await backend.head_position() == 2
+    await backend.close()
@@ -0,0 +1,236 @@
+# shared/tests/test_rate_limiter.py
+import asyncio
+
+import pytest
+
+from shared.ratelimit import (
+    GCRA, SLIDING_WINDOW, TOKEN_BUCKET,
+    LocalRateLimiter, RateLimitRule, RedisRateLimiter
+)
+from shared.ratelimit.testing import LocalRedisStandIn
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.mark.parametrize("algorithm", [TOKEN_BUCKET, GCRA, SLIDING_WINDOW])
+def test_allows_limit_then_rejects(algorithm, clock):
+    limiter = LocalRateLimiter(algorithm, clock=clock)
+    rule = RateLimitRule(5, 10)
+
+    results = [limiter.check("client", rule) for _ in range(6)]
+
+    assert [r.allowed for r in results] == [True] * 5 + [False]
+    assert results[0].remaining == 4
+    assert results[-1].remaining == 0
+    assert results[-1].retry_after > 0
+    assert "Retry-After" in results[-1].headers()
+
+
+def test_token_bucket_refills_over_time(clock):
+    limiter = LocalRateLimiter(TOKEN_BUCKET, clock=clock)
+    rule = RateLimitRule(10, 10)
+
+    for _ in range(10):
+        assert limiter.check("client", rule).allowed
+    rejected = limiter.check("client", rule)
+    assert not rejected.allowed
+    assert rejected.retry_after == pytest.approx(1.0)
+
+    clock.advance(1.0)
+    assert limiter.check("client", rule).allowed
+    assert not limiter.check("client", rule).allowed
+
+
+def test_gcra_honours_burst(clock):
+    limiter = LocalRateLimiter(GCRA, clock=clock)
+    rule = RateLimitRule(1, 1, burst=3)
+
+    assert [limiter.check("client", rule).allowed for _ in range(4)] == [True, True, True, False]
+    clock.advance(1.0)
+    assert limiter.check("client", rule).allowed
+
+
+def test_sliding_window_weights_previous_window(clock):
+    clock.now = 1_000_000.0  # Aligned to a 10s window boundary
+    limiter = LocalRateLimiter(SLIDING_WINDOW, clock=clock)
+    rule = RateLimitRule(10, 10)
+
+    for _ in range(10):
+        assert limiter.check("client", rule).allowed
+
+    # Halfway through the next window half of the previous count still applies
+    clock.advance(15)
+    assert [limiter.check("client", rule).allowed for _ in range(6)] == [True] * 5 + [False]
+
+
+def test_peek_does_not_consume(clock):
+    limiter = LocalRateLimiter(TOKEN_BUCKET, clock=clock)
+    rule = RateLimitRule(3, 60)
+
+    limiter.check("client", rule)
+    assert limiter.peek("client", rule).remaining == 2
+    assert limiter.peek("client", rule).remaining == 2
+    assert limiter.peek("unknown", rule).remaining == 3
+
+
+def test_idle_keys_are_evicted(clock):
+    limiter = LocalRateLimiter(TOKEN_BUCKET, clock=clock)
+    rule = RateLimitRule(10, 1)
+
+    for i in range(100):
+        limiter.check(f"client-{i}", rule)
+    clock.advance(5)
+    for _ in range(50):
+        limiter.check("active", rule)
+        clock.advance(0.1)
+
+    stats = limiter.get_stats()
+    assert stats["tracked_keys"] == 1
+    assert stats["evicted_keys"] == 100
+
+
+def test_key_count_is_capped(clock):
+    limiter = LocalRateLimiter(TOKEN_BUCKET, max_keys=10, clock=clock)
+    rule = RateLimitRule(10, 60)
+
+    for i in range(25):
+        limiter.check(f"client-{i}", rule)
+
+    stats = limiter.get_stats()
+    assert stats["tracked_keys"] == 10
+    assert stats["forced_evictions"] == 15
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("algorithm", [TOKEN_BUCKET, GCRA, SLIDING_WINDOW])
+async def test_redis_limiter_batches_checks(algorithm, clock):
+    redis_client = LocalRedisStandIn(clock=clock)
+    limiter = RedisRateLimiter(redis_client, algorithm)
+    rule = RateLimitRule(2, 60)
+
+    results = await limiter.check_many([
+        ("ip:10.0.0.1", rule, 1),
+        ("user:42", rule, 1),
+        ("user:42", rule, 1),
+        ("user:42", rule, 1),
+    ])
+
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert redis_client.round_trips == 1
+    assert limiter.get_stats()["rejected_checks"] == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_limiter_is_shared_between_instances(clock):
+    redis_client = LocalRedisStandIn(clock=clock)
+    gateway_a = RedisRateLimiter(redis_client)
+    gateway_b = RedisRateLimiter(redis_client)
+    rule = RateLimitRule(2, 60)
+
+    assert (await gateway_a.check("user:42", rule)).allowed
+    assert (await gateway_b.check("user:42", rule)).allowed
+    assert not (await gateway_a.check("user:42", rule)).allowed
+
+
+@pytest.mark.asyncio
+async def test_redis_limiter_falls_back_to_local(clock):
+    redis_client = LocalRedisStandIn(clock=clock)
+    redis_client.available = False
+    limiter = RedisRateLimiter(redis_client, fallback=LocalRateLimiter(clock=clock))
+    rule = RateLimitRule(1, 60)
+
+    assert (await limiter.check("user:42", rule)).allowed
+    assert not (await limiter.check("user:42", rule)).allowed
+    assert limiter.get_stats()["fallback_checks"] == 2
+
+
+# The tests below run the Lua scripts themselves on fakeredis. The scripts read the
+# server's TIME, so they work with real time and windows long enough not to move.
+
+@pytest.fixture
+def redis_server():
+    fakeredis = pytest.importorskip("fakeredis.aioredis")
+    pytest.importorskip("lupa")  # fakeredis needs lupa to run EVAL/EVALSHA
+    return fakeredis.FakeRedis()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("algorithm", [TOKEN_BUCKET, GCRA, SLIDING_WINDOW])
+async def test_lua_scripts_allow_limit_then_reject(algorithm, redis_server):
+    limiter = RedisRateLimiter(redis_server, algorithm)
+    rule = RateLimitRule(5, 60)
+
+    results = await limiter.check_many([("user:42", rule, 1)] * 6 + [("user:7", rule, 1)])
+
+    assert [r.allowed for r in results] == [True] * 5 + [False, True]
+    assert [r.remaining for r in results[:5]] == [4, 3, 2, 1, 0]
+    assert results[5].retry_after > 0
+    assert limiter.get_stats()["fallback_checks"] == 0
+
+    # State lives in Redis under the prefix and expires on its own
+    ttl = await redis_server.pttl("rate_limit:user:42")
+    assert 0 < ttl <= 120_000
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("algorithm", [TOKEN_BUCKET, GCRA, SLIDING_WINDOW])
+async def test_lua_scripts_match_local_algorithms(algorithm, redis_server, clock):
+    limiter = RedisRateLimiter(redis_server, algorithm)
+    local = LocalRateLimiter(algorithm, clock=clock)
+    rule = RateLimitRule(4, 60, burst=2 if algorithm == GCRA else None)
+    costs = [1, 2, 1, 1, 3, 1]
+
+    remote = await limiter.check_many([("client", rule, cost) for cost in costs])
+    expected = [local.check("client", rule, cost) for cost in costs]
+
+    assert [r.allowed for r in remote] == [r.allowed for r in expected]
+    assert [r.remaining for r in remote] == [r.remaining for r in expected]
+
+
+@pytest.mark.asyncio
+async def test_lua_scripts_are_shared_between_instances(redis_server):
+    gateway_a = RedisRateLimiter(redis_server, GCRA)
+    gateway_b = RedisRateLimiter(redis_server, GCRA)
+    rule = RateLimitRule(2, 60)
+
+    assert (await gateway_a.check("user:42", rule)).allowed
+    assert (await gateway_b.check("user:42", rule)).allowed
+    assert not (await gateway_a.check("user:42", rule)).allowed
+
+
+@pytest.mark.asyncio
+async def test_lua_token_bucket_refills_after_retry_after(redis_server):
+    limiter = RedisRateLimiter(redis_server, TOKEN_BUCKET)
+    rule = RateLimitRule(20, 1)
+
+    results = await limiter.check_many([("client", rule, 1)] * 21)
+    rejected = results[-1]
+    assert not rejected.allowed
+    assert 0 < rejected.retry_after <= 0.05
+
+    await asyncio.sleep(rejected.retry_after + 0.02)
+    assert (await limiter.check("client", rule)).allowed
+
+
+@pytest.mark.asyncio
+async def test_lua_state_does_not_collide_with_other_key_types(redis_server):
+    await redis_server.zadd("rate_limit:ip:10.0.0.1", {"1": 1})
+    limiter = RedisRateLimiter(redis_server, SLIDING_WINDOW, prefix="rate_limit:v2:")
+
+    assert (await limiter.check("ip:10.0.0.1", RateLimitRule(1, 60))).allowed
+    assert limiter.get_stats()["fallback_checks"] == 0
+    assert await redis_server.type("rate_limit:v2:ip:10.0.0.1") == b"hash"
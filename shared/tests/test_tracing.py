@@ -0,0 +1,144 @@
+# shared/tests/test_tracing.py
+import asyncio
+
+import pytest
+
+from shared.monitoring.testing import LocalCollectorStandIn
+from shared.monitoring.tracing import (
+    BatchSpanExporter, DistributedTracer, current_span,
+    format_traceparent, inject_trace_context, parse_traceparent
+)
+
+
+@pytest.fixture
+def collector():
+    return LocalCollectorStandIn()
+
+
+def make_tracer(collector, **kwargs):
+    return DistributedTracer("test-service", exporter=BatchSpanExporter(collector), **kwargs)
+
+
+def test_traceparent_round_trip():
+    header = format_traceparent("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", True)
+
+    context = parse_traceparent(header)
+
+    assert header == "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    assert context.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert context.span_id == "00f067aa0ba902b7"
+    assert context.sampled
+
+
+@pytest.mark.parametrize("value", [
+    None, "", "garbage",
+    "00-00000000000000000000000000000000-00f067aa0ba902b7-01",
+    "ff-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01",
+])
+def test_invalid_traceparent_is_ignored(value):
+    assert parse_traceparent(value) is None
+
+
+@pytest.mark.asyncio
+async def test_head_sampled_trace_is_exported(collector):
+    tracer = make_tracer(collector, sample_rate=1.0)
+
+    async with tracer.trace("request") as root:
+        async with tracer.trace("query") as child:
+            assert current_span() is child
+        assert current_span() is root
+    await tracer.shutdown()
+
+    spans = collector.find(root.trace_id)
+    assert {span["name"] for span in spans} == {"request", "query"}
+    assert child.parent_span_id == root.span_id
+    assert tracer.traces_head_sampled == 1
+
+
+@pytest.mark.asyncio
+async def test_unsampled_fast_trace_is_dropped(collector):
+    tracer = make_tracer(collector, sample_rate=0.0)
+
+    async with tracer.trace("request"):
+        async with tracer.trace("query"):
+            pass
+    await tracer.shutdown()
+
+    assert collector.spans == []
+    assert tracer.traces_dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_error_trace_is_always_kept(collector):
+    tracer = make_tracer(collector, sample_rate=0.0)
+
+    with pytest.raises(ValueError):
+        async with tracer.trace("request") as root:
+            async with tracer.trace("query"):
+                raise ValueError("boom")
+    await tracer.shutdown()
+
+    spans = collector.find(root.trace_id)
+    assert len(spans) == 2
+    assert all(span["status"]["code"] == 2 for span in spans)
+    assert tracer.traces_tail_sampled == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_trace_is_always_kept(collector):
+    tracer = make_tracer(collector, sample_rate=0.0, slow_trace_ms=10)
+
+    async with tracer.trace("request") as root:
+        await asyncio.sleep(0.02)
+    await tracer.shutdown()
+
+    assert len(collector.find(root.trace_id)) == 1
+
+
+@pytest.mark.asyncio
+async def test_remote_parent_decision_is_inherited(collector):
+    tracer = make_tracer(collector, sample_rate=0.0)
+    parent = parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01")
+
+    async with tracer.trace("request", parent_context=parent) as span:
+        headers = inject_trace_context({"accept": "application/json"})
+    await tracer.shutdown()
+
+    assert span.trace_id == parent.trace_id
+    assert span.parent_span_id == parent.span_id
+    assert headers["traceparent"] == format_traceparent(parent.trace_id, span.span_id, True)
+    assert len(collector.find(parent.trace_id)) == 1
+
+
+@pytest.mark.asyncio
+async def test_span_buffer_is_bounded(collector):
+    tracer = make_tracer(collector, sample_rate=0.0, max_spans=50)
+
+    for _ in range(200):
+        async with tracer.trace("request"):
+            pass
+
+    assert len(tracer.spans) == 50
+    assert not tracer.active_spans
+
+
+@pytest.mark.asyncio
+async def test_exporter_batches_and_survives_collector_outage(collector):
+    exporter = BatchSpanExporter(collector, max_batch_size=10, flush_interval=60)
+    tracer = DistributedTracer("test-service", sample_rate=1.0, exporter=exporter)
+
+    collector.available = False
+    async with tracer.trace("lost"):
+        pass
+    await exporter.flush()
+    collector.available = True
+
+    for _ in range(25):
+        async with tracer.trace("request"):
+            pass
+    await tracer.shutdown()
+
+    assert [len(r["resourceSpans"][0]["scopeSpans"][0]["spans"]) for r in collector.requests] == [10, 10, 5]
+    assert exporter.failed_batches == 1
+    assert exporter.dropped_spans == 1
+    assert collector.closed
@@ -0,0 +1,312 @@
+"""
+Sliding-Window Circuit Breaker
+Circuit breaker that trips on the failure rate and slow-call rate over the last
+N calls or N seconds, in constant memory and without locks, with a bounded
+number of trial calls while half-open.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CircuitState(Enum):
+    """Circuit breaker states"""
+    CLOSED = "closed"        # Normal operation
+    OPEN = "open"           # Failing, blocking requests
+    HALF_OPEN = "half_open" # Testing if service recovered
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+class CountWindow:
+    """Outcomes of the last `size` calls, in a ring of one byte per call"""
+
+    _RECORDED, _FAILED, _SLOW = 1, 2, 4
+
+    def __init__(self, size: int):
+        self.size = size
+        self._outcomes = bytearray(size)
+        self._index = 0
+        self.calls = self.failures = self.slow_calls = 0
+
+    def record(self, failed: bool, slow: bool, now: float):
+        old = self._outcomes[self._index]
+        if old:
+            self.calls -= 1
+            self.failures -= bool(old & self._FAILED)
+            self.slow_calls -= bool(old & self._SLOW)
+
+        self._outcomes[self._index] = self._RECORDED | (self._FAILED if failed else 0) | (self._SLOW if slow else 0)
+        self._index = (self._index + 1) % self.size
+        self.calls += 1
+        self.failures += failed
+        self.slow_calls += slow
+
+    def totals(self, now: float) -> Tuple[int, int, int]:
+        return self.calls, self.failures, self.slow_calls
+
+    def reset(self):
+        self._outcomes = bytearray(self.size)
+        self._index = 0
+        self.calls = self.failures = self.slow_calls = 0
+
+class TimeWindow:
+    """Outcomes of the last `size` seconds, in a ring of one-second buckets"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._calls = [0] * size
+        self._failures = [0] * size
+        self._slow = [0] * size
+        self._head = 0  # Second the newest bucket belongs to
+        self.calls = self.failures = self.slow_calls = 0
+
+    def _advance(self, now: float):
+        second = int(now)
+        if second <= self._head:
+            return
+        if second - self._head >= self.size:
+            self.reset()
+        else:
+            # Empty the buckets of the seconds that have slid out of the window
+            for expired in range(self._head + 1, second + 1):
+                index = expired % self.size
+                self.calls -= self._calls[index]
+                self.failures -= self._failures[index]
+                self.slow_calls -= self._slow[index]
+                self._calls[index] = self._failures[index] = self._slow[index] = 0
+        self._head = second
+
+    def record(self, failed: bool, slow: bool, now: float):
+        self._advance(now)
+        index = self._head % self.size
+        self._calls[index] += 1
+        self._failures[index] += failed
+        self._slow[index] += slow
+        self.calls += 1
+        self.failures += failed
+        self.slow_calls += slow
+
+    def totals(self, now: float) -> Tuple[int, int, int]:
+        self._advance(now)
+        return self.calls, self.failures, self.slow_calls
+
+    def reset(self):
+        for bucket in (self._calls, self._failures, self._slow):
+            bucket[:] = [0] * self.size
+        self.calls = self.failures = self.slow_calls = 0
+
+WINDOW_TYPES = {"count": CountWindow, "time": TimeWindow}
+
+class CircuitBreaker:
+    """Circuit breaker for calls to one dependency.
+
+    While closed, outcomes go into a sliding window of the last `window_size`
+    calls (`window_type="count"`) or seconds (`"time"`); once it holds at
+    least `minimum_calls`, the circuit opens if the failure rate or the rate of
+    calls slower than `slow_call_duration` reaches its threshold (percent).
+    After `wait_duration` it turns half-open and lets `half_open_calls` trial
+    calls through; their rates decide whether it closes or opens again. Trial
+    permits that are never returned (e.g. an abandoned call) are re-issued
+    after another `wait_duration`.
+
+    State only changes in synchronous code, so there is no lock: the breaker
+    is safe to share between tasks on one event loop, but not across threads.
+    Use call() for coroutines, or allow_request() followed by exactly one of
+    record_success(), record_failure() or release() around your own call.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 50.0,
+        slow_call_rate_threshold: float = 100.0,
+        slow_call_duration: float = 10.0,
+        window_type: str = "count",
+        window_size: int = 100,
+        minimum_calls: int = 20,
+        wait_duration: float = 60.0,
+        half_open_calls: int = 3,
+        expected_exception: Type[BaseException] = Exception,
+        timeout: Optional[float] = None
+    ):
+        if window_type not in WINDOW_TYPES:
+            raise ValueError(f"Unknown window type '{window_type}', expected one of {sorted(WINDOW_TYPES)}")
+
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.minimum_calls = minimum_calls
+        self.wait_duration = wait_duration
+        self.half_open_calls = half_open_calls
+        self.expected_exception = expected_exception
+        self.timeout = timeout
+        self.window = WINDOW_TYPES[window_type](window_size)
+
+        self._state = CircuitState.CLOSED
+        self._state_changed_at = time.monotonic()
+        self._trial_permits = 0
+        self._trial_calls = self._trial_failures = self._trial_slow = 0
+
+        # Statistics
+        self.total_requests = 0
+        self.successful_requests = 0
+        self.failed_requests = 0
+        self.slow_requests = 0
+        self.rejected_requests = 0
+        self.state_changes = 0
+        self.last_failure_time: Optional[float] = None
+        self.last_success_time: Optional[float] = None
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state is CircuitState.OPEN and time.monotonic() - self._state_changed_at >= self.wait_duration:
+            self._change_state(CircuitState.HALF_OPEN)
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Whether a call may go ahead now; in half-open this takes one of the trial permits"""
+        if self._state is CircuitState.CLOSED:
+            return True
+        state = self.state
+        if state is CircuitState.HALF_OPEN:
+            if self._trial_permits == 0 and time.monotonic() - self._state_changed_at >= self.wait_duration:
+                self._change_state(CircuitState.HALF_OPEN)  # Trials went missing; start a new round
+            if self._trial_permits > 0:
+                self._trial_permits -= 1
+                return True
+        self.rejected_requests += 1
+        return False
+
+    def record_success(self, duration: float = 0.0):
+        """Record a call that completed"""
+        self.successful_requests += 1
+        self.last_success_time = time.time()
+        self._record(False, duration)
+
+    def record_failure(self, duration: float = 0.0):
+        """Record a call that failed"""
+        self.failed_requests += 1
+        self.last_failure_time = time.time()
+        self._record(True, duration)
+
+    def release(self):
+        """Give back the permit of a call whose outcome says nothing about the dependency"""
+        if self._state is CircuitState.HALF_OPEN and self._trial_permits < self.half_open_calls:
+            self._trial_permits += 1
+
+    def _record(self, failed: bool, duration: float):
+        self.total_requests += 1
+        slow = duration >= self.slow_call_duration
+        self.slow_requests += slow
+        state = self._state
+
+        if state is CircuitState.CLOSED:
+            now = time.monotonic()
+            self.window.record(failed, slow, now)
+            if not (failed or slow):
+                return  # A good call can't push either rate over its threshold
+            calls, failures, slow_calls = self.window.totals(now)
+            if calls >= self.minimum_calls and self._exceeds_thresholds(calls, failures, slow_calls):
+                logger.warning(
+                    f"Circuit breaker '{self.name}' tripped: {failures}/{calls} calls failed, {slow_calls}/{calls} slow"
+                )
+                self._change_state(CircuitState.OPEN)
+        elif state is CircuitState.HALF_OPEN:
+            self._trial_calls += 1
+            self._trial_failures += failed
+            self._trial_slow += slow
+            if self._trial_calls >= self.half_open_calls:
+                if self._exceeds_thresholds(self._trial_calls, self._trial_failures, self._trial_slow):
+                    self._change_state(CircuitState.OPEN)
+                else:
+                    self._change_state(CircuitState.CLOSED)
+        # Calls that were let through before the circuit opened don't count
+
+    def _exceeds_thresholds(self, calls: int, failures: int, slow_calls: int) -> bool:
+        return (
+            failures * 100 >= self.failure_rate_threshold * calls
+            or slow_calls * 100 >= self.slow_call_rate_threshold * calls
+        )
+
+    def _change_state(self, new_state: CircuitState):
+        """Change circuit state and log"""
+        old_state = self._state
+        self._state = new_state
+        self._state_changed_at = time.monotonic()
+        self.state_changes += 1
+        self._trial_calls = self._trial_failures = self._trial_slow = 0
+        self._trial_permits = self.half_open_calls if new_state is CircuitState.HALF_OPEN else 0
+        if new_state is CircuitState.CLOSED:
+            self.window.reset()
+
+        if old_state is not new_state:
+            logger.info(f"Circuit breaker '{self.name}' changed from {old_state.value} to {new_state.value}")
+
+    def force_open(self):
+        """Open the circuit now; it turns half-open after `wait_duration` as usual"""
+        self._change_state(CircuitState.OPEN)
+
+    def force_close(self):
+        """Close the circuit and forget the outcomes recorded so far"""
+        self._change_state(CircuitState.CLOSED)
+
+    async def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Execute function with circuit breaker protection"""
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit breaker '{self.name}' is OPEN")
+
+        started = time.monotonic()
+        try:
+            if self.timeout is None:
+                result = await func(*args, **kwargs)
+            else:
+                result = await asyncio.wait_for(func(*args, **kwargs), timeout=self.timeout)
+        except (self.expected_exception, asyncio.TimeoutError):
+            self.record_failure(time.monotonic() - started)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record_success(time.monotonic() - started)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get circuit breaker statistics"""
+        calls, failures, slow_calls = self.window.totals(time.monotonic())
+        return {
+            "name": self.name,
+            "state": self.state.value,
+            "window_type": "time" if isinstance(self.window, TimeWindow) else "count",
+            "window_calls": calls,
+            "failure_count": failures,
+            "failure_rate": failures / calls * 100 if calls > 0 else 0,
+            "slow_call_rate": slow_calls / calls * 100 if calls > 0 else 0,
+            "total_requests": self.total_requests,
+            "successful_requests": self.successful_requests,
+            "failed_requests": self.failed_requests,
+            "slow_requests": self.slow_requests,
+            "rejected_requests": self.rejected_requests,
+            "success_rate": (
+                self.successful_requests / self.total_requests
+                if self.total_requests > 0 else 0
+            ),
+            "state_changes": self.state_changes,
+            "last_failure_time": datetime.utcfromtimestamp(self.last_failure_time) if self.last_failure_time else None,
+            "last_success_time": datetime.utcfromtimestamp(self.last_success_time) if self.last_success_time else None
+        }
+
+__all__ = [
+    "WINDOW_TYPES",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "CircuitState",
+    "CountWindow",
+    "TimeWindow",
+]
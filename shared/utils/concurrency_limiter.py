@@ -0,0 +1,330 @@
+"""
+Adaptive Concurrency Limits
+Concurrency limiter whose in-flight limit follows observed latency (AIMD,
+Vegas or gradient algorithms), with a short bounded queue so excess work is
+shed quickly instead of piling up.
+"""
+
+import asyncio
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+import logging
+
+from ..monitoring.histogram import WindowedHistogram
+
+logger = logging.getLogger(__name__)
+
+class LimitExceededError(Exception):
+    """Raised when a call is shed because the limiter and its queue are full"""
+
+class LimitAlgorithm(ABC):
+    """Computes the concurrency limit from completed calls"""
+
+    def __init__(self, initial_limit: int, min_limit: int = 1, max_limit: int = 1000):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self._limit = float(initial_limit)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _set(self, value: float):
+        self._limit = min(max(value, self.min_limit), self.max_limit)
+
+    @abstractmethod
+    def update(self, rtt: float, inflight: int, dropped: bool) -> None:
+        """Record one completed call: its latency (seconds), the in-flight count when it started,
+        and whether it was dropped (timed out or rejected by an overloaded dependency)"""
+
+class FixedLimit(LimitAlgorithm):
+    """Static limit; the behavior of a plain semaphore bulkhead"""
+
+    def __init__(self, limit: int):
+        super().__init__(limit, limit, limit)
+
+    def update(self, rtt: float, inflight: int, dropped: bool) -> None:
+        pass
+
+class AIMDLimit(LimitAlgorithm):
+    """Additive increase while the limit is being used, multiplicative decrease on drops
+    or calls slower than `timeout`"""
+
+    def __init__(self, initial_limit: int = 20, min_limit: int = 1, max_limit: int = 200,
+                 backoff_ratio: float = 0.9, timeout: float = 5.0):
+        super().__init__(initial_limit, min_limit, max_limit)
+        self.backoff_ratio = backoff_ratio
+        self.timeout = timeout
+
+    def update(self, rtt: float, inflight: int, dropped: bool) -> None:
+        if dropped or rtt > self.timeout:
+            self._set(self._limit * self.backoff_ratio)
+        elif inflight * 2 >= self._limit:
+            self._set(self._limit + 1)
+
+class VegasLimit(LimitAlgorithm):
+    """TCP Vegas: estimates the queue at the dependency from how far latency sits above
+    the no-load latency, growing the limit while the queue is short (< alpha) and
+    shrinking it when it is long (> beta). The no-load latency is re-learned every
+    `probe_interval` calls so a permanently slower dependency is not mistaken for queuing."""
+
+    def __init__(self, initial_limit: int = 20, min_limit: int = 1, max_limit: int = 200,
+                 alpha: float = 3, beta: float = 6, smoothing: float = 1.0, probe_interval: int = 1000):
+        super().__init__(initial_limit, min_limit, max_limit)
+        self.alpha = alpha
+        self.beta = beta
+        self.smoothing = smoothing
+        self.probe_interval = probe_interval
+        self.rtt_noload = 0.0
+        self._samples = 0
+
+    def update(self, rtt: float, inflight: int, dropped: bool) -> None:
+        self._samples += 1
+        if self._samples % self.probe_interval == 0:
+            self.rtt_noload = 0.0
+        if rtt <= 0:
+            return
+        if self.rtt_noload == 0.0 or rtt < self.rtt_noload:
+            self.rtt_noload = rtt
+            return
+
+        limit = self._limit
+        step = max(1.0, math.log10(limit))
+        if dropped:
+            new_limit = limit - step
+        else:
+            if inflight * 2 < limit:
+                return  # Not using the limit; latency says nothing about it
+            queue = limit * (1 - self.rtt_noload / rtt)
+            if queue < self.alpha:
+                new_limit = limit + step
+            elif queue > self.beta:
+                new_limit = limit - step
+            else:
+                return
+        self._set(limit * (1 - self.smoothing) + new_limit * self.smoothing)
+
+class GradientLimit(LimitAlgorithm):
+    """Gradient: scales the limit by how far recent latency sits above the no-load latency
+    (tolerance * rtt_noload / rtt, bounded to [0.5, 1]), plus sqrt(limit) headroom so it
+    keeps probing upwards while latency is flat. The no-load latency is the minimum over
+    the last two windows of `probe_interval` samples, so it follows a dependency that has
+    permanently slowed down."""
+
+    def __init__(self, initial_limit: int = 20, min_limit: int = 1, max_limit: int = 200,
+                 smoothing: float = 0.2, tolerance: float = 1.5,
+                 short_window: int = 10, probe_interval: int = 500):
+        super().__init__(initial_limit, min_limit, max_limit)
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.probe_interval = probe_interval
+        self._alpha = 2 / (short_window + 1)
+        self.rtt = 0.0
+        self._previous_min = math.inf
+        self._window_min = math.inf
+        self._samples = 0
+
+    @property
+    def rtt_noload(self) -> float:
+        return min(self._previous_min, self._window_min)
+
+    def update(self, rtt: float, inflight: int, dropped: bool) -> None:
+        if rtt > 0:
+            self._samples += 1
+            if self._samples % self.probe_interval == 0:
+                self._previous_min, self._window_min = self._window_min, math.inf
+            self._window_min = min(self._window_min, rtt)
+            self.rtt = rtt if self.rtt == 0.0 else self.rtt + (rtt - self.rtt) * self._alpha
+        if self.rtt <= 0:
+            return
+
+        limit = self._limit
+        if inflight < limit / 2 and not dropped:
+            return  # Not using the limit; latency says nothing about it
+
+        gradient = 0.5 if dropped else max(0.5, min(1.0, self.tolerance * self.rtt_noload / self.rtt))
+        new_limit = limit * gradient + math.sqrt(limit)
+        self._set(limit * (1 - self.smoothing) + new_limit * self.smoothing)
+
+LIMIT_ALGORITHMS: Dict[str, Type[LimitAlgorithm]] = {
+    "aimd": AIMDLimit,
+    "vegas": VegasLimit,
+    "gradient": GradientLimit,
+}
+
+class AdaptiveConcurrencyLimiter:
+    """Caps in-flight calls to a dependency at a limit that adapts to its latency.
+
+    Calls beyond the limit wait in a FIFO queue of at most `max_queue` entries
+    for at most `max_queue_wait` seconds, and are rejected with
+    LimitExceededError otherwise, so an overloaded dependency sheds load at
+    once instead of building an unbounded backlog. Timeouts and
+    `drop_exceptions` count as drops (strong overload signals); other errors
+    are ignored by the algorithm since they say nothing about capacity.
+
+    Pass a MetricsRegistry to export the limit, in-flight count and
+    queue-wait histogram.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit_algorithm: Optional[LimitAlgorithm] = None,
+        max_queue: int = 10,
+        max_queue_wait: float = 0.05,
+        drop_exceptions: Tuple[Type[BaseException], ...] = (asyncio.TimeoutError,),
+        registry=None
+    ):
+        self.name = name
+        self.algorithm = limit_algorithm or GradientLimit()
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait
+        self.drop_exceptions = drop_exceptions
+        self.inflight = 0
+        self._waiters: deque = deque()
+        self._queued = 0
+
+        # Statistics
+        self.total_requests = 0
+        self.rejected_requests = 0
+        self.dropped_requests = 0
+        self.queue_wait = WindowedHistogram()  # Milliseconds spent queued, for calls that had to wait
+
+        self._limit_gauge = self._inflight_gauge = None
+        if registry is not None:
+            labels = {"limiter": name}
+            self._limit_gauge = registry.gauge("concurrency_limit", "Current adaptive concurrency limit").labels(labels)
+            self._inflight_gauge = registry.gauge("concurrency_inflight", "Calls in flight").labels(labels)
+            registry.summary("concurrency_queue_wait_ms", "Milliseconds calls waited for a slot").labels(labels).histogram = self.queue_wait
+            self._rejected_counter = registry.counter("concurrency_rejected", "Calls shed by the limiter").labels(labels)
+            self._limit_gauge.set(self.algorithm.limit)
+
+    @property
+    def limit(self) -> int:
+        return self.algorithm.limit
+
+    async def acquire(self) -> int:
+        """Take a slot, waiting briefly if the queue has room; returns the in-flight count at start"""
+        self.total_requests += 1
+        if self.inflight < self.algorithm.limit and not self._queued:
+            self.inflight += 1
+            self._report_inflight()
+            return self.inflight
+
+        if self._queued >= self.max_queue or self.max_queue_wait <= 0:
+            self._reject()
+
+        # Expired waiters are left in the deque; drop them before queueing
+        while self._waiters and self._waiters[0].done():
+            self._waiters.popleft()
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        expiry = loop.call_later(self.max_queue_wait, self._expire, waiter)
+        self._waiters.append(waiter)
+        self._queued += 1
+        started = time.monotonic()
+        expired = False
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self._release_slot()  # Granted just as the caller was cancelled
+            raise
+        except LimitExceededError:
+            expired = True
+        finally:
+            expiry.cancel()
+            self._queued -= 1
+
+        if expired:
+            self._reject()
+        self.queue_wait.record((time.monotonic() - started) * 1000)
+        return self.inflight
+
+    def _expire(self, waiter: asyncio.Future):
+        if not waiter.done():
+            waiter.set_exception(LimitExceededError())
+
+    def _reject(self):
+        self.rejected_requests += 1
+        if self._limit_gauge is not None:
+            self._rejected_counter.inc()
+        raise LimitExceededError(
+            f"Concurrency limiter '{self.name}' is at capacity ({self.algorithm.limit} in flight, {self._queued} queued)"
+        )
+
+    def release(self, rtt: float, inflight: int, dropped: bool = False, ignored: bool = False):
+        """Free a slot and feed the call's outcome to the algorithm"""
+        if dropped:
+            self.dropped_requests += 1
+        if not ignored:
+            old_limit = self.algorithm.limit
+            self.algorithm.update(rtt, inflight, dropped)
+            if self._limit_gauge is not None and self.algorithm.limit != old_limit:
+                self._limit_gauge.set(self.algorithm.limit)
+        self._release_slot()
+
+    def _release_slot(self):
+        self.inflight -= 1
+        # Hand freed slots straight to queued callers, oldest first
+        while self._waiters and self.inflight < self.algorithm.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(None)
+        self._report_inflight()
+
+    def _report_inflight(self):
+        if self._inflight_gauge is not None:
+            self._inflight_gauge.set(self.inflight)
+
+    async def execute(self, func: Callable, *args, **kwargs) -> Any:
+        """Execute function within the concurrency limit"""
+        inflight = await self.acquire()
+        started = time.monotonic()
+        dropped = ignored = False
+        try:
+            return await func(*args, **kwargs)
+        except self.drop_exceptions:
+            dropped = True
+            raise
+        except BaseException:
+            ignored = True
+            raise
+        finally:
+            self.release(time.monotonic() - started, inflight, dropped, ignored)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter statistics"""
+        wait = self.queue_wait.window("1m")
+        return {
+            "name": self.name,
+            "algorithm": type(self.algorithm).__name__,
+            "max_concurrent": self.algorithm.limit,
+            "active_requests": self.inflight,
+            "queued_requests": self._queued,
+            "total_requests": self.total_requests,
+            "rejected_requests": self.rejected_requests,
+            "dropped_requests": self.dropped_requests,
+            "rejection_rate": (
+                self.rejected_requests / self.total_requests
+                if self.total_requests > 0 else 0
+            ),
+            "queue_wait_p50_ms": wait.quantile(0.5) or 0,
+            "queue_wait_p99_ms": wait.quantile(0.99) or 0
+        }
+
+__all__ = [
+    "LIMIT_ALGORITHMS",
+    "AIMDLimit",
+    "AdaptiveConcurrencyLimiter",
+    "FixedLimit",
+    "GradientLimit",
+    "LimitAlgorithm",
+    "LimitExceededError",
+    "VegasLimit",
+]
@@ -7,135 +7,16 @@ import asyncio
 import time
 import logging
 from typing import Callable, Any, Optional, Dict, List
-from enum import Enum
-from dataclasses import dataclass, field
 from functools import wraps
 import aiohttp
-from datetime import datetime, timedelta
 import random
 
-logger = logging.getLogger(__name__)
-
-class CircuitState(Enum):
-    """Circuit breaker states"""
-    CLOSED = "closed"        # Normal operation
-    OPEN = "open"           # Failing, blocking requests
-    HALF_OPEN = "half_open" # Testing if service recovered
-
-@dataclass
-class CircuitBreakerStats:
-    """Statistics for circuit breaker"""
-    total_requests: int = 0
-    successful_requests: int = 0
-    failed_requests: int = 0
-    consecutive_failures: int = 0
-    last_failure_time: Optional[datetime] = None
-    last_success_time: Optional[datetime] = None
-    state_changes: List[tuple] = field(default_factory=list)
+from ..monitoring.tracing import DistributedTracer, inject_trace_context
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from .concurrency_limiter import AdaptiveConcurrencyLimiter, FixedLimit, GradientLimit, LimitExceededError
+from .service_client import ClientRegistry, get_client_registry
 
-class CircuitBreaker:
-    """Circuit breaker implementation for external service calls"""
-    
-    def __init__(
-        self,
-        name: str,
-        failure_threshold: int = 5,
-        recovery_timeout: int = 60,
-        expected_exception: type = Exception,
-        success_threshold: int = 3,
-        timeout: float = 30.0
-    ):
-        self.name = name
-        self.failure_threshold = failure_threshold
-        self.recovery_timeout = recovery_timeout
-        self.expected_exception = expected_exception
-        self.success_threshold = success_threshold
-        self.timeout = timeout
-        
-        self.state = CircuitState.CLOSED
-        self.stats = CircuitBreakerStats()
-        self._lock = asyncio.Lock()
-        
-    async def call(self, func: Callable, *args, **kwargs) -> Any:
-        """Execute function with circuit breaker protection"""
-        async with self._lock:
-            if self.state == CircuitState.OPEN:
-                if self._should_attempt_reset():
-                    self._change_state(CircuitState.HALF_OPEN)
-                else:
-                    raise Exception(f"Circuit breaker '{self.name}' is OPEN")
-            
-            self.stats.total_requests += 1
-            
-        try:
-            # Execute with timeout
-            result = await asyncio.wait_for(func(*args, **kwargs), timeout=self.timeout)
-            await self._on_success()
-            return result
-            
-        except self.expected_exception as e:
-            await self._on_failure()
-            raise e
-        except asyncio.TimeoutError:
-            await self._on_failure()
-            raise Exception(f"Timeout after {self.timeout}s")
-    
-    async def _on_success(self):
-        """Handle successful execution"""
-        async with self._lock:
-            self.stats.successful_requests += 1
-            self.stats.consecutive_failures = 0
-            self.stats.last_success_time = datetime.utcnow()
-            
-            if self.state == CircuitState.HALF_OPEN:
-                if self.stats.successful_requests >= self.success_threshold:
-                    self._change_state(CircuitState.CLOSED)
-    
-    async def _on_failure(self):
-        """Handle failed execution"""
-        async with self._lock:
-            self.stats.failed_requests += 1
-            self.stats.consecutive_failures += 1
-            self.stats.last_failure_time = datetime.utcnow()
-            
-            if (self.state == CircuitState.CLOSED and 
-                self.stats.consecutive_failures >= self.failure_threshold):
-                self._change_state(CircuitState.OPEN)
-            elif self.state == CircuitState.HALF_OPEN:
-                self._change_state(CircuitState.OPEN)
-    
-    def _should_attempt_reset(self) -> bool:
-        """Check if circuit should attempt to reset"""
-        if self.stats.last_failure_time is None:
-            return True
-        
-        time_since_failure = datetime.utcnow() - self.stats.last_failure_time
-        return time_since_failure.total_seconds() >= self.recovery_timeout
-    
-    def _change_state(self, new_state: CircuitState):
-        """Change circuit state and log"""
-        old_state = self.state
-        self.state = new_state
-        self.stats.state_changes.append((old_state, new_state, datetime.utcnow()))
-        
-        logger.info(f"Circuit breaker '{self.name}' changed from {old_state.value} to {new_state.value}")
-    
-    def get_stats(self) -> Dict[str, Any]:
-        """Get circuit breaker statistics"""
-        return {
-            "name": self.name,
-            "state": self.state.value,
-            "total_requests": self.stats.total_requests,
-            "successful_requests": self.stats.successful_requests,
-            "failed_requests": self.stats.failed_requests,
-            "success_rate": (
-                self.stats.successful_requests / self.stats.total_requests 
-                if self.stats.total_requests > 0 else 0
-            ),
-            "consecutive_failures": self.stats.consecutive_failures,
-            "last_failure_time": self.stats.last_failure_time,
-            "last_success_time": self.stats.last_success_time
-        }
+logger = logging.getLogger(__name__)
 
 class RetryPolicy:
     """Retry policy with exponential backoff and jitter"""
@@ -197,65 +78,47 @@ async def retry_with_policy(policy: RetryPolicy, func: Callable, *args, **kwargs
     # This should never be reached, but just in case
     raise last_exception
 
-class BulkheadIsolation:
-    """Bulkhead isolation pattern to limit resource usage"""
+class BulkheadIsolation(AdaptiveConcurrencyLimiter):
+    """Bulkhead isolation pattern with a fixed limit: calls beyond `max_concurrent` are rejected.
+    
+    Prefer AdaptiveConcurrencyLimiter, which finds the limit from latency instead.
+    """
     
     def __init__(self, name: str, max_concurrent: int = 10):
-        self.name = name
+        super().__init__(name, FixedLimit(max_concurrent), max_queue=0)
         self.max_concurrent = max_concurrent
-        self.semaphore = asyncio.Semaphore(max_concurrent)
-        self.active_requests = 0
-        self.total_requests = 0
-        self.rejected_requests = 0
-    
-    async def execute(self, func: Callable, *args, **kwargs) -> Any:
-        """Execute function with bulkhead isolation"""
-        self.total_requests += 1
-        
-        try:
-            # Try to acquire semaphore (non-blocking)
-            acquired = self.semaphore.acquire_nowait()
-            if not acquired:
-                self.rejected_requests += 1
-                raise Exception(f"Bulkhead '{self.name}' is at capacity ({self.max_concurrent})")
-            
-            self.active_requests += 1
-            try:
-                return await func(*args, **kwargs)
-            finally:
-                self.active_requests -= 1
-                self.semaphore.release()
-                
-        except Exception as e:
-            logger.warning(f"Bulkhead '{self.name}' rejected request: {str(e)}")
-            raise
     
-    def get_stats(self) -> Dict[str, Any]:
-        """Get bulkhead statistics"""
-        return {
-            "name": self.name,
-            "max_concurrent": self.max_concurrent,
-            "active_requests": self.active_requests,
-            "total_requests": self.total_requests,
-            "rejected_requests": self.rejected_requests,
-            "rejection_rate": (
-                self.rejected_requests / self.total_requests 
-                if self.total_requests > 0 else 0
-            )
-        }
+    @property
+    def active_requests(self) -> int:
+        return self.inflight
 
 class ResilientServiceClient:
     """Service client with circuit breaker, retry, and bulkhead patterns"""
     
-    def __init__(self, service_name: str, base_url: str):
+    def __init__(
+        self,
+        service_name: str,
+        base_url: str,
+        tracer: Optional[DistributedTracer] = None,
+        limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        pool: str = "default",
+        registry: Optional[ClientRegistry] = None
+    ):
         self.service_name = service_name
         self.base_url = base_url.rstrip("/")
+        self.tracer = tracer  # Records a client span per request when set
+        self.pool = pool
+        self.registry = registry
         
         # Initialize resilience components
         self.circuit_breaker = CircuitBreaker(
             name=f"{service_name}_circuit",
-            failure_threshold=5,
-            recovery_timeout=60
+            failure_rate_threshold=50.0,
+            slow_call_rate_threshold=80.0,
+            slow_call_duration=10.0,
+            minimum_calls=10,
+            wait_duration=60,
+            timeout=30.0
         )
         
         self.retry_policy = RetryPolicy(
@@ -264,39 +127,38 @@ class ResilientServiceClient:
             retryable_exceptions=(aiohttp.ClientError, asyncio.TimeoutError)
         )
         
-        self.bulkhead = BulkheadIsolation(
+        # In-flight limit adapts to the service's latency; excess calls are shed quickly
+        self.bulkhead = limiter or AdaptiveConcurrencyLimiter(
             name=f"{service_name}_bulkhead",
-            max_concurrent=10
+            limit_algorithm=GradientLimit(initial_limit=10, max_limit=100)
         )
-        
-        # HTTP session
-        self.session = None
     
     async def _get_session(self) -> aiohttp.ClientSession:
-        """Get or create HTTP session"""
-        if self.session is None or self.session.closed:
-            connector = aiohttp.TCPConnector(
-                limit=100,
-                limit_per_host=20,
-                ttl_dns_cache=300,
-                use_dns_cache=True,
-            )
-            
-            timeout = aiohttp.ClientTimeout(total=30, connect=10)
-            
-            self.session = aiohttp.ClientSession(
-                connector=connector,
-                timeout=timeout,
-                headers={"User-Agent": f"VocelioServiceClient/{self.service_name}"}
-            )
-        
-        return self.session
+        """Get the process-wide pooled session"""
+        return (self.registry or get_client_registry()).session(self.pool)
     
     async def _make_request(self, method: str, endpoint: str, **kwargs) -> aiohttp.ClientResponse:
         """Make HTTP request with resilience patterns"""
         url = f"{self.base_url}{endpoint}"
+        if self.tracer is None:
+            return await self._send(method, url, **kwargs)
+        
+        async with self.tracer.trace(
+            f"{method} {endpoint}",
+            **{"http.method": method, "http.url": url, "peer.service": self.service_name}
+        ) as span:
+            span.kind = "client"
+            return await self._send(method, url, **kwargs)
+    
+    async def _send(self, method: str, url: str, **kwargs) -> aiohttp.ClientResponse:
         session = await self._get_session()
         
+        # Propagate the current trace to the downstream service
+        kwargs["headers"] = inject_trace_context({
+            "User-Agent": f"VocelioServiceClient/{self.service_name}",
+            **(kwargs.get("headers") or {})
+        })
+        
         async def _request():
             async with session.request(method, url, **kwargs) as response:
                 response.raise_for_status()
@@ -326,9 +188,7 @@ class ResilientServiceClient:
         return await self._make_request("DELETE", endpoint, **kwargs)
     
     async def close(self):
-        """Close HTTP session"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Nothing to release: connections belong to the shared pool, closed by close_client_registry()"""
     
     def get_health_stats(self) -> Dict[str, Any]:
         """Get comprehensive health statistics"""
@@ -342,12 +202,11 @@ class ResilientServiceClient:
 # Decorators for easy use
 def circuit_breaker(
     name: str,
-    failure_threshold: int = 5,
-    recovery_timeout: int = 60,
-    timeout: float = 30.0
+    timeout: Optional[float] = 30.0,
+    **breaker_options
 ):
-    """Decorator to add circuit breaker to function"""
-    cb = CircuitBreaker(name, failure_threshold, recovery_timeout, timeout=timeout)
+    """Decorator to add circuit breaker to function (see CircuitBreaker for the options)"""
+    cb = CircuitBreaker(name, timeout=timeout, **breaker_options)
     
     def decorator(func):
         @wraps(func)
@@ -371,9 +230,22 @@ def retry_on_failure(
         return wrapper
     return decorator
 
-def bulkhead_isolate(name: str, max_concurrent: int = 10):
-    """Decorator to add bulkhead isolation to function"""
-    bulkhead = BulkheadIsolation(name, max_concurrent)
+def bulkhead_isolate(
+    name: str,
+    max_concurrent: Optional[int] = None,
+    limit_algorithm=None,
+    **limiter_options
+):
+    """Decorator to add bulkhead isolation to function.
+    
+    With `max_concurrent` the limit is fixed; otherwise it adapts to latency
+    (`limit_algorithm`, gradient by default; see AdaptiveConcurrencyLimiter
+    for the other options).
+    """
+    if max_concurrent is not None:
+        bulkhead = BulkheadIsolation(name, max_concurrent)
+    else:
+        bulkhead = AdaptiveConcurrencyLimiter(name, limit_algorithm, **limiter_options)
     
     def decorator(func):
         @wraps(func)
@@ -0,0 +1,349 @@
+"""
+Service Client
+Process-wide registry of pooled HTTP connections for calls between services:
+keep-alive connectors with per-host caps, one DNS cache with a TTL shared by
+every pool, and orjson/msgpack body encoding when those are installed.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from ..monitoring.tracing import inject_trace_context
+
+logger = logging.getLogger(__name__)
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+# Serialization helpers
+def dumps_json(value: Any) -> bytes:
+    """Encode as JSON, with orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=str, separators=(",", ":")).encode()
+
+def loads_json(payload: bytes) -> Any:
+    """Decode JSON, with orjson when installed"""
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+def pack(value: Any) -> bytes:
+    """Encode as msgpack"""
+    if msgpack is None:
+        raise ImportError("msgpack is required for msgpack request bodies")
+    return msgpack.packb(value, default=str, use_bin_type=True)
+
+def unpack(payload: bytes) -> Any:
+    """Decode msgpack"""
+    if msgpack is None:
+        raise ImportError("msgpack is required for msgpack response bodies")
+    return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+def encode_body(value: Any, content_type: str = JSON_CONTENT_TYPE) -> bytes:
+    return pack(value) if content_type == MSGPACK_CONTENT_TYPE else dumps_json(value)
+
+def decode_body(payload: bytes, content_type: str) -> Any:
+    """Decode a response body by its content type; other types are returned as text"""
+    if not payload:
+        return None
+    if content_type == MSGPACK_CONTENT_TYPE or content_type == "application/x-msgpack":
+        return unpack(payload)
+    if content_type == JSON_CONTENT_TYPE or content_type.endswith("+json"):
+        return loads_json(payload)
+    return payload.decode("utf-8", errors="replace")
+
+class CachingResolver(AbstractResolver):
+    """DNS resolver caching answers for `ttl` seconds, shared by all connectors.
+
+    Concurrent lookups of the same name share one query, at most
+    `max_entries` names are kept (least recently used are evicted), and an
+    expired answer is still used if refreshing it fails.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple[str, int, int], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._pending: Dict[Tuple[str, int, int], asyncio.Future] = {}
+        self._resolver: Optional[AbstractResolver] = None
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> List[Dict[str, Any]]:
+        key = (host, port, family)
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        pending = self._pending.get(key)
+        if pending is None:
+            self.misses += 1
+            pending = self._pending[key] = asyncio.ensure_future(self._lookup(key, entry))
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _lookup(self, key: Tuple[str, int, int], stale) -> List[Dict[str, Any]]:
+        if self._resolver is None:
+            self._resolver = DefaultResolver()
+        try:
+            addresses = await self._resolver.resolve(*key)
+        except OSError:
+            if stale is None:
+                raise
+            self.stale_hits += 1
+            logger.warning(f"DNS lookup for {key[0]} failed, using the expired answer")
+            return stale[1]
+
+        self._cache[key] = (time.monotonic() + self.ttl, addresses)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return addresses
+
+    def clear(self):
+        self._cache.clear()
+
+    async def close(self) -> None:
+        if self._resolver is not None:
+            await self._resolver.close()
+            self._resolver = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "hit_rate": self.hits / lookups if lookups > 0 else 0
+        }
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """Connection pool settings for one named pool"""
+    limit: int = 100  # Connections across all hosts
+    limit_per_host: int = 20  # Connections to any one host:port
+    keepalive_timeout: float = 30.0  # Seconds an idle connection is kept
+    connect_timeout: float = 5.0
+    total_timeout: float = 30.0
+
+def pool_settings_from_env(prefix: str = "SERVICE_CLIENT") -> PoolSettings:
+    """Pool settings from <prefix>_POOL_LIMIT, _LIMIT_PER_HOST, _KEEPALIVE, _CONNECT_TIMEOUT and _TIMEOUT"""
+    defaults = PoolSettings()
+
+    def setting(name: str, default, cast=float):
+        value = os.getenv(f"{prefix}_{name}")
+        return cast(value) if value is not None else default
+
+    return PoolSettings(
+        limit=setting("POOL_LIMIT", defaults.limit, int),
+        limit_per_host=setting("LIMIT_PER_HOST", defaults.limit_per_host, int),
+        keepalive_timeout=setting("KEEPALIVE", defaults.keepalive_timeout),
+        connect_timeout=setting("CONNECT_TIMEOUT", defaults.connect_timeout),
+        total_timeout=setting("TIMEOUT", defaults.total_timeout)
+    )
+
+class ClientRegistry:
+    """Named aiohttp sessions, each over its own keep-alive connector, created on first use.
+
+    All pools resolve names through one CachingResolver. Clients ask for a
+    session per call rather than keeping one, so every caller in the process
+    shares the same warm connections; close() at shutdown closes them all.
+    """
+
+    def __init__(self, default_settings: Optional[PoolSettings] = None, dns_ttl: Optional[float] = None):
+        self.default_settings = default_settings or pool_settings_from_env()
+        self.resolver = CachingResolver(
+            ttl=dns_ttl if dns_ttl is not None else float(os.getenv("SERVICE_CLIENT_DNS_TTL", "60"))
+        )
+        self._settings: Dict[str, PoolSettings] = {}
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._loops: Dict[str, asyncio.AbstractEventLoop] = {}
+
+    def configure_pool(self, name: str, settings: PoolSettings):
+        """Use these settings for the pool `name` (applies when its session is next created)"""
+        self._settings[name] = settings
+
+    def session(self, pool: str = "default") -> aiohttp.ClientSession:
+        """The shared session of a pool; must be called from the event loop that will use it"""
+        session = self._sessions.get(pool)
+        loop = asyncio.get_running_loop()
+        if session is None or session.closed or self._loops.get(pool) is not loop:
+            session = self._sessions[pool] = self._create_session(pool)
+            self._loops[pool] = loop
+        return session
+
+    def _create_session(self, pool: str) -> aiohttp.ClientSession:
+        settings = self._settings.get(pool, self.default_settings)
+        connector = aiohttp.TCPConnector(
+            limit=settings.limit,
+            limit_per_host=settings.limit_per_host,
+            keepalive_timeout=settings.keepalive_timeout,
+            resolver=self.resolver,
+            use_dns_cache=False  # The resolver caches, for every pool at once
+        )
+        logger.info(f"HTTP pool '{pool}' ready ({settings.limit} connections, {settings.limit_per_host} per host)")
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=settings.total_timeout, connect=settings.connect_timeout),
+            json_serialize=lambda value: dumps_json(value).decode()
+        )
+
+    async def close(self):
+        """Close every pool's connections"""
+        sessions, self._sessions = self._sessions, {}
+        self._loops.clear()
+        for session in sessions.values():
+            if not session.closed:
+                await session.close()
+        await self.resolver.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        pools = {}
+        for name, session in self._sessions.items():
+            connector = session.connector
+            settings = self._settings.get(name, self.default_settings)
+            pools[name] = {
+                "closed": session.closed,
+                "limit": settings.limit,
+                "limit_per_host": settings.limit_per_host,
+                "in_use": len(getattr(connector, "_acquired", ())),
+                "idle": sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+            }
+        return {"pools": pools, "dns": self.resolver.get_stats()}
+
+_registry: Optional[ClientRegistry] = None
+
+def get_client_registry() -> ClientRegistry:
+    """The process-wide client registry"""
+    global _registry
+    if _registry is None:
+        _registry = ClientRegistry()
+    return _registry
+
+async def close_client_registry():
+    """Close the process-wide pools; call on service shutdown"""
+    global _registry
+    if _registry is not None:
+        await _registry.close()
+        _registry = None
+
+class ServiceClient:
+    """Client for calling other Vocelio services over the process-wide pools.
+
+    Instances are cheap (they hold no connections), so services may create one
+    wherever convenient. Relative URLs are resolved against `base_url`
+    (API_GATEWAY_URL by default). Bodies given as `json`, or `data` that is a
+    dict or list, are sent as JSON, or msgpack with `use_msgpack=True` if installed;
+    responses are decoded by content type. Raises aiohttp.ClientResponseError
+    for 4xx/5xx responses.
+    """
+
+    def __init__(
+        self,
+        service_name: str = "unknown_service",
+        base_url: Optional[str] = None,
+        pool: str = "default",
+        use_msgpack: bool = False,
+        registry: Optional[ClientRegistry] = None
+    ):
+        self.service_name = service_name
+        self.base_url = (base_url or os.getenv("API_GATEWAY_URL", "http://localhost:8000")).rstrip("/")
+        self.pool = pool
+        self.content_type = MSGPACK_CONTENT_TYPE if use_msgpack and msgpack is not None else JSON_CONTENT_TYPE
+        self.registry = registry
+        self._headers = {
+            "User-Agent": f"VocelioServiceClient/{service_name}",
+            "Accept": f"{self.content_type}, {JSON_CONTENT_TYPE};q=0.9, */*;q=0.1"
+        }
+
+    def _url(self, url: str) -> str:
+        if url.startswith(("http://", "https://")):
+            return url
+        return f"{self.base_url}/{url.lstrip('/')}"
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        json: Any = None,
+        data: Any = None,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """Send a request and return the decoded response body"""
+        request_headers = inject_trace_context({**self._headers, **(headers or {})})
+        if json is None and isinstance(data, (dict, list)):
+            json, data = data, None
+        if json is not None:
+            data = encode_body(json, self.content_type)
+            request_headers["Content-Type"] = self.content_type
+
+        options = {"timeout": aiohttp.ClientTimeout(total=timeout)} if timeout is not None else {}
+        session = (self.registry or get_client_registry()).session(self.pool)
+        async with session.request(
+            method, self._url(url), data=data, params=params, headers=request_headers, **options
+        ) as response:
+            payload = await response.read()
+            response.raise_for_status()
+            return decode_body(payload, response.content_type)
+
+    async def get(self, url: str, **kwargs) -> Any:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> Any:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> Any:
+        return await self.request("PUT", url, **kwargs)
+
+    async def patch(self, url: str, **kwargs) -> Any:
+        return await self.request("PATCH", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> Any:
+        return await self.request("DELETE", url, **kwargs)
+
+__all__ = [
+    "JSON_CONTENT_TYPE",
+    "MSGPACK_CONTENT_TYPE",
+    "CachingResolver",
+    "ClientRegistry",
+    "PoolSettings",
+    "ServiceClient",
+    "close_client_registry",
+    "decode_body",
+    "dumps_json",
+    "encode_body",
+    "get_client_registry",
+    "loads_json",
+    "pack",
+    "pool_settings_from_env",
+    "unpack",
+]